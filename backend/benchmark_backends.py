@@ -0,0 +1,226 @@
+"""
+Serving Backend Selection
+Scores every serving backend available for a model bundle on the test split and measures its
+per-call latency. The candidates are Keras, TFLite (each converted quantization), the stacked
+ensemble and gradient-boosted trees. The most accurate backend whose p99 latency fits the
+budget is recommended, together with the environment settings that select it.
+
+Usage:
+    python benchmark_backends.py                                  # base bundle, 1ms budget at bs=1
+    python benchmark_backends.py --latency-budget-ms 0.1 --batch-size 32
+    python benchmark_backends.py --version v2 --max-mae 4.5 --json backends.json
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from ml_model import (
+    KPI_MULTIPLIERS,
+    KPI_NAMES,
+    WARMUP_BATCH_SIZES,
+    build_serving_function,
+    load_model_and_scalers,
+    load_scalers
+)
+from model_registry import ModelRegistry, BASE_VERSION
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = Path(__file__).parent / 'trained_models'
+
+
+def find_backends(bundle_dir: Path) -> Dict[str, Dict]:
+    """
+    Load every serving backend a bundle can be served with
+
+    Args:
+        bundle_dir: Bundle directory
+
+    Returns:
+        Dict mapping candidate name to its predict function, the scalers its features
+        are scaled with, and the environment settings that serve it
+    """
+    from tflite_model import QUANTIZATION_MODES, TFLiteKPIModel, tflite_model_path
+    from ensemble_model import ENSEMBLE_DIR_NAME, ensemble_member_paths, load_stacked_ensemble
+    from gbdt_model import load_gbdt
+
+    model, scalers = load_model_and_scalers(bundle_dir)
+    candidates = {
+        'keras': {
+            'predict': build_serving_function(model),
+            'scalers': scalers,
+            'env': {'KPI_SERVING_BACKEND': 'keras'}
+        }
+    }
+
+    for quantization in QUANTIZATION_MODES:
+        path = tflite_model_path(bundle_dir, quantization)
+        if path.exists():
+            candidates[f'tflite:{quantization}'] = {
+                'predict': TFLiteKPIModel(path).predict_batch,
+                'scalers': scalers,
+                'env': {'KPI_SERVING_BACKEND': 'tflite', 'KPI_TFLITE_QUANTIZATION': quantization}
+            }
+
+    ensemble_dir = bundle_dir / ENSEMBLE_DIR_NAME
+    if ensemble_member_paths(ensemble_dir):
+        ensemble = load_stacked_ensemble(ensemble_dir)
+        candidates[f'ensemble[{ensemble.num_members}]'] = {
+            'predict': ensemble.predict_batch,
+            'scalers': load_scalers(ensemble_dir),
+            'env': {'KPI_SERVING_BACKEND': 'ensemble'}
+        }
+
+    gbdt = load_gbdt(bundle_dir)
+    if gbdt is not None:
+        candidates['gbdt'] = {
+            'predict': gbdt.predict_batch,
+            'scalers': scalers,
+            'env': {'KPI_SERVING_BACKEND': 'gbdt'}
+        }
+
+    return candidates
+
+
+def _measure_latency_ms(predict_fn: Callable, feature_matrix: np.ndarray, batch_size: int, repeats: int) -> Dict[str, float]:
+    """Measure p50/p99 latency (ms) of predict_fn at a given batch size"""
+    batch = np.ascontiguousarray(feature_matrix[np.arange(batch_size) % len(feature_matrix)], dtype=np.float32)
+    predict_fn(batch)  # Warm-up
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_fn(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 4),
+        'p99_ms': round(float(np.percentile(timings, 99)), 4)
+    }
+
+
+def benchmark_backends(
+    bundle_dir: Path,
+    batch_sizes: List[int] = WARMUP_BATCH_SIZES,
+    repeats: int = 500
+) -> Dict[str, Dict]:
+    """
+    Test MAE and latency of every backend available for a bundle
+
+    The test orders are the test split of train_model (70/15/15, seed 42), scaled with
+    the scalers each backend was trained with.
+
+    Args:
+        bundle_dir: Bundle directory
+        batch_sizes: Batch sizes to measure latency at
+        repeats: Timed calls per batch size
+
+    Returns:
+        Dict mapping candidate name to its env settings, test MAE (KPI units, mean and per
+        KPI) and latency per batch size
+    """
+    from train_model import load_or_prepare_dataset, split_dataset
+    from feature_extraction import scale_feature_matrix
+
+    X, y = load_or_prepare_dataset()
+    _, _, X_test, _, _, y_test = split_dataset(X, y)
+    multipliers = np.array(KPI_MULTIPLIERS, dtype=np.float64)
+
+    results = {}
+    for name, candidate in find_backends(bundle_dir).items():
+        features = scale_feature_matrix(X_test, candidate['scalers']).astype(np.float32)
+        kpi_mae = np.abs(candidate['predict'](features) - y_test).mean(axis=0) * multipliers
+        results[name] = {
+            'env': candidate['env'],
+            'test_mae': round(float(kpi_mae.mean()), 4),
+            'test_mae_per_kpi': {kpi: round(float(kpi_mae[i]), 4) for i, kpi in enumerate(KPI_NAMES)},
+            'latency': {
+                str(batch_size): _measure_latency_ms(candidate['predict'], features, batch_size, repeats)
+                for batch_size in batch_sizes
+            }
+        }
+        logger.info(f"✓ {name}: test MAE {results[name]['test_mae']:.3f}")
+    return results
+
+
+def select_backend(
+    results: Dict[str, Dict],
+    latency_budget_ms: float,
+    batch_size: int,
+    max_mae: Optional[float] = None
+) -> Optional[str]:
+    """
+    Pick the most accurate backend whose p99 latency at batch_size fits the budget
+
+    Args:
+        results: Output of benchmark_backends
+        latency_budget_ms: p99 latency budget per call
+        batch_size: Batch size the budget applies to (must have been measured)
+        max_mae: Optional upper bound on the mean test MAE (KPI units)
+
+    Returns:
+        Candidate name, or None if no backend meets the constraints
+    """
+    eligible = [
+        name for name, result in results.items()
+        if result['latency'][str(batch_size)]['p99_ms'] <= latency_budget_ms
+        and (max_mae is None or result['test_mae'] <= max_mae)
+    ]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda name: (results[name]['test_mae'], results[name]['latency'][str(batch_size)]['p99_ms']))
+
+
+def log_results(results: Dict[str, Dict]):
+    """Log a comparison table of benchmark_backends results"""
+    batch_sizes = list(next(iter(results.values()))['latency'])
+    logger.info("=" * 80)
+    logger.info(f"{'backend':<18} {'test MAE':>9}  " + '  '.join(f"{'bs=' + bs + ' p50/p99 ms':>22}" for bs in batch_sizes))
+    for name, result in sorted(results.items(), key=lambda item: item[1]['test_mae']):
+        latency = '  '.join(
+            f"{result['latency'][bs]['p50_ms']:>10.3f} / {result['latency'][bs]['p99_ms']:<9.3f}" for bs in batch_sizes
+        )
+        logger.info(f"{name:<18} {result['test_mae']:>9.3f}  {latency}")
+    logger.info("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick a serving backend by accuracy and latency budget")
+    parser.add_argument('--version', default=BASE_VERSION, help="Registry version to benchmark (default: base bundle)")
+    parser.add_argument('--latency-budget-ms', type=float, default=1.0, help="p99 latency budget per call")
+    parser.add_argument('--batch-size', type=int, default=1, help="Batch size the budget applies to")
+    parser.add_argument('--max-mae', type=float, default=None, help="Reject backends with a higher mean test MAE")
+    parser.add_argument('--repeats', type=int, default=500, help="Timed calls per batch size")
+    parser.add_argument('--json', type=Path, default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(MODELS_DIR)
+    if not registry.has_version(args.version):
+        parser.error(f"Unknown model version: {args.version}")
+
+    batch_sizes = sorted(set(WARMUP_BATCH_SIZES) | {args.batch_size})
+    results = benchmark_backends(registry.bundle_dir(args.version), batch_sizes, args.repeats)
+    log_results(results)
+
+    choice = select_backend(results, args.latency_budget_ms, args.batch_size, args.max_mae)
+    if choice is None:
+        logger.warning(f"⚠️ No backend meets p99 ≤ {args.latency_budget_ms}ms at bs={args.batch_size}"
+                       + (f" with MAE ≤ {args.max_mae}" if args.max_mae is not None else ""))
+    else:
+        settings = ' '.join(f"{key}={value}" for key, value in results[choice]['env'].items())
+        logger.info(f"✅ Recommended backend: {choice} (test MAE {results[choice]['test_mae']:.3f}, "
+                    f"p99 {results[choice]['latency'][str(args.batch_size)]['p99_ms']:.3f}ms at bs={args.batch_size})")
+        logger.info(f"   {settings}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': results, 'recommended': choice}, f, indent=2)
+        logger.info(f"✓ Saved results to {args.json}")
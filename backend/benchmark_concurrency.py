@@ -0,0 +1,200 @@
+"""
+Mixed-Load Concurrency Benchmark
+Starts the API with uvicorn, once with the handler stages inline on the event loop
+(KPI_STAGE_POOLS=0) and once with the per-stage worker pools, and drives each with the
+same mixed load: light requests (health, single-scenario simulate) interleaved with heavy
+ones (3D scene export, data summary, Monte Carlo). Reports p50/p99 latency per endpoint,
+so the effect of a slow stage on everything else shows directly.
+
+Usage:
+    python benchmark_concurrency.py                              # inline vs pooled, 20s each
+    python benchmark_concurrency.py --duration 30 --concurrency 16
+    python benchmark_concurrency.py --modes pooled --json concurrency.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).parent
+
+MODES = {
+    'inline': {'KPI_STAGE_POOLS': '0'},
+    'pooled': {'KPI_STAGE_POOLS': '1'}
+}
+
+# (name, weight); light requests dominate, as in interactive use. A data summary costs
+# about a second of CPU, so it is kept rare enough not to saturate one core on its own
+REQUEST_MIX = [
+    ('health', 50),
+    ('simulate', 30),
+    ('data-summary', 2),
+    ('sample', 9),
+    ('monte-carlo', 9)
+]
+LIGHT_REQUESTS = ['health', 'simulate']
+
+STARTUP_TIMEOUT_S = 300
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env_overrides: Dict[str, str], port: int) -> subprocess.Popen:
+    """Start `uvicorn main:app` with extra environment settings (one worker process)"""
+    env = {**os.environ, **env_overrides}
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+
+async def wait_until_ready(client, timeout_s: float = STARTUP_TIMEOUT_S):
+    """Poll /api/ready until the server has loaded and warmed up the model"""
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get('/api/ready')
+            if response.status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"Server not ready after {timeout_s}s")
+
+
+async def build_requests(client) -> Dict[str, Tuple[str, str, Dict]]:
+    """Request (method, path, JSON body) per mix entry, for the most frequent variant"""
+    session_id = (await client.post('/api/session/start')).json()['session_id']
+    variant = (await client.get('/api/most-frequent-variant')).json()
+    activities = [step['name'] for step in variant['steps'] if step['id'] not in ('start', 'end')]
+    graph = {'activities': activities, 'edges': [], 'kpis': {}}
+    return {
+        'health': ('GET', '/api/health', None),
+        'simulate': ('POST', '/api/simulate', {'event_log': [], 'graph': graph, 'session_id': session_id}),
+        'data-summary': ('GET', '/api/data-summary', None),
+        'sample': ('GET', '/api/sample', None),
+        'monte-carlo': ('POST', '/api/simulate/monte-carlo', {'graph': graph, 'session_id': session_id, 'samples': 10000})
+    }
+
+
+async def run_load(client, requests: Dict, duration_s: float, concurrency: int, seed: int) -> Dict[str, List[float]]:
+    """Run `concurrency` clients for duration_s, each issuing weighted-random requests back to back"""
+    names = [name for name, _ in REQUEST_MIX]
+    weights = [weight for _, weight in REQUEST_MIX]
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    deadline = time.monotonic() + duration_s
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed + worker_id)
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = requests[name]
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if response.status_code == 200:
+                latencies[name].append(elapsed_ms)
+            else:
+                errors[name] += 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    for name, count in errors.items():
+        if count:
+            logger.warning(f"⚠️ {name}: {count} failed requests")
+    return latencies
+
+
+def summarize(latencies: Dict[str, List[float]], duration_s: float) -> Dict[str, Dict]:
+    """Count, throughput and p50/p99 latency (ms) per request type, plus all light requests"""
+    groups = {**latencies, 'light (all)': [ms for name in LIGHT_REQUESTS for ms in latencies[name]]}
+    return {
+        name: {
+            'count': len(values),
+            'rps': round(len(values) / duration_s, 1),
+            'p50_ms': round(float(np.percentile(values, 50)), 1) if values else None,
+            'p99_ms': round(float(np.percentile(values, 99)), 1) if values else None
+        }
+        for name, values in groups.items()
+    }
+
+
+async def benchmark_mode(mode: str, duration_s: float, concurrency: int, seed: int) -> Dict[str, Dict]:
+    """Start a server in the given mode, warm it up, run the mixed load and stop it"""
+    import httpx
+
+    port = _free_port()
+    server = start_server(MODES[mode], port)
+    try:
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', timeout=120) as client:
+            await wait_until_ready(client)
+            requests = await build_requests(client)
+            for method, path, body in requests.values():  # First-call caches (scene dirs, variants)
+                await client.request(method, path, json=body)
+            logger.info(f"✓ {mode}: server ready on port {port}, running {duration_s:.0f}s at concurrency {concurrency}")
+            latencies = await run_load(client, requests, duration_s, concurrency, seed)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return summarize(latencies, duration_s)
+
+
+def log_results(results: Dict[str, Dict[str, Dict]]):
+    """Log p50/p99 per request type side by side for every mode"""
+    modes = list(results)
+    names = list(next(iter(results.values())))
+    logger.info("=" * 80)
+    logger.info(f"{'request':<14}" + ''.join(f"{mode + ' n / p50 / p99 ms':>31}" for mode in modes))
+    for name in names:
+        row = ''
+        for mode in modes:
+            stats = results[mode][name]
+            if stats['count']:
+                row += f"{stats['count']:>12} / {stats['p50_ms']:>6.1f} / {stats['p99_ms']:>7.1f}"
+            else:
+                row += f"{'-':>31}"
+        logger.info(f"{name:<14}{row}")
+    logger.info("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="p99 latency under mixed load, inline vs per-stage pools")
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds of load per mode")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', type=Path, default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = {
+        mode: asyncio.run(benchmark_mode(mode, args.duration, args.concurrency, args.seed))
+        for mode in args.modes
+    }
+    log_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"✓ Saved results to {args.json}")
@@ -0,0 +1,175 @@
+"""
+Import-Time Benchmark
+Runs each backend entry point under `python -X importtime` in a fresh interpreter and
+summarizes where startup time goes, so heavy dependencies don't creep back into
+rule-based mode or the data scripts.
+
+Usage:
+    python benchmark_imports.py                  # summary for all entry points
+    python benchmark_imports.py main --top 15    # single module, more detail
+    python benchmark_imports.py --budget 1.0     # also fail if a light module imports slower
+"""
+
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).parent
+
+# Entry points that should start without TensorFlow / sklearn / Groq
+LIGHT_MODULES = [
+    'main',
+    'ml_model',
+    'llm_service',
+    'simulation_engine',
+    'real_data_loader',
+    'regenerate_kpis',
+    'generate_order_variant_mapping',
+]
+
+# Entry points that are allowed to pull in heavy dependencies
+HEAVY_MODULES = [
+    'train_model',
+]
+
+# main.py parses the event log at module import, so it is excluded from the time budget
+BUDGET_EXEMPT = ['main']
+
+# Packages whose presence in a light entry point counts as a regression
+HEAVY_PACKAGES = ['tensorflow', 'keras', 'sklearn', 'groq']
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    Parse `-X importtime` output
+
+    Args:
+        stderr: stderr of the interpreter run
+
+    Returns:
+        List of dicts with 'module', 'self_us', 'cumulative_us' and 'depth'
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            # Format: "import time: <self us> | <cumulative us> | <indent><module>"
+            self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+            name = name[1:]
+            depth = (len(name) - len(name.lstrip(' '))) // 2
+            entries.append({
+                'module': name.strip(),
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': depth
+            })
+        except ValueError:
+            continue
+    return entries
+
+
+def benchmark_module(module_name: str, top: int = 10) -> Dict:
+    """
+    Import one module in a fresh interpreter and summarize its import cost
+
+    Args:
+        module_name: Backend module to import
+        top: Number of top-level imports to report
+
+    Returns:
+        Summary dict with wall time, total import time, heaviest imports and heavy packages loaded
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    wall_s = time.perf_counter() - start
+
+    entries = parse_importtime(result.stderr)
+    loaded = {entry['module'].split('.')[0] for entry in entries}
+
+    # Direct imports of the module (depth 1) carry the cumulative cost of everything below them
+    top_level = sorted(
+        (entry for entry in entries if entry['depth'] == 1),
+        key=lambda entry: entry['cumulative_us'],
+        reverse=True
+    )
+
+    return {
+        'module': module_name,
+        'ok': result.returncode == 0,
+        'wall_s': round(wall_s, 3),
+        'import_s': round(sum(entry['self_us'] for entry in entries) / 1e6, 3),
+        'heavy_packages': [pkg for pkg in HEAVY_PACKAGES if pkg in loaded],
+        'top_imports': [
+            {'module': entry['module'], 'cumulative_ms': round(entry['cumulative_us'] / 1000, 1)}
+            for entry in top_level[:top]
+        ]
+    }
+
+
+def log_summary(summary: Dict):
+    """Log one module's benchmark summary"""
+    status = '✓' if summary['ok'] else '❌'
+    heavy = ', '.join(summary['heavy_packages']) or '-'
+    logger.info(
+        f"{status} {summary['module']:32s} import={summary['import_s']:.3f}s "
+        f"wall={summary['wall_s']:.3f}s heavy=[{heavy}]"
+    )
+    for entry in summary['top_imports']:
+        logger.info(f"      {entry['cumulative_ms']:9.1f}ms  {entry['module']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize `-X importtime` for backend entry points")
+    parser.add_argument('modules', nargs='*', help="Modules to benchmark (default: all entry points)")
+    parser.add_argument('--top', type=int, default=5, help="Top-level imports to show per module")
+    parser.add_argument('--budget', type=float, default=None,
+                        help="Fail if a light module's import time exceeds this many seconds")
+    parser.add_argument('--json', type=Path, default=None, help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    modules = args.modules or LIGHT_MODULES + HEAVY_MODULES
+
+    logger.info("=" * 80)
+    logger.info("IMPORT-TIME BENCHMARK (python -X importtime)")
+    logger.info("=" * 80)
+
+    summaries = [benchmark_module(module_name, top=args.top) for module_name in modules]
+    for summary in summaries:
+        log_summary(summary)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summaries, f, indent=2)
+        logger.info(f"✓ Saved summary to {args.json}")
+
+    failures = []
+    for summary in summaries:
+        if summary['module'] not in LIGHT_MODULES:
+            continue
+        if not summary['ok']:
+            failures.append(f"{summary['module']}: import failed")
+        if summary['heavy_packages']:
+            failures.append(f"{summary['module']}: loads {', '.join(summary['heavy_packages'])}")
+        if args.budget is not None and summary['module'] not in BUDGET_EXEMPT and summary['import_s'] > args.budget:
+            failures.append(f"{summary['module']}: {summary['import_s']:.3f}s > {args.budget:.3f}s budget")
+
+    if failures:
+        for failure in failures:
+            logger.error(f"❌ {failure}")
+        sys.exit(1)
+    logger.info("✅ Light entry points stay free of heavy dependencies")
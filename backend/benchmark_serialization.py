@@ -0,0 +1,126 @@
+"""
+Serialization and Compression Benchmark
+Measures, on the bundled scene files in exports/, how long each JSON serializer takes and
+how large the payload is on the wire: the previous format (stdlib json, NumpyEncoder,
+indent=2), compact stdlib json, orjson, and the compact body compressed with gzip (per
+request and precompressed) and brotli (if installed).
+
+Usage:
+    python benchmark_serialization.py                      # all scene files in exports/
+    python benchmark_serialization.py --repeats 200
+    python benchmark_serialization.py --files exports/order_1_scene.json --json serialization.json
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from compression import (
+    BROTLI_QUALITY, GZIP_LEVEL, PRECOMPRESS_BROTLI_QUALITY, PRECOMPRESS_GZIP_LEVEL, brotli
+)
+from serialization import NumpyEncoder, resolve_backend
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXPORTS_DIR = Path(__file__).parent / 'exports'
+
+
+def serializers() -> Dict[str, Callable[[object], bytes]]:
+    """Serializer name -> function returning the JSON bytes"""
+    result = {
+        'json indent=2': lambda obj: json.dumps(obj, indent=2, cls=NumpyEncoder).encode('utf-8'),
+        'json compact': resolve_backend('json')[1]
+    }
+    name, dumps = resolve_backend('orjson')
+    if name == 'orjson':
+        result['orjson'] = dumps
+    return result
+
+
+def encoders() -> Dict[str, Callable[[bytes], bytes]]:
+    """Content encoding name -> compression function"""
+    result = {
+        f'gzip-{GZIP_LEVEL}': lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        f'gzip-{PRECOMPRESS_GZIP_LEVEL} (pre)': lambda body: gzip.compress(body, compresslevel=PRECOMPRESS_GZIP_LEVEL, mtime=0)
+    }
+    if brotli is not None:
+        result[f'br-{BROTLI_QUALITY}'] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+        result[f'br-{PRECOMPRESS_BROTLI_QUALITY} (pre)'] = lambda body: brotli.compress(body, quality=PRECOMPRESS_BROTLI_QUALITY)
+    return result
+
+
+def time_us(fn: Callable, arg, repeats: int) -> float:
+    """Mean wall time of fn(arg) in microseconds"""
+    fn(arg)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(arg)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def benchmark(files: List[Path], repeats: int) -> Dict[str, Dict]:
+    """
+    Total size and serialization / compression time over the given scene files
+
+    Returns:
+        Dict of variant name -> {'bytes', 'us'} (sums over all files)
+    """
+    scenes = [json.loads(path.read_bytes()) for path in files]
+    results: Dict[str, Dict] = {}
+
+    for name, dumps in serializers().items():
+        results[name] = {
+            'bytes': sum(len(dumps(scene)) for scene in scenes),
+            'us': round(sum(time_us(dumps, scene, repeats) for scene in scenes), 1)
+        }
+
+    compact = [resolve_backend('json')[1](scene) for scene in scenes]
+    for name, encode in encoders().items():
+        results[name] = {
+            'bytes': sum(len(encode(body)) for body in compact),
+            'us': round(sum(time_us(encode, body, repeats) for body in compact), 1)
+        }
+    return results
+
+
+def log_results(results: Dict[str, Dict], num_files: int):
+    """Log size (and ratio to the indented format) and time per variant"""
+    baseline = results['json indent=2']
+    logger.info("=" * 70)
+    logger.info(f"{num_files} scene files")
+    logger.info(f"{'variant':<22}{'bytes':>12}{'vs indent=2':>14}{'time (us)':>14}")
+    for name, stats in results.items():
+        ratio = stats['bytes'] / baseline['bytes']
+        logger.info(f"{name:<22}{stats['bytes']:>12}{ratio:>13.0%}{stats['us']:>14.1f}")
+    if brotli is None:
+        logger.info("(brotli not installed - br rows skipped)")
+    logger.info("=" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON serializer speed and compressed payload size on scene files")
+    parser.add_argument('--files', type=Path, nargs='+', default=None, help="Scene files (default: exports/**/*_scene.json and exports/scenes/*)")
+    parser.add_argument('--repeats', type=int, default=100, help="Timed calls per file and variant")
+    parser.add_argument('--json', type=Path, default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    files = args.files or sorted(
+        path for path in EXPORTS_DIR.rglob('*.json')
+        if not path.name.startswith('.') and not path.name.endswith('.meta.json')
+    )
+    if not files:
+        raise SystemExit(f"No scene files in {EXPORTS_DIR}")
+
+    results = benchmark(files, args.repeats)
+    log_results(results, len(files))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"✓ Saved results to {args.json}")
@@ -0,0 +1,215 @@
+"""
+Training Input Pipeline Benchmark
+Compares epoch time of the tf.data input pipeline (train_model.make_dataset) with
+handing NumPy arrays to model.fit, at several batch sizes. Larger batches use the
+square-root-scaled learning rate. With --full, every configuration is also trained to
+convergence (early stopping) and its test MAE reported, to check that the faster
+setting doesn't cost accuracy. --compact adds tf.data runs on training sets compacted
+at the given tolerances (see train_model.compact_dataset), with the compression ratio
+and, with --full, the change in test MAE per KPI.
+
+Usage:
+    python benchmark_training.py                          # epoch times, 10 epochs each
+    python benchmark_training.py --batch-sizes 32 128 --epochs 20
+    python benchmark_training.py --full --json results.json
+    python benchmark_training.py --batch-sizes 256 --paths tf.data --compact 0 1.5 --full
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from tensorflow import keras
+
+from train_model import (
+    BASE_BATCH_SIZE,
+    build_model,
+    compact_dataset,
+    load_or_prepare_dataset,
+    make_callbacks,
+    make_dataset,
+    scaled_learning_rate,
+    split_and_normalize
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INPUT_PATHS = ['numpy', 'tf.data']
+KPI_NAMES = ['on_time_delivery', 'days_sales_outstanding', 'order_accuracy', 'invoice_accuracy', 'avg_cost_delivery']
+
+
+class EpochTimer(keras.callbacks.Callback):
+    """Keras callback recording the wall time of every epoch"""
+
+    def __init__(self):
+        super().__init__()
+        self.seconds: List[float] = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.seconds.append(time.perf_counter() - self._start)
+
+
+def run_configuration(
+    input_path: str,
+    batch_size: int,
+    data: Dict[str, np.ndarray],
+    epochs: int,
+    full: bool,
+    compact_tolerance: float = None,
+    seed: int = 42
+) -> Dict:
+    """
+    Train one (input path, batch size) configuration and time its epochs
+
+    Args:
+        input_path: 'numpy' (arrays to model.fit) or 'tf.data' (make_dataset)
+        batch_size: Training batch size
+        data: Scaled train/val/test arrays from split_and_normalize
+        epochs: Epochs to time (ignored with full, which trains to early stopping)
+        full: Train to convergence and report test MAE
+        compact_tolerance: Compact the training set first (tf.data only; None = all rows)
+        seed: Seed for weights and shuffling
+
+    Returns:
+        Dict with the configuration, epoch times and (full) test MAE
+    """
+    learning_rate = scaled_learning_rate(batch_size)
+    keras.utils.set_random_seed(seed)
+    model = build_model(learning_rate=learning_rate)
+    timer = EpochTimer()
+    callbacks = [timer] + (make_callbacks(verbose=0) if full else [])
+    max_epochs = 300 if full else epochs
+
+    sample_weight = None
+    if input_path == 'numpy':
+        history = model.fit(
+            data['X_train'],
+            [data['y_train'][:, i:i+1] for i in range(5)],
+            validation_data=(data['X_val'], [data['y_val'][:, i:i+1] for i in range(5)]),
+            epochs=max_epochs,
+            batch_size=batch_size,
+            callbacks=callbacks,
+            verbose=0
+        )
+    else:
+        X_fit, y_fit, sample_weight = data['X_train'], data['y_train'], None
+        if compact_tolerance is not None:
+            X_fit, y_fit, sample_weight, _ = compact_dataset(X_fit, y_fit, compact_tolerance)
+        history = model.fit(
+            make_dataset(X_fit, y_fit, batch_size, shuffle=True, seed=seed, sample_weight=sample_weight),
+            validation_data=make_dataset(data['X_val'], data['y_val'], 1024),
+            epochs=max_epochs,
+            callbacks=callbacks,
+            shuffle=False,  # make_dataset shuffles
+            verbose=0
+        )
+
+    # The first epoch includes graph tracing (and filling the tf.data cache)
+    steady = timer.seconds[1:] or timer.seconds
+    result = {
+        'input_path': input_path,
+        'batch_size': batch_size,
+        'compact_tolerance': compact_tolerance,
+        'train_rows': len(data['X_train']) if sample_weight is None else len(sample_weight),
+        'learning_rate': learning_rate,
+        'epochs': len(timer.seconds),
+        'first_epoch_s': round(timer.seconds[0], 4),
+        'epoch_s': round(float(np.median(steady)), 4),
+        'total_s': round(float(sum(timer.seconds)), 2)
+    }
+    if full:
+        predictions = np.concatenate(model.predict(data['X_test'], batch_size=1024, verbose=0), axis=1)
+        result['best_val_loss'] = round(float(min(history.history['val_loss'])), 6)
+        kpi_mae = np.abs(predictions - data['y_test']).mean(axis=0)
+        result['test_mae'] = round(float(kpi_mae.mean()), 6)
+        result['test_mae_per_kpi'] = {name: round(float(kpi_mae[i]), 6) for i, name in enumerate(KPI_NAMES)}
+    return result
+
+
+def log_results(results: List[Dict]):
+    """Log a comparison table, with speedups against numpy at the base batch size"""
+    baseline = next(
+        (r for r in results if r['input_path'] == 'numpy' and r['batch_size'] == BASE_BATCH_SIZE),
+        results[0]
+    )
+    logger.info("=" * 80)
+    logger.info(f"{'input':<8} {'batch':>6} {'compact':>8} {'rows':>6} {'lr':>9} {'epoch ms':>9} {'speedup':>8} "
+                f"{'epochs':>7} {'total s':>8} {'test MAE':>9}")
+    for r in results:
+        test_mae = f"{r['test_mae']:.5f}" if 'test_mae' in r else '-'
+        compact = '-' if r['compact_tolerance'] is None else f"{r['compact_tolerance']:g}"
+        logger.info(
+            f"{r['input_path']:<8} {r['batch_size']:>6} {compact:>8} {r['train_rows']:>6} {r['learning_rate']:>9.5f} "
+            f"{r['epoch_s'] * 1000:>9.1f} {baseline['epoch_s'] / r['epoch_s']:>7.1f}x "
+            f"{r['epochs']:>7} {r['total_s']:>8.1f} {test_mae:>9}"
+        )
+    logger.info("=" * 80)
+
+
+def log_compaction(results: List[Dict]):
+    """Log compression ratio, training speedup and per-KPI MAE change of compacted runs"""
+    for r in results:
+        if r['compact_tolerance'] is None:
+            continue
+        reference = next(
+            (b for b in results
+             if b['input_path'] == 'tf.data' and b['batch_size'] == r['batch_size'] and b['compact_tolerance'] is None),
+            None
+        )
+        if reference is None:
+            logger.warning(f"⚠️ No uncompacted tf.data run at batch size {r['batch_size']} to compare with")
+            continue
+        logger.info(
+            f"Compaction {r['compact_tolerance']:g} (bs={r['batch_size']}): {reference['train_rows']} → {r['train_rows']} rows "
+            f"(ratio {reference['train_rows'] / r['train_rows']:.3f}), training {reference['total_s'] / r['total_s']:.2f}x faster"
+        )
+        if 'test_mae_per_kpi' in r:
+            for name in KPI_NAMES:
+                before, after = reference['test_mae_per_kpi'][name], r['test_mae_per_kpi'][name]
+                logger.info(f"  {name:<24} MAE {before:.5f} → {after:.5f} ({(after - before) / before:+.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the training input pipeline")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[32, 128, 256])
+    parser.add_argument('--paths', nargs='+', choices=INPUT_PATHS, default=INPUT_PATHS)
+    parser.add_argument('--epochs', type=int, default=10, help="Epochs to time per configuration")
+    parser.add_argument('--full', action='store_true', help="Train to early stopping and report test MAE")
+    parser.add_argument('--compact', type=float, nargs='*', default=[], metavar='TOL',
+                        help="Also run tf.data on training sets compacted at these tolerances (0 = exact duplicates)")
+    parser.add_argument('--json', type=Path, default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    X, y = load_or_prepare_dataset(mmap=True)
+    X_train, X_val, X_test, y_train, y_val, y_test, _ = split_and_normalize(X, y)
+    data = {
+        'X_train': X_train, 'X_val': X_val, 'X_test': X_test,
+        'y_train': y_train, 'y_val': y_val, 'y_test': y_test
+    }
+
+    results = []
+    for batch_size in args.batch_sizes:
+        for input_path in args.paths:
+            result = run_configuration(input_path, batch_size, data, args.epochs, args.full)
+            logger.info(f"✓ {input_path} bs={batch_size}: {result['epoch_s'] * 1000:.1f}ms/epoch")
+            results.append(result)
+        for tolerance in args.compact:
+            result = run_configuration('tf.data', batch_size, data, args.epochs, args.full, compact_tolerance=tolerance)
+            logger.info(f"✓ tf.data bs={batch_size} compact={tolerance:g}: {result['epoch_s'] * 1000:.1f}ms/epoch")
+            results.append(result)
+
+    log_results(results)
+    log_compaction(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"✓ Saved results to {args.json}")
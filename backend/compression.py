@@ -0,0 +1,264 @@
+"""
+HTTP Response Compression
+Compresses API responses with brotli (if the brotli package is installed) or gzip, negotiated
+on Accept-Encoding, and serves precompressed sibling files (scene.json.br / scene.json.gz)
+for the static /exports directory so scene files are never compressed per request.
+
+Responses below KPI_COMPRESS_MIN_BYTES, non-text responses and responses that already carry
+a Content-Encoding are passed through unchanged. A compressed response keeps a strong ETag
+of its own per encoding ("<hash>-br" / "<hash>-gzip"), since its bytes differ from the
+identity encoding; response_cache.etag_matches accepts these tags on revalidation.
+
+Usage:
+    python compression.py                # write missing .gz/.br siblings for backend/exports
+    python compression.py --force        # rewrite all siblings
+"""
+
+import argparse
+import gzip
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COMPRESSION_ENABLED = os.getenv('KPI_COMPRESSION', '1') != '0'
+MIN_SIZE_BYTES = int(os.getenv('KPI_COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('KPI_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('KPI_BROTLI_QUALITY', '5'))
+
+# Precompressed files are written once, so they use the maximum settings
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 11
+PRECOMPRESS_SUFFIXES = ('.json',)
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/x-ndjson')
+
+# Preference order when a client accepts several encodings
+FILE_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+CONTENT_ENCODINGS = tuple(FILE_SUFFIXES)
+
+
+def available_encodings() -> List[str]:
+    """Content encodings this server can produce, preferred first"""
+    return (['br'] if brotli is not None else []) + ['gzip']
+
+
+def negotiate_encoding(accept_encoding: Optional[str], encodings: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Pick a content encoding from an Accept-Encoding header
+
+    Args:
+        accept_encoding: Header value (e.g. 'gzip, deflate, br;q=0.9'), or None
+        encodings: Candidate encodings, preferred first (default: available_encodings())
+
+    Returns:
+        The accepted encoding with the highest q-value (ties: server preference), or None
+    """
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in available_encodings() if encodings is None else encodings:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a response body with the per-request settings"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def write_precompressed(path: Path) -> List[Path]:
+    """
+    Write the .gz (and .br, if brotli is installed) siblings of a file atomically
+
+    Args:
+        path: File to precompress
+
+    Returns:
+        Paths of the written siblings
+    """
+    data = path.read_bytes()
+    written = []
+    for encoding in available_encodings():
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=PRECOMPRESS_BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(data, compresslevel=PRECOMPRESS_GZIP_LEVEL, mtime=0)
+        sibling = path.with_name(path.name + FILE_SUFFIXES[encoding])
+        tmp_path = sibling.with_name(f'.{sibling.name}.{os.getpid()}.tmp')
+        tmp_path.write_bytes(compressed)
+        os.replace(tmp_path, sibling)
+        written.append(sibling)
+    return written
+
+
+def precompress_directory(directory: Path, force: bool = False) -> int:
+    """
+    Write missing or outdated precompressed siblings for the files of a directory tree
+
+    Args:
+        directory: Directory to scan (e.g. backend/exports)
+        force: Rewrite siblings that are up to date
+
+    Returns:
+        Number of files precompressed
+    """
+    count = 0
+    for path in sorted(directory.rglob('*')):
+        if not path.is_file() or path.name.startswith('.') or path.suffix not in PRECOMPRESS_SUFFIXES:
+            continue
+        mtime = path.stat().st_mtime
+        siblings = [path.with_name(path.name + FILE_SUFFIXES[encoding]) for encoding in available_encodings()]
+        if force or any(not s.exists() or s.stat().st_mtime < mtime for s in siblings):
+            write_precompressed(path)
+            count += 1
+    return count
+
+
+def encoding_etag(etag: str, encoding: str) -> str:
+    """
+    Strong ETag of a representation in a content encoding
+
+    Args:
+        etag: Quoted strong ETag of the identity encoding (weak ETags are returned unchanged)
+        encoding: Content encoding ('br' or 'gzip')
+
+    Returns:
+        The tag with the encoding appended inside the quotes, e.g. '"3f2a...-gzip"'
+    """
+    if etag.startswith('W/') or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _tag_encoding_etag(headers: MutableHeaders, encoding: str):
+    etag = headers.get('etag')
+    if etag:
+        headers['ETag'] = encoding_etag(etag, encoding)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing single-message responses (JSON API responses) with the
+    negotiated encoding. Streaming responses are passed through unchanged.
+    """
+
+    def __init__(self, app: ASGIApp, min_size: int = MIN_SIZE_BYTES):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get('accept-encoding'))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+
+        async def send_compressed(message: Message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            headers = MutableHeaders(scope=start)
+            body = message.get('body', b'')
+            if start['status'] == 304:
+                # Echo the encoding's tag if that is what the client revalidated (the compressed 200)
+                etag = headers.get('etag')
+                if etag and encoding_etag(etag, encoding) in request_headers.get('if-none-match', ''):
+                    _tag_encoding_etag(headers, encoding)
+                headers.add_vary_header('Accept-Encoding')
+            if (
+                message.get('more_body', False)
+                or 'content-encoding' in headers
+                or len(body) < self.min_size
+                or not headers.get('content-type', '').startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start)
+                await send(message)
+                return
+            body = compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = str(len(body))
+            headers.add_vary_header('Accept-Encoding')
+            _tag_encoding_etag(headers, encoding)
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles serving file.br / file.gz siblings when the client accepts them"""
+
+    async def get_response(self, path: str, scope: Scope):
+        accept_encoding = Headers(scope=scope).get('accept-encoding')
+        if not path.endswith(PRECOMPRESS_SUFFIXES):
+            return await super().get_response(path, scope)
+
+        if accept_encoding:
+            _, source_stat = self.lookup_path(path)
+            siblings = {}
+            for encoding in available_encodings():
+                full_path, stat_result = self.lookup_path(path + FILE_SUFFIXES[encoding])
+                # Ignore siblings older than the file they were compressed from
+                if stat_result is not None and source_stat is not None and stat_result.st_mtime >= source_stat.st_mtime:
+                    siblings[encoding] = (full_path, stat_result)
+            encoding = negotiate_encoding(accept_encoding, list(siblings))
+            if encoding is not None:
+                response = self.file_response(*siblings[encoding], scope)
+                if response.status_code == 200:
+                    response.headers['Content-Encoding'] = encoding
+                    response.headers['Content-Type'] = 'application/json'
+                response.headers.add_vary_header('Accept-Encoding')
+                return response
+
+        response = await super().get_response(path, scope)
+        response.headers.add_vary_header('Accept-Encoding')
+        return response
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write precompressed siblings of the exported scene files")
+    parser.add_argument('--dir', type=Path, default=Path(__file__).parent / 'exports')
+    parser.add_argument('--force', action='store_true', help="Rewrite up-to-date siblings")
+    args = parser.parse_args()
+
+    count = precompress_directory(args.dir, force=args.force)
+    logger.info(f"✓ Precompressed {count} files in {args.dir} ({', '.join(available_encodings())})")
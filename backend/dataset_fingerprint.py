@@ -0,0 +1,382 @@
+"""
+Dataset Fingerprinting
+Detects dataset changes from a manifest of (path, size, mtime_ns, inode, content hash)
+so only files whose metadata changed are rehashed on start-up, instead of reading every
+data file each time the model manager initializes.
+
+The fingerprint is the cache key for anything derived from the data files (trained
+models, and any cache built from a subset of the files via cache_key(); in-process caches
+track their files with FileSetKey).
+
+Usage:
+    python dataset_fingerprint.py                  # print the fingerprint and per-file hashes
+    python dataset_fingerprint.py --hash fast      # fast non-cryptographic hash of large files
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Files the model is trained from (a change to any of them invalidates cached models)
+DATASET_FILES = [
+    'o2c_data_orders_only.xml',
+    'users.csv',
+    'items.csv',
+    'suppliers.csv',
+    'order_kpis.csv',
+    'orders_enriched.csv',
+    'order_users.csv',
+    'order_items.csv',
+    'order_suppliers.csv'
+]
+
+MANIFEST_FILE_NAME = '.dataset_manifest.json'
+MANIFEST_VERSION = 1
+
+# Content hash: 'sha256' (default) or 'fast' (xxh3-128 if installed, else CRC-32)
+HASH_ALGORITHM = os.getenv('KPI_DATASET_HASH', 'sha256')
+
+# Files are hashed in blocks so large files can be spread over threads
+# (hashlib, xxhash and zlib release the GIL while hashing)
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+HASH_WORKERS = int(os.getenv('KPI_DATASET_HASH_WORKERS', str(min(8, os.cpu_count() or 1))))
+
+# Entries modified this close to the manifest write are rehashed: a write in the same
+# timestamp tick could leave size and mtime unchanged
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def _fast_block_hasher():
+    """Fastest available non-cryptographic block hash: (name, bytes -> hex digest)"""
+    try:
+        import xxhash
+        return 'xxh3_128', lambda data: xxhash.xxh3_128_hexdigest(data)
+    except ImportError:
+        return 'crc32', lambda data: format(zlib.crc32(data), '08x')
+
+
+def resolve_algorithm(algorithm: str) -> Tuple[str, Callable[[bytes], str]]:
+    """
+    Resolve a configured hash name to (concrete name, block hash function)
+
+    Args:
+        algorithm: 'sha256' or 'fast'
+
+    Returns:
+        Tuple of the concrete algorithm name (recorded in the fingerprint) and its hasher
+    """
+    if algorithm == 'sha256':
+        return 'sha256', lambda data: hashlib.sha256(data).hexdigest()
+    if algorithm == 'fast':
+        return _fast_block_hasher()
+    raise ValueError(f"Unknown dataset hash algorithm: {algorithm!r} (expected 'sha256' or 'fast')")
+
+
+def _file_stat(path: Path) -> Optional[Dict]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'inode': stat.st_ino}
+
+
+def _hash_block(path: Path, offset: int, length: int, block_hash) -> str:
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return block_hash(f.read(length))
+
+
+class DatasetManifest:
+    """
+    Per-file metadata and content hashes for the dataset files
+
+    Layout of <data_dir>/.dataset_manifest.json:
+        {"version": 1, "algorithm": "sha256", "recorded_ns": ...,
+         "files": {"users.csv": {"size": ..., "mtime_ns": ..., "inode": ..., "hash": "..."}},
+         "legacy_sha256": {"stats": {...}, "hash": "..."}}
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        algorithm: str = HASH_ALGORITHM,
+        manifest_path: Optional[Path] = None,
+        files: Optional[List[str]] = None,
+        workers: int = HASH_WORKERS
+    ):
+        """
+        Args:
+            data_dir: Path to data directory
+            algorithm: 'sha256' or 'fast' (env: KPI_DATASET_HASH)
+            manifest_path: Manifest location (default: <data_dir>/.dataset_manifest.json)
+            files: Files to track (default: DATASET_FILES)
+            workers: Threads used to hash blocks (env: KPI_DATASET_HASH_WORKERS)
+        """
+        self.data_dir = data_dir
+        self.algorithm, self._block_hash = resolve_algorithm(algorithm)
+        self.manifest_path = manifest_path or data_dir / MANIFEST_FILE_NAME
+        self.files = sorted(files or DATASET_FILES)
+        self.workers = max(1, workers)
+        self._manifest = self._read_manifest()
+        self._hashes: Optional[Dict[str, Optional[str]]] = None
+        self.rehashed: List[str] = []
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('algorithm') != self.algorithm:
+            return {}
+        return manifest
+
+    def _write_manifest(self):
+        self._manifest.update({
+            'version': MANIFEST_VERSION,
+            'algorithm': self.algorithm,
+            'recorded_ns': time.time_ns()
+        })
+        tmp_path = self.manifest_path.with_name(f'.{self.manifest_path.name}.{os.getpid()}.tmp')
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            # Read-only data directory: fingerprinting still works, it just rehashes next time
+            logger.warning(f"⚠️ Could not write dataset manifest {self.manifest_path}: {e}")
+
+    def _is_current(self, entry: Optional[Dict], stat: Dict) -> bool:
+        if not entry or 'hash' not in entry:
+            return False
+        if any(entry.get(key) != value for key, value in stat.items()):
+            return False
+        return stat['mtime_ns'] < self._manifest.get('recorded_ns', 0) - RACY_WINDOW_NS
+
+    def _hash_files(self, names: List[str], pool: ThreadPoolExecutor) -> Dict[str, str]:
+        """Hash files block-wise on the pool (multi-block files hash the list of block hashes)"""
+        block_futures = {}
+        for name in names:
+            path = self.data_dir / name
+            size = path.stat().st_size
+            block_futures[name] = [
+                pool.submit(_hash_block, path, offset, HASH_BLOCK_SIZE, self._block_hash)
+                for offset in range(0, max(size, 1), HASH_BLOCK_SIZE)
+            ]
+
+        hashes = {}
+        for name, futures in block_futures.items():
+            blocks = [future.result() for future in futures]
+            if len(blocks) == 1:
+                hashes[name] = blocks[0]
+            else:
+                hashes[name] = hashlib.sha256(','.join(blocks).encode()).hexdigest()
+        return hashes
+
+    def file_hashes(self) -> Dict[str, Optional[str]]:
+        """
+        Get the content hash of every tracked file, rehashing only files whose size,
+        mtime or inode changed since the manifest was written
+
+        Returns:
+            Dict mapping file name to content hash (None for missing files)
+        """
+        if self._hashes is not None:
+            return self._hashes
+
+        stats = {name: _file_stat(self.data_dir / name) for name in self.files}
+        entries = self._manifest.get('files', {})
+        stale = [name for name, stat in stats.items() if stat and not self._is_current(entries.get(name), stat)]
+
+        fresh = {}
+        if stale:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                fresh = self._hash_files(stale, pool)
+
+        self._hashes = {}
+        new_entries = {}
+        for name, stat in stats.items():
+            if stat is None:
+                self._hashes[name] = None
+                continue
+            content_hash = fresh.get(name) or entries[name]['hash']
+            self._hashes[name] = content_hash
+            new_entries[name] = {**stat, 'hash': content_hash}
+
+        self.rehashed = stale
+        if stale or new_entries != entries:
+            self._manifest['files'] = new_entries
+            self._write_manifest()
+        return self._hashes
+
+    def cache_key(self, files: Optional[List[str]] = None) -> str:
+        """
+        Derive a cache key from the content hashes of some or all tracked files
+
+        Args:
+            files: Subset of tracked files the cached artifact depends on (default: all)
+
+        Returns:
+            Key of the form '<algorithm>:<hex>'
+        """
+        hashes = self.file_hashes()
+        digest = hashlib.sha256()
+        for name in sorted(files or self.files):
+            if name not in hashes:
+                raise ValueError(f"File not tracked by the dataset manifest: {name}")
+            digest.update(f'{name}\0{hashes[name] or "-"}\n'.encode())
+        return f'{self.algorithm}:{digest.hexdigest()}'
+
+    def fingerprint(self) -> str:
+        """
+        Get the dataset fingerprint (cache key over all tracked files)
+
+        Returns:
+            Fingerprint string of the form '<algorithm>:<hex>'
+        """
+        return self.cache_key()
+
+    def legacy_hash(self) -> str:
+        """
+        SHA-256 over the concatenated file contents, as written to dataset_hash.txt by
+        models trained before the manifest existed
+
+        The result is stored in the manifest against the files' metadata, so it is only
+        recomputed (a full read) after a file changes.
+
+        Returns:
+            Hex digest
+        """
+        stats = {name: _file_stat(self.data_dir / name) for name in self.files}
+        cached = self._manifest.get('legacy_sha256', {})
+        if cached.get('stats') == stats and all(
+            stat is None or self._is_current({**stat, 'hash': ''}, stat) for stat in stats.values()
+        ):
+            return cached['hash']
+
+        digest = hashlib.sha256()
+        for name in self.files:
+            path = self.data_dir / name
+            if path.exists():
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+
+        self._manifest['legacy_sha256'] = {'stats': stats, 'hash': digest.hexdigest()}
+        self._write_manifest()
+        return digest.hexdigest()
+
+    def matches(self, cached_hash: str) -> bool:
+        """
+        Check a stored dataset hash against the current data
+
+        Args:
+            cached_hash: Fingerprint or legacy hash stored with a model
+
+        Returns:
+            True if the data is unchanged since the hash was recorded
+        """
+        if ':' in cached_hash:
+            return cached_hash == self.fingerprint()
+        return cached_hash == self.legacy_hash()
+
+
+class FileSetKey:
+    """
+    Content key of a set of data files for in-process caches, revalidated from file metadata
+
+    Files tracked by the dataset manifest are keyed by their manifest hash; other files
+    (e.g. variant_contexts.json) by a SHA-256 of their content. After a key is computed,
+    the files' metadata is checked at most once per check_interval_s, and the content is
+    only rehashed when a size, mtime or inode changed.
+    """
+
+    def __init__(self, data_dir: Path, files: List[str], check_interval_s: float = 1.0):
+        """
+        Args:
+            data_dir: Path to data directory
+            files: Files the cached artifact is derived from
+            check_interval_s: Seconds between metadata checks
+        """
+        self.data_dir = data_dir
+        self.files = sorted(files)
+        self.check_interval_s = check_interval_s
+        self._checked_at = 0.0
+        self._stats: Optional[List] = None
+        self._key: Optional[str] = None
+
+    def current(self) -> Optional[str]:
+        """The last computed key if the files' metadata is unchanged, else None (no file reads)"""
+        if self._key is None:
+            return None
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval_s:
+            return self._key
+        if [_file_stat(self.data_dir / name) for name in self.files] != self._stats:
+            return None
+        self._checked_at = now
+        return self._key
+
+    def compute(self) -> str:
+        """Recompute the key (rehashes files whose metadata changed)"""
+        stats = [_file_stat(self.data_dir / name) for name in self.files]
+        digest = hashlib.sha256()
+        tracked = [name for name in self.files if name in DATASET_FILES]
+        if tracked:
+            digest.update(DatasetManifest(self.data_dir).cache_key(tracked).encode())
+        for name in self.files:
+            if name not in DATASET_FILES:
+                path = self.data_dir / name
+                digest.update(f'\0{name}\0'.encode())
+                if path.exists():
+                    digest.update(path.read_bytes())
+        self._stats, self._key, self._checked_at = stats, digest.hexdigest(), time.monotonic()
+        return self._key
+
+    def key(self) -> str:
+        """Current key of the files (computed on first use and after a change)"""
+        return self.current() or self.compute()
+
+
+def calculate_dataset_fingerprint(data_dir: Path, algorithm: str = HASH_ALGORITHM) -> str:
+    """
+    Calculate the fingerprint of the dataset files
+
+    Args:
+        data_dir: Path to data directory
+        algorithm: 'sha256' or 'fast' (env: KPI_DATASET_HASH)
+
+    Returns:
+        Fingerprint string of the form '<algorithm>:<hex>'
+    """
+    return DatasetManifest(data_dir, algorithm=algorithm).fingerprint()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fingerprint the dataset files")
+    parser.add_argument('--data-dir', type=Path, default=Path(__file__).parent.parent / 'data',
+                        help="Data directory")
+    parser.add_argument('--hash', dest='algorithm', choices=['sha256', 'fast'], default=HASH_ALGORITHM,
+                        help="Content hash for the files")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = DatasetManifest(args.data_dir, algorithm=args.algorithm)
+    fingerprint = manifest.fingerprint()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for name, content_hash in manifest.file_hashes().items():
+        marker = '*' if name in manifest.rehashed else ' '
+        logger.info(f"{marker} {name:28s} {content_hash or 'missing'}")
+    logger.info(f"✓ Fingerprint {fingerprint} ({len(manifest.rehashed)} files rehashed, {elapsed_ms:.1f}ms)")
@@ -0,0 +1,445 @@
+"""
+Linearized Duration Surrogate for Large Parameter Sweeps
+Approximates the KPI model around a base process by a first- or second-order Taylor
+expansion in the edge durations, so sweeps over many small duration changes become one
+matrix product instead of a forward pass per row. Every surrogate prediction carries an
+error bound calibrated against the full model. Rows whose bound exceeds the tolerance
+(or that lie outside the calibrated radius) are scored by the full model instead.
+
+Usage:
+    python duration_surrogate.py                       # baseline variant, 1M swept rows, ±1% per edge
+    python duration_surrogate.py --change 0.05 --order 2
+    python duration_surrogate.py --samples 5000000 --order 1 --tolerance 0.25
+"""
+
+import argparse
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from feature_extraction import DURATION_SLICE
+from ml_model import KPI_MULTIPLIERS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SURROGATE_ORDERS = [1, 2]
+DEFAULT_SURROGATE_ORDER = 2
+
+# Largest acceptable error bound, in KPI units (percentage points, days, ...)
+DEFAULT_SURROGATE_TOLERANCE = 0.5
+
+# Full-model rows the error bound is calibrated on, and the margin applied to the
+# largest error observed on them
+NUM_CALIBRATION_SAMPLES = 512
+BOUND_SAFETY_FACTOR = 2.0
+
+# Rows per surrogate chunk (bounds the memory of the quadratic design matrix) and per
+# full-model fallback batch
+SURROGATE_CHUNK_ROWS = 1 << 16
+FALLBACK_BATCH_ROWS = 4096
+
+
+class DurationSurrogate:
+    """
+    Taylor expansion of the KPI model in the durations of a fixed set of edges
+
+    Durations are expressed as offsets from the base process in units of a per-edge
+    step, u = (hours - base_hours) / step_hours. The prediction is
+    f0 + u @ J (+ u^T (H / 2) u for order 2), and its error bound per KPI is
+    c * |u|^(order + 1), with c calibrated on full-model rows. Rows with |u| beyond
+    the calibrated radius have an infinite bound.
+    """
+
+    def __init__(
+        self,
+        columns: np.ndarray,
+        base_hours: np.ndarray,
+        step_hours: np.ndarray,
+        base_prediction: np.ndarray,
+        jacobian: np.ndarray,
+        hessian: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            columns: Duration feature columns (0-168) the surrogate varies, shape (E,)
+            base_hours: Duration of each column in the base process
+            step_hours: Unit of each column's offset (also the finite-difference step)
+            base_prediction: Normalized KPIs of the base process, shape (5,)
+            jacobian: Derivatives per unit offset, shape (E, 5)
+            hessian: Second derivatives per unit offset, shape (E, E, 5) (order 2 only)
+        """
+        self.columns = columns
+        self.base_hours = base_hours
+        self.step_hours = step_hours
+        self.inverse_step = 1.0 / step_hours
+        self.base_prediction = base_prediction
+        self.jacobian = jacobian
+        self.hessian = hessian
+        self.order = 1 if hessian is None else 2
+        # H / 2 as an (E, E * 5) matrix: the quadratic term is one matmul and a row-wise dot
+        self._half_hessian = None if hessian is None else (hessian / 2).reshape(len(columns), -1)
+
+        # Set by calibrate
+        self.error_coefficients = np.full(len(base_prediction), np.inf)
+        self.trust_radius = 0.0
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.columns)
+
+    @classmethod
+    def fit(
+        cls,
+        base_scaled: np.ndarray,
+        columns: np.ndarray,
+        base_hours: np.ndarray,
+        step_hours: np.ndarray,
+        duration_scaler,
+        predict_batch_fn: Callable[[np.ndarray], np.ndarray],
+        order: int = DEFAULT_SURROGATE_ORDER,
+        calibration_hours: Optional[np.ndarray] = None
+    ) -> 'DurationSurrogate':
+        """
+        Build the expansion from central differences of the full model, then calibrate
+        its error bound
+
+        The network is piecewise linear, so its pointwise derivatives only describe an
+        infinitesimal neighbourhood. The differences are therefore taken one step away
+        (step_hours, typically the spread of the sweep), which gives the average slope
+        and curvature over the swept range. All difference and calibration rows are
+        scored in one predict_batch_fn call.
+
+        Args:
+            base_scaled: Scaled feature row of the base process, shape (417,)
+            columns: Duration feature columns to vary, shape (E,)
+            base_hours: Duration of each column in the base process
+            step_hours: Finite-difference step per column (> 0)
+            duration_scaler: Fitted scaler of the duration block (scalers['duration'])
+            predict_batch_fn: Maps a scaled (N, 417) matrix to (N, 5) normalized KPIs
+            order: 1 (Jacobian) or 2 (Jacobian and Hessian)
+            calibration_hours: Durations (C, E) to calibrate the bound on; default
+                NUM_CALIBRATION_SAMPLES rows uniform within one step of the base
+
+        Returns:
+            Calibrated DurationSurrogate
+        """
+        if order not in SURROGATE_ORDERS:
+            raise ValueError(f"Surrogate order must be one of {SURROGATE_ORDERS}")
+        num_edges = len(columns)
+
+        # Unit offsets of the finite-difference stencil: centre, ±e_i, and for order 2
+        # the four (±e_i, ±e_j) corners of every pair
+        identity = np.eye(num_edges)
+        stencil = [np.zeros((1, num_edges)), identity, -identity]
+        pairs = [(i, j) for i in range(num_edges) for j in range(i + 1, num_edges)] if order == 2 else []
+        for sign_i, sign_j in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+            for i, j in pairs:
+                corner = np.zeros(num_edges)
+                corner[i], corner[j] = sign_i, sign_j
+                stencil.append(corner[None, :])
+        stencil = np.vstack(stencil)
+
+        if calibration_hours is None:
+            rng = np.random.default_rng(0)
+            calibration_hours = base_hours + step_hours * rng.uniform(-1, 1, (NUM_CALIBRATION_SAMPLES, num_edges))
+
+        sweep = SweepFeatures(base_scaled, columns, duration_scaler)
+        predictions = np.asarray(predict_batch_fn(sweep.rows(np.vstack([
+            base_hours + stencil * step_hours,
+            calibration_hours
+        ]))), dtype=np.float64)
+        f = predictions[:len(stencil)]
+        calibration_predictions = predictions[len(stencil):]
+
+        f0 = f[0]
+        plus, minus = f[1:1 + num_edges], f[1 + num_edges:1 + 2 * num_edges]
+        jacobian = (plus - minus) / 2
+        hessian = None
+        if order == 2:
+            hessian = np.zeros((num_edges, num_edges, len(f0)))
+            hessian[np.arange(num_edges), np.arange(num_edges)] = plus - 2 * f0 + minus
+            corners = f[1 + 2 * num_edges:].reshape(4, len(pairs), len(f0))
+            for k, (i, j) in enumerate(pairs):
+                hessian[i, j] = hessian[j, i] = (corners[0, k] - corners[1, k] - corners[2, k] + corners[3, k]) / 4
+
+        surrogate = cls(columns, base_hours, step_hours, f0, jacobian, hessian)
+        surrogate.calibrate(calibration_hours, calibration_predictions)
+        return surrogate
+
+    def _offsets(self, hours: np.ndarray) -> np.ndarray:
+        return (np.asarray(hours, dtype=np.float64) - self.base_hours) * self.inverse_step
+
+    def _expand(self, offsets: np.ndarray) -> np.ndarray:
+        """Taylor expansion at unit offsets (S, E) -> normalized KPIs (S, 5)"""
+        predictions = offsets @ self.jacobian
+        predictions += self.base_prediction
+        if self._half_hessian is not None:
+            curvature = (offsets @ self._half_hessian).reshape(len(offsets), self.num_edges, -1)
+            predictions += np.einsum('se,sek->sk', offsets, curvature)
+        return predictions
+
+    @staticmethod
+    def _radius(offsets: np.ndarray) -> np.ndarray:
+        return np.sqrt(np.einsum('se,se->s', offsets, offsets))
+
+    def calibrate(self, hours: np.ndarray, full_predictions: np.ndarray):
+        """
+        Fit the error bound to full-model predictions
+
+        The coefficient per KPI is the largest observed error / |u|^(order + 1), times
+        BOUND_SAFETY_FACTOR. The trust radius is the largest calibrated |u|. The bound is
+        empirical: it holds on the calibration rows and assumes the remainder keeps
+        scaling with the Taylor order inside the radius.
+
+        Args:
+            hours: Calibration durations (C, E)
+            full_predictions: Full-model normalized KPIs for those rows (C, 5)
+        """
+        offsets = self._offsets(hours)
+        radius = self._radius(offsets)
+        errors = np.abs(self._expand(offsets) - full_predictions)
+        # Rows right at the base carry no information about the remainder
+        informative = radius > 1e-3 * max(radius.max(), 1e-12)
+        scaled_errors = errors[informative] / radius[informative, None] ** (self.order + 1)
+        self.error_coefficients = BOUND_SAFETY_FACTOR * scaled_errors.max(axis=0) if informative.any() \
+            else np.zeros(len(self.base_prediction))
+        self.trust_radius = float(radius.max())
+
+    def predict(self, hours: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Surrogate predictions with error bounds
+
+        Args:
+            hours: Durations of the surrogate's columns, shape (S, E)
+
+        Returns:
+            Dict with 'predictions' and 'bounds' (S, 5), normalized KPI units
+        """
+        predictions = np.empty((len(hours), len(self.base_prediction)))
+        bounds = np.empty_like(predictions)
+        for start in range(0, len(hours), SURROGATE_CHUNK_ROWS):
+            offsets = self._offsets(hours[start:start + SURROGATE_CHUNK_ROWS])
+            rows = slice(start, start + len(offsets))
+            predictions[rows] = self._expand(offsets)
+            radius = self._radius(offsets)
+            bounds[rows] = radius[:, None] ** (self.order + 1) * self.error_coefficients
+            bounds[rows][radius > self.trust_radius] = np.inf
+        return {'predictions': predictions, 'bounds': bounds}
+
+
+class SweepFeatures:
+    """Builds scaled feature rows of a base process with some duration columns replaced"""
+
+    def __init__(self, base_scaled: np.ndarray, columns: np.ndarray, duration_scaler):
+        """
+        Args:
+            base_scaled: Scaled feature row of the base process, shape (417,)
+            columns: Duration feature columns that vary
+            duration_scaler: Fitted scaler of the duration block
+        """
+        self.base_scaled = np.asarray(base_scaled, dtype=np.float32).ravel()
+        self.columns = np.asarray(columns)
+
+        # The duration scaler is affine per column: recover offset and slope per hour
+        probe = np.zeros((2, DURATION_SLICE.stop - DURATION_SLICE.start))
+        probe[1] = 60.0
+        scaled_probe = duration_scaler.transform(probe)
+        self.offset = scaled_probe[0, self.columns]
+        self.per_hour = scaled_probe[1, self.columns] - self.offset
+
+    def rows(self, hours: np.ndarray) -> np.ndarray:
+        """Scaled feature matrix (S, 417) for durations (S, E) of the varying columns"""
+        matrix = np.tile(self.base_scaled, (len(hours), 1))
+        matrix[:, DURATION_SLICE.start + self.columns] = self.offset + np.asarray(hours) * self.per_hour
+        return matrix
+
+
+def evaluate_sweep(
+    surrogate: DurationSurrogate,
+    sweep: SweepFeatures,
+    hours: np.ndarray,
+    predict_batch_fn: Callable[[np.ndarray], np.ndarray],
+    tolerance: float = DEFAULT_SURROGATE_TOLERANCE
+) -> Dict:
+    """
+    Score a duration sweep with the surrogate, falling back to the full model on rows
+    whose error bound exceeds the tolerance
+
+    Args:
+        surrogate: Fitted DurationSurrogate
+        sweep: Feature builder for the same base process and columns
+        hours: Durations (S, E)
+        predict_batch_fn: Full model, scaled (N, 417) -> (N, 5) normalized KPIs
+        tolerance: Largest acceptable bound in KPI units, on every KPI
+
+    Returns:
+        Dict with 'predictions' (S, 5, normalized), 'bounds' (S, 5, KPI units; 0 on
+        fallback rows), 'fallback_rows', 'surrogate_ms' and 'fallback_ms'
+    """
+    start = time.perf_counter()
+    result = surrogate.predict(hours)
+    predictions = result['predictions']
+    bounds = result['bounds'] * np.asarray(KPI_MULTIPLIERS, dtype=np.float64)
+    fallback = np.flatnonzero((bounds > tolerance).any(axis=1))
+    surrogate_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for batch_start in range(0, len(fallback), FALLBACK_BATCH_ROWS):
+        rows = fallback[batch_start:batch_start + FALLBACK_BATCH_ROWS]
+        predictions[rows] = np.asarray(predict_batch_fn(sweep.rows(hours[rows])), dtype=np.float64)
+        bounds[rows] = 0.0
+    fallback_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'predictions': predictions,
+        'bounds': bounds,
+        'fallback_rows': int(len(fallback)),
+        'surrogate_ms': round(surrogate_ms, 2),
+        'fallback_ms': round(fallback_ms, 2)
+    }
+
+
+def benchmark_surrogate(
+    predict_batch_fn: Callable[[np.ndarray], np.ndarray],
+    scalers: Dict,
+    activities: List[str],
+    edges: List[Dict],
+    user_ids: List[str],
+    items_data: List[Dict],
+    supplier_ids: List[str],
+    num_samples: int,
+    relative_change: float,
+    orders: List[int] = SURROGATE_ORDERS,
+    tolerance: float = DEFAULT_SURROGATE_TOLERANCE,
+    num_checked: int = 20000,
+    seed: int = 42
+) -> Dict:
+    """
+    Sweep every edge duration by up to ±relative_change and compare each surrogate order
+    with the full model
+
+    Args:
+        predict_batch_fn: Full model
+        scalers: Feature scalers matching predict_batch_fn
+        activities, edges, user_ids, items_data, supplier_ids: Base process and entities
+        num_samples: Swept rows S
+        relative_change: Largest relative duration change per edge
+        orders: Surrogate orders to compare
+        tolerance: Bound tolerance in KPI units
+        num_checked: Rows also scored by the full model to measure the actual error
+        seed: Random seed
+
+    Returns:
+        Report with throughput, fallback share and observed vs bounded error per order
+    """
+    from feature_extraction import extract_features_from_scenario, scale_feature_matrix
+    from monte_carlo import edge_duration_columns
+
+    base_raw = extract_features_from_scenario(activities, edges, user_ids, items_data, supplier_ids)
+    base_scaled = scale_feature_matrix(base_raw, scalers).ravel()
+    columns = np.array(sorted(edge_duration_columns(edges)))
+    base_hours = base_raw.ravel()[DURATION_SLICE][columns] / 60
+    step_hours = np.maximum(base_hours * relative_change, 1e-6)
+
+    rng = np.random.default_rng(seed)
+    hours = base_hours * (1 + rng.uniform(-relative_change, relative_change, (num_samples, len(columns))))
+    sweep = SweepFeatures(base_scaled, columns, scalers['duration'])
+    multipliers = np.asarray(KPI_MULTIPLIERS, dtype=np.float64)
+
+    start = time.perf_counter()
+    checked = hours[:num_checked]
+    reference = np.vstack([
+        predict_batch_fn(sweep.rows(checked[i:i + FALLBACK_BATCH_ROWS]))
+        for i in range(0, len(checked), FALLBACK_BATCH_ROWS)
+    ])
+    full_rows_per_second = len(checked) / (time.perf_counter() - start)
+
+    report = {
+        'num_samples': num_samples,
+        'num_edges': len(columns),
+        'relative_change': relative_change,
+        'tolerance': tolerance,
+        'full_model_rows_per_second': round(full_rows_per_second),
+        'orders': {}
+    }
+    for order in orders:
+        start = time.perf_counter()
+        surrogate = DurationSurrogate.fit(
+            base_scaled, columns, base_hours, step_hours, scalers['duration'], predict_batch_fn, order,
+            calibration_hours=hours[rng.choice(num_samples, min(NUM_CALIBRATION_SAMPLES, num_samples), replace=False)]
+        )
+        fit_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        surrogate_only = surrogate.predict(hours)
+        surrogate_seconds = time.perf_counter() - start
+
+        result = evaluate_sweep(surrogate, sweep, hours, predict_batch_fn, tolerance)
+        raw_error = np.abs(surrogate_only['predictions'][:num_checked] - reference) * multipliers
+        served_error = np.abs(result['predictions'][:num_checked] - reference) * multipliers
+        raw_bound = surrogate_only['bounds'][:num_checked] * multipliers
+        sweep_seconds = (result['surrogate_ms'] + result['fallback_ms']) / 1000
+        report['orders'][str(order)] = {
+            'fit_ms': round(fit_ms, 1),
+            # Effective: all rows over the whole sweep, full-model fallback included
+            'rows_per_second': round(num_samples / sweep_seconds),
+            'expansion_rows_per_second': round(num_samples / surrogate_seconds),
+            'sweep_seconds': round(sweep_seconds, 3),
+            'fallback_rows': result['fallback_rows'],
+            'max_error': round(float(raw_error.max()), 4),
+            'mean_error': round(float(raw_error.mean()), 5),
+            'bound_violations': int((raw_error > raw_bound).sum()),
+            'max_served_error': round(float(served_error.max()), 4)
+        }
+    return report
+
+
+def log_report(report: Dict):
+    """Log a comparison table of a benchmark_surrogate report"""
+    logger.info("=" * 80)
+    logger.info(f"DURATION SWEEP: {report['num_samples']} rows, {report['num_edges']} edges, "
+                f"±{report['relative_change']:.0%}, tolerance {report['tolerance']} KPI units")
+    logger.info(f"Full model: {report['full_model_rows_per_second']:,} rows/s")
+    logger.info("=" * 80)
+    logger.info(f"{'order':>5} {'fit ms':>8} {'rows/s':>12} {'expansion/s':>12} {'sweep s':>8} {'fallback':>9} "
+                f"{'max err':>8} {'mean err':>9} {'violations':>10} {'served max':>10}")
+    for order, r in report['orders'].items():
+        logger.info(
+            f"{order:>5} {r['fit_ms']:>8.1f} {r['rows_per_second']:>12,} {r['expansion_rows_per_second']:>12,} "
+            f"{r['sweep_seconds']:>8.3f} "
+            f"{r['fallback_rows']:>9} {r['max_error']:>8.4f} {r['mean_error']:>9.5f} "
+            f"{r['bound_violations']:>10} {r['max_served_error']:>10.4f}"
+        )
+    logger.info("=" * 80)
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+    from ml_model import load_model_and_scalers, build_serving_function
+    from real_data_loader import get_data_loader
+    from feature_extraction import enrich_edges_with_durations
+
+    parser = argparse.ArgumentParser(description="Benchmark the duration surrogate against the full model")
+    parser.add_argument('--samples', type=int, default=1_000_000, help="Swept rows")
+    parser.add_argument('--change', type=float, default=0.01, help="Largest relative duration change per edge")
+    parser.add_argument('--order', type=int, choices=SURROGATE_ORDERS, action='append', default=None)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_SURROGATE_TOLERANCE, help="Bound tolerance (KPI units)")
+    args = parser.parse_args()
+
+    backend_dir = Path(__file__).parent
+    model, scalers = load_model_and_scalers(backend_dir / 'trained_models')
+    loader = get_data_loader(str(backend_dir.parent / 'data' / 'o2c_data_orders_only.xml'))
+    activities = loader.get_most_frequent_variant_activities()
+    edges = enrich_edges_with_durations(activities, [], loader.get_event_kpis_for_activities(activities))
+
+    report = benchmark_surrogate(
+        build_serving_function(model), scalers, activities, edges,
+        user_ids=['U001'], items_data=[{'item_id': 'I001', 'quantity': 1, 'line_total': 100.0}], supplier_ids=['S001'],
+        num_samples=args.samples, relative_change=args.change, orders=args.order or SURROGATE_ORDERS,
+        tolerance=args.tolerance
+    )
+    log_report(report)
@@ -0,0 +1,394 @@
+"""
+Deep Ensemble Serving for KPI Prediction
+Stacks the weights of M independently trained KPI models so every member is evaluated
+with one batched matmul per layer, instead of M sequential forward passes
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+# ml_model (pandas, registry) is imported inside the functions that need it, so inference
+# worker processes can rebuild a StackedEnsemble from a weight file with only NumPy loaded
+if TYPE_CHECKING:
+    from tensorflow import keras
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ENSEMBLE_DIR_NAME = 'ensemble'
+ENSEMBLE_CONFIG_FILE = 'ensemble_config.json'
+
+
+def ensemble_member_paths(ensemble_dir: Path) -> List[Path]:
+    """
+    List saved ensemble members in member order
+
+    Args:
+        ensemble_dir: Directory containing member_<i>.keras files
+
+    Returns:
+        Sorted list of member model paths
+    """
+    return sorted(
+        ensemble_dir.glob('member_*.keras'),
+        key=lambda path: int(path.stem.split('_')[1])
+    )
+
+
+def fold_member_weights(model: 'keras.Model') -> Tuple[List[Tuple[np.ndarray, np.ndarray]], Tuple[np.ndarray, np.ndarray]]:
+    """
+    Extract inference-time weights from one KPI model, folding BatchNorm into Dense
+
+    Dense -> BatchNorm (inference) is an affine map, so it collapses into a single
+    kernel and bias: W' = W * s, b' = (b - moving_mean) * s + beta with
+    s = gamma / sqrt(moving_variance + epsilon). Dropout is the identity at inference.
+
+    Args:
+        model: Trained model with the build_kpi_model architecture
+
+    Returns:
+        Tuple of (hidden layers as [(kernel, bias), ...], (head kernel, head bias))
+        where the five single-unit KPI heads are concatenated into one (64, 5) kernel
+    """
+    from tensorflow import keras
+    from ml_model import KPI_NAMES
+
+    hidden: List[Tuple[np.ndarray, np.ndarray]] = []
+    for layer in model.layers:
+        if isinstance(layer, keras.layers.InputLayer) or layer.name in KPI_NAMES:
+            continue
+        if isinstance(layer, keras.layers.Dense):
+            kernel, bias = layer.get_weights()
+            hidden.append((kernel.astype(np.float32), bias.astype(np.float32)))
+        elif isinstance(layer, keras.layers.BatchNormalization):
+            gamma, beta, moving_mean, moving_variance = layer.get_weights()
+            scale = gamma / np.sqrt(moving_variance + layer.epsilon)
+            kernel, bias = hidden[-1]
+            hidden[-1] = (
+                (kernel * scale).astype(np.float32),
+                ((bias - moving_mean) * scale + beta).astype(np.float32)
+            )
+        elif isinstance(layer, keras.layers.Activation):
+            if layer.get_config()['activation'] != 'relu':
+                raise ValueError(f"Unsupported activation in {layer.name}: {layer.get_config()['activation']}")
+        elif not isinstance(layer, keras.layers.Dropout):
+            raise ValueError(f"Unsupported layer for weight stacking: {layer.name} ({type(layer).__name__})")
+
+    head_weights = [model.get_layer(name).get_weights() for name in KPI_NAMES]
+    head_kernel = np.concatenate([kernel for kernel, _ in head_weights], axis=1).astype(np.float32)
+    head_bias = np.concatenate([bias for _, bias in head_weights]).astype(np.float32)
+
+    return hidden, (head_kernel, head_bias)
+
+
+def member_dropout_rates(model: 'keras.Model') -> List[float]:
+    """Dropout rate after each hidden layer, in layer order"""
+    from tensorflow import keras
+
+    return [float(layer.rate) for layer in model.layers if isinstance(layer, keras.layers.Dropout)]
+
+
+class StackedEnsemble:
+    """
+    M KPI models evaluated together from stacked, BatchNorm-folded weights
+
+    The first layer shares its input across members, so all member kernels are
+    concatenated into one (D, M*H) matrix and applied with a single GEMM. Later
+    layers use one batched matmul over the member axis.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], dropout_rates: Optional[List[float]] = None):
+        """
+        Args:
+            arrays: Stacked weights as produced by to_arrays() (may be memory-mapped)
+            dropout_rates: Dropout rate after each hidden layer (for sample_dropout)
+        """
+        self.first_kernel = arrays['first_kernel']                                          # (D, M*H1)
+        self.first_bias = arrays['first_bias']                                              # (M*H1,)
+        self.head_kernel = arrays['head_kernel']                                            # (M, H, 5)
+        self.head_bias = arrays['head_bias']                                                # (M, 1, 5)
+
+        num_hidden = sum(1 for name in arrays if name.startswith('hidden_kernel_'))
+        self.hidden_kernels = [arrays[f'hidden_kernel_{i}'] for i in range(num_hidden)]     # (M, Hi, Hi+1)
+        self.hidden_biases = [arrays[f'hidden_bias_{i}'] for i in range(num_hidden)]        # (M, 1, Hi+1)
+
+        self.num_members = self.head_kernel.shape[0]
+        self.first_units = self.first_kernel.shape[1] // self.num_members
+        self.dropout_rates = list(dropout_rates or [])
+
+    @classmethod
+    def from_members(cls, members: List['keras.Model']) -> 'StackedEnsemble':
+        """
+        Fold and stack the weights of trained member models
+
+        Args:
+            members: Trained ensemble member models (same architecture)
+
+        Returns:
+            StackedEnsemble
+        """
+        if not members:
+            raise ValueError("Ensemble needs at least one member")
+
+        folded = [fold_member_weights(model) for model in members]
+        num_hidden = len(folded[0][0])
+
+        arrays = {
+            'first_kernel': np.concatenate([hidden[0][0] for hidden, _ in folded], axis=1),
+            'first_bias': np.concatenate([hidden[0][1] for hidden, _ in folded]),
+            'head_kernel': np.stack([head[0] for _, head in folded]),
+            'head_bias': np.stack([head[1] for _, head in folded])[:, None, :]
+        }
+        for i in range(1, num_hidden):
+            arrays[f'hidden_kernel_{i - 1}'] = np.stack([hidden[i][0] for hidden, _ in folded])
+            arrays[f'hidden_bias_{i - 1}'] = np.stack([hidden[i][1] for hidden, _ in folded])[:, None, :]
+
+        return cls(arrays, dropout_rates=member_dropout_rates(members[0]))
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Get the stacked weights (inverse of the constructor)
+
+        Returns:
+            Dict of named float32 arrays
+        """
+        arrays = {
+            'first_kernel': self.first_kernel,
+            'first_bias': self.first_bias,
+            'head_kernel': self.head_kernel,
+            'head_bias': self.head_bias
+        }
+        for i, (kernel, bias) in enumerate(zip(self.hidden_kernels, self.hidden_biases)):
+            arrays[f'hidden_kernel_{i}'] = kernel
+            arrays[f'hidden_bias_{i}'] = bias
+        return arrays
+
+    def predict_members(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Evaluate every member on a batch
+
+        Args:
+            feature_matrix: Feature matrix of shape (N, 417) or (417,)
+
+        Returns:
+            Array of shape (N, M, 5) with normalized KPI predictions per member
+        """
+        if feature_matrix.ndim == 1:
+            feature_matrix = feature_matrix.reshape(1, -1)
+        x = feature_matrix.astype(np.float32, copy=False)
+        num_rows = x.shape[0]
+
+        # (N, M*H1) -> (M, N, H1)
+        h = np.maximum(x @ self.first_kernel + self.first_bias, 0.0)
+        h = h.reshape(num_rows, self.num_members, self.first_units).transpose(1, 0, 2)
+
+        for kernel, bias in zip(self.hidden_kernels, self.hidden_biases):
+            h = np.maximum(np.matmul(h, kernel) + bias, 0.0)
+
+        outputs = np.matmul(h, self.head_kernel) + self.head_bias                             # (M, N, 5)
+        return outputs.transpose(1, 0, 2)
+
+    def sample_dropout(self, feature_matrix: np.ndarray, num_samples: int, seed: int = 42) -> np.ndarray:
+        """
+        MC-dropout samples for a single-member stack (NumPy counterpart of
+        ml_model.build_mc_dropout_function)
+
+        Dropout masks have shape (K, units) and are shared across rows, so a row's
+        samples don't depend on the rest of the batch.
+
+        Args:
+            feature_matrix: Feature matrix of shape (N, 417) or (417,)
+            num_samples: Stochastic forward passes per row (K)
+            seed: Seed for the dropout masks
+
+        Returns:
+            Array of shape (N, K, 5) with normalized KPI samples
+        """
+        if self.num_members != 1:
+            raise ValueError("MC dropout sampling needs a single-member stack")
+        if len(self.dropout_rates) != len(self.hidden_kernels) + 1:
+            raise ValueError("Dropout rates unavailable for this stack")
+        if feature_matrix.ndim == 1:
+            feature_matrix = feature_matrix.reshape(1, -1)
+        x = feature_matrix.astype(np.float32, copy=False)
+        num_rows = x.shape[0]
+
+        def dropout(h, layer_index):
+            rate = self.dropout_rates[layer_index]
+            noise = np.random.default_rng([seed, layer_index]).random((num_samples, h.shape[-1]), dtype=np.float32)
+            keep = np.tile(noise >= rate, (num_rows, 1))
+            return np.where(keep, h / (1.0 - rate), 0.0).astype(np.float32)
+
+        # The first layer is deterministic: evaluate once per row, then tile K times
+        h = np.maximum(x @ self.first_kernel + self.first_bias, 0.0)
+        h = dropout(np.repeat(h, num_samples, axis=0), 0)
+
+        for i, (kernel, bias) in enumerate(zip(self.hidden_kernels, self.hidden_biases)):
+            h = dropout(np.maximum(h @ kernel[0] + bias[0], 0.0), i + 1)
+
+        outputs = h @ self.head_kernel[0] + self.head_bias[0]
+        return outputs.reshape(num_rows, num_samples, -1)
+
+    def predict_batch(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Ensemble mean prediction
+
+        Args:
+            feature_matrix: Feature matrix of shape (N, 417) or (417,)
+
+        Returns:
+            Array of shape (N, 5) with normalized KPI values
+        """
+        return self.predict_members(feature_matrix).mean(axis=1)
+
+    def predict_with_spread(self, feature_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ensemble mean and member spread
+
+        Args:
+            feature_matrix: Feature matrix of shape (N, 417) or (417,)
+
+        Returns:
+            Tuple of (mean, std), each of shape (N, 5) with normalized KPI values
+        """
+        members = self.predict_members(feature_matrix)
+        return members.mean(axis=1), members.std(axis=1)
+
+
+def load_ensemble_members(ensemble_dir: Path) -> List['keras.Model']:
+    """
+    Load all saved ensemble members
+
+    Args:
+        ensemble_dir: Directory containing member_<i>.keras files
+
+    Returns:
+        List of Keras models
+    """
+    from tensorflow import keras
+
+    paths = ensemble_member_paths(ensemble_dir)
+    if not paths:
+        raise FileNotFoundError(f"No ensemble members found in {ensemble_dir}")
+    members = [keras.models.load_model(path) for path in paths]
+    logger.info(f"✓ Loaded {len(members)} ensemble members from {ensemble_dir}")
+    return members
+
+
+def load_stacked_ensemble(ensemble_dir: Path) -> StackedEnsemble:
+    """
+    Load ensemble members and stack their weights for serving
+
+    Args:
+        ensemble_dir: Directory containing member_<i>.keras files
+
+    Returns:
+        StackedEnsemble
+    """
+    return StackedEnsemble.from_members(load_ensemble_members(ensemble_dir))
+
+
+def _measure_latency(predict_fn, batch: np.ndarray, repeats: int) -> float:
+    """Median latency in ms of predict_fn(batch) after one warm-up call"""
+    predict_fn(batch)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_fn(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def benchmark_ensemble(
+    ensemble_dir: Path,
+    feature_matrix: np.ndarray,
+    batch_sizes: Tuple[int, ...] = (1, 32),
+    repeats: int = 50
+) -> Dict:
+    """
+    Compare latency of a single model, M sequential members and the stacked ensemble
+
+    Args:
+        ensemble_dir: Directory containing the ensemble members
+        feature_matrix: Scaled feature rows to benchmark with
+        batch_sizes: Batch sizes to time
+        repeats: Timed calls per measurement
+
+    Returns:
+        Report dict (also written to <ensemble_dir>/ensemble_benchmark.json)
+    """
+    from ml_model import build_serving_function, KPI_NAMES, KPI_MULTIPLIERS
+
+    members = load_ensemble_members(ensemble_dir)
+    stacked = StackedEnsemble.from_members(members)
+    member_fns = [build_serving_function(model) for model in members]
+
+    def sequential(batch):
+        return np.mean([fn(batch) for fn in member_fns], axis=0)
+
+    # Stacked (folded) weights must reproduce the Keras members
+    check_rows = feature_matrix[:256]
+    reference = np.stack([fn(check_rows) for fn in member_fns], axis=1)
+    max_abs_diff = float(np.abs(stacked.predict_members(check_rows) - reference).max())
+
+    report = {
+        'num_members': stacked.num_members,
+        'max_abs_diff_vs_keras': max_abs_diff,
+        'latency_ms': {}
+    }
+    for batch_size in batch_sizes:
+        batch = feature_matrix[np.arange(batch_size) % len(feature_matrix)]
+        report['latency_ms'][f'batch_{batch_size}'] = {
+            'single_model': round(_measure_latency(member_fns[0], batch, repeats), 3),
+            'sequential_members': round(_measure_latency(sequential, batch, repeats), 3),
+            'stacked_ensemble': round(_measure_latency(stacked.predict_batch, batch, repeats), 3)
+        }
+
+    # Spread of the ensemble on the benchmark rows, in KPI units
+    _, spread = stacked.predict_with_spread(check_rows)
+    report['mean_member_std'] = {
+        kpi_name: round(float(spread[:, i].mean() * KPI_MULTIPLIERS[i]), 3)
+        for i, kpi_name in enumerate(KPI_NAMES)
+    }
+
+    with open(ensemble_dir / 'ensemble_benchmark.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"✓ Saved ensemble benchmark to {ensemble_dir / 'ensemble_benchmark.json'}")
+    return report
+
+
+def log_benchmark(report: Dict):
+    """Log an ensemble benchmark report"""
+    logger.info("=" * 80)
+    logger.info(f"ENSEMBLE SERVING BENCHMARK ({report['num_members']} members)")
+    logger.info("=" * 80)
+    logger.info(f"Stacked vs Keras max |Δ|: {report['max_abs_diff_vs_keras']:.2e}")
+    for batch_key, timings in report['latency_ms'].items():
+        logger.info(
+            f"{batch_key:10s} single={timings['single_model']:.3f}ms  "
+            f"sequential={timings['sequential_members']:.3f}ms  "
+            f"stacked={timings['stacked_ensemble']:.3f}ms"
+        )
+    logger.info("Mean member std (KPI units): " + ", ".join(
+        f"{name}={value:.2f}" for name, value in report['mean_member_std'].items()
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark stacked ensemble serving against a single model")
+    parser.add_argument('--ensemble-dir', type=Path,
+                        default=Path(__file__).parent / 'trained_models' / ENSEMBLE_DIR_NAME)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    from tflite_model import load_scaled_training_features
+
+    features = load_scaled_training_features(args.ensemble_dir)
+    log_benchmark(benchmark_ensemble(args.ensemble_dir, features, repeats=args.repeats))
@@ -259,6 +259,60 @@ def build_outcome_features(activities: List[str]) -> np.ndarray:
     ])
 
 
+# Column layout of the 417-dim feature vector
+FREQ_SLICE = slice(0, 169)
+DURATION_SLICE = slice(169, 338)
+USERS_SLICE = slice(338, 345)
+ITEMS_SLICE = slice(345, 393)
+SUPPLIERS_SLICE = slice(393, 409)
+OUTCOME_SLICE = slice(409, 417)
+
+
+def scale_feature_matrix(
+    feature_matrix: np.ndarray,
+    scalers: Dict
+) -> np.ndarray:
+    """
+    Apply the fitted feature scalers to a batch of raw feature vectors
+    
+    Vectorized equivalent of the per-vector scaling in extract_features_from_scenario,
+    so many scenarios can be scaled with one transform call per feature group.
+    
+    Args:
+        feature_matrix: Raw feature matrix of shape (N, 417)
+        scalers: Dict of fitted scalers ('freq', 'duration', 'users', 'items_qty',
+                 'items_amt', 'suppliers' and optionally 'outcome')
+    
+    Returns:
+        Scaled feature matrix of shape (N, 417)
+    """
+    feature_matrix = np.asarray(feature_matrix, dtype=np.float64)
+    if feature_matrix.ndim == 1:
+        feature_matrix = feature_matrix.reshape(1, -1)
+    
+    scaled = np.empty_like(feature_matrix)
+    scaled[:, FREQ_SLICE] = scalers['freq'].transform(feature_matrix[:, FREQ_SLICE])
+    scaled[:, DURATION_SLICE] = scalers['duration'].transform(feature_matrix[:, DURATION_SLICE])
+    scaled[:, USERS_SLICE] = scalers['users'].transform(feature_matrix[:, USERS_SLICE])
+    
+    # Items matrix is interleaved (quantity, line total) - scale each column group separately
+    items = feature_matrix[:, ITEMS_SLICE]
+    items_scaled = np.empty_like(items)
+    items_scaled[:, ::2] = scalers['items_qty'].transform(items[:, ::2])
+    items_scaled[:, 1::2] = scalers['items_amt'].transform(items[:, 1::2])
+    scaled[:, ITEMS_SLICE] = items_scaled
+    
+    scaled[:, SUPPLIERS_SLICE] = scalers['suppliers'].transform(feature_matrix[:, SUPPLIERS_SLICE])
+    
+    # Outcome features: scale if scaler exists, otherwise use raw (already 0-2 range)
+    if 'outcome' in scalers:
+        scaled[:, OUTCOME_SLICE] = scalers['outcome'].transform(feature_matrix[:, OUTCOME_SLICE])
+    else:
+        scaled[:, OUTCOME_SLICE] = feature_matrix[:, OUTCOME_SLICE]
+    
+    return scaled
+
+
 def extract_features_from_scenario(
     activities: List[str],
     edges: List[Dict],
@@ -289,49 +343,19 @@ def extract_features_from_scenario(
     supplier_vector = build_supplier_vector(suppliers_involved)
     outcome_features = build_outcome_features(activities)  # NEW: 8-dim outcome features
     
-    # Split items matrix into quantity and line total
-    items_qty = items_matrix[::2]  # Every other element (quantity)
-    items_amt = items_matrix[1::2]  # Every other element (line total)
+    # Concatenate raw features (items matrix stays interleaved: quantity, line total)
+    feature_vector = np.concatenate([
+        freq_matrix,
+        duration_matrix,
+        user_vector,
+        items_matrix,
+        supplier_vector,
+        outcome_features  # NEW: Add outcome features
+    ])
     
     # Apply scaling if scalers provided
     if scalers:
-        freq_matrix_scaled = scalers['freq'].transform(freq_matrix.reshape(1, -1)).flatten()
-        duration_matrix_scaled = scalers['duration'].transform(duration_matrix.reshape(1, -1)).flatten()
-        user_vector_scaled = scalers['users'].transform(user_vector.reshape(1, -1)).flatten()
-        items_qty_scaled = scalers['items_qty'].transform(items_qty.reshape(1, -1)).flatten()
-        items_amt_scaled = scalers['items_amt'].transform(items_amt.reshape(1, -1)).flatten()
-        supplier_vector_scaled = scalers['suppliers'].transform(supplier_vector.reshape(1, -1)).flatten()
-        
-        # Outcome features: scale if scaler exists, otherwise use raw
-        if 'outcome' in scalers:
-            outcome_features_scaled = scalers['outcome'].transform(outcome_features.reshape(1, -1)).flatten()
-        else:
-            outcome_features_scaled = outcome_features  # Already 0-2 range, minimal scaling needed
-        
-        # Interleave items quantity and line total back together
-        items_matrix_scaled = np.empty(48)
-        items_matrix_scaled[::2] = items_qty_scaled
-        items_matrix_scaled[1::2] = items_amt_scaled
-        
-        # Concatenate all scaled features
-        feature_vector = np.concatenate([
-            freq_matrix_scaled,
-            duration_matrix_scaled,
-            user_vector_scaled,
-            items_matrix_scaled,
-            supplier_vector_scaled,
-            outcome_features_scaled  # NEW: Add outcome features
-        ])
-    else:
-        # No scaling - just concatenate raw features
-        feature_vector = np.concatenate([
-            freq_matrix,
-            duration_matrix,
-            user_vector,
-            items_matrix,
-            supplier_vector,
-            outcome_features  # NEW: Add outcome features
-        ])
+        feature_vector = scale_feature_matrix(feature_vector.reshape(1, -1), scalers)[0]
     
     assert feature_vector.shape[0] == TOTAL_FEATURE_DIM, \
         f"Feature vector dimension mismatch: {feature_vector.shape[0]} != {TOTAL_FEATURE_DIM}"
@@ -0,0 +1,226 @@
+"""
+Per-Order Feature Store
+Keeps the 417-dim feature row and the KPI targets of every order, keyed by order id and
+a signature of the order's raw data (events, KPIs, users, items, suppliers). Refreshing
+after a data change re-extracts only the orders whose signature changed, instead of
+running prepare_dataset over every order.
+
+Usage:
+    python feature_store.py            # refresh the store and report what changed
+"""
+
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from train_model import (
+    DATA_DIR,
+    FEATURE_CACHE_DIR,
+    FEATURE_CACHE_VERSION,
+    load_event_log,
+    extract_features_for_order
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STORE_FILE_NAME = 'feature_store.npz'
+
+KPI_TARGET_COLUMNS = [
+    'on_time_delivery_normalized',
+    'days_sales_outstanding_normalized',
+    'order_accuracy_normalized',
+    'invoice_accuracy_normalized',
+    'avg_cost_delivery_normalized'
+]
+
+
+def load_order_frames(data_dir: Path = DATA_DIR) -> Dict[str, pd.DataFrame]:
+    """
+    Load the raw per-order data the features and targets are built from
+
+    Returns:
+        Dict with 'events', 'kpis', 'users', 'items' and 'suppliers' DataFrames
+    """
+    return {
+        'events': load_event_log(),
+        'kpis': pd.read_csv(data_dir / 'order_kpis.csv'),
+        'users': pd.read_csv(data_dir / 'order_users.csv'),
+        'items': pd.read_csv(data_dir / 'order_items.csv'),
+        'suppliers': pd.read_csv(data_dir / 'order_suppliers.csv')
+    }
+
+
+def order_signatures(frames: Dict[str, pd.DataFrame], order_ids: np.ndarray) -> np.ndarray:
+    """
+    Signature of each order's raw data across all frames
+
+    Each frame's rows are hashed (pandas row hashes), grouped by order in their
+    original order, and the per-order hash lists of all frames are digested together.
+
+    Args:
+        frames: Output of load_order_frames
+        order_ids: Orders to sign
+
+    Returns:
+        Hex digest per order (same order as order_ids)
+    """
+    digests = {order_id: hashlib.blake2b(digest_size=16) for order_id in order_ids}
+    for name in sorted(frames):
+        frame = frames[name]
+        row_hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+        positions = frame.groupby('order_id', sort=False).indices
+        for order_id, digest in digests.items():
+            rows = positions.get(order_id)
+            digest.update(name.encode())
+            if rows is not None:
+                digest.update(row_hashes[rows].tobytes())
+    return np.array([digests[order_id].hexdigest() for order_id in order_ids])
+
+
+class FeatureStore:
+    """
+    Feature rows and targets per order, persisted as one .npz file
+
+    Arrays: order_ids, signatures, X (N, 417), y (N, 5), version. Rows follow the
+    order of order_kpis.csv, like prepare_dataset.
+    """
+
+    def __init__(self, store_dir: Path = FEATURE_CACHE_DIR, data_dir: Path = DATA_DIR):
+        """
+        Args:
+            store_dir: Directory of the store file
+            data_dir: Data directory
+        """
+        self.path = store_dir / STORE_FILE_NAME
+        self.data_dir = data_dir
+        self.order_ids: Optional[np.ndarray] = None
+        self.signatures: Optional[np.ndarray] = None
+        self.X: Optional[np.ndarray] = None
+        self.y: Optional[np.ndarray] = None
+        self._load()
+
+    def _load(self):
+        try:
+            with np.load(self.path, allow_pickle=False) as stored:
+                if int(stored['version']) != FEATURE_CACHE_VERSION:
+                    logger.info("Feature store was built by another feature version - rebuilding")
+                    return
+                self.order_ids = stored['order_ids']
+                self.signatures = stored['signatures']
+                self.X = stored['X']
+                self.y = stored['y']
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                version=np.array(FEATURE_CACHE_VERSION),
+                order_ids=self.order_ids,
+                signatures=self.signatures,
+                X=self.X,
+                y=self.y
+            )
+        os.replace(tmp_path, self.path)
+
+    @property
+    def empty(self) -> bool:
+        return self.order_ids is None
+
+    def signature_map(self) -> Dict[str, str]:
+        """Stored signature per order id"""
+        if self.empty:
+            return {}
+        return dict(zip(self.order_ids.tolist(), self.signatures.tolist()))
+
+    def refresh(self) -> Dict:
+        """
+        Bring the store up to date with the data files, re-extracting changed orders only
+
+        Returns:
+            Dict with lists of 'changed' (new or modified), 'removed' and the number of
+            'reused' orders, and 'seconds'
+        """
+        start = time.perf_counter()
+        frames = load_order_frames(self.data_dir)
+        order_ids = frames['kpis']['order_id'].unique().astype(str)
+        signatures = order_signatures(frames, order_ids)
+
+        stored = self.signature_map()
+        stored_rows = {order_id: i for i, order_id in enumerate(self.order_ids)} if not self.empty else {}
+        changed = [order_id for order_id, signature in zip(order_ids, signatures) if stored.get(order_id) != signature]
+        current = set(order_ids.tolist())
+        removed = [order_id for order_id in stored if order_id not in current]
+
+        X = np.empty((len(order_ids), self.X.shape[1] if not self.empty else 417))
+        y = frames['kpis'].drop_duplicates('order_id').set_index('order_id').loc[order_ids, KPI_TARGET_COLUMNS].to_numpy()
+
+        changed_set = set(changed)
+        if changed:
+            logger.info(f"Extracting features for {len(changed)} new or changed orders...")
+        grouped = {
+            name: frames[name].groupby('order_id', sort=False).indices
+            for name in ('events', 'users', 'items', 'suppliers')
+        }
+
+        def order_frame(name: str, order_id: str) -> pd.DataFrame:
+            rows = grouped[name].get(order_id)
+            return frames[name].iloc[rows] if rows is not None else frames[name].iloc[0:0]
+
+        for i, order_id in enumerate(order_ids):
+            if order_id in changed_set:
+                X[i] = extract_features_for_order(
+                    order_id,
+                    order_frame('events', order_id),
+                    order_frame('users', order_id),
+                    order_frame('items', order_id),
+                    order_frame('suppliers', order_id)
+                )
+            else:
+                X[i] = self.X[stored_rows[order_id]]
+
+        self.order_ids, self.signatures, self.X, self.y = order_ids, signatures, X, y
+        if changed or removed:
+            self._save()
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"✓ Feature store: {len(changed)} orders extracted, {len(removed)} removed, "
+                    f"{len(order_ids) - len(changed)} reused ({elapsed:.1f}s)")
+        return {
+            'changed': changed,
+            'removed': removed,
+            'reused': len(order_ids) - len(changed),
+            'seconds': elapsed
+        }
+
+    def changed_since(self, trained_signatures: Dict[str, str]) -> List[str]:
+        """
+        Orders whose data is new or differs from a recorded training snapshot
+
+        Args:
+            trained_signatures: Signature per order id at training time
+
+        Returns:
+            Order ids (store order)
+        """
+        return [
+            order_id for order_id, signature in zip(self.order_ids.tolist(), self.signatures.tolist())
+            if trained_signatures.get(order_id) != signature
+        ]
+
+
+if __name__ == "__main__":
+    store = FeatureStore()
+    report = store.refresh()
+    logger.info(f"✓ {len(store.order_ids)} orders in {store.path}")
@@ -0,0 +1,238 @@
+"""
+Gradient-Boosted Tree Backend for KPI Prediction
+One HistGradientBoostingRegressor per KPI, trained on the same split and scaled features as
+the neural network (see train_model.train_gbdt). For serving, the fitted trees are compiled
+into flat NumPy arrays (kpi_gbdt_model.npz) and all trees are walked at once, level by level,
+so neither scikit-learn nor TensorFlow is imported at request time.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GBDT_MODEL_FILE = 'kpi_gbdt_model.npz'
+GBDT_CONFIG_FILE = 'gbdt_config.json'
+
+# Shallow trees keep the level-by-level walk short (max_depth steps per batch); on the
+# bundled data depth 4 was as accurate as unbounded depth
+GBDT_PARAMS = {
+    'loss': 'squared_error',
+    'learning_rate': 0.05,
+    'max_iter': 500,
+    'max_leaf_nodes': 15,
+    'max_depth': 4,
+    'min_samples_leaf': 20,
+    'l2_regularization': 1.0
+}
+GBDT_VALIDATION_FRACTION = 0.1
+GBDT_EARLY_STOPPING_ROUNDS = 20
+
+
+def gbdt_model_path(models_dir: Path) -> Path:
+    """Path of the compiled tree arrays in a bundle"""
+    return models_dir / GBDT_MODEL_FILE
+
+
+def fit_gbdt(
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    sample_weight: Optional[np.ndarray] = None,
+    params: Optional[Dict] = None,
+    seed: int = 42
+) -> List:
+    """
+    Fit one gradient-boosted regressor per KPI
+
+    Each regressor stops early on a held-out fraction of the training rows.
+
+    Args:
+        X_train: Scaled training features (N, 417)
+        y_train: Normalized KPI targets (N, 5)
+        sample_weight: Optional per-row weights
+        params: HistGradientBoostingRegressor parameters (default: GBDT_PARAMS)
+        seed: Seed for the validation split and feature binning
+
+    Returns:
+        List of 5 fitted HistGradientBoostingRegressor
+    """
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+    regressors = []
+    for kpi_index in range(y_train.shape[1]):
+        regressor = HistGradientBoostingRegressor(
+            **(params or GBDT_PARAMS),
+            early_stopping=True,
+            validation_fraction=GBDT_VALIDATION_FRACTION,
+            n_iter_no_change=GBDT_EARLY_STOPPING_ROUNDS,
+            random_state=seed
+        )
+        regressor.fit(X_train, y_train[:, kpi_index], sample_weight=sample_weight)
+        regressors.append(regressor)
+    return regressors
+
+
+def _renumber_breadth_first(nodes: np.ndarray) -> np.ndarray:
+    """Node order in which the two children of every split are adjacent (right = left + 1)"""
+    order = [0]
+    for node in order:
+        if not nodes['is_leaf'][node]:
+            order.extend((int(nodes['left'][node]), int(nodes['right'][node])))
+    return np.array(order)
+
+
+def compile_gbdt(regressors: List) -> 'GBDTKPIModel':
+    """
+    Compile fitted regressors into flat tree arrays
+
+    Reads the fitted predictors of scikit-learn's HistGradientBoostingRegressor
+    (_predictors, _baseline_prediction), which are private; the compiled model is checked
+    against the regressors' own predict by train_model.train_gbdt.
+
+    Args:
+        regressors: One fitted regressor per KPI (identity link, numerical splits only)
+
+    Returns:
+        GBDTKPIModel
+    """
+    features, thresholds, lefts, values, roots, tree_kpis = [], [], [], [], [], []
+    baseline = []
+    offset = 0
+    depth = 0
+    for kpi_index, regressor in enumerate(regressors):
+        baseline.append(float(np.ravel(regressor._baseline_prediction)[0]))
+        for (predictor,) in regressor._predictors:
+            if predictor.nodes['is_categorical'].any():
+                raise ValueError("Categorical splits are not supported by the compiled tree backend")
+
+            order = _renumber_breadth_first(predictor.nodes)
+            nodes = predictor.nodes[order]
+            position = np.empty(len(predictor.nodes), dtype=np.int64)
+            position[order] = np.arange(len(order))
+            is_leaf = nodes['is_leaf'].astype(bool)
+
+            # Leaves point at themselves with an infinite threshold, so a walk that has
+            # reached a leaf stays there for the remaining levels
+            self_index = np.arange(len(nodes))
+            features.append(np.where(is_leaf, 0, nodes['feature_idx']))
+            thresholds.append(np.where(is_leaf, np.inf, nodes['num_threshold']))
+            lefts.append(offset + np.where(is_leaf, self_index, position[nodes['left']]))
+            values.append(np.where(is_leaf, nodes['value'], 0.0))
+            roots.append(offset)
+            tree_kpis.append(kpi_index)
+            offset += len(nodes)
+            depth = max(depth, int(nodes['depth'].max()))
+
+    return GBDTKPIModel({
+        'feature': np.concatenate(features).astype(np.int32),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts).astype(np.int32),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.int32),
+        'tree_kpi': np.array(tree_kpis, dtype=np.int32),
+        'baseline': np.array(baseline),
+        'depth': np.array(depth)
+    })
+
+
+class GBDTKPIModel:
+    """
+    Serves compiled gradient-boosted trees with NumPy
+
+    Every tree is walked for every row at once: each level gathers the split feature and
+    threshold of the current nodes and moves to the left child or the one after it. Leaf
+    values are summed per KPI on top of the baseline. Inputs must be finite (the scaled
+    feature vectors always are).
+    """
+    name = 'gbdt'
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        Args:
+            arrays: Tree arrays from compile_gbdt (or a saved .npz)
+        """
+        self.feature = arrays['feature'].astype(np.intp)
+        self.threshold = arrays['threshold'].astype(np.float64)
+        self.left = arrays['left'].astype(np.intp)
+        self.value = arrays['value'].astype(np.float64)
+        self.roots = arrays['roots'].astype(np.intp)
+        self.tree_kpi = arrays['tree_kpi'].astype(np.intp)
+        self.baseline = arrays['baseline'].astype(np.float64)
+        self.depth = int(arrays['depth'])
+
+        # Sums leaf values per KPI in one matmul
+        self._kpi_onehot = np.zeros((len(self.roots), len(self.baseline)))
+        self._kpi_onehot[np.arange(len(self.roots)), self.tree_kpi] = 1.0
+
+    @property
+    def num_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.feature)
+
+    def predict_batch(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Predict normalized KPIs
+
+        Args:
+            feature_matrix: Scaled feature matrix of shape (N, 417) or (417,)
+
+        Returns:
+            Array of shape (N, 5) with normalized KPI values
+        """
+        # float64 like scikit-learn's predict, so rows on a threshold split the same way
+        features = np.array(feature_matrix, dtype=np.float64, ndmin=2)
+        num_rows, num_features = features.shape
+        flat = features.ravel()
+        row_offsets = (np.arange(num_rows) * num_features)[:, None]
+
+        nodes = np.broadcast_to(self.roots, (num_rows, len(self.roots)))
+        for _ in range(self.depth):
+            go_right = flat[row_offsets + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.left[nodes] + go_right
+        return (self.value[nodes] @ self._kpi_onehot + self.baseline).astype(np.float32)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            'feature': self.feature.astype(np.int32),
+            'threshold': self.threshold,
+            'left': self.left.astype(np.int32),
+            'value': self.value,
+            'roots': self.roots.astype(np.int32),
+            'tree_kpi': self.tree_kpi.astype(np.int32),
+            'baseline': self.baseline,
+            'depth': np.array(self.depth)
+        }
+
+    def save(self, path: Path):
+        tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **self.to_arrays())
+        os.replace(tmp_path, path)
+        logger.info(f"✓ Saved GBDT model ({self.num_trees} trees, {self.num_nodes} nodes) to {path}")
+
+    @classmethod
+    def load(cls, path: Path) -> 'GBDTKPIModel':
+        with np.load(path, allow_pickle=False) as stored:
+            return cls({name: stored[name] for name in stored.files})
+
+
+def load_gbdt(models_dir: Path) -> Optional[GBDTKPIModel]:
+    """
+    Load a bundle's compiled GBDT model
+
+    Returns:
+        GBDTKPIModel, or None if the bundle has none (train with `python train_model.py --gbdt`)
+    """
+    path = gbdt_model_path(models_dir)
+    if not path.exists():
+        return None
+    return GBDTKPIModel.load(path)
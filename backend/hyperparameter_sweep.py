@@ -0,0 +1,393 @@
+"""
+Hyperparameter Sweep with K-Fold Cross-Validation
+Evaluates KPI model configurations (layer widths, dropout, learning rate, batch size)
+by k-fold cross-validation, training the (configuration, fold) pairs in parallel in a
+pool of worker processes with capped thread counts.
+
+The feature matrix is built once and cached (train_model.load_or_prepare_dataset);
+workers memory-map the cached arrays instead of re-extracting features. Folds are cut
+from the orders outside train_model's held-out test split, and each fold's training
+part holds back 10% for early stopping, so the fold MAE is measured on data the model
+never saw.
+
+Usage:
+    python hyperparameter_sweep.py                                   # default grid, 5 folds
+    python hyperparameter_sweep.py --search random --n-iter 8 --workers 4
+    python hyperparameter_sweep.py --units 256,128,64 128,64 --dropout 0.1 0.3 \
+        --learning-rate 1e-3 3e-4 --batch-size 32 64 --folds 3 --epochs 100
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+KPI_NAMES = ['on_time_delivery', 'days_sales_outstanding', 'order_accuracy', 'invoice_accuracy', 'avg_cost_delivery']
+
+DEFAULT_GRID = {
+    'hidden_units': [(256, 128, 64), (128, 64)],
+    'dropout': [0.1, 0.3],
+    'learning_rate': [1e-3, 3e-4],
+    'batch_size': [32, 64]
+}
+
+# Worker processes and threads per worker (workers x threads should not exceed the cores)
+SWEEP_WORKERS = int(os.getenv('KPI_SWEEP_WORKERS', str(min(4, os.cpu_count() or 1))))
+SWEEP_THREADS_PER_WORKER = int(os.getenv('KPI_SWEEP_THREADS', '1'))
+
+# Share of each fold's training rows held back for early stopping
+EARLY_STOPPING_FRACTION = 0.1
+
+SWEEP_OUTPUT_DIR = Path(__file__).parent / 'trained_models' / 'sweeps'
+
+# Per-worker state (set by _init_worker)
+_worker_X: Optional[np.ndarray] = None
+_worker_y: Optional[np.ndarray] = None
+
+
+def build_search_space(
+    grid: Dict[str, List],
+    search: str = 'grid',
+    n_iter: int = 10,
+    seed: int = 42
+) -> List[Dict]:
+    """
+    Expand a parameter grid into the configurations to evaluate
+
+    Args:
+        grid: Candidate values per hyperparameter
+        search: 'grid' (every combination) or 'random' (n_iter distinct combinations)
+        n_iter: Configurations drawn by random search
+        seed: Random search seed
+
+    Returns:
+        List of configuration dicts
+    """
+    from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+    if search == 'grid':
+        return list(ParameterGrid(grid))
+    if search == 'random':
+        n_iter = min(n_iter, len(ParameterGrid(grid)))
+        return list(ParameterSampler(grid, n_iter=n_iter, random_state=seed))
+    raise ValueError(f"Unknown search: {search!r} (expected 'grid' or 'random')")
+
+
+def cv_folds(num_rows: int, folds: int, seed: int = 42) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    K-fold splits over the rows outside train_model's held-out test split
+
+    Args:
+        num_rows: Rows in the feature matrix
+        folds: Number of folds (k)
+        seed: Shuffle seed
+
+    Returns:
+        List of (train row indices, evaluation row indices) per fold
+    """
+    from sklearn.model_selection import KFold, train_test_split
+
+    # Same index split as train_model.split_and_normalize, so the test orders stay unseen
+    rows = np.arange(num_rows)
+    train_rows, temp_rows = train_test_split(rows, test_size=0.3, random_state=42)
+    val_rows, _ = train_test_split(temp_rows, test_size=0.5, random_state=42)
+    dev_rows = np.sort(np.concatenate([train_rows, val_rows]))
+
+    splitter = KFold(n_splits=folds, shuffle=True, random_state=seed)
+    return [(dev_rows[fit], dev_rows[held_out]) for fit, held_out in splitter.split(dev_rows)]
+
+
+def config_label(config: Dict) -> str:
+    """Short human-readable label for a configuration"""
+    units = '-'.join(str(u) for u in config['hidden_units'])
+    return f"{units} do={config['dropout']:g} lr={config['learning_rate']:g} bs={config['batch_size']}"
+
+
+def _init_worker(x_path: str, y_path: str, threads: int):
+    """Worker initializer: cap TensorFlow/BLAS threads and map the cached features"""
+    global _worker_X, _worker_y
+
+    # Must be set before TensorFlow is imported in this process
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    # Per-fold training logs would interleave across workers
+    logging.getLogger('train_model').setLevel(logging.WARNING)
+
+    _worker_X = np.load(x_path, mmap_mode='r')
+    _worker_y = np.load(y_path, mmap_mode='r')
+
+
+def _worker_run_fold(
+    config: Dict,
+    train_rows: np.ndarray,
+    eval_rows: np.ndarray,
+    epochs: int,
+    seed: int
+) -> Dict:
+    """Train one configuration on one fold and measure MAE on the held-out rows"""
+    from sklearn.model_selection import train_test_split
+    from tensorflow import keras
+    from train_model import build_model, make_callbacks, make_dataset, normalize_features
+
+    started = time.time()
+    fit_rows, stop_rows = train_test_split(train_rows, test_size=EARLY_STOPPING_FRACTION, random_state=seed)
+
+    X_fit, X_stop, X_eval, _ = normalize_features(_worker_X[fit_rows], _worker_X[stop_rows], _worker_X[eval_rows])
+    y_fit, y_stop, y_eval = _worker_y[fit_rows], _worker_y[stop_rows], _worker_y[eval_rows]
+
+    keras.utils.set_random_seed(seed)
+    model = build_model(
+        hidden_units=tuple(config['hidden_units']),
+        dropout=config['dropout'],
+        learning_rate=config['learning_rate']
+    )
+    history = model.fit(
+        make_dataset(X_fit, y_fit, config['batch_size'], shuffle=True, seed=seed),
+        validation_data=make_dataset(X_stop, y_stop, 1024),
+        epochs=epochs,
+        callbacks=make_callbacks(verbose=0),
+        shuffle=False,  # make_dataset shuffles
+        verbose=0
+    )
+    predictions = np.concatenate(model.predict(X_eval, batch_size=1024, verbose=0), axis=1)
+
+    return {
+        'mae': np.abs(predictions - y_eval).mean(axis=0).tolist(),
+        'epochs': len(history.history['loss']),
+        'started': started,
+        'finished': time.time(),
+        'pid': os.getpid()
+    }
+
+
+def summarize_config(config: Dict, fold_results: List[Dict]) -> Dict:
+    """
+    Aggregate the fold results of one configuration
+
+    Args:
+        config: Configuration
+        fold_results: Output of _worker_run_fold per fold
+
+    Returns:
+        Result row with mean/std MAE (overall and per KPI, normalized units) and timing
+    """
+    mae = np.array([result['mae'] for result in fold_results])  # (folds, 5)
+    fold_mean = mae.mean(axis=1)
+    return {
+        'config': {**config, 'hidden_units': list(config['hidden_units'])},
+        'label': config_label(config),
+        'mean_mae': float(fold_mean.mean()),
+        'std_mae': float(fold_mean.std()),
+        'kpi_mae_mean': {name: float(mae[:, i].mean()) for i, name in enumerate(KPI_NAMES)},
+        'kpi_mae_std': {name: float(mae[:, i].std()) for i, name in enumerate(KPI_NAMES)},
+        'mean_epochs': float(np.mean([result['epochs'] for result in fold_results])),
+        # Fold training time summed (sequential cost) and first start to last finish (wall-clock)
+        'fit_seconds': float(sum(result['finished'] - result['started'] for result in fold_results)),
+        'wall_seconds': float(
+            max(result['finished'] for result in fold_results) - min(result['started'] for result in fold_results)
+        )
+    }
+
+
+def run_sweep(
+    configs: List[Dict],
+    folds: int = 5,
+    workers: int = SWEEP_WORKERS,
+    threads_per_worker: int = SWEEP_THREADS_PER_WORKER,
+    epochs: int = 300,
+    seed: int = 42
+) -> Dict:
+    """
+    Cross-validate every configuration, training (configuration, fold) pairs in parallel
+
+    Every configuration sees the same folds and the same per-fold seeds, so differences
+    between configurations are not down to the split or initialization.
+
+    Args:
+        configs: Configurations from build_search_space
+        folds: Number of folds (k)
+        workers: Worker processes (0 = train in this process)
+        threads_per_worker: TensorFlow/BLAS threads per worker
+        epochs: Maximum epochs per fold (early stopping applies)
+        seed: Fold and initialization seed
+
+    Returns:
+        Dict with the ranked results and sweep settings
+    """
+    from train_model import load_or_prepare_dataset, feature_cache_paths
+
+    X, _ = load_or_prepare_dataset(mmap=True)
+    x_path, y_path = feature_cache_paths()
+    splits = cv_folds(len(X), folds, seed)
+
+    cores = os.cpu_count() or 1
+    if workers * threads_per_worker > cores:
+        logger.warning(f"⚠️ {workers} workers x {threads_per_worker} threads oversubscribes {cores} cores")
+
+    logger.info(f"✓ Sweep: {len(configs)} configurations x {folds} folds = {len(configs) * folds} fits "
+                f"on {workers or 'in-process'} worker(s), {threads_per_worker} thread(s) each")
+
+    tasks = [
+        (config_index, fold, config, train_rows, eval_rows)
+        for config_index, config in enumerate(configs)
+        for fold, (train_rows, eval_rows) in enumerate(splits)
+    ]
+    fold_results: Dict[int, List[Dict]] = {index: [] for index in range(len(configs))}
+    start = time.perf_counter()
+
+    def record(config_index: int, fold: int, result: Dict):
+        fold_results[config_index].append(result)
+        logger.info(f"  [{sum(len(r) for r in fold_results.values())}/{len(tasks)}] "
+                    f"{config_label(configs[config_index])} fold {fold + 1}/{folds}: "
+                    f"MAE {np.mean(result['mae']):.5f}, {result['epochs']} epochs, "
+                    f"{result['finished'] - result['started']:.1f}s")
+
+    if workers <= 0:
+        _init_worker(str(x_path), str(y_path), threads_per_worker)
+        for config_index, fold, config, train_rows, eval_rows in tasks:
+            record(config_index, fold, _worker_run_fold(config, train_rows, eval_rows, epochs, seed + fold))
+    else:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(str(x_path), str(y_path), threads_per_worker)
+        ) as pool:
+            futures = {
+                pool.submit(_worker_run_fold, config, train_rows, eval_rows, epochs, seed + fold): (config_index, fold)
+                for config_index, fold, config, train_rows, eval_rows in tasks
+            }
+            for future in as_completed(futures):
+                record(*futures[future], future.result())
+
+    results = [summarize_config(config, fold_results[index]) for index, config in enumerate(configs)]
+    results.sort(key=lambda row: row['mean_mae'])
+    for rank, row in enumerate(results, start=1):
+        row['rank'] = rank
+
+    return {
+        'folds': folds,
+        'epochs': epochs,
+        'seed': seed,
+        'workers': workers,
+        'threads_per_worker': threads_per_worker,
+        'num_rows': int(len(X)),
+        'cv_rows': int(sum(len(eval_rows) for _, eval_rows in splits)),
+        'total_seconds': time.perf_counter() - start,
+        'results': results
+    }
+
+
+def log_results(report: Dict):
+    """Log the results table, best configuration first"""
+    short = {'on_time_delivery': 'otd', 'days_sales_outstanding': 'dso', 'order_accuracy': 'oacc',
+             'invoice_accuracy': 'iacc', 'avg_cost_delivery': 'cost'}
+    header = f"{'#':>2}  {'configuration':34s} {'MAE':>17s}  " + ' '.join(f"{short[n]:>8s}" for n in KPI_NAMES) + \
+        f"  {'epochs':>6s} {'wall s':>7s}"
+    logger.info(header)
+    logger.info("-" * len(header))
+    for row in report['results']:
+        logger.info(
+            f"{row['rank']:>2}  {row['label']:34s} {row['mean_mae']:.5f} ± {row['std_mae']:.5f}  "
+            + ' '.join(f"{row['kpi_mae_mean'][n]:8.5f}" for n in KPI_NAMES)
+            + f"  {row['mean_epochs']:6.1f} {row['wall_seconds']:7.1f}"
+        )
+    logger.info(f"✓ {len(report['results'])} configurations in {report['total_seconds']:.1f}s "
+                f"({report['workers'] or 'in-process'} worker(s))")
+
+
+def save_results(report: Dict, output_dir: Path = SWEEP_OUTPUT_DIR) -> Path:
+    """
+    Write the sweep report as JSON and the results table as CSV
+
+    Returns:
+        Path of the JSON report
+    """
+    import pandas as pd
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    json_path = output_dir / f'sweep_{stamp}.json'
+    with open(json_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    rows = []
+    for row in report['results']:
+        flat = {'rank': row['rank'], **row['config'], 'mean_mae': row['mean_mae'], 'std_mae': row['std_mae']}
+        flat['hidden_units'] = '-'.join(str(u) for u in row['config']['hidden_units'])
+        for name in KPI_NAMES:
+            flat[f'{name}_mae_mean'] = row['kpi_mae_mean'][name]
+            flat[f'{name}_mae_std'] = row['kpi_mae_std'][name]
+        flat.update({key: row[key] for key in ('mean_epochs', 'fit_seconds', 'wall_seconds')})
+        rows.append(flat)
+    pd.DataFrame(rows).to_csv(output_dir / f'sweep_{stamp}.csv', index=False)
+    return json_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter sweep for the KPI model")
+    parser.add_argument('--search', choices=['grid', 'random'], default='grid', help="Search strategy")
+    parser.add_argument('--n-iter', type=int, default=10, help="Configurations drawn by random search")
+    parser.add_argument('--units', nargs='+', default=None, metavar='W1,W2,...',
+                        help="Hidden layer widths to try, e.g. 256,128,64 128,64")
+    parser.add_argument('--dropout', type=float, nargs='+', default=None, help="Dropout rates to try")
+    parser.add_argument('--learning-rate', type=float, nargs='+', default=None, help="Learning rates to try")
+    parser.add_argument('--batch-size', type=int, nargs='+', default=None, help="Batch sizes to try")
+    parser.add_argument('--folds', type=int, default=5, help="Cross-validation folds")
+    parser.add_argument('--epochs', type=int, default=300, help="Maximum epochs per fold")
+    parser.add_argument('--workers', type=int, default=SWEEP_WORKERS, help="Worker processes (0 = in-process)")
+    parser.add_argument('--threads-per-worker', type=int, default=SWEEP_THREADS_PER_WORKER,
+                        help="TensorFlow/BLAS threads per worker")
+    parser.add_argument('--seed', type=int, default=42, help="Fold, initialization and random search seed")
+    parser.add_argument('--output-dir', type=Path, default=SWEEP_OUTPUT_DIR, help="Directory for the results")
+    args = parser.parse_args()
+
+    grid = dict(DEFAULT_GRID)
+    if args.units:
+        grid['hidden_units'] = [tuple(int(u) for u in spec.split(',')) for spec in args.units]
+    if args.dropout:
+        grid['dropout'] = args.dropout
+    if args.learning_rate:
+        grid['learning_rate'] = args.learning_rate
+    if args.batch_size:
+        grid['batch_size'] = args.batch_size
+
+    logger.info("=" * 80)
+    logger.info("HYPERPARAMETER SWEEP")
+    logger.info("=" * 80)
+    configs = build_search_space(grid, args.search, args.n_iter, args.seed)
+    report = run_sweep(
+        configs,
+        folds=args.folds,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        epochs=args.epochs,
+        seed=args.seed
+    )
+    report['search'] = args.search
+    log_results(report)
+    logger.info(f"✓ Saved results to {save_results(report, args.output_dir)}")
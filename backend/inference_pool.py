@@ -0,0 +1,433 @@
+"""
+Multi-Process Inference Pool for KPI Prediction
+Scores KPI batches in a pool of worker processes that share one memory-mapped copy
+of the model weights, so throughput scales with cores while the model (and TensorFlow)
+stays resident only once.
+
+The API process folds the trained model (or the stacked ensemble) into plain float32
+arrays and writes them to a single weight file. Workers map that file read-only and
+evaluate it with NumPy - they never import TensorFlow, and every worker (in every API
+process) reads the same physical pages from the page cache. Batches reach the workers
+through the executor's call queue.
+
+Usage:
+    python inference_pool.py                         # benchmark in-process, 1, 2 and 4 workers
+    python inference_pool.py --workers 1 2 --batch-size 32 --requests 400
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import struct
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ensemble_model import StackedEnsemble, ensemble_member_paths, load_ensemble_members, ENSEMBLE_DIR_NAME
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# BLAS threads per worker; one thread each lets the pool size map onto cores
+WORKER_THREADS = int(os.getenv('KPI_INFERENCE_WORKER_THREADS', '1'))
+
+# Batches are split across workers only above this many rows per chunk
+MIN_CHUNK_ROWS = 8
+
+WEIGHT_FILE_NAME = 'kpi_weights.bin'
+WEIGHT_FILE_MAGIC = b'KPIW0001'
+WEIGHT_ALIGNMENT = 64
+
+# Weights of the pool this worker process serves (set by _init_worker)
+_worker_ensemble: Optional[StackedEnsemble] = None
+
+
+def _aligned(offset: int) -> int:
+    return (offset + WEIGHT_ALIGNMENT - 1) // WEIGHT_ALIGNMENT * WEIGHT_ALIGNMENT
+
+
+def write_weight_file(ensemble: StackedEnsemble, path: Path) -> Path:
+    """
+    Write stacked weights to a single memory-mappable file
+
+    Layout: 8-byte magic, uint64 header length, JSON header (array offsets and shapes,
+    dropout rates), then 64-byte aligned float32 arrays. The file is written to a
+    temporary name and renamed into place, so readers never map a partial file.
+
+    Args:
+        ensemble: Stacked weights to write
+        path: Destination weight file
+
+    Returns:
+        Path to the written file
+    """
+    arrays = {name: np.ascontiguousarray(array, dtype=np.float32) for name, array in ensemble.to_arrays().items()}
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'offset': offset, 'shape': list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        'dtype': 'float32',
+        'num_members': ensemble.num_members,
+        'dropout_rates': ensemble.dropout_rates,
+        'arrays': layout
+    }).encode()
+    data_start = _aligned(len(WEIGHT_FILE_MAGIC) + 8 + len(header))
+
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(WEIGHT_FILE_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+    logger.info(f"✓ Wrote {len(arrays)} weight arrays ({(data_start + offset) / 1024:.0f} KB) to {path}")
+    return path
+
+
+def map_weight_file(path: Path) -> StackedEnsemble:
+    """
+    Map a weight file read-only and build a StackedEnsemble on top of it (no copies)
+
+    Args:
+        path: Weight file written by write_weight_file
+
+    Returns:
+        StackedEnsemble whose arrays are views into the mapping
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(WEIGHT_FILE_MAGIC)) != WEIGHT_FILE_MAGIC:
+            raise ValueError(f"Not a KPI weight file: {path}")
+        (header_length,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length))
+    data_start = _aligned(len(WEIGHT_FILE_MAGIC) + 8 + header_length)
+
+    mapping = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        start = data_start + entry['offset']
+        num_bytes = int(np.prod(entry['shape'])) * 4
+        arrays[name] = mapping[start:start + num_bytes].view(np.float32).reshape(entry['shape'])
+
+    return StackedEnsemble(arrays, dropout_rates=header['dropout_rates'])
+
+
+def weight_file_is_current(path: Path, sources: List[Path]) -> bool:
+    """Check a weight file exists and is newer than the model files it was built from"""
+    if not path.exists():
+        return False
+    mtime = path.stat().st_mtime_ns
+    return all(source.stat().st_mtime_ns <= mtime for source in sources if source.exists())
+
+
+def export_bundle_weights(bundle_dir: Path, use_ensemble: bool = False) -> Path:
+    """
+    Get the weight file for a bundle, writing it first if missing or stale
+
+    Only (re)writing the file needs TensorFlow; an up-to-date file is used as is, so
+    API processes that find one never load the Keras model.
+
+    Args:
+        bundle_dir: Bundle directory (trained_models or a registry version)
+        use_ensemble: Export the stacked ensemble members instead of the single model
+
+    Returns:
+        Path to the weight file
+    """
+    if use_ensemble:
+        ensemble_dir = bundle_dir / ENSEMBLE_DIR_NAME
+        weight_path = ensemble_dir / WEIGHT_FILE_NAME
+        sources = ensemble_member_paths(ensemble_dir)
+    else:
+        weight_path = bundle_dir / WEIGHT_FILE_NAME
+        sources = [bundle_dir / 'kpi_prediction_model.keras']
+
+    if weight_file_is_current(weight_path, sources):
+        return weight_path
+
+    if use_ensemble:
+        members = load_ensemble_members(bundle_dir / ENSEMBLE_DIR_NAME)
+    else:
+        from tensorflow import keras
+        members = [keras.models.load_model(sources[0])]
+
+    return write_weight_file(StackedEnsemble.from_members(members), weight_path)
+
+
+def _init_worker(weight_path: str, threads: int):
+    """Worker initializer: cap BLAS threads and map the shared weights"""
+    global _worker_ensemble
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+    _worker_ensemble = map_weight_file(Path(weight_path))
+
+
+def _worker_predict_members(feature_matrix: np.ndarray) -> np.ndarray:
+    return _worker_ensemble.predict_members(feature_matrix)
+
+
+def _worker_sample_dropout(feature_matrix: np.ndarray, num_samples: int, seed: int) -> np.ndarray:
+    return _worker_ensemble.sample_dropout(feature_matrix, num_samples, seed=seed)
+
+
+class InferencePool:
+    """
+    Pool of worker processes scoring against a shared, memory-mapped weight file
+
+    Large batches are split into chunks across the workers; concurrent callers
+    (e.g. the micro-batcher's executor threads) queue their batches on the same pool.
+    """
+
+    def __init__(
+        self,
+        weight_path: Path,
+        num_workers: int,
+        threads_per_worker: int = WORKER_THREADS
+    ):
+        """
+        Args:
+            weight_path: Weight file written by write_weight_file
+            num_workers: Worker processes (env: KPI_INFERENCE_WORKERS)
+            threads_per_worker: BLAS threads per worker (env: KPI_INFERENCE_WORKER_THREADS)
+        """
+        if num_workers < 1:
+            raise ValueError("Inference pool needs at least one worker")
+
+        self.weight_path = weight_path
+        self.num_workers = num_workers
+
+        # Header only - the parent doesn't need the weights mapped to route work
+        local = map_weight_file(weight_path)
+        self.num_members = local.num_members
+
+        # Spawned workers start from a clean interpreter: no forked TensorFlow state,
+        # and only NumPy plus this module are imported
+        self._executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(str(weight_path), threads_per_worker)
+        )
+        self._start_workers()
+        logger.info(f"✓ Inference pool started: {num_workers} workers on {weight_path.name}")
+
+    def _chunks(self, feature_matrix: np.ndarray) -> List[np.ndarray]:
+        """Split a batch into at most num_workers chunks of at least MIN_CHUNK_ROWS rows"""
+        if feature_matrix.ndim == 1:
+            feature_matrix = feature_matrix.reshape(1, -1)
+        num_chunks = max(1, min(self.num_workers, len(feature_matrix) // MIN_CHUNK_ROWS))
+        return np.array_split(np.ascontiguousarray(feature_matrix, dtype=np.float32), num_chunks)
+
+    def _map(self, fn, feature_matrix: np.ndarray, *args) -> np.ndarray:
+        futures = [self._executor.submit(fn, chunk, *args) for chunk in self._chunks(feature_matrix)]
+        return np.concatenate([future.result() for future in futures])
+
+    def submit_members(self, feature_matrix: np.ndarray) -> Future:
+        """Queue one batch on a single worker without waiting (returns (N, M, 5) future)"""
+        return self._executor.submit(_worker_predict_members, np.asarray(feature_matrix, dtype=np.float32))
+
+    def predict_members(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Evaluate every member on a batch
+
+        Args:
+            feature_matrix: Feature matrix of shape (N, 417) or (417,)
+
+        Returns:
+            Array of shape (N, M, 5) with normalized KPI predictions per member
+        """
+        return self._map(_worker_predict_members, feature_matrix)
+
+    def predict_batch(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Predict normalized KPIs (member mean for an ensemble)
+
+        Args:
+            feature_matrix: Feature matrix of shape (N, 417) or (417,)
+
+        Returns:
+            Array of shape (N, 5) with normalized KPI values
+        """
+        return self.predict_members(feature_matrix).mean(axis=1)
+
+    def predict_samples(self, feature_matrix: np.ndarray, num_samples: int, seed: int = 42) -> np.ndarray:
+        """
+        Draw uncertainty samples: member predictions for an ensemble, MC dropout otherwise
+
+        Args:
+            feature_matrix: Feature matrix of shape (N, 417) or (417,)
+            num_samples: Stochastic forward passes per row (ignored for an ensemble)
+            seed: Seed for the dropout masks
+
+        Returns:
+            Array of shape (N, K, 5) (or (N, M, 5)) with normalized KPI samples
+        """
+        if self.num_members > 1:
+            return self.predict_members(feature_matrix)
+        return self._map(_worker_sample_dropout, feature_matrix, num_samples, seed)
+
+    def _start_workers(self):
+        """
+        Spawn every worker up front (the executor otherwise starts them on demand,
+        putting interpreter start-up on a live request)
+        """
+        futures = [self._executor.submit(time.sleep, 0.05) for _ in range(self.num_workers)]
+        for future in futures:
+            future.result()
+
+    def worker_pids(self) -> List[int]:
+        """Process ids of the running workers"""
+        return sorted(self._executor._processes.keys())
+
+    def close(self):
+        """Shut down the worker processes"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        logger.info(f"Inference pool on {self.weight_path.name} stopped")
+
+
+def read_process_memory(pid: int) -> Dict[str, float]:
+    """
+    Read a process's resident memory from /proc (Linux)
+
+    Returns:
+        Dict with total, anonymous (private heap) and file-backed (shareable) RSS in MB
+    """
+    fields = {'VmRSS': 'rss_mb', 'RssAnon': 'anon_mb', 'RssFile': 'file_mb'}
+    memory = {}
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                key = line.split(':', 1)[0]
+                if key in fields:
+                    memory[fields[key]] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+
+def benchmark_pool(
+    weight_path: Path,
+    worker_counts: List[int],
+    batch_size: int = 32,
+    num_requests: int = 400
+) -> Dict:
+    """
+    Measure scoring throughput and memory per worker count
+
+    Each measurement keeps num_requests batches of batch_size rows queued on the pool
+    at once; workers=0 scores the same batches in this process for reference.
+
+    Args:
+        weight_path: Weight file to serve
+        worker_counts: Pool sizes to measure
+        batch_size: Rows per request
+        num_requests: Requests per measurement
+
+    Returns:
+        Benchmark report dict
+    """
+    rng = np.random.default_rng(0)
+    ensemble = map_weight_file(weight_path)
+    input_dim = ensemble.first_kernel.shape[0]
+    batches = [rng.standard_normal((batch_size, input_dim), dtype=np.float32) for _ in range(num_requests)]
+
+    report = {
+        'cpu_count': os.cpu_count(),
+        'batch_size': batch_size,
+        'num_requests': num_requests,
+        'api_process': read_process_memory(os.getpid()),
+        'results': []
+    }
+
+    for num_workers in worker_counts:
+        if num_workers == 0:
+            start = time.perf_counter()
+            for batch in batches:
+                ensemble.predict_members(batch)
+            elapsed = time.perf_counter() - start
+            report['results'].append({
+                'workers': 0,
+                'rows_per_s': round(batch_size * num_requests / elapsed),
+                'requests_per_s': round(num_requests / elapsed, 1)
+            })
+            continue
+
+        pool = InferencePool(weight_path, num_workers)
+        try:
+            pids = pool.worker_pids()
+            for future in [pool.submit_members(batch) for batch in batches[:num_workers * 4]]:
+                future.result()
+
+            start = time.perf_counter()
+            for future in [pool.submit_members(batch) for batch in batches]:
+                future.result()
+            elapsed = time.perf_counter() - start
+
+            report['results'].append({
+                'workers': num_workers,
+                'rows_per_s': round(batch_size * num_requests / elapsed),
+                'requests_per_s': round(num_requests / elapsed, 1),
+                'worker_memory': [read_process_memory(pid) for pid in pids]
+            })
+        finally:
+            pool.close()
+
+    return report
+
+
+def log_benchmark(report: Dict):
+    """Log a pool benchmark report"""
+    logger.info(f"CPUs: {report['cpu_count']}, batch={report['batch_size']}, requests={report['num_requests']}")
+    logger.info(f"API process (TensorFlow + model loaded): {report['api_process']}")
+    for result in report['results']:
+        logger.info(
+            f"  workers={result['workers']}: {result['rows_per_s']:8d} rows/s "
+            f"({result['requests_per_s']:.1f} req/s)"
+        )
+        for memory in result.get('worker_memory', []):
+            logger.info(f"      worker rss={memory.get('rss_mb')}MB anon={memory.get('anon_mb')}MB "
+                        f"file={memory.get('file_mb')}MB")
+
+
+if __name__ == "__main__":
+    from ml_model import load_model_and_scalers
+
+    parser = argparse.ArgumentParser(description="Benchmark the multi-process KPI inference pool")
+    parser.add_argument('--models-dir', type=Path, default=Path(__file__).parent / 'trained_models',
+                        help="Bundle directory holding kpi_prediction_model.keras")
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4],
+                        help="Pool sizes to measure (0 = in-process)")
+    parser.add_argument('--batch-size', type=int, default=32, help="Rows per request")
+    parser.add_argument('--requests', type=int, default=400, help="Requests per measurement")
+    args = parser.parse_args()
+
+    model, _ = load_model_and_scalers(args.models_dir)
+    weight_path = write_weight_file(StackedEnsemble.from_members([model]), args.models_dir / WEIGHT_FILE_NAME)
+
+    logger.info("=" * 80)
+    logger.info("INFERENCE POOL BENCHMARK")
+    logger.info("=" * 80)
+    report = benchmark_pool(weight_path, args.workers, batch_size=args.batch_size, num_requests=args.requests)
+    log_benchmark(report)
+
+    output_path = args.models_dir / 'inference_pool_benchmark.json'
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"✓ Saved benchmark to {output_path}")
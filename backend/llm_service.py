@@ -5,10 +5,10 @@ LLM service for parsing natural language prompts using Groq API.
 import os
 import json
 from pathlib import Path
-from groq import Groq
 from typing import Dict, Any, Optional, List
 from action_schemas import ProcessAction, ActionType
 from llm_prompts import SYSTEM_PROMPT, VARIANT_SELECTION_PROMPT, get_user_prompt, FALLBACK_SUGGESTIONS
+from stage_metrics import metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,6 +30,8 @@ class GroqLLMService:
             raise ValueError("GROQ_API_KEY not found. Please provide API key or set environment variable.")
         self.data_loader = data_loader
         
+        # Imported here so modules that only reference the service class don't load the SDK
+        from groq import Groq
         self.client = Groq(api_key=self.api_key)
         # Use current Groq models: llama-3.3-70b-versatile (best), llama-3.1-8b-instant (fast), mixtral-8x7b-32768
         self.model = "llama-3.3-70b-versatile"
@@ -57,6 +59,7 @@ class GroqLLMService:
             logger.error(f"Error loading variant contexts: {e}")
             return {"variants": []}
         
+    @metrics.timed('llm.parse_prompt')
     def parse_prompt(
         self, 
         user_prompt: str, 
@@ -139,6 +142,7 @@ class GroqLLMService:
             logger.error(f"Error calling Groq API: {e}")
             return self._fallback_action(user_prompt, f"Error processing request: {str(e)}")
     
+    @metrics.timed('llm.generate_event_narration')
     def generate_event_narration(self, event_data: Dict[str, Any]) -> str:
         """
         Generate natural language narration for a simulation event.
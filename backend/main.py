@@ -1,9 +1,11 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Dict, Any, Optional
-import pandas as pd
+import asyncio
+import functools
+import json
 import os
 import logging
 import traceback
@@ -13,15 +15,40 @@ from simulation_engine import SimulationEngine
 from real_data_loader import get_data_loader, get_baseline_kpis_from_data
 from utils import parse_prompt_mock, graph_to_networkx
 from llm_service import GroqLLMService
-from ml_model import ModelManager
+from ml_model import (
+    ModelManager,
+    denormalize_kpis,
+    summarize_kpi_samples,
+    confidence_from_uncertainty,
+    DEFAULT_UNCERTAINTY_SAMPLES,
+    MAX_UNCERTAINTY_SAMPLES
+)
+from micro_batcher import MicroBatcher
+from stage_pools import StagePools
+from response_cache import ResponseCache
+from reference_catalog import get_reference_catalog
+from sensitivity_analysis import run_sensitivity_analysis, KPI_HIGHER_IS_BETTER
+from process_optimizer import ProcessOptimizer
+from monte_carlo import (
+    run_monte_carlo_simulation,
+    DEFAULT_MONTE_CARLO_SAMPLES,
+    MAX_MONTE_CARLO_SAMPLES,
+    MAX_SURROGATE_SAMPLES,
+    HISTOGRAM_BINS
+)
 from scenario_generator import ScenarioGenerator
 from session_manager import get_session_manager
 from feature_extraction import (
     extract_features_from_scenario,
     enrich_edges_with_durations,
-    parse_activity_duration
+    parse_activity_duration,
+    scale_feature_matrix
 )
-from usd_builder import generate_gltf_for_case, get_sample_case_data
+from usd_builder import build_scene_data, get_sample_case_data
+from scene_cache import SceneCache
+from serialization import FastJSONResponse
+from compression import COMPRESSION_ENABLED, CompressionMiddleware, PrecompressedStaticFiles, precompress_directory
+from stage_metrics import MetricsMiddleware, metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,7 +57,15 @@ logger = logging.getLogger(__name__)
 # Constants
 HOURLY_RATE = 25.0  # Default hourly rate for cost calculation
 
-app = FastAPI(title="Process Simulation Studio API", version="1.0.0")
+app = FastAPI(
+    title="Process Simulation Studio API",
+    version="1.0.0",
+    default_response_class=FastJSONResponse  # orjson when installed
+)
+
+# Compress JSON responses (brotli / gzip, negotiated on Accept-Encoding)
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
 # Configure CORS for frontend integration
 app.add_middleware(
@@ -39,8 +74,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # lets the frontends read the ETag of cached data responses
 )
 
+# Per-endpoint request latency, and the endpoint label of the stage timing spans (outermost)
+app.add_middleware(MetricsMiddleware)
+
 # Pydantic models
 class PromptRequest(BaseModel):
     prompt: str
@@ -60,6 +99,10 @@ class SimulationRequest(BaseModel):
     event_log: List[Dict[str, Any]]
     graph: ProcessGraph
     session_id: Optional[str] = None  # Session ID for entity consistency
+    # MC-dropout passes for uncertainty (None: server default, 0: off)
+    uncertainty_samples: Optional[int] = Field(None, ge=0, le=MAX_UNCERTAINTY_SAMPLES)
+    # 'student': the bundle's distilled student (microsecond latency, no uncertainty)
+    predictor: str = Field('model', pattern='^(model|student)$')
 
 class PromptResponse(BaseModel):
     action: str
@@ -79,6 +122,8 @@ class PromptResponse(BaseModel):
     suggested_prompts: Optional[List[str]] = None  # Suggested next prompts after variant selection
 
 class SimulationResponse(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())  # allow the model_version field
+    
     # Baseline KPIs (before changes)
     baseline_on_time_delivery: float
     baseline_days_sales_outstanding: float
@@ -96,6 +141,61 @@ class SimulationResponse(BaseModel):
     # Metadata
     confidence: float
     summary: str
+    model_version: Optional[str] = None  # Registry version that produced the prediction (None for rule-based)
+    kpi_uncertainty: Optional[Dict[str, Dict[str, float]]] = None  # Per-KPI mean/std/lower/upper (MC dropout or ensemble spread)
+    predictor: Optional[str] = None  # 'model' or 'student:<architecture>' (None for rule-based)
+
+class SensitivityRequest(BaseModel):
+    graph: ProcessGraph
+    session_id: Optional[str] = None  # Session ID for entity consistency
+    duration_change: float = Field(0.2, gt=0, lt=1)  # Relative change applied to each edge duration
+    include_structure: bool = True  # Also evaluate removing each activity and adding each missing one
+    rank_by: str = 'on_time_delivery'  # KPI used to order the impact table
+
+class SensitivityResponse(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())  # allow the model_version field
+    
+    model_version: str
+    rank_by: str
+    duration_change: float
+    base_kpis: Dict[str, float]  # Model prediction for the unmodified graph
+    num_variants: int  # Perturbed variants scored in the batch
+    feature_ms: float
+    inference_ms: float
+    impacts: List[Dict[str, Any]]  # Ranked: type, target, kpi_deltas (+ edge_index, kpi_per_hour for edges)
+
+class MonteCarloRequest(BaseModel):
+    graph: ProcessGraph
+    session_id: Optional[str] = None  # Session ID for entity consistency
+    samples: int = Field(DEFAULT_MONTE_CARLO_SAMPLES, ge=100, le=MAX_SURROGATE_SAMPLES)  # > 50000 needs the surrogate
+    bins: int = Field(HISTOGRAM_BINS, ge=5, le=100)  # Histogram bins per KPI
+    seed: Optional[int] = 42  # None for a fresh draw on every request
+    surrogate_order: Optional[int] = Field(None, ge=1, le=2)  # Score samples with a 1st/2nd-order duration surrogate
+    surrogate_tolerance: Optional[float] = Field(None, gt=0)  # Max surrogate error bound (KPI units) before falling back
+
+class MonteCarloResponse(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())  # allow the model_version field
+    
+    model_version: str
+    num_samples: int
+    point_kpis: Dict[str, float]  # Prediction at the edges' fixed (mean) durations
+    kpi_distribution: Dict[str, Dict[str, Any]]  # Per KPI: mean, std, min, max, percentiles, histogram
+    edge_distributions: List[Dict[str, Any]]  # Duration distribution used for each edge
+    feature_ms: float
+    inference_ms: float
+    summary_ms: float
+    surrogate: Optional[Dict[str, Any]] = None  # Surrogate order, fallback rows and timings (surrogate mode)
+
+class OptimizeRequest(BaseModel):
+    graph: ProcessGraph  # Starting variant
+    session_id: Optional[str] = None  # Session ID for entity consistency
+    generations: int = Field(10, ge=1, le=50)
+    beam_width: int = Field(16, ge=1, le=64)
+    mutations_per_parent: int = Field(8, ge=1, le=32)
+    max_duration_change: float = Field(0.5, gt=0, lt=1)  # Bound on each edge's relative duration change
+    max_added: int = Field(2, ge=0, le=5)  # Activities that may be added to the starting variant
+    max_front: int = Field(20, ge=1, le=100)  # Pareto-front entries returned
+    seed: int = 42
 
 class NarrationRequest(BaseModel):
     event_name: str
@@ -114,6 +214,10 @@ class NarrationResponse(BaseModel):
     event_name: str
     timestamp: str
 
+# Data files each cached read-only endpoint is derived from
+EVENT_LOG_FILES = ['o2c_data_orders_only.xml']
+SAMPLE_ORDER_FILES = EVENT_LOG_FILES + ['variant_sample_orders.csv', 'order_kpis.csv', 'order_items.csv', 'variant_contexts.json']
+
 # Initialize
 simulation_engine = SimulationEngine()
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -125,20 +229,28 @@ data_loader = get_data_loader(data_file_path)
 # Initialize ML model manager and scenario generator
 model_manager: Optional[ModelManager] = None
 scenario_generator: Optional[ScenarioGenerator] = None
+micro_batcher: Optional[MicroBatcher] = None  # Batches concurrent /api/simulate forward passes
+stage_pools = StagePools()  # Bounded worker pools for the blocking stages of each handler
+response_cache = ResponseCache(data_dir)  # ETag'd bodies of the read-only data endpoints
+scene_cache = SceneCache(backend_dir / 'exports', data_dir)  # Content-addressed /api/sample scenes
 use_ml_predictions = False  # Flag to indicate if ML model is available
+startup_complete = False  # Set once startup (including model warm-up) has finished
 
 # Initialize LLM service (will be properly initialized after data_loader in startup)
 llm_service = None
 
 # Initialize Session Manager for entity consistency
 session_manager = get_session_manager()
+
+# Typical activity durations (hours) from the event log, used when a what-if adds an activity
+typical_activity_hours: Optional[Dict[str, float]] = None
 logger.info("✅ Session Manager initialized")
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize ML model and scenario generator at startup"""
-    global model_manager, scenario_generator, use_ml_predictions, llm_service
+    global model_manager, scenario_generator, use_ml_predictions, llm_service, micro_batcher, startup_complete
     
     logger.info("="*80)
     logger.info("🚀 BACKEND STARTUP - Initializing ML Model")
@@ -150,10 +262,11 @@ async def startup_event():
         exports_dir.mkdir(exist_ok=True)
         logger.info(f"✓ Exports directory ready: {exports_dir}")
         
-        # Mount static files for serving exported scenes
+        # Mount static files for serving exported scenes (with precompressed .br/.gz siblings)
         try:
-            app.mount("/exports", StaticFiles(directory=str(exports_dir)), name="exports")
-            logger.info("✓ Static files mounted at /exports")
+            precompressed = precompress_directory(exports_dir)
+            app.mount("/exports", PrecompressedStaticFiles(directory=str(exports_dir)), name="exports")
+            logger.info(f"✓ Static files mounted at /exports ({precompressed} files precompressed)")
         except Exception as e:
             logger.warning(f"⚠️ Could not mount static files: {e}")
         
@@ -162,6 +275,9 @@ async def startup_event():
         models_dir.mkdir(exist_ok=True)
         logger.info(f"✓ Models directory ready: {models_dir}")
         
+        # Preload the shared reference data (entities, order links, variant samples)
+        get_reference_catalog(data_dir)
+        
         # Check if model and data files exist
         model_file = models_dir / 'kpi_prediction_model.keras'
         data_files_exist = all([
@@ -176,30 +292,15 @@ async def startup_event():
             
             # Initialize Model Manager
             model_manager = ModelManager(backend_dir)
-            try:
-                model_manager.initialize(force_retrain=False)
-                logger.info("✅ ML Model loaded successfully")
-                
-                # Initialize Scenario Generator
-                scenario_generator = ScenarioGenerator(data_dir)
-                logger.info("✅ Scenario Generator initialized")
-                
-                use_ml_predictions = True
-                logger.info("✅ ML-BASED KPI PREDICTION ENABLED")
-            except NotImplementedError:
-                logger.warning("⚠️ Model training not yet implemented - using cached model if available")
-                # Try to load cached model directly
-                if model_file.exists():
-                    try:
-                        from ml_model import load_model_and_scalers
-                        model_manager.model, model_manager.scalers = load_model_and_scalers(models_dir)
-                        model_manager.baseline_kpis = get_baseline_kpis_from_data(str(data_dir))
-                        scenario_generator = ScenarioGenerator(data_dir)
-                        use_ml_predictions = True
-                        logger.info("✅ ML Model loaded from cache (training skipped)")
-                    except Exception as e2:
-                        logger.error(f"Failed to load cached model: {e2}")
-                        use_ml_predictions = False
+            model_manager.initialize(force_retrain=False)
+            logger.info("✅ ML Model loaded successfully")
+            
+            # Initialize Scenario Generator
+            scenario_generator = ScenarioGenerator(data_dir)
+            logger.info("✅ Scenario Generator initialized")
+            
+            use_ml_predictions = True
+            logger.info("✅ ML-BASED KPI PREDICTION ENABLED")
         else:
             logger.warning("⚠️ Model or data files not found")
             logger.warning("   Missing files - ML predictions will not be available")
@@ -212,6 +313,14 @@ async def startup_event():
         logger.warning("⚠️ Falling back to rule-based KPI calculation")
         use_ml_predictions = False
     
+    # Put the micro-batching queue in front of the model
+    if use_ml_predictions and model_manager:
+        # Batched forward passes count against (and are sized by) the compute stage pool
+        micro_batcher = MicroBatcher(
+            model_manager.predict_batch,
+            run_batch=functools.partial(stage_pools.run, 'compute')
+        )
+    
     # Initialize LLM service with data_loader
     try:
         llm_service = GroqLLMService(data_loader=data_loader)
@@ -221,6 +330,7 @@ async def startup_event():
         logger.warning("⚠️ Falling back to regex-based parser")
         llm_service = None
     
+    startup_complete = True
     logger.info("="*80)
     if use_ml_predictions:
         logger.info("✅ BACKEND READY - ML predictions enabled")
@@ -229,12 +339,21 @@ async def startup_event():
     logger.info("="*80)
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background inference tasks, stage pools and inference worker processes"""
+    if micro_batcher:
+        await micro_batcher.close()
+    stage_pools.shutdown()
+    if model_manager:
+        model_manager.close()
+
+
 @app.get("/")
 async def root():
     return {"message": "Process Simulation Studio API is running", "data_source": "Real O2C Data"}
 
-@app.get("/api/data-summary")
-async def get_data_summary():
+def build_data_summary():
     try:
         summary = data_loader.get_summary_stats()
         
@@ -262,8 +381,13 @@ async def get_data_summary():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
-@app.get("/api/most-frequent-variant")
-async def get_most_frequent_variant():
+@app.get("/api/data-summary")
+async def get_data_summary(request: Request):
+    return await response_cache.respond(
+        request, 'data-summary', EVENT_LOG_FILES, lambda: stage_pools.run('data', build_data_summary)
+    )
+
+def build_most_frequent_variant():
     try:
         variants = data_loader.get_process_variants(top_n=1)
         if not variants:
@@ -336,8 +460,13 @@ async def get_most_frequent_variant():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
-@app.get("/api/process-flow-metrics")
-async def get_process_flow_metrics():
+@app.get("/api/most-frequent-variant")
+async def get_most_frequent_variant(request: Request):
+    return await response_cache.respond(
+        request, 'most-frequent-variant', EVENT_LOG_FILES, lambda: stage_pools.run('data', build_most_frequent_variant)
+    )
+
+def build_process_flow_metrics():
     """
     Get detailed process flow metrics including edge frequencies and timing.
     Returns real data about transitions between activities.
@@ -348,6 +477,13 @@ async def get_process_flow_metrics():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@app.get("/api/process-flow-metrics")
+async def get_process_flow_metrics(request: Request):
+    """Detailed process flow metrics (edge frequencies and timing) from the event log."""
+    return await response_cache.respond(
+        request, 'process-flow-metrics', EVENT_LOG_FILES, lambda: stage_pools.run('data', build_process_flow_metrics)
+    )
+
 @app.post("/api/parse-prompt", response_model=PromptResponse)
 async def parse_prompt(request: PromptRequest):
     try:
@@ -365,7 +501,9 @@ async def parse_prompt(request: PromptRequest):
         if llm_service:
             logger.info(f"🤖 Using LLM service for prompt: {request.prompt}")
             logger.info(f"Current process: {request.current_process}")
-            result = llm_service.parse_prompt(
+            result = await stage_pools.run(
+                'llm',
+                llm_service.parse_prompt,
                 user_prompt=request.prompt,
                 current_process=request.current_process
             )
@@ -378,8 +516,7 @@ async def parse_prompt(request: PromptRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error: {str(e)}")
 
-@app.post("/api/generate-log")
-async def generate_log(request: EventLogRequest):
+def build_event_log(request: EventLogRequest):
     try:
         activities = request.graph.activities
         kpis = request.graph.kpis  # ✅ Get KPIs from request
@@ -396,6 +533,117 @@ async def generate_log(request: EventLogRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@app.post("/api/generate-log")
+async def generate_log(request: EventLogRequest):
+    return await stage_pools.run('data', build_event_log, request)
+
+def resolve_scenario_entities(activities: List[str], session_id: Optional[str]):
+    """
+    Get the users, items and suppliers for a scenario - stored session entities if
+    available, otherwise newly generated ones (stored in the session for consistency)
+    
+    Returns:
+        Tuple of (user_ids, items_data, supplier_ids)
+    """
+    stored_entities = None
+    if session_id:
+        stored_entities = session_manager.get_entities(session_id)
+    
+    if stored_entities:
+        # Use stored entities from session
+        user_ids = stored_entities['users']
+        items_data = stored_entities['items']
+        supplier_ids = stored_entities['suppliers']
+        logger.info(f"✅ Using stored session entities: {len(user_ids)} users, {len(items_data)} items, {len(supplier_ids)} suppliers")
+    else:
+        # Generate new entities with constraints if available
+        entity_constraints = None
+        session_seed = None
+    
+        if session_id:
+            entity_constraints = session_manager.get_entity_constraints(session_id)
+            session_seed = session_manager.get_session_seed(session_id)
+            logger.info(f"🎲 Using session seed: {session_seed}, constraints: {entity_constraints}")
+    
+        user_ids, items_data, supplier_ids, order_value = scenario_generator.generate_scenario_entities(
+            activities,
+            num_users=None,
+            num_items=None,
+            session_seed=session_seed,
+            entity_constraints=entity_constraints
+        )
+        logger.debug(f"   Generated: {len(user_ids)} users, {len(items_data)} items, {len(supplier_ids)} suppliers")
+    
+        # Store entities in session for future use
+        if session_id:
+            session_manager.store_entities(session_id, user_ids, items_data, supplier_ids)
+            logger.info("💾 Stored entities in session for consistency")
+    
+    return user_ids, items_data, supplier_ids
+
+
+def is_baseline_scenario(activities: List[str], kpis: Dict[str, Dict[str, float]]) -> bool:
+    """
+    Whether a scenario is the unmodified most frequent variant: the same activities with
+    durations within 0.5h of the event log's (blocking pandas queries)
+    """
+    # Get baseline activities dynamically from data (most frequent variant)
+    baseline_activities = data_loader.get_most_frequent_variant_activities()
+    logger.debug(f"   Baseline activities from most frequent variant: {baseline_activities}")
+    
+    # Check if activities match baseline
+    is_baseline_activities = sorted(activities) == sorted(baseline_activities)
+    
+    # Also check if KPIs match the baseline values from data (no user modifications)
+    has_baseline_kpis = True
+    if is_baseline_activities and kpis:
+        # Get baseline KPIs from data for comparison
+        baseline_kpis_data = data_loader.get_event_kpis_for_activities(baseline_activities)
+        
+        for activity, kpi_vals in kpis.items():
+            avg_time = kpi_vals.get('avg_time', 2.0)
+            baseline_time = baseline_kpis_data.get(activity, {}).get('avg_time', 2.0)
+            
+            # If any activity has significantly different time from baseline data, not baseline
+            if abs(avg_time - baseline_time) > 0.5:  # Allow 0.5h tolerance for rounding
+                has_baseline_kpis = False
+                logger.debug(f"   Activity '{activity}' has modified time: {avg_time}h vs baseline {baseline_time}h")
+                break
+    
+    return is_baseline_activities and has_baseline_kpis
+
+
+def build_scenario_features(
+    activities: List[str],
+    edges: List[Dict[str, Any]],
+    kpis: Dict[str, Dict[str, float]],
+    session_id: Optional[str],
+    scalers: Dict
+):
+    """
+    Resolve the session's entities and build the scaled feature vector of a scenario
+    
+    Returns:
+        Tuple of (user_ids, items_data, supplier_ids, feature_vector)
+    """
+    with metrics.span('entities'):
+        user_ids, items_data, supplier_ids = resolve_scenario_entities(activities, session_id)
+    with metrics.span('edge_durations'):
+        enriched_edges = enrich_edges_with_durations(activities, edges, kpis)
+    with metrics.span('features'):
+        feature_vector = extract_features_from_scenario(
+            activities,
+            enriched_edges,
+            user_ids,
+            items_data,
+            supplier_ids
+        )
+    if scalers:
+        with metrics.span('scaling'):
+            feature_vector = scale_feature_matrix(feature_vector.reshape(1, -1), scalers)[0]
+    return user_ids, items_data, supplier_ids, feature_vector
+
+
 @app.post("/api/simulate", response_model=SimulationResponse)
 async def simulate_process(request: SimulationRequest):
     try:
@@ -410,92 +658,70 @@ async def simulate_process(request: SimulationRequest):
             
             activities = request.graph.activities
             
-            # 1. Check for existing entities in session
-            stored_entities = None
-            if request.session_id:
-                stored_entities = session_manager.get_entities(request.session_id)
-            
-            if stored_entities:
-                # Use stored entities from session
-                user_ids = stored_entities['users']
-                items_data = stored_entities['items']
-                supplier_ids = stored_entities['suppliers']
-                logger.info(f"✅ Using stored session entities: {len(user_ids)} users, {len(items_data)} items, {len(supplier_ids)} suppliers")
-            else:
-                # Generate new entities with constraints if available
-                entity_constraints = None
-                session_seed = None
-                
-                if request.session_id:
-                    entity_constraints = session_manager.get_entity_constraints(request.session_id)
-                    session_seed = session_manager.get_session_seed(request.session_id)
-                    logger.info(f"🎲 Using session seed: {session_seed}, constraints: {entity_constraints}")
-                
-                user_ids, items_data, supplier_ids, order_value = scenario_generator.generate_scenario_entities(
-                    activities,
-                    num_users=None,
-                    num_items=None,
-                    session_seed=session_seed,
-                    entity_constraints=entity_constraints
-                )
-                logger.debug(f"   Generated: {len(user_ids)} users, {len(items_data)} items, {len(supplier_ids)} suppliers")
-                
-                # Store entities in session for future use
-                if request.session_id:
-                    session_manager.store_entities(request.session_id, user_ids, items_data, supplier_ids)
-                    logger.info("💾 Stored entities in session for consistency")
-            
-            # 2. Enrich edges with duration information from KPIs
-            edges = request.graph.edges
-            enriched_edges = enrich_edges_with_durations(activities, edges, request.graph.kpis)
+            # Take one model bundle for the whole request, so a hot-swap can't mix versions
+            bundle = model_manager.get_active_bundle()
+            student = None
+            if request.predictor == 'student':
+                student = bundle.student
+                if student is None:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Model version {bundle.version} has no distilled student - run `python student_model.py`"
+                    )
             
-            # 3. Extract 409-dimensional feature vector
-            feature_vector = extract_features_from_scenario(
+            # 1-3. Session entities, edge durations and the 417-dim feature vector (off the event loop)
+            user_ids, items_data, supplier_ids, feature_vector = await stage_pools.run(
+                'compute',
+                build_scenario_features,
                 activities,
-                enriched_edges,
-                user_ids,
-                items_data,
-                supplier_ids,
-                scalers=model_manager.scalers
+                request.graph.edges,
+                request.graph.kpis,
+                request.session_id,
+                student.scalers if student is not None else bundle.scalers
             )
             logger.debug(f"   Feature vector extracted: shape={feature_vector.shape}")
             
-            # 4. Predict KPIs using ML model
-            predicted_kpis_raw = model_manager.predict(feature_vector)
+            # 4. Predict KPIs using ML model (batched with concurrent requests),
+            #    plus uncertainty samples (K MC-dropout passes, or the ensemble members) in a second call
+            num_samples = request.uncertainty_samples
+            if num_samples is None:
+                num_samples = DEFAULT_UNCERTAINTY_SAMPLES
+            if not bundle.supports_uncertainty:
+                num_samples = 0
+            
+            kpi_samples = None
+            with metrics.span('predict'):
+                if student is not None:
+                    # A student forward pass takes microseconds: no batching window, no uncertainty
+                    point_row = (await stage_pools.run('compute', student.predict_batch, feature_vector))[0]
+                elif micro_batcher:
+                    if num_samples > 0:
+                        point_row, kpi_samples = await asyncio.gather(
+                            micro_batcher.predict(feature_vector, bundle.predict_batch),
+                            micro_batcher.predict(feature_vector, bundle.uncertainty_fn(num_samples))
+                        )
+                    else:
+                        point_row = await micro_batcher.predict(feature_vector, bundle.predict_batch)
+                else:
+                    point_row = (await stage_pools.run('compute', bundle.predict_batch, feature_vector))[0]
+                    if num_samples > 0:
+                        kpi_samples = (await stage_pools.run('compute', bundle.predict_samples, feature_vector, num_samples))[0]
+            predicted_kpis_raw = denormalize_kpis(point_row)
+            kpi_uncertainty = summarize_kpi_samples(kpi_samples) if kpi_samples is not None else None
             logger.debug(f"   Raw ML predicted KPIs: {predicted_kpis_raw}")
             
             # 5. Apply process complexity adjustments and baseline detection
             # Check if this is the exact baseline process (most frequent variant)
-            # Get baseline activities dynamically from data (most frequent variant)
-            baseline_activities = data_loader.get_most_frequent_variant_activities()
-            logger.debug(f"   Baseline activities from most frequent variant: {baseline_activities}")
-            
-            # Check if activities match baseline
-            is_baseline_activities = sorted(activities) == sorted(baseline_activities)
-            
-            # Also check if KPIs match the baseline values from data (no user modifications)
-            has_baseline_kpis = True
-            if is_baseline_activities and request.graph.kpis:
-                # Get baseline KPIs from data for comparison
-                baseline_kpis_data = data_loader.get_event_kpis_for_activities(baseline_activities)
-                
-                for activity, kpi_vals in request.graph.kpis.items():
-                    avg_time = kpi_vals.get('avg_time', 2.0)
-                    baseline_time = baseline_kpis_data.get(activity, {}).get('avg_time', 2.0)
-                    
-                    # If any activity has significantly different time from baseline data, not baseline
-                    if abs(avg_time - baseline_time) > 0.5:  # Allow 0.5h tolerance for rounding
-                        has_baseline_kpis = False
-                        logger.debug(f"   Activity '{activity}' has modified time: {avg_time}h vs baseline {baseline_time}h")
-                        break
-            
-            is_baseline_process = is_baseline_activities and has_baseline_kpis
+            with metrics.span('baseline_detection'):
+                is_baseline_process = await stage_pools.run('data', is_baseline_scenario, activities, request.graph.kpis)
             
             if is_baseline_process:
                 # For exact baseline process with default KPIs, use baseline KPIs directly
                 logger.info("   📊 Detected baseline process with default KPIs - using baseline KPIs")
                 baseline_kpis_temp = model_manager.get_baseline_kpis()
                 predicted_kpis = baseline_kpis_temp.copy()
+                # Measured, not predicted: the MC samples describe the raw prediction, so drop them
+                kpi_uncertainty = None
             else:
                 # For modified processes, use ML model predictions
                 # The model now learns business logic from outcome features (has_rejection, etc.)
@@ -526,15 +752,16 @@ async def simulate_process(request: SimulationRequest):
             logger.debug(f"   Baseline KPIs: {baseline_kpis}")
             
             # 7. Generate summary with entity details
-            summary = scenario_generator.generate_scenario_summary(
-                user_ids,
-                items_data,
-                supplier_ids,
-                predicted_kpis
-            )
+            with metrics.span('summary'):
+                summary = scenario_generator.generate_scenario_summary(
+                    user_ids,
+                    items_data,
+                    supplier_ids,
+                    predicted_kpis
+                )
             
-            # 8. Calculate confidence (fixed for now, could use model uncertainty)
-            confidence = 0.85
+            # 8. Calculate confidence from the prediction intervals (fixed if uncertainty is disabled or baseline)
+            confidence = confidence_from_uncertainty(kpi_uncertainty) if kpi_uncertainty else 0.85
             
             # 9. Build response
             response = SimulationResponse(
@@ -551,7 +778,10 @@ async def simulate_process(request: SimulationRequest):
                 avg_cost_delivery=predicted_kpis['avg_cost_delivery'],
                 
                 confidence=confidence,
-                summary=summary
+                summary=summary,
+                model_version=bundle.version,
+                kpi_uncertainty=kpi_uncertainty,
+                predictor=f'student:{student.architecture}' if student is not None else 'model'
             )
             
             logger.info("✅ ML-based simulation completed successfully")
@@ -583,13 +813,185 @@ async def simulate_process(request: SimulationRequest):
                 summary="ML model not available. Showing baseline KPIs. Please train the model first."
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Simulation error: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
-@app.get("/api/orders")
-async def get_available_orders():
+def get_typical_activity_hours() -> Dict[str, float]:
+    """Typical duration per O2C activity from the event log (computed once)"""
+    global typical_activity_hours
+    if typical_activity_hours is None:
+        from llm_prompts import VALID_O2C_ACTIVITIES
+        activity_kpis = data_loader.get_event_kpis_for_activities(VALID_O2C_ACTIVITIES)
+        typical_activity_hours = {name: kpis['avg_time'] for name, kpis in activity_kpis.items()}
+    return typical_activity_hours
+
+
+@app.post("/api/sensitivity", response_model=SensitivityResponse)
+async def analyze_sensitivity(request: SensitivityRequest):
+    """
+    What-if sensitivity of the 5 KPIs to every edge duration and to removing or adding
+    each activity, scored in one batched forward pass and returned as a ranked table.
+    """
+    if not (use_ml_predictions and model_manager and scenario_generator):
+        raise HTTPException(status_code=503, detail="ML model not available")
+    if request.rank_by not in KPI_HIGHER_IS_BETTER:
+        raise HTTPException(
+            status_code=422,
+            detail=f"rank_by must be one of: {', '.join(KPI_HIGHER_IS_BETTER)}"
+        )
+    
+    try:
+        logger.info("🔬 Sensitivity analysis request received")
+        activities = request.graph.activities
+        bundle = model_manager.get_active_bundle()
+        
+        def analyze():
+            user_ids, items_data, supplier_ids = resolve_scenario_entities(activities, request.session_id)
+            enriched_edges = enrich_edges_with_durations(activities, request.graph.edges, request.graph.kpis)
+            activity_hours = {
+                **get_typical_activity_hours(),
+                **{name: kpis.get('avg_time', 1.0) for name, kpis in request.graph.kpis.items()}
+            }
+            return run_sensitivity_analysis(
+                activities,
+                enriched_edges,
+                user_ids,
+                items_data,
+                supplier_ids,
+                bundle.predict_batch,
+                bundle.scalers,
+                duration_change=request.duration_change,
+                include_structure=request.include_structure,
+                rank_by=request.rank_by,
+                activity_hours=activity_hours
+            )
+        
+        # Entities, feature building and the batched forward pass run in the compute pool
+        result = await stage_pools.run('compute', analyze)
+        
+        return SensitivityResponse(model_version=bundle.version, **result)
+    
+    except Exception as e:
+        logger.error(f"❌ Sensitivity analysis error: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/api/simulate/monte-carlo", response_model=MonteCarloResponse)
+async def simulate_monte_carlo(request: MonteCarloRequest):
+    """
+    KPI distributions for a process, sampling every edge duration from the durations
+    of that transition in the event log and scoring all samples in one batch.
+    """
+    if not (use_ml_predictions and model_manager and scenario_generator):
+        raise HTTPException(status_code=503, detail="ML model not available")
+    if request.surrogate_order is None and request.samples > MAX_MONTE_CARLO_SAMPLES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"samples above {MAX_MONTE_CARLO_SAMPLES} require a surrogate_order"
+        )
+    
+    try:
+        logger.info(f"🎲 Monte Carlo simulation request received ({request.samples} samples)")
+        activities = request.graph.activities
+        bundle = model_manager.get_active_bundle()
+        
+        def simulate():
+            user_ids, items_data, supplier_ids = resolve_scenario_entities(activities, request.session_id)
+            enriched_edges = enrich_edges_with_durations(activities, request.graph.edges, request.graph.kpis)
+            return run_monte_carlo_simulation(
+                activities,
+                enriched_edges,
+                user_ids,
+                items_data,
+                supplier_ids,
+                bundle.predict_batch,
+                bundle.scalers,
+                data_loader.get_transition_durations(),
+                num_samples=request.samples,
+                seed=request.seed,
+                bins=request.bins,
+                surrogate_order=request.surrogate_order,
+                surrogate_tolerance=request.surrogate_tolerance
+            )
+        
+        # Entities, sampling, feature building and the batched forward pass run in the compute pool
+        result = await stage_pools.run('compute', simulate)
+        
+        return MonteCarloResponse(model_version=bundle.version, **result)
+    
+    except Exception as e:
+        logger.error(f"❌ Monte Carlo simulation error: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.post("/api/optimize")
+async def optimize_process(request: OptimizeRequest):
+    """
+    Search processes near the given variant and stream progress as NDJSON: one
+    {"type": "progress"} line per generation, then {"type": "result"} with the Pareto
+    front over the 5 KPIs (or {"type": "error"}).
+    """
+    if not (use_ml_predictions and model_manager and scenario_generator):
+        raise HTTPException(status_code=503, detail="ML model not available")
+    
+    logger.info("🧭 Process optimization request received")
+    activities = request.graph.activities
+    bundle = model_manager.get_active_bundle()
+    
+    def start_optimizer():
+        user_ids, items_data, supplier_ids = resolve_scenario_entities(activities, request.session_id)
+        enriched_edges = enrich_edges_with_durations(activities, request.graph.edges, request.graph.kpis)
+        activity_hours = {
+            **get_typical_activity_hours(),
+            **{name: kpis.get('avg_time', 1.0) for name, kpis in request.graph.kpis.items()}
+        }
+        optimizer = ProcessOptimizer(
+            activities,
+            enriched_edges,
+            user_ids,
+            items_data,
+            supplier_ids,
+            bundle.predict_batch,
+            bundle.scalers,
+            max_duration_change=request.max_duration_change,
+            max_added=request.max_added,
+            activity_hours=activity_hours,
+            seed=request.seed
+        )
+        return optimizer.run(
+            generations=request.generations,
+            beam_width=request.beam_width,
+            mutations_per_parent=request.mutations_per_parent,
+            max_front=request.max_front
+        )
+    
+    events = await stage_pools.run('compute', start_optimizer)
+    
+    async def stream():
+        # Each generation (mutation, feature building, batched scoring) runs in the compute pool
+        try:
+            while True:
+                event = await stage_pools.run('compute', next, events, None)
+                if event is None:
+                    break
+                if event['type'] == 'result':
+                    event['model_version'] = bundle.version
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"❌ Optimization error: {str(e)}")
+            logger.error(traceback.format_exc())
+            yield json.dumps({'type': 'error', 'detail': str(e)}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def build_available_orders():
     """
     Get list of sample orders (1 per variant) with metadata.
     Returns 8 sample orders representing each of the 8 process variants.
@@ -598,43 +1000,29 @@ async def get_available_orders():
         List of sample orders with case_id, event_count, item_count, KPIs, and variant info
     """
     try:
-        data_dir = backend_dir.parent / 'data'  # Data is in parent directory
-        
-        # Load sample orders (1 per variant)
-        df_sample_orders = pd.read_csv(data_dir / 'variant_sample_orders.csv')
-        df_kpis = pd.read_csv(data_dir / 'order_kpis.csv')
-        df_order_items = pd.read_csv(data_dir / 'order_items.csv')
-        
-        # Load variant contexts for descriptions
-        import json
-        with open(data_dir / 'variant_contexts.json', 'r') as f:
-            variant_contexts = json.load(f)
-        
-        # Create variant lookup
-        variant_info = {v['variant_id']: v for v in variant_contexts['variants']}
+        # Sample orders (1 per variant), KPIs, items and variant contexts from the shared catalog
+        catalog = get_reference_catalog(data_dir)
         
         # Build order list (only sample orders)
         orders = []
-        for _, sample_row in df_sample_orders.iterrows():
+        for sample_row in catalog.variant_samples.rows.values():
             order_id = sample_row['sample_order_id']
             variant_id = sample_row['variant_id']
             
             # Get KPIs for this order
-            kpi_row = df_kpis[df_kpis['order_id'] == order_id]
-            if kpi_row.empty:
+            kpi_row = catalog.order_kpis.get(order_id)
+            if kpi_row is None:
                 continue
             
-            kpi_row = kpi_row.iloc[0]
-            
             # Get event count
             events_df = data_loader.df_events[data_loader.df_events['order_id'] == order_id]
             event_count = len(events_df)
             
             # Get item count
-            items_count = len(df_order_items[df_order_items['order_id'] == order_id])
+            items_count = len(catalog.order_items.get(order_id, ()))
             
             # Get variant description
-            variant = variant_info.get(variant_id, {})
+            variant = catalog.variants.get(variant_id, {})
             variant_name = ' → '.join(variant.get('event_sequence', []))[:80] + '...'  # Truncate long names
             
             orders.append({
@@ -658,14 +1046,21 @@ async def get_available_orders():
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error fetching orders: {str(e)}")
 
-@app.get("/api/sample")
-async def get_sample_case(case_id: Optional[str] = None, seed: int = 42):
+@app.get("/api/orders")
+async def get_available_orders(request: Request):
+    """Sample orders (1 per variant) with metadata, KPIs and variant info."""
+    return await response_cache.respond(
+        request, 'orders', SAMPLE_ORDER_FILES, lambda: stage_pools.run('data', build_available_orders)
+    )
+
+def build_sample_case(case_id: Optional[str] = None, seed: int = 42):
     """
     Get a sample O2C case with 3D visualization data.
     
     This endpoint:
     1. Fetches a sample case from the dataset (using seed for consistency)
-    2. Generates a 3D scene JSON file with animation keyframes
+    2. Generates a 3D scene JSON file with animation keyframes (or reuses the cached one
+       for the same case, data and builder version)
     3. Returns the scene file path and metadata
     
     Args:
@@ -675,10 +1070,6 @@ async def get_sample_case(case_id: Optional[str] = None, seed: int = 42):
     try:
         logger.info(f"📦 Fetching sample case (seed={seed})")
         
-        # Create exports directory
-        exports_dir = backend_dir / 'exports'
-        exports_dir.mkdir(exist_ok=True)
-        
         # Get sample case data
         case_id, events, order_info, users, items, suppliers, kpis = get_sample_case_data(
             data_loader, case_id, seed
@@ -690,15 +1081,16 @@ async def get_sample_case(case_id: Optional[str] = None, seed: int = 42):
         logger.info(f"   Items: {len(items)}")
         logger.info(f"   Suppliers: {len(suppliers)}")
         
-        # Generate GLTF/JSON scene file
-        scene_path, metadata = generate_gltf_for_case(
-            case_id, events, order_info, users, items, suppliers, kpis, exports_dir
+        # Generate GLTF/JSON scene file (served from the scene cache when unchanged)
+        scene_path, metadata = scene_cache.get_or_build(
+            case_id,
+            lambda: build_scene_data(case_id, events, order_info, users, items, suppliers, kpis, data_dir)
         )
         
         # Make path relative to backend directory for serving
         relative_path = Path(scene_path).relative_to(backend_dir)
         
-        logger.info(f"✅ Generated 3D scene: {relative_path}")
+        logger.info(f"✅ 3D scene: {relative_path}")
         
         # Convert all values to native Python types (not numpy) for JSON serialization
         return {
@@ -744,10 +1136,153 @@ async def get_sample_case(case_id: Optional[str] = None, seed: int = 42):
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error generating sample case: {str(e)}")
 
+@app.get("/api/sample")
+async def get_sample_case(case_id: Optional[str] = None, seed: int = 42):
+    """Sample O2C case with a generated 3D scene file (see build_sample_case)."""
+    return await stage_pools.run('scene', build_sample_case, case_id, seed)
+
+@app.get("/api/model/batching-stats")
+async def get_batching_stats():
+    """
+    Get micro-batching statistics for ML inference.
+    Returns request/batch counts, current queue depth, and batch-size / queue-depth histograms.
+    """
+    if micro_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **micro_batcher.get_stats()}
+
+@app.get("/api/stage-pools")
+async def get_stage_pool_stats():
+    """
+    Get the worker pools that run the blocking stages of request handling.
+    Returns the workers and running / queued / completed calls per stage.
+    """
+    return stage_pools.get_stats()
+
+@app.get("/api/response-cache")
+async def get_response_cache_stats():
+    """
+    Get the cached read-only data responses.
+    Returns hit / miss / 304 counts and the size, ETag and build time of each cached body.
+    """
+    return response_cache.get_stats()
+
+@app.get("/api/scene-cache")
+async def get_scene_cache_stats():
+    """
+    Get the content-addressed cache of /api/sample scenes.
+    Returns hit / miss counts, the average build time and the builder version.
+    """
+    return scene_cache.get_stats()
+
+@app.get("/api/reference-catalog")
+async def get_reference_catalog_stats():
+    """
+    Get the in-memory reference data catalog.
+    Returns its source key, load time and table sizes.
+    """
+    return get_reference_catalog(data_dir).get_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics: per-stage and per-request latency histograms (endpoint / stage labels)
+    and request counts by status.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/admin/models")
+async def list_model_versions():
+    """
+    List registered model versions with the active / previous version and background load status.
+    """
+    if model_manager is None:
+        raise HTTPException(status_code=503, detail="ML model not available")
+    
+    return {
+        "versions": model_manager.registry.list_versions(),
+        "active": model_manager.bundle.get_info() if model_manager.bundle else None,
+        "previous": model_manager.previous_bundle.get_info() if model_manager.previous_bundle else None,
+        "load_status": model_manager.load_status,
+        "retrain_status": model_manager.retrain_status
+    }
+
+@app.post("/api/admin/models/{version}/load", status_code=202)
+async def load_model_version(version: str):
+    """
+    Load and warm up a registered model version in the background, then swap it in atomically.
+    In-flight and new requests keep using the active version until the swap.
+    """
+    if model_manager is None or not use_ml_predictions:
+        raise HTTPException(status_code=503, detail="ML model not available")
+    if not model_manager.registry.has_version(version):
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+    if model_manager.load_status.get('state') == 'loading':
+        raise HTTPException(status_code=409, detail=f"Already loading {model_manager.load_status.get('version')}")
+    
+    model_manager.load_status = {'state': 'loading', 'version': version}
+    loop = asyncio.get_running_loop()
+    task = loop.run_in_executor(stage_pools.executor('admin'), model_manager.load_and_activate, version)
+    # Failures are recorded in load_status; keep the exception from being reported as unretrieved
+    task.add_done_callback(lambda t: t.exception())
+    
+    return {"status": "loading", "version": version, "active": model_manager.model_version}
+
+@app.post("/api/admin/models/retrain", status_code=202)
+async def retrain_model():
+    """
+    Warm-start retrain the active model on the orders that changed since it was trained, in
+    the background. The result is registered as a new version and swapped in unless its
+    validation MAE regressed or a derived serving artifact could not be rebuilt; progress and
+    the validation delta are in retrain_status.
+    """
+    if model_manager is None or not use_ml_predictions:
+        raise HTTPException(status_code=503, detail="ML model not available")
+    try:
+        model_manager.start_retraining()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return {"status": "training", "parent_version": model_manager.model_version}
+
+
+@app.post("/api/admin/models/rollback")
+async def rollback_model_version():
+    """
+    Swap the previously active (still loaded and warm) model version back in.
+    """
+    if model_manager is None or not use_ml_predictions:
+        raise HTTPException(status_code=503, detail="ML model not available")
+    try:
+        bundle = model_manager.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return {"status": "rolled_back", "active": bundle.version, "previous": model_manager.previous_bundle.version}
+
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy", "service": "Process Simulation Studio API", "data_loaded": data_loader.df_events is not None, "total_orders": len(data_loader.df_orders) if data_loader.df_orders is not None else 0}
 
+@app.get("/api/ready")
+async def readiness_check():
+    """
+    Readiness probe for load balancers / autoscalers.
+    Returns 503 until startup has finished and, when ML predictions are enabled, the model is warmed up.
+    """
+    model_ready = bool(model_manager and model_manager.ready) if use_ml_predictions else None
+    ready = startup_complete and model_ready is not False
+    body = {
+        "ready": ready,
+        "ml_predictions": use_ml_predictions,
+        "model_ready": model_ready,
+        "model_version": model_manager.model_version if model_manager else None,
+        "warmup_timings": model_manager.warmup_timings if model_manager else {}
+    }
+    if not ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -859,7 +1394,7 @@ async def generate_narration(request: NarrationRequest):
         }
         
         # Generate narration using LLM
-        narration = llm_service.generate_event_narration(event_data)
+        narration = await stage_pools.run('llm', llm_service.generate_event_narration, event_data)
         
         logger.info(f"✅ Narration generated: {narration[:100]}...")
         
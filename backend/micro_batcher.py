@@ -0,0 +1,229 @@
+"""
+Micro-Batching Queue for KPI Inference
+Collects concurrent single-row prediction requests into one batched forward pass
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Defaults (overridable via environment)
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv('KPI_MAX_BATCH_SIZE', '32'))
+DEFAULT_MAX_WAIT_MS = float(os.getenv('KPI_BATCH_WINDOW_MS', '2.0'))
+
+# Histogram bucket upper bounds (batch size and queue depth)
+HISTOGRAM_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+
+
+def _bucket_label(value: int) -> str:
+    """Map a count to its histogram bucket label ('le_<bound>' or 'gt_<max>')"""
+    for bound in HISTOGRAM_BUCKETS:
+        if value <= bound:
+            return f'le_{bound}'
+    return f'gt_{HISTOGRAM_BUCKETS[-1]}'
+
+
+def _fail_future(future: asyncio.Future, error: BaseException):
+    """Set an error on a request's future unless it is already resolved (or its loop is gone)"""
+    if future.done():
+        return
+    try:
+        future.set_exception(error)
+    except RuntimeError:
+        pass  # Event loop closed: nobody is waiting any more
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batcher in front of a batched predict function.
+
+    Requests are queued with a future each. A single runner task takes the first pending
+    request and, if other requests are already waiting (e.g. queued while the previous batch
+    ran), keeps collecting for up to max_wait_ms or until max_batch_size rows are gathered.
+    The batch runs off the event loop (in run_batch, e.g. the API's compute stage pool, or
+    the loop's default executor) so the loop stays responsive, and each future is
+    resolved with its own row or with the error of its batch. A lone request at low load is
+    dispatched immediately.
+    """
+
+    def __init__(
+        self,
+        predict_batch_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        run_batch: Optional[Callable[[Callable, np.ndarray], Awaitable[np.ndarray]]] = None
+    ):
+        """
+        Args:
+            predict_batch_fn: Function mapping an (N, D) feature matrix to (N, K) predictions
+            max_batch_size: Maximum rows per batched call
+            max_wait_ms: Maximum time to wait for more requests once batching has started
+            run_batch: Coroutine function run_batch(fn, feature_matrix) that runs a batched
+                       call off the event loop, e.g. functools.partial(stage_pools.run, 'compute')
+                       (default: the event loop's default executor)
+        """
+        self.predict_batch_fn = predict_batch_fn
+        self.run_batch = run_batch or self._run_in_default_executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._runner: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.total_requests = 0
+        self.total_batches = 0
+        self.batch_size_histogram: Dict[str, int] = {_bucket_label(b): 0 for b in HISTOGRAM_BUCKETS}
+        self.queue_depth_histogram: Dict[str, int] = {_bucket_label(b): 0 for b in HISTOGRAM_BUCKETS}
+
+        logger.info(f"✓ MicroBatcher ready (max_batch_size={self.max_batch_size}, window={max_wait_ms}ms)")
+
+    def _ensure_runner(self):
+        """Start the runner task on the current event loop (lazily, on first request)"""
+        if self._runner is None or self._runner.done():
+            # The runner only stops when cancelled (or with its event loop): fail what it left queued
+            self._fail_pending(RuntimeError("MicroBatcher runner stopped before the request was served"))
+            self._queue = asyncio.Queue()
+            self._runner = asyncio.get_running_loop().create_task(self._run())
+
+    def _fail_pending(self, error: BaseException):
+        """Resolve every request still in the queue with an error"""
+        if self._queue is None:
+            return
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            _fail_future(future, error)
+
+    async def predict(
+        self,
+        feature_vector: np.ndarray,
+        predict_batch_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None
+    ) -> np.ndarray:
+        """
+        Queue one feature vector and wait for its prediction
+
+        Args:
+            feature_vector: Feature vector of shape (D,) or (1, D)
+            predict_batch_fn: Batched predict function for this request (default: the
+                              batcher's). Rows are only batched with rows using the same
+                              function, e.g. the same model version.
+
+        Returns:
+            Prediction row of shape (K,)
+        """
+        self._ensure_runner()
+        future = asyncio.get_running_loop().create_future()
+        fn = predict_batch_fn or self.predict_batch_fn
+        await self._queue.put((np.asarray(feature_vector).reshape(-1), fn, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[np.ndarray, Callable, asyncio.Future]]:
+        """Wait for the first request, then gather more within the batching window"""
+        batch = [await self._queue.get()]
+
+        # No concurrency: dispatch immediately so low-load latency is unaffected
+        if self._queue.empty():
+            return batch
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """Runner loop: collect, predict off the event loop, resolve futures (never exits on errors)"""
+        while True:
+            batch = await self._collect_batch()
+            try:
+                self._record(len(batch), queue_depth=len(batch) + self._queue.qsize())
+
+                # Group by predict function (one forward pass per model version)
+                groups: Dict[Callable, List[Tuple[np.ndarray, asyncio.Future]]] = {}
+                for vector, fn, future in batch:
+                    groups.setdefault(fn, []).append((vector, future))
+
+                for fn, group in groups.items():
+                    await self._run_group(fn, group)
+            except asyncio.CancelledError:
+                for _, _, future in batch:
+                    _fail_future(future, RuntimeError("MicroBatcher closed"))
+                raise
+            except Exception as e:
+                logger.error(f"❌ MicroBatcher batch failed: {e}")
+                for _, _, future in batch:
+                    _fail_future(future, e)
+
+    @staticmethod
+    async def _run_in_default_executor(fn: Callable, feature_matrix: np.ndarray) -> np.ndarray:
+        return await asyncio.get_running_loop().run_in_executor(None, fn, feature_matrix)
+
+    async def _run_group(self, fn: Callable, group: List[Tuple[np.ndarray, asyncio.Future]]):
+        """Run one batched forward pass and resolve its futures"""
+        try:
+            feature_matrix = np.stack([vector for vector, _ in group])
+            predictions = await self.run_batch(fn, feature_matrix)
+            if len(predictions) != len(group):
+                raise ValueError(f"Predict function returned {len(predictions)} rows for a batch of {len(group)}")
+        except Exception as e:
+            for _, future in group:
+                _fail_future(future, e)
+            return
+
+        for i, (_, future) in enumerate(group):
+            if not future.done():
+                future.set_result(predictions[i])
+
+    def _record(self, batch_size: int, queue_depth: int):
+        """Update request/batch counters and histograms"""
+        self.total_requests += batch_size
+        self.total_batches += 1
+        self.batch_size_histogram[_bucket_label(batch_size)] = \
+            self.batch_size_histogram.get(_bucket_label(batch_size), 0) + 1
+        self.queue_depth_histogram[_bucket_label(queue_depth)] = \
+            self.queue_depth_histogram.get(_bucket_label(queue_depth), 0) + 1
+
+    def get_stats(self) -> Dict:
+        """
+        Get batching statistics
+
+        Returns:
+            Dict with request/batch counts, current queue depth and histograms
+        """
+        return {
+            'max_batch_size': self.max_batch_size,
+            'window_ms': self.max_wait_s * 1000,
+            'total_requests': self.total_requests,
+            'total_batches': self.total_batches,
+            'mean_batch_size': round(self.total_requests / self.total_batches, 3) if self.total_batches else 0.0,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'batch_size_histogram': dict(self.batch_size_histogram),
+            'queue_depth_histogram': dict(self.queue_depth_histogram)
+        }
+
+    async def close(self):
+        """Stop the runner task and fail the requests still queued"""
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        self._fail_pending(RuntimeError("MicroBatcher closed"))
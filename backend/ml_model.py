@@ -6,13 +6,21 @@ Implements the deep learning model from the Jupyter notebook (Cells 45-49)
 import numpy as np
 import pandas as pd
 import pickle
-import hashlib
 import json
 import logging
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Tuple, Dict, Optional
-import tensorflow as tf
-from tensorflow import keras
+from typing import Callable, Tuple, Dict, List, Optional, Protocol, TYPE_CHECKING
+
+# TensorFlow is imported lazily where the model is built or loaded, so rule-based
+# mode and the data scripts don't pay for it at startup
+if TYPE_CHECKING:
+    from tensorflow import keras
+
+from model_registry import ModelRegistry, BASE_VERSION
+from dataset_fingerprint import DatasetManifest
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,8 +40,26 @@ KPI_NAMES = [
 # KPI denormalization multipliers
 KPI_MULTIPLIERS = [100, 90, 100, 100, 100]
 
+# MC-dropout uncertainty: stochastic passes per request (0 disables) and interval coverage
+DEFAULT_UNCERTAINTY_SAMPLES = int(os.getenv('KPI_UNCERTAINTY_SAMPLES', '32'))
+MAX_UNCERTAINTY_SAMPLES = 256
+PREDICTION_INTERVAL = 0.9
+MC_DROPOUT_SEED = 42
+
+# Retrain in the background at startup when the dataset changed since the model was trained
+AUTO_RETRAIN = os.getenv('KPI_AUTO_RETRAIN', '1') == '1'
 
-def build_kpi_model(input_dim: int = FEATURE_DIM, use_dropout: bool = True) -> keras.Model:
+# Values of KPI_SERVING_BACKEND
+SERVING_BACKENDS = ['keras', 'tflite', 'ensemble', 'gbdt']
+
+# Batch sizes traced during warm-up: single requests and full micro-batches
+WARMUP_BATCH_SIZES = [
+    int(size) for size in
+    os.getenv('KPI_WARMUP_BATCH_SIZES', f"1,{os.getenv('KPI_MAX_BATCH_SIZE', '32')}").split(',')
+]
+
+
+def build_kpi_model(input_dim: int = FEATURE_DIM, use_dropout: bool = True) -> 'keras.Model':
     """
     Build multi-output KPI prediction model with regularization for generalization
     
@@ -44,6 +70,8 @@ def build_kpi_model(input_dim: int = FEATURE_DIM, use_dropout: bool = True) -> k
     Returns:
         Compiled Keras model
     """
+    from tensorflow import keras
+
     # Input layer
     inputs = keras.Input(shape=(input_dim,), name='process_features')
     
@@ -93,42 +121,22 @@ def build_kpi_model(input_dim: int = FEATURE_DIM, use_dropout: bool = True) -> k
 
 def calculate_dataset_hash(data_dir: Path) -> str:
     """
-    Calculate hash of all dataset files to detect changes
+    Calculate the dataset fingerprint to detect changes
+    
+    Files are only rehashed when their size, mtime or inode changed since the last
+    call (see dataset_fingerprint.DatasetManifest).
     
     Args:
         data_dir: Path to data directory
     
     Returns:
-        SHA256 hash string
-    """
-    hash_md5 = hashlib.sha256()
-    
-    # Files to hash
-    files_to_hash = [
-        'o2c_data_orders_only.xml',
-        'users.csv',
-        'items.csv',
-        'suppliers.csv',
-        'order_kpis.csv',
-        'orders_enriched.csv',
-        'order_users.csv',
-        'order_items.csv',
-        'order_suppliers.csv'
-    ]
-    
-    for filename in sorted(files_to_hash):
-        filepath = data_dir / filename
-        if filepath.exists():
-            with open(filepath, 'rb') as f:
-                # Read in chunks for large files
-                for chunk in iter(lambda: f.read(4096), b''):
-                    hash_md5.update(chunk)
-    
-    return hash_md5.hexdigest()
+        Fingerprint string of the form '<algorithm>:<hex>'
+    """
+    return DatasetManifest(data_dir).fingerprint()
 
 
 def save_model_and_scalers(
-    model: keras.Model,
+    model: 'keras.Model',
     scalers: Dict,
     models_dir: Path,
     dataset_hash: str
@@ -173,7 +181,7 @@ def save_model_and_scalers(
     logger.info(f"✓ Saved KPI normalization config")
 
 
-def load_model_and_scalers(models_dir: Path) -> Tuple[keras.Model, Dict]:
+def load_model_and_scalers(models_dir: Path) -> Tuple['keras.Model', Dict]:
     """
     Load trained model and scalers from disk
     
@@ -183,11 +191,28 @@ def load_model_and_scalers(models_dir: Path) -> Tuple[keras.Model, Dict]:
     Returns:
         Tuple of (model, scalers_dict)
     """
+    from tensorflow import keras
+
     # Load model
     model = keras.models.load_model(models_dir / 'kpi_prediction_model.keras')
     logger.info(f"✓ Loaded model from {models_dir / 'kpi_prediction_model.keras'}")
     
     # Load scalers
+    scalers = load_scalers(models_dir)
+    
+    return model, scalers
+
+
+def load_scalers(models_dir: Path) -> Dict:
+    """
+    Load fitted feature scalers from disk
+    
+    Args:
+        models_dir: Directory containing saved scalers
+    
+    Returns:
+        Dictionary of fitted scalers
+    """
     scaler_names = ['freq', 'duration', 'users', 'items_qty', 'items_amt', 'suppliers']
     scalers = {}
     for name in scaler_names:
@@ -196,16 +221,22 @@ def load_model_and_scalers(models_dir: Path) -> Tuple[keras.Model, Dict]:
             scalers[name] = pickle.load(f)
     logger.info(f"✓ Loaded {len(scalers)} scalers")
     
-    return model, scalers
+    return scalers
 
 
-def check_cached_model(models_dir: Path, current_hash: str) -> bool:
+def check_cached_model(
+    models_dir: Path,
+    current_hash: str,
+    manifest: Optional[DatasetManifest] = None
+) -> bool:
     """
     Check if cached model exists and dataset hasn't changed
     
     Args:
         models_dir: Directory containing saved models
-        current_hash: Current dataset hash
+        current_hash: Current dataset fingerprint
+        manifest: Dataset manifest, used to verify hashes written before fingerprinting
+                  (SHA-256 of the concatenated files)
     
     Returns:
         True if cached model is valid, False otherwise
@@ -220,7 +251,7 @@ def check_cached_model(models_dir: Path, current_hash: str) -> bool:
     with open(hash_path, 'r') as f:
         cached_hash = f.read().strip()
     
-    if cached_hash != current_hash:
+    if cached_hash != current_hash and not (manifest and manifest.matches(cached_hash)):
         logger.info("❌ Dataset has changed, need to retrain")
         return False
     
@@ -259,7 +290,7 @@ def denormalize_kpis(normalized_predictions: np.ndarray) -> Dict[str, float]:
 
 
 def predict_kpis(
-    model: keras.Model,
+    model: 'keras.Model',
     feature_vector: np.ndarray
 ) -> Dict[str, float]:
     """
@@ -276,11 +307,8 @@ def predict_kpis(
     if feature_vector.ndim == 1:
         feature_vector = feature_vector.reshape(1, -1)
     
-    # Predict (returns list of 5 arrays)
-    predictions = model.predict(feature_vector, verbose=0)
-    
-    # Extract values (each prediction is shape (1, 1))
-    normalized_values = np.array([pred[0, 0] for pred in predictions])
+    # Predict normalized values for the single row
+    normalized_values = predict_kpis_batch(model, feature_vector)[0]
     
     # Denormalize
     denormalized_kpis = denormalize_kpis(normalized_values)
@@ -288,65 +316,870 @@ def predict_kpis(
     return denormalized_kpis
 
 
+def predict_kpis_batch(
+    model: 'keras.Model',
+    feature_matrix: np.ndarray
+) -> np.ndarray:
+    """
+    Predict normalized KPIs for a batch of feature vectors
+    
+    Args:
+        model: Trained Keras model
+        feature_matrix: Feature matrix of shape (N, 417)
+    
+    Returns:
+        Array of shape (N, 5) with normalized KPI values
+    """
+    if feature_matrix.ndim == 1:
+        feature_matrix = feature_matrix.reshape(1, -1)
+    
+    # Predict (returns list of 5 arrays, each of shape (N, 1))
+    predictions = model.predict(feature_matrix, verbose=0)
+    
+    return np.concatenate(predictions, axis=1)
+
+
+def build_serving_function(model: 'keras.Model') -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Wrap the model in a traced inference function with a fixed input signature
+    
+    model.predict() rebuilds its data pipeline on every call, which dominates latency for
+    small request batches. The traced function has a dynamic batch dimension, so it is
+    traced once and reused for any batch size.
+    
+    Args:
+        model: Trained Keras model
+    
+    Returns:
+        Function mapping an (N, D) or (D,) feature matrix to (N, 5) normalized KPIs
+    """
+    import tensorflow as tf
+    
+    input_dim = model.input_shape[-1]
+    
+    @tf.function(input_signature=[tf.TensorSpec([None, input_dim], tf.float32, name='process_features')])
+    def serve(process_features):
+        return tf.concat(model(process_features, training=False), axis=1)
+    
+    def predict(feature_matrix: np.ndarray) -> np.ndarray:
+        if feature_matrix.ndim == 1:
+            feature_matrix = feature_matrix.reshape(1, -1)
+        return serve(feature_matrix.astype(np.float32, copy=False)).numpy()
+    
+    return predict
+
+
+def build_mc_dropout_function(
+    model: 'keras.Model',
+    seed: int = MC_DROPOUT_SEED
+) -> Callable[[np.ndarray, int], np.ndarray]:
+    """
+    Build a batched Monte Carlo dropout sampler for the KPI model
+    
+    Each row is tiled K times and run through the network in one call with dropout
+    active and BatchNorm in inference mode. Dropout masks are drawn from a stateless
+    RNG with shape (K, units) and shared across rows, so a row's samples are
+    deterministic and don't depend on which other rows share the batch.
+    
+    Args:
+        model: Trained Keras model (shared trunk followed by one Dense head per KPI)
+        seed: Seed for the dropout masks
+    
+    Returns:
+        Function mapping an (N, D) feature matrix and K to (N, K, 5) normalized samples
+    """
+    import tensorflow as tf
+    from tensorflow import keras
+    
+    input_dim = model.input_shape[-1]
+    trunk = [
+        layer for layer in model.layers
+        if not isinstance(layer, keras.layers.InputLayer) and layer.name not in KPI_NAMES
+    ]
+    heads = [model.get_layer(name) for name in KPI_NAMES]
+    
+    @tf.function(input_signature=[
+        tf.TensorSpec([None, input_dim], tf.float32, name='process_features'),
+        tf.TensorSpec([], tf.int32, name='num_samples')
+    ])
+    def sample(process_features, num_samples):
+        num_rows = tf.shape(process_features)[0]
+        x = tf.repeat(process_features, num_samples, axis=0)
+        for i, layer in enumerate(trunk):
+            if isinstance(layer, keras.layers.Dropout):
+                noise = tf.random.stateless_uniform([num_samples, tf.shape(x)[1]], seed=[seed, i])
+                keep = tf.tile(noise >= layer.rate, [num_rows, 1])
+                x = tf.where(keep, x / (1.0 - layer.rate), tf.zeros_like(x))
+            else:
+                x = layer(x, training=False)
+        outputs = tf.concat([head(x) for head in heads], axis=1)
+        return tf.reshape(outputs, [num_rows, num_samples, len(heads)])
+    
+    def predict(feature_matrix: np.ndarray, num_samples: int) -> np.ndarray:
+        if feature_matrix.ndim == 1:
+            feature_matrix = feature_matrix.reshape(1, -1)
+        return sample(feature_matrix.astype(np.float32, copy=False), np.int32(num_samples)).numpy()
+    
+    return predict
+
+
+def summarize_kpi_samples(
+    samples: np.ndarray,
+    interval: float = PREDICTION_INTERVAL
+) -> Dict[str, Dict[str, float]]:
+    """
+    Summarize MC-dropout samples for one scenario
+    
+    Args:
+        samples: Normalized KPI samples of shape (K, 5)
+        interval: Central prediction interval coverage (e.g. 0.9 -> 5th..95th percentile)
+    
+    Returns:
+        Dict mapping KPI names to {'mean', 'std', 'lower', 'upper'} in original units
+    """
+    denormalized = samples * np.asarray(KPI_MULTIPLIERS, dtype=np.float64)
+    tail = (1.0 - interval) / 2 * 100
+    lower, upper = np.percentile(denormalized, [tail, 100 - tail], axis=0)
+    mean = denormalized.mean(axis=0)
+    std = denormalized.std(axis=0)
+    
+    return {
+        kpi_name: {
+            'mean': round(float(mean[i]), 3),
+            'std': round(float(std[i]), 3),
+            'lower': round(float(lower[i]), 3),
+            'upper': round(float(upper[i]), 3)
+        }
+        for i, kpi_name in enumerate(KPI_NAMES)
+    }
+
+
+def confidence_from_uncertainty(kpi_uncertainty: Dict[str, Dict[str, float]]) -> float:
+    """
+    Derive a 0-1 confidence score from per-KPI prediction intervals
+    
+    Confidence is one minus the mean interval width relative to each KPI's full
+    scale, so a model that is certain about every KPI scores close to 1.
+    
+    Args:
+        kpi_uncertainty: Output of summarize_kpi_samples
+    
+    Returns:
+        Confidence score rounded to 2 decimals
+    """
+    relative_widths = [
+        (kpi_uncertainty[kpi_name]['upper'] - kpi_uncertainty[kpi_name]['lower']) / KPI_MULTIPLIERS[i]
+        for i, kpi_name in enumerate(KPI_NAMES)
+    ]
+    return round(float(np.clip(1.0 - np.mean(relative_widths), 0.0, 1.0)), 2)
+
+
+class KPIBackend(Protocol):
+    """
+    A pluggable serving backend: maps scaled feature vectors to normalized KPIs
+    
+    Bundles score through a backend instead of the Keras model when one is set (e.g.
+    gbdt_model.GBDTKPIModel). Backends don't provide uncertainty samples.
+    """
+    name: str
+    
+    def predict_batch(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """(N, 417) or (417,) scaled features -> (N, 5) normalized KPIs"""
+        ...
+
+
+class ModelBundle:
+    """
+    One loaded model version: model, matching scalers and its serving path
+    
+    A request should take one bundle and use it for both feature scaling and
+    prediction, so a hot-swap never mixes scalers from one version with another
+    version's model.
+    """
+    def __init__(
+        self,
+        version: str,
+        model: Optional['keras.Model'],
+        scalers: Dict,
+        tflite_model=None,
+        ensemble=None,
+        pool=None,
+        student=None,
+        backend: Optional[KPIBackend] = None,
+        metadata: Optional[Dict] = None
+    ):
+        """
+        Args:
+            version: Model version name
+            model: Trained Keras model (None when served by an inference pool)
+            scalers: Fitted feature scalers for this model
+            tflite_model: Optional TFLiteKPIModel used instead of the Keras model
+            ensemble: Optional StackedEnsemble used instead of the Keras model
+            pool: Optional InferencePool that scores in worker processes
+            student: Optional distilled StudentModel for low-latency requests
+            backend: Optional KPIBackend used instead of the Keras model (model may be None)
+            metadata: Registry metadata for the version
+        """
+        self.version = version
+        self.model = model
+        self.scalers = scalers
+        self.tflite_model = tflite_model
+        self.ensemble = ensemble
+        self.pool = pool
+        self.student = student
+        self.backend = backend
+        self.metadata = metadata or {'version': version}
+        self.serving_fn = None
+        if model is not None and tflite_model is None and ensemble is None and pool is None and backend is None:
+            self.serving_fn = build_serving_function(model)
+        self._mc_dropout_fn: Optional[Callable[[np.ndarray, int], np.ndarray]] = None
+        self._uncertainty_fns: Dict[int, Callable[[np.ndarray], np.ndarray]] = {}
+        
+        # Readiness: set only after warm-up has traced the serving path
+        self.ready = False
+        self.warmup_timings: Dict[str, Dict[str, float]] = {}
+    
+    def predict_batch(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Predict normalized KPIs for a batch of feature vectors
+        
+        Args:
+            feature_matrix: Feature matrix of shape (N, 417) or (417,)
+        
+        Returns:
+            Array of shape (N, 5) with normalized KPI values
+        """
+        if self.backend is not None:
+            return self.backend.predict_batch(feature_matrix)
+        if self.pool is not None:
+            return self.pool.predict_batch(feature_matrix)
+        if self.ensemble is not None:
+            return self.ensemble.predict_batch(feature_matrix)
+        if self.tflite_model is not None:
+            return self.tflite_model.predict_batch(feature_matrix)
+        return self.serving_fn(feature_matrix)
+    
+    def predict_samples(self, feature_matrix: np.ndarray, num_samples: int) -> np.ndarray:
+        """
+        Draw uncertainty samples for a batch of feature vectors
+        
+        With an ensemble the samples are the M member predictions (num_samples is
+        ignored); otherwise K MC-dropout passes of the Keras model.
+        
+        Args:
+            feature_matrix: Feature matrix of shape (N, 417) or (417,)
+            num_samples: Stochastic forward passes per row (K)
+        
+        Returns:
+            Array of shape (N, K, 5) (or (N, M, 5)) with normalized KPI samples
+        """
+        if not self.supports_uncertainty:
+            raise ValueError(f"The {self.serving_backend} backend has no uncertainty samples")
+        if self.pool is not None:
+            return self.pool.predict_samples(feature_matrix, num_samples, seed=MC_DROPOUT_SEED)
+        if self.ensemble is not None:
+            return self.ensemble.predict_members(feature_matrix)
+        if self._mc_dropout_fn is None:
+            self._mc_dropout_fn = build_mc_dropout_function(self.model)
+        return self._mc_dropout_fn(feature_matrix, num_samples)
+    
+    @property
+    def supports_uncertainty(self) -> bool:
+        """Whether predict_samples is available (MC dropout or ensemble members)"""
+        if self.backend is not None:
+            return False
+        return self.pool is not None or self.ensemble is not None or self.model is not None
+    
+    def uncertainty_fn(self, num_samples: int) -> Callable[[np.ndarray], np.ndarray]:
+        """
+        Get a batched sampler for a fixed K (cached, so the micro-batcher can group on it)
+        
+        Args:
+            num_samples: Stochastic forward passes per row (K)
+        
+        Returns:
+            Function mapping an (N, 417) matrix to (N, K, 5) normalized samples
+        """
+        if num_samples not in self._uncertainty_fns:
+            self._uncertainty_fns[num_samples] = \
+                lambda feature_matrix: self.predict_samples(feature_matrix, num_samples)
+        return self._uncertainty_fns[num_samples]
+    
+    def warmup(
+        self,
+        raw_features: np.ndarray,
+        batch_sizes: Optional[List[int]] = None
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Run representative batches through the serving path and mark the bundle ready
+        
+        The first call at each batch size pays for tracing and kernel setup; doing it
+        here keeps that cost off the first live requests.
+        
+        Args:
+            raw_features: Unscaled sample feature matrix (scaled here with this bundle's scalers)
+            batch_sizes: Batch sizes to warm up (default: WARMUP_BATCH_SIZES)
+        
+        Returns:
+            Dict mapping 'batch_<N>' to first-call and steady-state latency in ms
+        """
+        from feature_extraction import scale_feature_matrix
+        
+        features = scale_feature_matrix(raw_features, self.scalers).astype(np.float32)
+        logger.info(f"Warming up model {self.version} with {len(features)} sample orders...")
+        
+        start = time.perf_counter()
+        self.warmup_timings = {}
+        for batch_size in batch_sizes or WARMUP_BATCH_SIZES:
+            # Cycle the sample orders to fill the batch
+            batch = features[np.arange(batch_size) % len(features)]
+            
+            call_start = time.perf_counter()
+            self.predict_batch(batch)
+            first_ms = (time.perf_counter() - call_start) * 1000
+            
+            call_start = time.perf_counter()
+            self.predict_batch(batch)
+            steady_ms = (time.perf_counter() - call_start) * 1000
+            
+            self.warmup_timings[f'batch_{batch_size}'] = {
+                'first_ms': round(first_ms, 2),
+                'steady_ms': round(steady_ms, 2)
+            }
+            logger.info(f"  batch={batch_size:3d}: first {first_ms:.1f}ms, steady {steady_ms:.1f}ms")
+            
+            # Uncertainty mode runs its own serving path
+            if DEFAULT_UNCERTAINTY_SAMPLES > 0 and self.supports_uncertainty:
+                call_start = time.perf_counter()
+                self.predict_samples(batch, DEFAULT_UNCERTAINTY_SAMPLES)
+                mc_ms = (time.perf_counter() - call_start) * 1000
+                self.warmup_timings[f'batch_{batch_size}']['uncertainty_first_ms'] = round(mc_ms, 2)
+        
+        self.ready = True
+        logger.info(f"✓ Warm-up complete in {(time.perf_counter() - start) * 1000:.0f}ms - {self.version} ready")
+        return self.warmup_timings
+    
+    @property
+    def serving_backend(self) -> str:
+        if self.backend is not None:
+            return self.backend.name
+        if self.pool is not None:
+            members = f'ensemble[{self.pool.num_members}]' if self.pool.num_members > 1 else 'numpy'
+            return f'{members}+pool[{self.pool.num_workers}]'
+        if self.ensemble is not None:
+            return f'ensemble[{self.ensemble.num_members}]'
+        return 'tflite' if self.tflite_model is not None else 'keras'
+    
+    def get_info(self) -> Dict:
+        """
+        Get bundle metadata and warm-up state
+        
+        Returns:
+            Dict with version, serving backend, readiness and warm-up timings
+        """
+        return {
+            **self.metadata,
+            'version': self.version,
+            'serving_backend': self.serving_backend,
+            'ready': self.ready,
+            'warmup_timings': self.warmup_timings,
+            'student': self.student.architecture if self.student is not None else None
+        }
+    
+    def close(self):
+        """Release worker processes held by the bundle"""
+        if self.pool is not None:
+            self.pool.close()
+
+
 class ModelManager:
     """
     Manager class for ML model lifecycle
+    
+    Holds the active ModelBundle and the previously active one. New versions are loaded
+    and warmed up from the model registry while the active bundle keeps serving, then
+    swapped in with a single pointer assignment; rollback swaps the two back.
     """
-    def __init__(self, backend_dir: Path):
+    def __init__(
+        self,
+        backend_dir: Path,
+        serving_backend: Optional[str] = None,
+        tflite_quantization: Optional[str] = None,
+        inference_workers: Optional[int] = None
+    ):
+        """
+        Args:
+            backend_dir: Path to backend directory
+            serving_backend: 'keras' (default), 'tflite', 'ensemble' or 'gbdt' (env: KPI_SERVING_BACKEND)
+            tflite_quantization: Quantized flatbuffer to serve in tflite mode,
+                                 'float16', 'dynamic' or 'int8' (env: KPI_TFLITE_QUANTIZATION)
+            inference_workers: Worker processes scoring from shared memory-mapped weights,
+                               0 to score in-process (env: KPI_INFERENCE_WORKERS)
+        """
         self.backend_dir = backend_dir
         self.data_dir = backend_dir.parent / 'data'
         self.models_dir = backend_dir / 'trained_models'
-        self.model: Optional[keras.Model] = None
-        self.scalers: Optional[Dict] = None
+        self.registry = ModelRegistry(self.models_dir)
         self.baseline_kpis: Optional[Dict[str, float]] = None
+        
+        self.serving_backend = serving_backend or os.getenv('KPI_SERVING_BACKEND', 'keras')
+        if self.serving_backend not in SERVING_BACKENDS:
+            raise ValueError(f"Unknown serving backend {self.serving_backend!r} - one of {', '.join(SERVING_BACKENDS)}")
+        self.tflite_quantization = tflite_quantization or os.getenv('KPI_TFLITE_QUANTIZATION', 'float16')
+        self.inference_workers = inference_workers if inference_workers is not None \
+            else int(os.getenv('KPI_INFERENCE_WORKERS', '0'))
+        
+        self.bundle: Optional[ModelBundle] = None
+        self.previous_bundle: Optional[ModelBundle] = None
+        self._swap_lock = threading.Lock()
+        self._warmup_features: Optional[np.ndarray] = None
+        
+        # Background load and retraining state, reported by the admin endpoints
+        self.load_status: Dict = {'state': 'idle'}
+        self.retrain_status: Dict = {'state': 'idle'}
+    
+    @property
+    def model(self) -> Optional['keras.Model']:
+        return self.bundle.model if self.bundle else None
+    
+    @property
+    def scalers(self) -> Optional[Dict]:
+        return self.bundle.scalers if self.bundle else None
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        return self.bundle.version if self.bundle else None
+    
+    @property
+    def ready(self) -> bool:
+        return bool(self.bundle and self.bundle.ready)
+    
+    @property
+    def warmup_timings(self) -> Dict[str, Dict[str, float]]:
+        return self.bundle.warmup_timings if self.bundle else {}
     
     def initialize(self, force_retrain: bool = False):
         """
-        Initialize model - load from cache or train from scratch
+        Initialize model - load the active registry version or the cached base model,
+        and retrain it in the background if the dataset changed since it was trained
         
         Args:
-            force_retrain: Force retraining even if cached model exists
+            force_retrain: Retrain even if the model matches the current dataset
         """
         logger.info("="*80)
         logger.info("INITIALIZING ML MODEL FOR KPI PREDICTION")
         logger.info("="*80)
         
-        # Calculate dataset hash
-        current_hash = calculate_dataset_hash(self.data_dir)
-        logger.info(f"Dataset hash: {current_hash[:16]}...")
-        
-        # Check if we can use cached model
-        use_cached = not force_retrain and check_cached_model(self.models_dir, current_hash)
+        # A version activated through the registry takes precedence over the base model
+        active_version = self.registry.get_active_version()
+        if active_version and active_version != BASE_VERSION:
+            try:
+                logger.info(f"Loading active registry version {active_version}...")
+                self.activate(self.load_bundle(active_version), persist=False)
+            except Exception as e:
+                logger.error(f"Failed to load registry version {active_version}: {e}")
+                logger.info("Falling back to base model...")
         
-        if use_cached:
+        if self.bundle is None and self.registry.has_version(BASE_VERSION):
             try:
                 logger.info("Loading cached model...")
-                self.model, self.scalers = load_model_and_scalers(self.models_dir)
+                self.activate(self.load_bundle(BASE_VERSION), persist=False)
                 logger.info("✓ Model loaded from cache")
             except Exception as e:
                 logger.error(f"Failed to load cached model: {e}")
-                logger.info("Will train from scratch...")
-                use_cached = False
         
-        if not use_cached:
-            logger.info("Training model from scratch...")
-            self._train_model(current_hash)
+        if self.bundle is None:
+            raise RuntimeError("No trained model to serve - run `python train_model.py` to train one")
+        
+        # Fingerprint the dataset (only files whose metadata changed are rehashed)
+        manifest = DatasetManifest(self.data_dir)
+        current_hash = manifest.fingerprint()
+        logger.info(f"Dataset fingerprint: {current_hash[:23]}... ({len(manifest.rehashed)} files rehashed)")
+        
+        bundle_dir = self.registry.bundle_dir(self.bundle.version)
+        if force_retrain or not check_cached_model(bundle_dir, current_hash, manifest):
+            if AUTO_RETRAIN:
+                self._train_model(current_hash)
+            else:
+                logger.warning("⚠️ Serving a model trained on older data (KPI_AUTO_RETRAIN=0)")
         
         # Load baseline KPIs (from most frequent variant)
         self._load_baseline_kpis()
         
         logger.info("="*80)
-        logger.info("✓ MODEL INITIALIZATION COMPLETE")
+        logger.info(f"✓ MODEL INITIALIZATION COMPLETE (version {self.model_version})")
         logger.info("="*80)
     
     def _train_model(self, dataset_hash: str):
         """
-        Train model from scratch (placeholder - requires full implementation)
+        Refresh the active model for a changed dataset: it keeps serving while a
+        warm-start retrain runs in a background thread, and the result is swapped in
+        once trained (see retrain)
+        """
+        logger.info(f"🔁 Retraining model version {self.bundle.version} in the background...")
+        self.start_retraining(dataset_hash)
+    
+    def start_retraining(self, dataset_hash: Optional[str] = None) -> threading.Thread:
+        """
+        Start retrain() in a background thread
+        
+        Args:
+            dataset_hash: Current dataset fingerprint (computed if omitted)
+        
+        Returns:
+            The started thread
+        """
+        with self._swap_lock:
+            if self.retrain_status.get('state') == 'training':
+                raise ValueError(f"Already retraining from {self.retrain_status.get('parent_version')}")
+            self.retrain_status = {'state': 'training', 'parent_version': self.model_version}
+        
+        def run():
+            try:
+                self.retrain(dataset_hash)
+            except Exception:
+                logger.exception("❌ Background retraining failed")
+        
+        thread = threading.Thread(target=run, name='kpi-retrain', daemon=True)
+        thread.start()
+        return thread
+    
+    def retrain(self, dataset_hash: Optional[str] = None) -> Dict:
+        """
+        Warm-start retrain the active model on the changed orders, register the result
+        and activate it unless its validation MAE regressed or one of its derived serving
+        artifacts could not be rebuilt (blocking)
+        
+        Progress, the training report and errors are recorded in retrain_status.
+        
+        Args:
+            dataset_hash: Current dataset fingerprint (computed if omitted)
+        
+        Returns:
+            Training report (see model_retraining.retrain_incremental)
+        """
+        from model_retraining import retrain_incremental, accept_retrained
+        
+        parent_version = self.get_active_bundle().version
+        self.retrain_status = {'state': 'training', 'parent_version': parent_version}
+        try:
+            report = retrain_incremental(
+                self.registry,
+                parent_version,
+                dataset_hash or calculate_dataset_hash(self.data_dir),
+                serving_backend=self.serving_backend,
+                tflite_quantization=self.tflite_quantization
+            )
+            accepted = accept_retrained(report)
+            if accepted:
+                self.activate(self.load_bundle(report['version']))
+            elif report['failed_artifacts']:
+                logger.warning(f"⚠️ Could not rebuild {', '.join(report['failed_artifacts'])} for retrained "
+                               f"version {report['version']} - registered but not activated")
+            else:
+                logger.warning(f"⚠️ Retrained version {report['version']} has a higher validation MAE "
+                               f"({report['served_backend']}) than {parent_version} - registered but not activated")
+        except Exception as e:
+            logger.error(f"❌ Retraining from {parent_version} failed: {e}")
+            self.retrain_status = {'state': 'failed', 'parent_version': parent_version, 'error': str(e)}
+            raise
+        
+        self.retrain_status = {
+            'state': 'activated' if accepted else 'rejected',
+            'parent_version': parent_version,
+            'version': report['version'],
+            'training_seconds': report['training_seconds'],
+            'changed_orders': report['changed_orders'],
+            'served_backend': report['served_backend'],
+            'val_mae_previous': report['val_mae_previous_mean'],
+            'val_mae_new': report['val_mae_new_mean'],
+            'failed_artifacts': report['failed_artifacts']
+        }
+        return report
+    
+    def load_bundle(self, version: str, warmup: bool = True) -> ModelBundle:
         """
-        # This would require loading all the data and training
-        # For now, we'll implement a simplified version
-        logger.warning("Full training implementation required - using placeholder")
-        raise NotImplementedError("Full model training not yet implemented")
+        Load a model version from disk (does not activate it)
+        
+        Args:
+            version: Registry version name or BASE_VERSION
+            warmup: Run the warm-up batches before returning
+        
+        Returns:
+            Loaded (and warmed-up) ModelBundle
+        """
+        if not self.registry.has_version(version):
+            raise ValueError(f"Unknown model version: {version}")
+        
+        bundle_dir = self.registry.bundle_dir(version)
+        gbdt = self._load_gbdt(bundle_dir)
+        if gbdt is not None:
+            # Trees share the bundle's scalers; the Keras model (and TensorFlow) isn't loaded
+            bundle = ModelBundle(
+                version,
+                None,
+                load_scalers(bundle_dir),
+                backend=gbdt,
+                metadata=self.registry.get_metadata(version)
+            )
+        elif self.inference_workers > 0 and self.serving_backend != 'tflite':
+            bundle = self._load_pooled_bundle(version, bundle_dir)
+        else:
+            model, scalers = load_model_and_scalers(bundle_dir)
+            ensemble = self._load_ensemble(bundle_dir)
+            if ensemble is not None:
+                # Ensemble members were trained against their own copy of the scalers
+                scalers = load_scalers(bundle_dir / 'ensemble')
+            bundle = ModelBundle(
+                version,
+                model,
+                scalers,
+                tflite_model=self._load_tflite_model(bundle_dir) if ensemble is None else None,
+                ensemble=ensemble,
+                metadata=self.registry.get_metadata(version)
+            )
+        bundle.student = self._load_student(bundle_dir)
+        
+        if warmup:
+            bundle.warmup(self._get_warmup_features())
+        return bundle
+    
+    def _load_pooled_bundle(self, version: str, bundle_dir: Path) -> ModelBundle:
+        """
+        Load a bundle served by an inference pool from the bundle's weight file
+        
+        The Keras model is only loaded (to write the weight file) when the file is
+        missing or stale, so API processes normally never import TensorFlow.
+        
+        Returns:
+            ModelBundle without a Keras model
+        """
+        from inference_pool import InferencePool, export_bundle_weights
+        from ensemble_model import ensemble_member_paths, ENSEMBLE_DIR_NAME
+        
+        use_ensemble = self.serving_backend == 'ensemble'
+        if use_ensemble and not ensemble_member_paths(bundle_dir / ENSEMBLE_DIR_NAME):
+            logger.warning(f"⚠️ No ensemble members in {bundle_dir / ENSEMBLE_DIR_NAME} - serving a single model")
+            use_ensemble = False
+        
+        weight_path = export_bundle_weights(bundle_dir, use_ensemble=use_ensemble)
+        scalers = load_scalers(bundle_dir / ENSEMBLE_DIR_NAME if use_ensemble else bundle_dir)
+        pool = InferencePool(weight_path, self.inference_workers)
+        
+        return ModelBundle(version, None, scalers, pool=pool, metadata=self.registry.get_metadata(version))
+    
+    def _load_student(self, bundle_dir: Path):
+        """
+        Load the distilled student of a bundle, if one was distilled
+        
+        Returns:
+            StudentModel, or None (requests for the student are then rejected)
+        """
+        from student_model import load_student, DEFAULT_STUDENT
+        
+        student = load_student(bundle_dir, DEFAULT_STUDENT)
+        if student is not None:
+            logger.info(f"✓ Distilled student available ({student.architecture}, {student.num_parameters} parameters)")
+        return student
+    
+    def _load_gbdt(self, bundle_dir: Path):
+        """
+        Load the compiled gradient-boosted trees for a bundle when serving with the gbdt backend
+        
+        Returns:
+            GBDTKPIModel, or None to serve the neural network (other backend or no trees)
+        """
+        if self.serving_backend != 'gbdt':
+            return None
+        
+        from gbdt_model import load_gbdt, gbdt_model_path
+        
+        gbdt = load_gbdt(bundle_dir)
+        if gbdt is None:
+            logger.warning(f"⚠️ GBDT model not found: {gbdt_model_path(bundle_dir)} - serving with Keras")
+            logger.warning("   Run `python train_model.py --gbdt` to train it")
+            return None
+        
+        logger.info(f"✓ Serving KPI predictions with gradient-boosted trees ({gbdt.num_trees} trees)")
+        return gbdt
+    
+    def _load_tflite_model(self, bundle_dir: Path):
+        """
+        Load the quantized TFLite flatbuffer for a bundle when serving with TFLite
+        
+        Returns:
+            TFLiteKPIModel, or None to serve with Keras (backend is keras or file is missing)
+        """
+        if self.serving_backend != 'tflite':
+            return None
+        
+        from tflite_model import TFLiteKPIModel, tflite_model_path
+        
+        path = tflite_model_path(bundle_dir, self.tflite_quantization)
+        if not path.exists():
+            logger.warning(f"⚠️ TFLite model not found: {path} - serving with Keras")
+            logger.warning("   Run `python tflite_model.py` to convert the model")
+            return None
+        
+        logger.info(f"✓ Serving KPI predictions with TFLite ({self.tflite_quantization})")
+        return TFLiteKPIModel(path)
+    
+    def _load_ensemble(self, bundle_dir: Path):
+        """
+        Load the stacked deep ensemble for a bundle when serving with the ensemble backend
+        
+        Returns:
+            StackedEnsemble, or None to serve a single model (other backend or no members)
+        """
+        if self.serving_backend != 'ensemble':
+            return None
+        
+        from ensemble_model import load_stacked_ensemble, ensemble_member_paths, ENSEMBLE_DIR_NAME
+        
+        ensemble_dir = bundle_dir / ENSEMBLE_DIR_NAME
+        if not ensemble_member_paths(ensemble_dir):
+            logger.warning(f"⚠️ No ensemble members in {ensemble_dir} - serving a single model")
+            logger.warning("   Run `python train_model.py --ensemble 5` to train an ensemble")
+            return None
+        
+        ensemble = load_stacked_ensemble(ensemble_dir)
+        logger.info(f"✓ Serving KPI predictions with a {ensemble.num_members}-member stacked ensemble")
+        return ensemble
+    
+    def activate(self, bundle: ModelBundle, persist: bool = True):
+        """
+        Make a loaded bundle the active one; the current bundle is kept for rollback
+        
+        Args:
+            bundle: Loaded, warmed-up bundle
+            persist: Record the version as active in the registry so restarts serve it
+        """
+        evicted = None
+        with self._swap_lock:
+            if self.bundle is not None and self.bundle is not bundle:
+                evicted = self.previous_bundle
+                self.previous_bundle = self.bundle
+            self.bundle = bundle
+        
+        # The bundle that drops out of the rollback slot no longer needs its workers
+        if evicted is not None and evicted is not bundle and evicted is not self.previous_bundle:
+            evicted.close()
+        
+        if persist:
+            self.registry.set_active_version(bundle.version)
+        logger.info(f"✅ Active model version: {bundle.version}")
+    
+    def load_and_activate(self, version: str) -> ModelBundle:
+        """
+        Load and warm up a version, then swap it in (blocking; run in a worker thread)
+        
+        The active bundle keeps serving until the swap. Progress and errors are
+        recorded in load_status.
+        
+        Args:
+            version: Registry version name or BASE_VERSION
+        
+        Returns:
+            The newly active bundle
+        """
+        self.load_status = {'state': 'loading', 'version': version}
+        try:
+            bundle = self.load_bundle(version)
+        except Exception as e:
+            logger.error(f"❌ Failed to load model version {version}: {e}")
+            self.load_status = {'state': 'failed', 'version': version, 'error': str(e)}
+            raise
+        
+        self.activate(bundle)
+        self.load_status = {'state': 'activated', 'version': version}
+        return bundle
+    
+    def rollback(self) -> ModelBundle:
+        """
+        Swap the previous bundle back in (already loaded and warm, so this is instant)
+        
+        Returns:
+            The newly active bundle
+        """
+        with self._swap_lock:
+            if self.previous_bundle is None:
+                raise ValueError("No previous model version to roll back to")
+            self.bundle, self.previous_bundle = self.previous_bundle, self.bundle
+            bundle = self.bundle
+        
+        self.registry.set_active_version(bundle.version)
+        logger.info(f"↩️ Rolled back to model version: {bundle.version}")
+        return bundle
+    
+    def get_active_bundle(self) -> ModelBundle:
+        """
+        Get the active bundle (take it once per request and use it throughout)
+        
+        Returns:
+            Active ModelBundle
+        """
+        bundle = self.bundle
+        if bundle is None:
+            raise ValueError("Model not initialized. Call initialize() first.")
+        return bundle
+    
+    def close(self):
+        """Release worker processes of the active and previous bundles"""
+        for bundle in (self.bundle, self.previous_bundle):
+            if bundle is not None:
+                bundle.close()
+    
+    def _get_warmup_features(self) -> np.ndarray:
+        """Unscaled warm-up features, built once and shared by every bundle"""
+        if self._warmup_features is None:
+            self._warmup_features = self._build_warmup_features()
+        return self._warmup_features
+    
+    def _build_warmup_features(self) -> np.ndarray:
+        """
+        Build raw feature vectors for the variant sample orders (one per variant)
+        
+        Returns:
+            Unscaled feature matrix of shape (num_variants, 417); a single zero row if
+            the sample-order files are not available
+        """
+        from feature_extraction import (
+            extract_features_from_scenario,
+            enrich_edges_with_durations,
+            TOTAL_FEATURE_DIM
+        )
+        
+        try:
+            df_samples = pd.read_csv(self.data_dir / 'variant_sample_orders.csv')
+            df_users = pd.read_csv(self.data_dir / 'order_users.csv')
+            df_items = pd.read_csv(self.data_dir / 'order_items.csv')
+            df_suppliers = pd.read_csv(self.data_dir / 'order_suppliers.csv')
+            with open(self.data_dir / 'variant_contexts.json', 'r') as f:
+                variants = {v['variant_id']: v for v in json.load(f).get('variants', [])}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Warm-up sample orders unavailable ({e}) - warming up with zero features")
+            return np.zeros((1, TOTAL_FEATURE_DIM), dtype=np.float32)
+        
+        rows = []
+        for _, sample in df_samples.iterrows():
+            variant = variants.get(sample['variant_id'])
+            if variant is None:
+                continue
+            order_id = sample['sample_order_id']
+            activities = list(variant['event_sequence'])
+            edges = enrich_edges_with_durations(activities, [], {})
+            order_items = df_items[df_items['order_id'] == order_id]
+            rows.append(extract_features_from_scenario(
+                activities,
+                edges,
+                df_users.loc[df_users['order_id'] == order_id, 'user_id'].tolist(),
+                order_items[['item_id', 'quantity', 'line_total']].to_dict('records'),
+                df_suppliers.loc[df_suppliers['order_id'] == order_id, 'supplier_id'].unique().tolist()
+            ))
+        
+        if not rows:
+            return np.zeros((1, TOTAL_FEATURE_DIM), dtype=np.float32)
+        return np.stack(rows).astype(np.float32)
     
     def _load_baseline_kpis(self):
         """
@@ -388,10 +1221,20 @@ class ModelManager:
         Returns:
             Dictionary mapping KPI names to predicted values
         """
-        if self.model is None:
-            raise ValueError("Model not initialized. Call initialize() first.")
+        normalized_values = self.predict_batch(feature_vector)[0]
+        return denormalize_kpis(normalized_values)
+    
+    def predict_batch(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Predict normalized KPIs for a batch of feature vectors with the active bundle
         
-        return predict_kpis(self.model, feature_vector)
+        Args:
+            feature_matrix: Feature matrix of shape (N, 417) or (417,)
+        
+        Returns:
+            Array of shape (N, 5) with normalized KPI values
+        """
+        return self.get_active_bundle().predict_batch(feature_matrix)
     
     def get_baseline_kpis(self) -> Dict[str, float]:
         """
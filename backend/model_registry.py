@@ -0,0 +1,226 @@
+"""
+Model Registry for KPI Prediction
+Versioned model + scaler bundles on disk, with a persisted pointer to the active version
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The bundle trained in place under trained_models/ (outside the registry)
+BASE_VERSION = 'base'
+
+# Files that make up a bundle (scalers are matched by pattern)
+BUNDLE_FILES = ['kpi_prediction_model.keras', 'kpi_normalization_config.json', 'dataset_hash.txt', 'training_orders.npz',
+                'student_report.json', 'kpi_gbdt_model.npz', 'gbdt_config.json']
+BUNDLE_PATTERNS = ['scaler_*.pkl', 'kpi_prediction_model_*.tflite', 'kpi_student_*.npz']
+BUNDLE_SUBDIRS = ['ensemble']
+
+ACTIVE_POINTER = 'ACTIVE'
+METADATA_FILE = 'metadata.json'
+
+VERSION_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$')
+
+
+class ModelRegistry:
+    """
+    Directory of versioned model bundles
+
+    Layout:
+        trained_models/registry/<version>/kpi_prediction_model.keras
+                                         /scaler_*.pkl
+                                         /metadata.json
+        trained_models/registry/ACTIVE     (name of the version workers should serve)
+    """
+
+    def __init__(self, models_dir: Path):
+        """
+        Args:
+            models_dir: Path to trained_models directory (holds the base bundle)
+        """
+        self.models_dir = models_dir
+        self.registry_dir = models_dir / 'registry'
+
+    def is_valid_version(self, version: str) -> bool:
+        """Check a version name is safe to use as a directory name"""
+        return bool(VERSION_PATTERN.match(version)) and version != BASE_VERSION
+
+    def bundle_dir(self, version: str) -> Path:
+        """
+        Get the directory holding a version's files
+
+        Args:
+            version: Registered version name or BASE_VERSION
+
+        Returns:
+            Path to the bundle directory
+        """
+        if version == BASE_VERSION:
+            return self.models_dir
+        if not self.is_valid_version(version):
+            raise ValueError(f"Invalid model version: {version!r}")
+        return self.registry_dir / version
+
+    def has_version(self, version: str) -> bool:
+        """Check whether a version exists and contains a model"""
+        try:
+            return (self.bundle_dir(version) / 'kpi_prediction_model.keras').exists()
+        except ValueError:
+            return False
+
+    def list_versions(self) -> List[Dict]:
+        """
+        List registered versions (newest first), followed by the base bundle if present
+
+        Returns:
+            List of metadata dicts, each with at least 'version'
+        """
+        versions = []
+        if self.registry_dir.exists():
+            for path in self.registry_dir.iterdir():
+                if path.is_dir() and self.is_valid_version(path.name) and self.has_version(path.name):
+                    versions.append(self.get_metadata(path.name))
+        versions.sort(key=lambda meta: meta.get('registered_at', ''), reverse=True)
+
+        if self.has_version(BASE_VERSION):
+            versions.append(self.get_metadata(BASE_VERSION))
+        return versions
+
+    def get_metadata(self, version: str) -> Dict:
+        """
+        Read a version's metadata
+
+        Args:
+            version: Version name
+
+        Returns:
+            Metadata dict (always contains 'version')
+        """
+        metadata = {'version': version}
+        metadata_path = self.bundle_dir(version) / METADATA_FILE
+        if version != BASE_VERSION and metadata_path.exists():
+            with open(metadata_path, 'r') as f:
+                metadata.update(json.load(f))
+        hash_path = self.bundle_dir(version) / 'dataset_hash.txt'
+        if 'dataset_hash' not in metadata and hash_path.exists():
+            metadata['dataset_hash'] = hash_path.read_text().strip()
+        return metadata
+
+    def register(
+        self,
+        source_dir: Path,
+        version: Optional[str] = None,
+        metadata: Optional[Dict] = None
+    ) -> str:
+        """
+        Copy a trained bundle into the registry as a new version
+
+        Files are staged in a temporary directory inside the registry and renamed into
+        place, so a version directory is either complete or absent.
+
+        Args:
+            source_dir: Directory containing kpi_prediction_model.keras and scaler_*.pkl
+            version: Version name (default: timestamp)
+            metadata: Extra metadata to store with the bundle
+
+        Returns:
+            Registered version name
+        """
+        version = version or datetime.now().strftime('v%Y%m%d-%H%M%S')
+        if not self.is_valid_version(version):
+            raise ValueError(f"Invalid model version: {version!r}")
+        if self.has_version(version):
+            raise ValueError(f"Model version already registered: {version}")
+        if not (source_dir / 'kpi_prediction_model.keras').exists():
+            raise FileNotFoundError(f"No kpi_prediction_model.keras in {source_dir}")
+
+        self.registry_dir.mkdir(parents=True, exist_ok=True)
+        staging_dir = Path(tempfile.mkdtemp(prefix=f'.{version}.', dir=self.registry_dir))
+        try:
+            for name in BUNDLE_FILES:
+                if (source_dir / name).exists():
+                    shutil.copy2(source_dir / name, staging_dir / name)
+            for pattern in BUNDLE_PATTERNS:
+                for path in source_dir.glob(pattern):
+                    shutil.copy2(path, staging_dir / path.name)
+            for name in BUNDLE_SUBDIRS:
+                if (source_dir / name).is_dir():
+                    shutil.copytree(source_dir / name, staging_dir / name)
+
+            bundle_metadata = {
+                'version': version,
+                'registered_at': datetime.now().isoformat(timespec='seconds'),
+                'source': str(source_dir),
+                **(metadata or {})
+            }
+            with open(staging_dir / METADATA_FILE, 'w') as f:
+                json.dump(bundle_metadata, f, indent=2)
+
+            os.rename(staging_dir, self.registry_dir / version)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"✓ Registered model version {version} from {source_dir}")
+        return version
+
+    def get_active_version(self) -> Optional[str]:
+        """
+        Get the persisted active version
+
+        Returns:
+            Version name, or None if no pointer has been written
+        """
+        pointer_path = self.registry_dir / ACTIVE_POINTER
+        if not pointer_path.exists():
+            return None
+        version = pointer_path.read_text().strip()
+        return version or None
+
+    def set_active_version(self, version: str):
+        """
+        Persist the active version (atomic rename, so readers never see a partial file)
+
+        Args:
+            version: Version name
+        """
+        self.registry_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.registry_dir / f'.{ACTIVE_POINTER}.tmp'
+        tmp_path.write_text(version)
+        os.replace(tmp_path, self.registry_dir / ACTIVE_POINTER)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage versioned KPI model bundles")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    register_parser = subparsers.add_parser('register', help="Register a trained bundle as a new version")
+    register_parser.add_argument('--from', dest='source_dir', type=Path, default=None,
+                                 help="Bundle directory (default: trained_models)")
+    register_parser.add_argument('--version', default=None, help="Version name (default: timestamp)")
+    register_parser.add_argument('--note', default=None, help="Free-text note stored in metadata")
+
+    subparsers.add_parser('list', help="List registered versions")
+
+    args = parser.parse_args()
+    registry = ModelRegistry(Path(__file__).parent / 'trained_models')
+
+    if args.command == 'register':
+        metadata = {'note': args.note} if args.note else None
+        registry.register(args.source_dir or registry.models_dir, version=args.version, metadata=metadata)
+    else:
+        active = registry.get_active_version() or BASE_VERSION
+        for meta in registry.list_versions():
+            marker = '*' if meta['version'] == active else ' '
+            logger.info(f"{marker} {meta['version']:24s} {meta.get('registered_at', '-'):20s} {meta.get('note', '')}")
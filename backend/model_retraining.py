@@ -0,0 +1,569 @@
+"""
+Incremental Warm-Start Retraining
+Refreshes a served model after the dataset changes, without a full training run: the
+current model's weights are the starting point, the feature scalers are updated with
+the new rows, and the model is fine-tuned on the orders whose data changed since it was
+trained (plus a replay sample of unchanged orders, so it doesn't forget them) with early
+stopping, with the BatchNorm statistics frozen. Rows come from the feature store, so only
+changed orders are re-extracted.
+
+Serving artifacts derived from the parent's model (ensemble members, TFLite flatbuffers,
+gradient-boosted trees, distilled students) are rebuilt for the new weights and scalers,
+or carried over when no order changed. A version whose artifacts could not be rebuilt is
+registered but never activated, so a retrain doesn't silently drop a serving path.
+
+The result is registered as a new registry version (atomic), with the training time and
+the validation MAE of the new and the previous model on the same validation orders,
+measured with the serving backend (KPI_SERVING_BACKEND) the server would use for them.
+
+Usage:
+    python model_retraining.py                  # retrain from the active version
+    python model_retraining.py --from v20250101-120000 --activate
+    python model_retraining.py --backend gbdt  # compare the models as served by the trees
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from feature_extraction import (
+    FREQ_SLICE,
+    DURATION_SLICE,
+    USERS_SLICE,
+    ITEMS_SLICE,
+    SUPPLIERS_SLICE,
+    OUTCOME_SLICE,
+    scale_feature_matrix
+)
+from model_registry import ModelRegistry, BASE_VERSION
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+KPI_NAMES = ['on_time_delivery', 'days_sales_outstanding', 'order_accuracy', 'invoice_accuracy', 'avg_cost_delivery']
+
+# Fine-tuning starts from trained weights, so it uses a lower learning rate and few epochs
+RETRAIN_LEARNING_RATE = float(os.getenv('KPI_RETRAIN_LEARNING_RATE', '0.0001'))
+RETRAIN_MAX_EPOCHS = int(os.getenv('KPI_RETRAIN_MAX_EPOCHS', '50'))
+RETRAIN_PATIENCE = 5
+RETRAIN_BATCH_SIZE = 32
+
+# Unchanged orders replayed per changed order, and the smallest fine-tuning set
+REPLAY_RATIO = 1.0
+MIN_TRAIN_ROWS = 256
+
+# Validation orders are picked by a hash of the order id, so they stay the same across
+# data changes and the previous and new model are compared on identical rows
+VALIDATION_PERCENT = 15
+
+# Share of the fine-tuning rows held back for early stopping
+EARLY_STOPPING_FRACTION = 0.1
+
+# A retrained model whose validation MAE is worse than the previous model's by more
+# than this (relative) is registered but not activated
+MAX_VALIDATION_REGRESSION = 0.05
+
+# Order ids and data signatures a bundle was trained on (see feature_store)
+TRAINING_ORDERS_FILE = 'training_orders.npz'
+
+# Serving artifacts derived from a bundle's model: files carried over when no order changed
+DERIVED_ARTIFACTS = {
+    'ensemble': ['ensemble'],
+    'tflite': ['kpi_prediction_model_*.tflite'],
+    'gbdt': ['kpi_gbdt_model.npz', 'gbdt_config.json'],
+    'student': ['kpi_student_*.npz', 'student_report.json']
+}
+
+
+def save_training_orders(bundle_dir: Path, order_ids: np.ndarray, signatures: np.ndarray):
+    """Record the orders (and their data signatures) a bundle was trained on"""
+    with open(bundle_dir / TRAINING_ORDERS_FILE, 'wb') as f:
+        np.savez(f, order_ids=order_ids.astype(str), signatures=signatures.astype(str))
+
+
+def load_training_orders(bundle_dir: Path) -> Optional[Dict[str, str]]:
+    """
+    Load a bundle's training snapshot
+
+    Returns:
+        Signature per order id, or None if the bundle has no record
+    """
+    try:
+        with np.load(bundle_dir / TRAINING_ORDERS_FILE, allow_pickle=False) as record:
+            return dict(zip(record['order_ids'].tolist(), record['signatures'].tolist()))
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def validation_mask(order_ids: np.ndarray) -> np.ndarray:
+    """Stable validation split: orders whose id hashes below VALIDATION_PERCENT"""
+    return np.array([zlib.crc32(order_id.encode()) % 100 < VALIDATION_PERCENT for order_id in order_ids])
+
+
+def update_scalers(scalers: Dict, X_new: np.ndarray) -> Dict:
+    """
+    Update fitted scalers with new raw rows
+
+    Scalers with partial_fit (MinMaxScaler, StandardScaler) absorb the new rows;
+    RobustScaler (median/IQR) has no incremental form and is kept as fitted.
+
+    Args:
+        scalers: Fitted scalers (left unchanged)
+        X_new: Raw feature rows of shape (N, 417)
+
+    Returns:
+        Updated copy of the scalers
+    """
+    columns = {
+        'freq': X_new[:, FREQ_SLICE],
+        'duration': X_new[:, DURATION_SLICE],
+        'users': X_new[:, USERS_SLICE],
+        'items_qty': X_new[:, ITEMS_SLICE][:, ::2],
+        'items_amt': X_new[:, ITEMS_SLICE][:, 1::2],
+        'suppliers': X_new[:, SUPPLIERS_SLICE],
+        'outcome': X_new[:, OUTCOME_SLICE]
+    }
+    updated = copy.deepcopy(scalers)
+    for name, scaler in updated.items():
+        if hasattr(scaler, 'partial_fit') and len(X_new):
+            scaler.partial_fit(columns[name])
+    return updated
+
+
+def _predict(model, X_scaled: np.ndarray) -> np.ndarray:
+    return np.concatenate(model.predict(X_scaled, batch_size=1024, verbose=0), axis=1)
+
+
+def serving_predictor(
+    bundle_dir: Path,
+    serving_backend: str,
+    tflite_quantization: str = 'float16'
+) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+    """
+    Load a bundle the way ModelManager serves it with a given backend
+
+    Args:
+        bundle_dir: Bundle directory
+        serving_backend: 'keras', 'tflite', 'ensemble' or 'gbdt'
+        tflite_quantization: Flatbuffer served by the tflite backend
+
+    Returns:
+        Function from raw feature rows (N, 417) to normalized KPIs (N, 5), or None if the
+        bundle has no artifact for the backend (the server then falls back to Keras)
+    """
+    from ml_model import load_model_and_scalers, load_scalers
+
+    if serving_backend == 'gbdt':
+        from gbdt_model import load_gbdt
+        predictor, scalers = load_gbdt(bundle_dir), None
+    elif serving_backend == 'tflite':
+        from tflite_model import TFLiteKPIModel, tflite_model_path
+        path = tflite_model_path(bundle_dir, tflite_quantization)
+        predictor, scalers = TFLiteKPIModel(path) if path.exists() else None, None
+    elif serving_backend == 'ensemble':
+        from ensemble_model import load_stacked_ensemble, ensemble_member_paths, ENSEMBLE_DIR_NAME
+        ensemble_dir = bundle_dir / ENSEMBLE_DIR_NAME
+        if not ensemble_member_paths(ensemble_dir):
+            return None
+        predictor, scalers = load_stacked_ensemble(ensemble_dir), load_scalers(ensemble_dir)
+    else:
+        model, scalers = load_model_and_scalers(bundle_dir)
+        return lambda X: _predict(model, scale_feature_matrix(X, scalers).astype(np.float32))
+
+    if predictor is None:
+        return None
+    scalers = scalers or load_scalers(bundle_dir)
+    return lambda X: predictor.predict_batch(scale_feature_matrix(X, scalers).astype(np.float32))
+
+
+def _kpi_mae(predictions: np.ndarray, y: np.ndarray) -> Dict[str, float]:
+    mae = np.abs(predictions - y).mean(axis=0)
+    return {name: float(mae[i]) for i, name in enumerate(KPI_NAMES)}
+
+
+def select_training_rows(
+    order_ids: np.ndarray,
+    changed: List[str],
+    holdout: np.ndarray,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Rows to fine-tune on: changed orders plus a replay sample of unchanged ones
+
+    Args:
+        order_ids: Order id per store row
+        changed: Orders whose data changed since the model was trained
+        holdout: Validation mask per row (never trained on)
+        rng: Random generator for the replay sample
+
+    Returns:
+        Row indices
+    """
+    changed_set = set(changed)
+    is_changed = np.array([order_id in changed_set for order_id in order_ids])
+    changed_rows = np.flatnonzero(is_changed & ~holdout)
+    unchanged_rows = np.flatnonzero(~is_changed & ~holdout)
+
+    num_replay = max(int(len(changed_rows) * REPLAY_RATIO), MIN_TRAIN_ROWS - len(changed_rows), 0)
+    num_replay = min(num_replay, len(unchanged_rows))
+    replay_rows = rng.choice(unchanged_rows, size=num_replay, replace=False)
+    return np.sort(np.concatenate([changed_rows, replay_rows]))
+
+
+def fine_tune(
+    model,
+    scalers: Dict,
+    store,
+    changed: List[str],
+    holdout: np.ndarray,
+    seed: int
+) -> Tuple[Dict, int, np.ndarray]:
+    """
+    Warm-start fine-tune a Keras KPI model in place on the changed orders
+
+    Args:
+        model: Trained Keras model (updated in place)
+        scalers: Its fitted scalers (left unchanged)
+        store: Refreshed FeatureStore
+        changed: Orders whose data changed since the model was trained
+        holdout: Validation mask per store row (never trained on)
+        seed: Seed for the replay sample, early-stopping split and training
+
+    Returns:
+        Tuple of (updated scalers, epochs trained, training row indices)
+    """
+    from sklearn.model_selection import train_test_split
+    from tensorflow import keras
+
+    changed_set = set(changed)
+    changed_train = np.array([order_id in changed_set for order_id in store.order_ids]) & ~holdout
+    new_scalers = update_scalers(scalers, store.X[changed_train])
+    train_rows = select_training_rows(store.order_ids, changed, holdout, np.random.default_rng(seed))
+    fit_rows, stop_rows = train_test_split(train_rows, test_size=EARLY_STOPPING_FRACTION, random_state=seed)
+
+    X_fit = scale_feature_matrix(store.X[fit_rows], new_scalers).astype(np.float32)
+    X_stop = scale_feature_matrix(store.X[stop_rows], new_scalers).astype(np.float32)
+    y_fit, y_stop = store.y[fit_rows], store.y[stop_rows]
+
+    # Keep the BatchNorm statistics of the full training set: re-estimating them on the
+    # small, change-heavy fine-tuning set shifts every prediction
+    for layer in model.layers:
+        if isinstance(layer, keras.layers.BatchNormalization):
+            layer.trainable = False
+
+    keras.utils.set_random_seed(seed)
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=RETRAIN_LEARNING_RATE, clipnorm=1.0),
+        loss=[keras.losses.Huber(delta=1.0) for _ in range(5)],
+        metrics=[['mae'] for _ in range(5)]
+    )
+    history = model.fit(
+        X_fit,
+        [y_fit[:, i:i+1] for i in range(5)],
+        validation_data=(X_stop, [y_stop[:, i:i+1] for i in range(5)]),
+        epochs=RETRAIN_MAX_EPOCHS,
+        batch_size=RETRAIN_BATCH_SIZE,
+        callbacks=[keras.callbacks.EarlyStopping(
+            monitor='val_loss', patience=RETRAIN_PATIENCE, restore_best_weights=True
+        )],
+        verbose=0
+    )
+    return new_scalers, len(history.history['loss']), train_rows
+
+
+def parent_artifacts(bundle_dir: Path) -> List[str]:
+    """Derived serving artifacts present in a bundle (see DERIVED_ARTIFACTS)"""
+    from ensemble_model import ensemble_member_paths, ENSEMBLE_DIR_NAME
+
+    present = []
+    if ensemble_member_paths(bundle_dir / ENSEMBLE_DIR_NAME):
+        present.append('ensemble')
+    for name in ('tflite', 'gbdt', 'student'):
+        if list(bundle_dir.glob(DERIVED_ARTIFACTS[name][0])):
+            present.append(name)
+    return present
+
+
+def _copy_artifact(parent_dir: Path, staging_dir: Path, name: str):
+    for pattern in DERIVED_ARTIFACTS[name]:
+        for path in parent_dir.glob(pattern):
+            if path.is_dir():
+                shutil.copytree(path, staging_dir / path.name)
+            else:
+                shutil.copy2(path, staging_dir / path.name)
+
+
+def _rebuild_ensemble(parent_dir: Path, staging_dir: Path, store, changed: List[str],
+                      holdout: np.ndarray, seed: int, dataset_hash: str):
+    """Fine-tune every ensemble member like the main model (members keep their own scalers)"""
+    from ensemble_model import ensemble_member_paths, ENSEMBLE_CONFIG_FILE, ENSEMBLE_DIR_NAME
+    from ml_model import load_scalers
+    from tensorflow import keras
+    from train_model import save_scalers
+
+    parent_ensemble, ensemble_dir = parent_dir / ENSEMBLE_DIR_NAME, staging_dir / ENSEMBLE_DIR_NAME
+    ensemble_dir.mkdir()
+    scalers = load_scalers(parent_ensemble)
+    for member, path in enumerate(ensemble_member_paths(parent_ensemble)):
+        model = keras.models.load_model(path)
+        new_scalers, epochs, _ = fine_tune(model, scalers, store, changed, holdout, seed + member)
+        model.save(ensemble_dir / path.name)
+        logger.info(f"✓ Fine-tuned ensemble {path.stem} ({epochs} epochs)")
+    save_scalers(new_scalers, ensemble_dir)
+    if (parent_ensemble / ENSEMBLE_CONFIG_FILE).exists():
+        shutil.copy2(parent_ensemble / ENSEMBLE_CONFIG_FILE, ensemble_dir / ENSEMBLE_CONFIG_FILE)
+    (ensemble_dir / 'dataset_hash.txt').write_text(dataset_hash)
+
+
+def _rebuild_tflite(parent_dir: Path, staging_dir: Path, model, scalers: Dict, store, holdout: np.ndarray):
+    """Convert the fine-tuned model for every quantization the parent was served in"""
+    from tflite_model import convert_to_tflite, save_tflite_model
+
+    calibration_features = scale_feature_matrix(store.X[~holdout], scalers).astype(np.float32)
+    for path in sorted(parent_dir.glob(DERIVED_ARTIFACTS['tflite'][0])):
+        quantization = path.stem.removeprefix('kpi_prediction_model_')
+        save_tflite_model(convert_to_tflite(model, quantization, calibration_features), staging_dir, quantization)
+
+
+def _rebuild_gbdt(parent_dir: Path, staging_dir: Path):
+    """Retrain the trees on the current data with the staged bundle's scalers"""
+    from gbdt_model import GBDT_CONFIG_FILE
+    from train_model import train_gbdt
+
+    compact_tolerance = None
+    if (parent_dir / GBDT_CONFIG_FILE).exists():
+        with open(parent_dir / GBDT_CONFIG_FILE) as f:
+            compact_tolerance = json.load(f).get('compact_tolerance')
+    if not train_gbdt(staging_dir, compact_tolerance=compact_tolerance):
+        raise RuntimeError("GBDT training failed")
+
+
+def _rebuild_students(parent_dir: Path, staging_dir: Path):
+    """Distill the parent's student architectures from the fine-tuned model"""
+    from student_model import STUDENT_ARCHITECTURES, distill_students, student_model_path
+
+    architectures = [name for name in STUDENT_ARCHITECTURES if student_model_path(parent_dir, name).exists()]
+    distill_students(staging_dir, architectures=architectures)
+
+
+def rebuild_derived_artifacts(
+    parent_dir: Path,
+    staging_dir: Path,
+    model,
+    scalers: Dict,
+    store,
+    changed: List[str],
+    holdout: np.ndarray,
+    seed: int,
+    dataset_hash: str
+) -> Dict[str, str]:
+    """
+    Rebuild (or carry over) the parent's derived serving artifacts into a staged bundle
+
+    Args:
+        parent_dir: Parent bundle directory
+        staging_dir: Staged bundle with the fine-tuned model and scalers saved
+        model: Fine-tuned Keras model
+        scalers: Its updated scalers
+        store: Refreshed FeatureStore
+        changed: Orders whose data changed (none: the artifacts are copied)
+        holdout: Validation mask per store row
+        seed: Seed for fine-tuning the ensemble members
+        dataset_hash: Current dataset fingerprint
+
+    Returns:
+        Dict of artifact name -> 'copied', 'rebuilt' or 'failed: <error>'
+    """
+    status = {}
+    for name in parent_artifacts(parent_dir):
+        try:
+            if not changed:
+                _copy_artifact(parent_dir, staging_dir, name)
+                status[name] = 'copied'
+                continue
+            if name == 'ensemble':
+                _rebuild_ensemble(parent_dir, staging_dir, store, changed, holdout, seed, dataset_hash)
+            elif name == 'tflite':
+                _rebuild_tflite(parent_dir, staging_dir, model, scalers, store, holdout)
+            elif name == 'gbdt':
+                _rebuild_gbdt(parent_dir, staging_dir)
+            else:
+                _rebuild_students(parent_dir, staging_dir)
+            status[name] = 'rebuilt'
+        except Exception as e:
+            logger.error(f"❌ Could not rebuild {name} for the retrained model: {e}")
+            status[name] = f'failed: {e}'
+    return status
+
+
+def retrain_incremental(
+    registry: ModelRegistry,
+    parent_version: str,
+    dataset_hash: str,
+    seed: int = 42,
+    serving_backend: str = 'keras',
+    tflite_quantization: str = 'float16'
+) -> Dict:
+    """
+    Fine-tune a registered model on the changed orders and register the result
+
+    Args:
+        registry: Model registry (the new version is registered here)
+        parent_version: Version whose weights and scalers are the starting point
+        dataset_hash: Current dataset fingerprint (stored with the new version)
+        seed: Seed for the replay sample, early-stopping split and training
+        serving_backend: Backend the versions are served with; the validation MAEs are
+                         measured with it (Keras if the parent has no artifact for it)
+        tflite_quantization: Flatbuffer served by the tflite backend
+
+    Returns:
+        Training report (also stored as the new version's metadata), including the
+        new 'version', 'training_seconds', the 'val_mae_previous' / 'val_mae_new' /
+        'val_mae_delta' of both models on the validation orders with the 'served_backend',
+        and the status of the derived 'artifacts' (with the 'failed_artifacts' that block
+        activation)
+    """
+    from feature_store import FeatureStore
+    from ml_model import load_model_and_scalers, save_model_and_scalers
+
+    start = time.perf_counter()
+    parent_dir = registry.bundle_dir(parent_version)
+
+    store = FeatureStore()
+    refresh = store.refresh()
+    trained_orders = load_training_orders(parent_dir)
+    if trained_orders is not None:
+        changed = store.changed_since(trained_orders)
+    elif refresh['reused']:
+        # No training record (bundle trained before records existed): changes since the last refresh
+        logger.warning("⚠️ No training record in the parent bundle - using orders changed since the last refresh")
+        changed = refresh['changed']
+    else:
+        logger.warning("⚠️ No training record and no previous feature store - fine-tuning on all orders")
+        changed = store.order_ids.tolist()
+
+    model, scalers = load_model_and_scalers(parent_dir)
+    holdout = validation_mask(store.order_ids)
+
+    X_val, y_val = store.X[holdout], store.y[holdout]
+    served_backend = serving_backend
+    previous_predictor = serving_predictor(parent_dir, served_backend, tflite_quantization)
+    if previous_predictor is None:
+        logger.warning(f"⚠️ {parent_version} has no {serving_backend} artifact - comparing the Keras models")
+        served_backend = 'keras'
+        previous_predictor = serving_predictor(parent_dir, served_backend)
+    val_mae_previous = _kpi_mae(previous_predictor(X_val), y_val)
+
+    report = {
+        'training': 'incremental',
+        'parent_version': parent_version,
+        'dataset_hash': dataset_hash,
+        'changed_orders': len(changed),
+        'removed_orders': len(refresh['removed']),
+        'validation_rows': int(holdout.sum())
+    }
+
+    if not changed:
+        # Nothing to learn (e.g. only files the features don't use changed): re-stamp the model
+        logger.info("✓ No order data changed - registering the parent model for the new dataset")
+        new_scalers, epochs, train_rows = scalers, 0, np.array([], dtype=int)
+    else:
+        new_scalers, epochs, train_rows = fine_tune(model, scalers, store, changed, holdout, seed)
+
+
+    # Stage the bundle outside the registry; register() copies it in with an atomic rename
+    staging_dir = Path(tempfile.mkdtemp(prefix='.retrain.', dir=registry.models_dir))
+    try:
+        save_model_and_scalers(model, new_scalers, staging_dir, dataset_hash)
+        save_training_orders(staging_dir, store.order_ids, store.signatures)
+        artifacts = rebuild_derived_artifacts(
+            parent_dir, staging_dir, model, new_scalers, store, changed, holdout, seed, dataset_hash
+        )
+        new_predictor = serving_predictor(staging_dir, served_backend, tflite_quantization)
+        if new_predictor is None:
+            # Artifact failed to rebuild (the version isn't activated): compare the Keras models
+            served_backend = 'keras'
+            val_mae_previous = _kpi_mae(serving_predictor(parent_dir, served_backend)(X_val), y_val)
+            new_predictor = serving_predictor(staging_dir, served_backend)
+        val_mae_new = _kpi_mae(new_predictor(X_val), y_val)
+
+        training_seconds = time.perf_counter() - start
+        report.update({
+            'train_rows': int(len(train_rows)),
+            'epochs': epochs,
+            'training_seconds': round(training_seconds, 2),
+            'served_backend': served_backend,
+            'val_mae_previous': val_mae_previous,
+            'val_mae_new': val_mae_new,
+            'val_mae_delta': {name: val_mae_new[name] - val_mae_previous[name] for name in KPI_NAMES},
+            'val_mae_previous_mean': float(np.mean(list(val_mae_previous.values()))),
+            'val_mae_new_mean': float(np.mean(list(val_mae_new.values()))),
+            'artifacts': artifacts,
+            'failed_artifacts': [name for name, state in artifacts.items() if state.startswith('failed')]
+        })
+        report['version'] = registry.register(staging_dir, metadata=report)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    logger.info(
+        f"✓ Retrained {parent_version} → {report['version']} on {len(train_rows)} rows "
+        f"({len(changed)} changed orders, {epochs} epochs) in {training_seconds:.1f}s: "
+        f"validation MAE {report['val_mae_previous_mean']:.5f} → {report['val_mae_new_mean']:.5f}"
+    )
+    return report
+
+
+def accept_retrained(report: Dict) -> bool:
+    """
+    Whether a retrained model can be activated: every derived artifact of its parent was
+    rebuilt and its validation MAE did not regress (see MAX_VALIDATION_REGRESSION)
+    """
+    if report.get('failed_artifacts'):
+        return False
+    return report['val_mae_new_mean'] <= report['val_mae_previous_mean'] * (1 + MAX_VALIDATION_REGRESSION)
+
+
+if __name__ == "__main__":
+    from dataset_fingerprint import DatasetManifest
+    from ml_model import SERVING_BACKENDS
+
+    parser = argparse.ArgumentParser(description="Warm-start retrain the KPI model on changed data")
+    parser.add_argument('--from', dest='parent_version', default=None,
+                        help="Version to start from (default: the active version)")
+    parser.add_argument('--activate', action='store_true', help="Make the new version active if accepted")
+    parser.add_argument('--backend', choices=SERVING_BACKENDS, default=os.getenv('KPI_SERVING_BACKEND', 'keras'),
+                        help="Serving backend to compare the models with (default: KPI_SERVING_BACKEND or keras)")
+    parser.add_argument('--quantization', default=os.getenv('KPI_TFLITE_QUANTIZATION', 'float16'),
+                        help="Flatbuffer served by the tflite backend (default: KPI_TFLITE_QUANTIZATION or float16)")
+    args = parser.parse_args()
+
+    backend_dir = Path(__file__).parent
+    registry = ModelRegistry(backend_dir / 'trained_models')
+    parent_version = args.parent_version or registry.get_active_version() or BASE_VERSION
+    dataset_hash = DatasetManifest(backend_dir.parent / 'data').fingerprint()
+
+    report = retrain_incremental(
+        registry, parent_version, dataset_hash,
+        serving_backend=args.backend, tflite_quantization=args.quantization
+    )
+    logger.info(json.dumps({key: value for key, value in report.items() if key != 'dataset_hash'}, indent=2))
+    if args.activate:
+        if accept_retrained(report):
+            registry.set_active_version(report['version'])
+            logger.info(f"✅ Active model version: {report['version']}")
+        elif report['failed_artifacts']:
+            logger.warning(f"⚠️ Could not rebuild {', '.join(report['failed_artifacts'])} - "
+                           f"{report['version']} registered but not activated")
+        else:
+            logger.warning(f"⚠️ Validation MAE regressed - {report['version']} registered but not activated")
@@ -0,0 +1,324 @@
+"""
+Monte Carlo KPI Simulation
+Samples edge durations from the per-transition duration distributions observed in the
+event log, builds one feature row per sample (only the duration block varies), scores
+all samples in a single batched forward pass and summarizes each KPI's distribution
+(percentiles and histogram) instead of the single point prediction for mean durations.
+"""
+
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from feature_extraction import (
+    ALL_EVENTS,
+    DURATION_SLICE,
+    extract_features_from_scenario,
+    scale_feature_matrix
+)
+from ml_model import KPI_NAMES, KPI_MULTIPLIERS, denormalize_kpis
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MONTE_CARLO_SAMPLES = 10000
+MAX_MONTE_CARLO_SAMPLES = 50000
+# With the duration surrogate (see duration_surrogate.py) most rows never reach the model
+MAX_SURROGATE_SAMPLES = 1000000
+MONTE_CARLO_PERCENTILES = [5, 25, 50, 75, 95]
+HISTOGRAM_BINS = 20
+
+# Transitions observed fewer times than this keep their fixed duration
+MIN_TRANSITION_SAMPLES = 5
+
+
+def edge_duration_distributions(
+    edges: List[Dict],
+    transition_hours: Dict[Tuple[str, str], np.ndarray],
+    min_samples: int = MIN_TRANSITION_SAMPLES
+) -> List[Optional[np.ndarray]]:
+    """
+    Pick the empirical duration distribution for each edge
+
+    Transitions observed fewer than min_samples times (or never, e.g. edges the user
+    drew) keep their fixed duration.
+
+    Args:
+        edges: Enriched edges
+        transition_hours: Observed durations in hours per (from, to) transition
+        min_samples: Observations needed to sample a transition's durations
+
+    Returns:
+        Observed durations in hours per edge (None for fixed edges)
+    """
+    distributions = []
+    for edge in edges:
+        hours = transition_hours.get((edge.get('from'), edge.get('to')))
+        distributions.append(hours if hours is not None and len(hours) >= min_samples else None)
+    return distributions
+
+
+def edge_duration_columns(edges: List[Dict]) -> Dict[int, int]:
+    """
+    Duration feature column (from * 13 + to) of each edge's transition
+
+    Returns:
+        Dict mapping column to the index of the last edge that sets it (later edges
+        overwrite earlier ones, as in build_transition_matrix_duration)
+    """
+    event_to_idx = {event: idx for idx, event in enumerate(ALL_EVENTS)}
+    columns = {}
+    for index, edge in enumerate(edges):
+        from_idx = event_to_idx.get(edge.get('from'))
+        to_idx = event_to_idx.get(edge.get('to'))
+        if from_idx is not None and to_idx is not None:
+            columns[from_idx * len(ALL_EVENTS) + to_idx] = index
+    return columns
+
+
+def sampled_duration_columns(
+    edges: List[Dict],
+    distributions: List[Optional[np.ndarray]]
+) -> Dict[int, np.ndarray]:
+    """Observed durations (hours) per duration column that is sampled"""
+    return {
+        column: distributions[index]
+        for column, index in edge_duration_columns(edges).items()
+        if distributions[index] is not None
+    }
+
+
+def sample_duration_features(
+    base_durations: np.ndarray,
+    edges: List[Dict],
+    distributions: List[Optional[np.ndarray]],
+    num_samples: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Build the raw duration block (minutes) for num_samples sampled processes
+
+    Args:
+        base_durations: Raw 169-dim duration block of the process (mean durations)
+        edges: Enriched edges
+        distributions: Output of edge_duration_distributions
+        num_samples: Number of samples S
+        rng: Random generator
+
+    Returns:
+        Raw duration block of shape (S, 169)
+    """
+    block = np.tile(base_durations, (num_samples, 1))
+    for column, hours in sampled_duration_columns(edges, distributions).items():
+        block[:, column] = rng.choice(hours, size=num_samples) * 60
+    return block
+
+
+def summarize_kpi_distribution(
+    predictions: np.ndarray,
+    percentiles: List[float] = MONTE_CARLO_PERCENTILES,
+    bins: int = HISTOGRAM_BINS
+) -> Dict[str, Dict]:
+    """
+    Summarize sampled KPI predictions
+
+    Args:
+        predictions: Normalized KPI predictions of shape (S, 5)
+        percentiles: Percentiles to report
+        bins: Histogram bins per KPI
+
+    Returns:
+        Dict mapping KPI names to {'mean', 'std', 'min', 'max', 'percentiles',
+        'histogram': {'bin_edges', 'counts'}} in original units
+    """
+    denormalized = predictions * np.asarray(KPI_MULTIPLIERS, dtype=np.float64)
+    percentile_values = np.percentile(denormalized, percentiles, axis=0)
+
+    summary = {}
+    for i, kpi_name in enumerate(KPI_NAMES):
+        values = denormalized[:, i]
+        counts, bin_edges = np.histogram(values, bins=bins)
+        summary[kpi_name] = {
+            'mean': round(float(values.mean()), 3),
+            'std': round(float(values.std()), 4),
+            'min': round(float(values.min()), 3),
+            'max': round(float(values.max()), 3),
+            'percentiles': {
+                f'p{p:g}': round(float(percentile_values[j, i]), 3)
+                for j, p in enumerate(percentiles)
+            },
+            'histogram': {
+                'bin_edges': [round(float(edge), 4) for edge in bin_edges],
+                'counts': counts.tolist()
+            }
+        }
+    return summary
+
+
+def run_monte_carlo_simulation(
+    activities: List[str],
+    edges: List[Dict],
+    user_ids: List[str],
+    items_data: List[Dict],
+    supplier_ids: List[str],
+    predict_batch_fn: Callable[[np.ndarray], np.ndarray],
+    scalers: Dict,
+    transition_hours: Dict[Tuple[str, str], np.ndarray],
+    num_samples: int = DEFAULT_MONTE_CARLO_SAMPLES,
+    seed: Optional[int] = None,
+    bins: int = HISTOGRAM_BINS,
+    surrogate_order: Optional[int] = None,
+    surrogate_tolerance: Optional[float] = None
+) -> Dict:
+    """
+    Simulate the KPI distribution of a process under empirical duration variability
+
+    Entities are held fixed and only edge durations are sampled, so the spread reflects
+    how the model responds to the timing variability seen in the event log. With a
+    surrogate order, the samples are scored by a Taylor expansion of the model around
+    the mean sampled durations (see duration_surrogate.py); rows whose error bound
+    exceeds the tolerance are scored by the model.
+
+    Args:
+        activities: Activity names
+        edges: Enriched edges (with duration_hours)
+        user_ids: Formatted user IDs
+        items_data: Item dicts with 'item_id', 'quantity', 'line_total'
+        supplier_ids: Formatted supplier IDs
+        predict_batch_fn: Maps a scaled (N, 417) matrix to (N, 5) normalized KPIs
+        scalers: Feature scalers matching predict_batch_fn
+        transition_hours: Observed durations in hours per (from, to) transition
+        num_samples: Number of sampled processes S
+        seed: Random seed (None for a fresh draw)
+        bins: Histogram bins per KPI
+        surrogate_order: 1 or 2 to score the samples with the duration surrogate
+        surrogate_tolerance: Largest surrogate error bound in KPI units (default 0.5)
+
+    Returns:
+        Dict with the point prediction, the per-KPI distributions, the duration
+        distribution used for each edge, timing and (surrogate mode) surrogate stats
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    distributions = edge_duration_distributions(edges, transition_hours)
+
+    # Everything but the duration block is identical across samples: scale it once
+    base_raw = extract_features_from_scenario(activities, edges, user_ids, items_data, supplier_ids)
+    base_scaled = scale_feature_matrix(base_raw, scalers).astype(np.float32)
+
+    surrogate_stats = None
+    sampled = sampled_duration_columns(edges, distributions)
+    if surrogate_order is not None and sampled:
+        predictions, surrogate_stats = _score_with_surrogate(
+            base_scaled, sampled, num_samples, rng, predict_batch_fn, scalers,
+            surrogate_order, surrogate_tolerance
+        )
+        build_ms = surrogate_stats.pop('build_ms')
+        inference_ms = surrogate_stats['fit_ms'] + surrogate_stats['surrogate_ms'] + surrogate_stats['fallback_ms']
+    else:
+        duration_block = sample_duration_features(
+            base_raw[DURATION_SLICE], edges, distributions, num_samples, rng
+        )
+        features = np.tile(base_scaled, (num_samples + 1, 1))
+        features[1:, DURATION_SLICE] = scalers['duration'].transform(duration_block)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # Row 0 is the point prediction at the edges' fixed durations
+        start = time.perf_counter()
+        predictions = np.asarray(predict_batch_fn(features), dtype=np.float64)
+        inference_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    distribution = summarize_kpi_distribution(predictions[1:], bins=bins)
+    summary_ms = (time.perf_counter() - start) * 1000
+
+    edge_distributions = [
+        {
+            'from': edge.get('from'),
+            'to': edge.get('to'),
+            'sampled': hours is not None,
+            'observations': 0 if hours is None else int(len(hours)),
+            'mean_hours': None if hours is None else round(float(hours.mean()), 3),
+            'std_hours': None if hours is None else round(float(hours.std()), 3)
+        }
+        for edge, hours in zip(edges, distributions)
+    ]
+
+    if surrogate_stats is not None:
+        logger.info(f"   Surrogate (order {surrogate_order}): {surrogate_stats['fallback_rows']} of "
+                    f"{num_samples} samples scored by the model")
+    logger.info(
+        f"✓ Monte Carlo simulation: {num_samples} samples "
+        f"(features {build_ms:.1f}ms, inference {inference_ms:.1f}ms, summary {summary_ms:.1f}ms)"
+    )
+    return {
+        'num_samples': num_samples,
+        'point_kpis': denormalize_kpis(predictions[0]),
+        'kpi_distribution': distribution,
+        'edge_distributions': edge_distributions,
+        'feature_ms': round(build_ms, 2),
+        'inference_ms': round(inference_ms, 2),
+        'summary_ms': round(summary_ms, 2),
+        'surrogate': surrogate_stats
+    }
+
+
+def _score_with_surrogate(
+    base_scaled: np.ndarray,
+    sampled: Dict[int, np.ndarray],
+    num_samples: int,
+    rng: np.random.Generator,
+    predict_batch_fn: Callable[[np.ndarray], np.ndarray],
+    scalers: Dict,
+    order: int,
+    tolerance: Optional[float]
+) -> Tuple[np.ndarray, Dict]:
+    """
+    Score sampled durations with a duration surrogate fitted around their means
+
+    Returns:
+        Predictions (S + 1, 5) with the point prediction in row 0, and surrogate stats
+    """
+    from duration_surrogate import (
+        DEFAULT_SURROGATE_TOLERANCE,
+        NUM_CALIBRATION_SAMPLES,
+        DurationSurrogate,
+        SweepFeatures,
+        evaluate_sweep
+    )
+
+    start = time.perf_counter()
+    tolerance = DEFAULT_SURROGATE_TOLERANCE if tolerance is None else tolerance
+    columns = np.array(list(sampled))
+    # Same draws, column by column, as sample_duration_features
+    hours = np.column_stack([rng.choice(observed, size=num_samples) for observed in sampled.values()])
+    centre = hours.mean(axis=0)
+    step = np.maximum(hours.std(axis=0), 1e-6)
+    calibration = hours[rng.choice(num_samples, min(NUM_CALIBRATION_SAMPLES, num_samples), replace=False)]
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    surrogate = DurationSurrogate.fit(
+        base_scaled, columns, centre, step, scalers['duration'], predict_batch_fn, order,
+        calibration_hours=calibration
+    )
+    point = np.asarray(predict_batch_fn(np.atleast_2d(base_scaled)), dtype=np.float64)
+    fit_ms = (time.perf_counter() - start) * 1000
+
+    sweep = SweepFeatures(base_scaled, columns, scalers['duration'])
+    result = evaluate_sweep(surrogate, sweep, hours, predict_batch_fn, tolerance)
+    served = result['bounds'][result['bounds'] > 0]
+    return np.vstack([point, result['predictions']]), {
+        'order': order,
+        'tolerance': tolerance,
+        'num_edges': int(len(columns)),
+        'fallback_rows': result['fallback_rows'],
+        'max_error_bound': round(float(served.max()), 4) if served.size else 0.0,
+        'build_ms': round(build_ms, 2),
+        'fit_ms': round(fit_ms, 2),
+        'surrogate_ms': result['surrogate_ms'],
+        'fallback_ms': result['fallback_ms']
+    }
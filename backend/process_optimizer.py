@@ -0,0 +1,375 @@
+"""
+Process Optimizer
+Searches processes near a starting variant - removing optional activities, adding missing
+ones and re-timing edges within bounds - and returns the Pareto front over the 5 KPIs.
+
+The search is an evolutionary beam: every generation mutates the beam, deduplicates the
+children against everything already scored, scores the new ones in a single batched
+forward pass, and keeps the best non-dominated (and most spread-out) candidates.
+"""
+
+import logging
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from feature_extraction import (
+    extract_features_from_scenario,
+    scale_feature_matrix,
+    BASELINE_ACTIVITIES
+)
+from llm_prompts import VALID_O2C_ACTIVITIES
+from ml_model import KPI_NAMES, denormalize_kpis
+from sensitivity_analysis import (
+    KPI_HIGHER_IS_BETTER,
+    edge_duration_hours,
+    insert_activity,
+    remove_activity
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Objective signs: multiply KPIs by these so that larger is better for every objective
+OBJECTIVE_SIGNS = np.array([1.0 if KPI_HIGHER_IS_BETTER[name] else -1.0 for name in KPI_NAMES])
+
+# Multiplicative steps for re-timing an edge
+DURATION_STEPS = [0.8, 0.9, 1.1, 1.25]
+
+
+def normalize_edge(edge: Dict) -> Dict:
+    """Copy of an edge with string 'from' / 'to' (falling back to 'source' / 'target', else '')"""
+    edge = edge.copy()
+    edge['from'] = edge.get('from') or edge.get('source') or ''
+    edge['to'] = edge.get('to') or edge.get('target') or ''
+    return edge
+
+
+def candidate_key(activities: List[str], edges: List[Dict]) -> Tuple:
+    """Hashable identity of a candidate (activity order and rounded edge durations)"""
+    return (
+        tuple(activities),
+        tuple(sorted(
+            (edge.get('from'), edge.get('to'), round(edge_duration_hours(edge), 3)) for edge in edges
+        ))
+    )
+
+
+def non_dominated_ranks(objectives: np.ndarray) -> np.ndarray:
+    """
+    Pareto rank of each point (0 = non-dominated), all objectives maximized
+
+    Args:
+        objectives: Array of shape (N, K)
+
+    Returns:
+        Integer ranks of shape (N,)
+    """
+    geq = (objectives[:, None, :] >= objectives[None, :, :]).all(axis=2)
+    gt = (objectives[:, None, :] > objectives[None, :, :]).any(axis=2)
+    dominates = geq & gt                       # dominates[i, j]: i dominates j
+
+    ranks = np.full(len(objectives), -1)
+    remaining = np.ones(len(objectives), dtype=bool)
+    rank = 0
+    while remaining.any():
+        dominated = (dominates[remaining][:, remaining]).any(axis=0)
+        current = np.flatnonzero(remaining)[~dominated]
+        ranks[current] = rank
+        remaining[current] = False
+        rank += 1
+    return ranks
+
+
+def crowding_distance(objectives: np.ndarray) -> np.ndarray:
+    """
+    NSGA-II crowding distance (larger = more isolated; boundary points are infinite)
+
+    Args:
+        objectives: Array of shape (N, K)
+
+    Returns:
+        Distances of shape (N,)
+    """
+    num_points = len(objectives)
+    distance = np.zeros(num_points)
+    if num_points <= 2:
+        return np.full(num_points, np.inf)
+    for k in range(objectives.shape[1]):
+        order = np.argsort(objectives[:, k])
+        span = objectives[order[-1], k] - objectives[order[0], k]
+        distance[order[0]] = distance[order[-1]] = np.inf
+        if span > 0:
+            distance[order[1:-1]] += (objectives[order[2:], k] - objectives[order[:-2], k]) / span
+    return distance
+
+
+def select_survivors(objectives: np.ndarray, count: int) -> np.ndarray:
+    """Indices of the best `count` points by Pareto rank, then crowding distance"""
+    ranks = non_dominated_ranks(objectives)
+    crowding = np.zeros(len(objectives))
+    for rank in np.unique(ranks):
+        members = ranks == rank
+        crowding[members] = crowding_distance(objectives[members])
+    order = np.lexsort((-crowding, ranks))
+    return order[:count]
+
+
+class ProcessOptimizer:
+    """
+    Evolutionary beam search over processes near a starting variant
+
+    Constraints:
+        - Mandatory activities (BASELINE_ACTIVITIES present in the start) are never removed
+        - Each edge's duration stays within +/- max_duration_change of the duration it had
+          when it first appeared
+        - At most max_added activities from VALID_O2C_ACTIVITIES are added
+    """
+
+    def __init__(
+        self,
+        activities: List[str],
+        edges: List[Dict],
+        user_ids: List[str],
+        items_data: List[Dict],
+        supplier_ids: List[str],
+        predict_batch_fn: Callable[[np.ndarray], np.ndarray],
+        scalers: Dict,
+        max_duration_change: float = 0.5,
+        max_added: int = 2,
+        mandatory: Optional[List[str]] = None,
+        activity_hours: Optional[Dict[str, float]] = None,
+        seed: int = 42
+    ):
+        """
+        Args:
+            activities: Activity names of the starting process
+            edges: Enriched edges of the starting process (with duration_hours; 'source' /
+                   'target' edges are accepted and normalized to 'from' / 'to')
+            user_ids: Formatted user IDs (held fixed across candidates)
+            items_data: Item dicts (held fixed)
+            supplier_ids: Formatted supplier IDs (held fixed)
+            predict_batch_fn: Maps a scaled (N, 417) matrix to (N, 5) normalized KPIs
+            scalers: Feature scalers matching predict_batch_fn
+            max_duration_change: Bound on the relative change of each edge duration
+            max_added: Maximum number of activities added to the start process
+            mandatory: Activities that must stay (default: BASELINE_ACTIVITIES in the start)
+            activity_hours: Typical duration in hours per activity, for added activities
+            seed: Seed for the mutation choices
+        """
+        self.start_activities = list(activities)
+        self.start_edges = [self._with_base_hours(normalize_edge(edge)) for edge in edges]
+        self.user_ids = user_ids
+        self.items_data = items_data
+        self.supplier_ids = supplier_ids
+        self.predict_batch_fn = predict_batch_fn
+        self.scalers = scalers
+        self.max_duration_change = max_duration_change
+        self.max_added = max_added
+        self.mandatory = set(mandatory if mandatory is not None else
+                             [name for name in activities if name in BASELINE_ACTIVITIES])
+        self.activity_hours = activity_hours or {}
+        self.rng = np.random.default_rng(seed)
+
+        # Scored candidates: key -> normalized KPI prediction (5,)
+        self.cache: Dict[Tuple, np.ndarray] = {}
+        self.candidates: Dict[Tuple, Dict] = {}
+        self.front: List[Tuple] = []
+        self.evaluated = 0
+        self.cache_hits = 0
+        self.inference_ms = 0.0
+
+    @staticmethod
+    def _with_base_hours(edge: Dict) -> Dict:
+        edge = edge.copy()
+        edge.setdefault('base_hours', edge_duration_hours(edge))
+        return edge
+
+    def _mutate(self, candidate: Dict) -> Optional[Dict]:
+        """Apply one random constrained change to a candidate (None if nothing applies)"""
+        activities, edges = candidate['activities'], candidate['edges']
+        added = [name for name in activities if name not in self.start_activities]
+
+        removable = [name for name in dict.fromkeys(activities) if name not in self.mandatory]
+        addable = [name for name in VALID_O2C_ACTIVITIES if name not in activities] \
+            if len(added) < self.max_added else []
+        retimable = [i for i, edge in enumerate(edges) if edge_duration_hours(edge) > 0]
+
+        moves = ['duration'] * 3 * bool(retimable) + ['remove'] * bool(removable) + ['add'] * bool(addable)
+        if not moves:
+            return None
+        move = moves[self.rng.integers(len(moves))]
+
+        if move == 'remove':
+            variant = remove_activity(activities, edges, removable[self.rng.integers(len(removable))])
+        elif move == 'add':
+            variant = insert_activity(activities, edges, addable[self.rng.integers(len(addable))],
+                                      self.activity_hours)
+        else:
+            index = retimable[self.rng.integers(len(retimable))]
+            edge = edges[index]
+            base_hours = edge.get('base_hours', edge_duration_hours(edge))
+            hours = edge_duration_hours(edge) * DURATION_STEPS[self.rng.integers(len(DURATION_STEPS))]
+            hours = float(np.clip(hours, base_hours * (1 - self.max_duration_change),
+                                  base_hours * (1 + self.max_duration_change)))
+            new_edges = [e.copy() for e in edges]
+            new_edges[index].pop('avgDays', None)
+            new_edges[index]['duration_hours'] = hours
+            variant = {'activities': activities, 'edges': new_edges}
+
+        variant['edges'] = [self._with_base_hours(edge) for edge in variant['edges']]
+        return variant
+
+    def _score(self, candidates: List[Dict]) -> np.ndarray:
+        """
+        Score candidates, predicting only keys not seen before (one batched call)
+
+        Returns:
+            Normalized KPI predictions of shape (N, 5)
+        """
+        new = {}
+        for candidate in candidates:
+            key = candidate['key']
+            if key in self.cache or key in new:
+                self.cache_hits += 1
+            else:
+                new[key] = candidate
+
+        if new:
+            raw = np.stack([
+                extract_features_from_scenario(
+                    candidate['activities'], candidate['edges'],
+                    self.user_ids, self.items_data, self.supplier_ids
+                )
+                for candidate in new.values()
+            ])
+            features = scale_feature_matrix(raw, self.scalers).astype(np.float32)
+            start = time.perf_counter()
+            predictions = np.asarray(self.predict_batch_fn(features), dtype=np.float64)
+            self.inference_ms += (time.perf_counter() - start) * 1000
+            for (key, candidate), prediction in zip(new.items(), predictions):
+                self.cache[key] = prediction
+                self.candidates[key] = candidate
+            self.evaluated += len(new)
+            self._update_front(list(new))
+
+        return np.stack([self.cache[candidate['key']] for candidate in candidates])
+
+    def _update_front(self, new_keys: List[Tuple]):
+        """
+        Merge newly scored candidates into the Pareto archive (of candidates with
+        identical predictions, the first scored is kept)
+        """
+        unique = {}
+        for key in self.front + new_keys:
+            unique.setdefault(tuple(np.round(self.cache[key], 6)), key)
+        keys = list(unique.values())
+        objectives = np.stack([self.cache[key] for key in keys]) * OBJECTIVE_SIGNS
+        geq = (objectives[:, None, :] >= objectives[None, :, :]).all(axis=2)
+        gt = (objectives[:, None, :] > objectives[None, :, :]).any(axis=2)
+        dominated = (geq & gt).any(axis=0)
+        self.front = [key for key, is_dominated in zip(keys, dominated) if not is_dominated]
+
+    def describe(self, key: Tuple) -> Dict:
+        """
+        Describe a scored candidate relative to the starting process
+
+        Returns:
+            Dict with activities, edges, predicted KPIs and the list of changes
+        """
+        candidate = self.candidates[key]
+        start_hours = {(edge.get('from'), edge.get('to')): edge_duration_hours(edge) for edge in self.start_edges}
+
+        changes = [f"remove {name}" for name in dict.fromkeys(self.start_activities)
+                   if name not in candidate['activities']]
+        changes += [f"add {name}" for name in candidate['activities'] if name not in self.start_activities]
+        for edge in candidate['edges']:
+            pair = (edge.get('from'), edge.get('to'))
+            hours = edge_duration_hours(edge)
+            if pair in start_hours and abs(hours - start_hours[pair]) > 1e-6:
+                changes.append(f"{pair[0]} → {pair[1]}: {start_hours[pair]:.2f}h → {hours:.2f}h")
+
+        return {
+            'activities': candidate['activities'],
+            'edges': [
+                {'from': edge.get('from'), 'to': edge.get('to'), 'duration_hours': round(edge_duration_hours(edge), 3)}
+                for edge in candidate['edges']
+            ],
+            'kpis': {name: round(value, 3) for name, value in denormalize_kpis(self.cache[key]).items()},
+            'changes': changes
+        }
+
+    def run(
+        self,
+        generations: int = 10,
+        beam_width: int = 16,
+        mutations_per_parent: int = 8,
+        max_front: int = 20
+    ) -> Iterator[Dict]:
+        """
+        Run the search, yielding a progress event per generation and a final result
+
+        Args:
+            generations: Number of generations
+            beam_width: Candidates kept per generation
+            mutations_per_parent: Children generated from each beam member
+            max_front: Maximum Pareto-front entries in the result
+
+        Yields:
+            {'type': 'progress', ...} after each generation, then {'type': 'result', ...}
+        """
+        start = time.perf_counter()
+        seed_candidate = {'activities': self.start_activities, 'edges': self.start_edges}
+        seed_candidate['key'] = candidate_key(seed_candidate['activities'], seed_candidate['edges'])
+        beam = [seed_candidate]
+        start_prediction = self._score(beam)[0]
+
+        for generation in range(1, generations + 1):
+            children = []
+            for parent in beam:
+                for _ in range(mutations_per_parent):
+                    child = self._mutate(parent)
+                    if child is not None:
+                        child['key'] = candidate_key(child['activities'], child['edges'])
+                        children.append(child)
+
+            pool = list({candidate['key']: candidate for candidate in beam + children}.values())
+            objectives = self._score(pool) * OBJECTIVE_SIGNS
+            beam = [pool[i] for i in select_survivors(objectives, beam_width)]
+
+            front_kpis = np.stack([self.cache[key] for key in self.front])
+            yield {
+                'type': 'progress',
+                'generation': generation,
+                'generations': generations,
+                'evaluated': self.evaluated,
+                'cache_hits': self.cache_hits,
+                'front_size': len(self.front),
+                'best': {
+                    name: round(float(denormalize_kpis(
+                        front_kpis[np.argmax(front_kpis[:, i] * OBJECTIVE_SIGNS[i])]
+                    )[name]), 3)
+                    for i, name in enumerate(KPI_NAMES)
+                },
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+            }
+
+        front_objectives = np.stack([self.cache[key] for key in self.front]) * OBJECTIVE_SIGNS
+        ordered = [self.front[i] for i in select_survivors(front_objectives, max_front)]
+
+        logger.info(
+            f"✓ Optimizer: {self.evaluated} candidates scored ({self.cache_hits} cache hits), "
+            f"Pareto front of {len(self.front)} in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+        yield {
+            'type': 'result',
+            'start_kpis': {name: round(value, 3) for name, value in denormalize_kpis(start_prediction).items()},
+            'front_size': len(self.front),
+            'front': [self.describe(key) for key in ordered],
+            'evaluated': self.evaluated,
+            'cache_hits': self.cache_hits,
+            'inference_ms': round(self.inference_ms, 1),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
@@ -4,6 +4,8 @@ from datetime import datetime
 from typing import Dict, Any, List, Tuple
 import numpy as np
 
+from stage_metrics import metrics
+
 class RealDataLoader:
     """
     Loader for the real O2C event log data from o2c_data_orders_only.xml
@@ -15,8 +17,10 @@ class RealDataLoader:
         self.df_events = None
         self.df_orders = None
         self.kpis = None
+        self._transition_durations = None
         self._load_data()
     
+    @metrics.timed('loader.load')
     def _load_data(self):
         """Load and parse the case-centric event log XML file."""
         print(f"Loading real O2C data from {self.data_file_path}...")
@@ -145,6 +149,7 @@ class RealDataLoader:
         print(f"   - Average order cost: ${self.kpis['order_cost']['mean_cost']:.2f}")
         print(f"   - Unique event types: {self.kpis['process_summary']['unique_event_types']}")
     
+    @metrics.timed('loader.get_event_kpis_for_activities')
     def get_event_kpis_for_activities(self, activities: List[str]) -> Dict[str, Dict[str, float]]:
         """
         Get KPIs (avg_time and cost) for a list of activities.
@@ -232,6 +237,7 @@ class RealDataLoader:
             return []
         return sorted(self.df_events['event_name'].unique().tolist())
     
+    @metrics.timed('loader.get_process_variants')
     def get_process_variants(self, top_n: int = 10) -> List[Dict[str, Any]]:
         """
         Get the most common process variants from the data.
@@ -259,6 +265,7 @@ class RealDataLoader:
         
         return result
     
+    @metrics.timed('loader.get_most_frequent_variant_activities')
     def get_most_frequent_variant_activities(self) -> List[str]:
         """
         Get the activity list of the most frequent variant.
@@ -274,6 +281,7 @@ class RealDataLoader:
             'Pack Items', 'Generate Shipping Label', 'Ship Order', 'Generate Invoice'
         ]
     
+    @metrics.timed('loader.get_process_flow_metrics')
     def get_process_flow_metrics(self) -> Dict[str, Any]:
         """
         Calculate process flow metrics including edge frequencies and timing.
@@ -331,6 +339,36 @@ class RealDataLoader:
             'unique_transitions': len(edge_metrics)
         }
     
+    @metrics.timed('loader.get_transition_durations')
+    def get_transition_durations(self) -> Dict[Tuple[str, str], np.ndarray]:
+        """
+        Get the observed durations (hours) of every transition in the event log.
+        A transition's duration is the time from one event to the next event of the
+        same order, matching the duration features the model was trained on.
+        Computed once and cached.
+        """
+        if self._transition_durations is not None:
+            return self._transition_durations
+        
+        if self.df_events.empty:
+            self._transition_durations = {}
+            return self._transition_durations
+        
+        # df_events is sorted by order and timestamp, so the previous row of the same
+        # order is the transition's source event
+        transitions = pd.DataFrame({
+            'from': self.df_events.groupby('order_id')['event_name'].shift(),
+            'to': self.df_events['event_name'],
+            'hours': self.df_events['time_diff_hours']
+        }).dropna()
+        
+        self._transition_durations = {
+            (from_activity, to_activity): group['hours'].to_numpy(dtype=np.float64)
+            for (from_activity, to_activity), group in transitions.groupby(['from', 'to'])
+        }
+        return self._transition_durations
+    
+    @metrics.timed('loader.get_sample_event_log')
     def get_sample_event_log(self, n_cases: int = 20) -> List[Dict[str, Any]]:
         """
         Get a sample of the event log for simulation.
@@ -358,6 +396,7 @@ class RealDataLoader:
         
         return event_log
     
+    @metrics.timed('loader.get_event_log_for_activities')
     def get_event_log_for_activities(self, activities: List[str], n_cases: int = 1, custom_kpis: Dict[str, Dict[str, float]] = None) -> pd.DataFrame:
         """
         Generate a simulated event log for the user's designed process.
@@ -422,6 +461,7 @@ class RealDataLoader:
         
         return pd.DataFrame(event_log)
     
+    @metrics.timed('loader.get_summary_stats')
     def get_summary_stats(self) -> Dict[str, Any]:
         """Get summary statistics about the dataset."""
         if self.df_events.empty or self.df_orders.empty:
@@ -437,6 +477,7 @@ class RealDataLoader:
             "order_statuses": self.df_orders['order_status'].value_counts().to_dict()
         }
     
+    @metrics.timed('loader.calculate_order_execution_times')
     def calculate_order_execution_times(self) -> Dict[str, float]:
         """
         Calculate and return baseline order execution time and cost metrics.
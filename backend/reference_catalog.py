@@ -0,0 +1,254 @@
+"""
+Reference Data Catalog
+Preloads the entity and order-level tables (users, items, suppliers, enriched orders, order
+KPIs, order users/items/suppliers, variant sample orders and contexts) once into an
+immutable, in-memory catalog: read-only column arrays plus id -> row mappings. Request
+handlers, the scene builder and the scenario generator share it instead of re-reading the
+CSV files on every call.
+
+The catalog is reloaded when the content key of its files changes (see
+dataset_fingerprint.FileSetKey); callers always get a complete catalog, never a partially
+reloaded one.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dataset_fingerprint import FileSetKey
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+
+# table name -> (file, id column, columns of an empty table when the file is missing)
+CATALOG_TABLES = {
+    'users': ('users.csv', 'user_id', ['user_id', 'name', 'role']),
+    'items': ('items.csv', 'item_id', ['item_id', 'name', 'category', 'unit_price', 'weight_kg', 'stock_status']),
+    'suppliers': ('suppliers.csv', 'supplier_id', ['supplier_id', 'name', 'country']),
+    'orders': ('orders_enriched.csv', 'order_id', ['order_id', 'order_value', 'order_status', 'num_items', 'total_quantity']),
+    'order_kpis': ('order_kpis.csv', 'order_id', ['order_id']),
+    'order_users': ('order_users.csv', 'order_id', ['order_id', 'user_id']),
+    'order_items': ('order_items.csv', 'order_id', ['order_id', 'item_id', 'quantity', 'unit_price', 'line_total']),
+    'order_suppliers': ('order_suppliers.csv', 'order_id', ['order_id', 'item_id', 'supplier_id']),
+    'variant_samples': ('variant_sample_orders.csv', 'variant_id', ['variant_id', 'sample_order_id', 'variant_name', 'frequency_percentage'])
+}
+VARIANT_CONTEXTS_FILE = 'variant_contexts.json'
+CATALOG_FILES = [file for file, _, _ in CATALOG_TABLES.values()] + [VARIANT_CONTEXTS_FILE]
+
+# Seconds between metadata checks of the catalog files
+CATALOG_CHECK_INTERVAL_S = 1.0
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+def _frozen_rows(df: pd.DataFrame) -> Tuple[Mapping[str, Any], ...]:
+    """Rows of a DataFrame as read-only mappings of native Python values"""
+    return tuple(MappingProxyType(row) for row in df.to_dict('records'))
+
+
+@dataclass(frozen=True)
+class EntityTable:
+    """
+    One table keyed by a unique id: read-only column arrays (in file order) and an
+    id -> row mapping
+    """
+    id_column: str
+    ids: np.ndarray
+    columns: Mapping[str, np.ndarray]
+    rows: Mapping[str, Mapping[str, Any]]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, id_column: str) -> 'EntityTable':
+        rows = _frozen_rows(df)
+        return cls(
+            id_column=id_column,
+            ids=_read_only(df[id_column].to_numpy(copy=True)),
+            columns=MappingProxyType({name: _read_only(df[name].to_numpy(copy=True)) for name in df.columns}),
+            rows=MappingProxyType({row[id_column]: row for row in rows})
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self.rows
+
+    def get(self, entity_id: str) -> Optional[Mapping[str, Any]]:
+        """Row of an id, or None"""
+        return self.rows.get(entity_id)
+
+    def frame(self) -> pd.DataFrame:
+        """The table as a new DataFrame"""
+        return pd.DataFrame({name: np.array(values) for name, values in self.columns.items()})
+
+
+def _group_rows(df: pd.DataFrame, key_column: str) -> Mapping[str, Tuple[Mapping[str, Any], ...]]:
+    """Rows of a one-to-many table grouped by key, in file order"""
+    groups: Dict[str, List[Mapping[str, Any]]] = {}
+    for row in _frozen_rows(df):
+        groups.setdefault(row[key_column], []).append(row)
+    return MappingProxyType({key: tuple(rows) for key, rows in groups.items()})
+
+
+@dataclass(frozen=True)
+class ReferenceCatalog:
+    """
+    Immutable snapshot of the reference data
+
+    Entity tables (users, items, suppliers, orders, order_kpis) are EntityTables keyed by
+    their id. The order link tables map order_id to its rows in file order, and variants
+    maps variant_id to its context from variant_contexts.json.
+    """
+    users: EntityTable
+    items: EntityTable
+    suppliers: EntityTable
+    orders: EntityTable
+    order_kpis: EntityTable
+    order_users: Mapping[str, Tuple[Mapping[str, Any], ...]]
+    order_items: Mapping[str, Tuple[Mapping[str, Any], ...]]
+    order_suppliers: Mapping[str, Tuple[Mapping[str, Any], ...]]
+    variant_samples: EntityTable
+    variants: Mapping[str, Mapping[str, Any]]
+    source_key: str
+    loaded_at: float
+
+    def order_user_ids(self, order_id: str) -> List[str]:
+        return [row['user_id'] for row in self.order_users.get(order_id, ())]
+
+    def order_supplier_ids(self, order_id: str) -> List[str]:
+        return [row['supplier_id'] for row in self.order_suppliers.get(order_id, ())]
+
+    def item_supplier_map(self, order_id: str) -> Dict[str, str]:
+        """item_id -> supplier_id for one order"""
+        return {row['item_id']: row['supplier_id'] for row in self.order_suppliers.get(order_id, ())}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'source_key': self.source_key,
+            'loaded_at': self.loaded_at,
+            'users': len(self.users),
+            'items': len(self.items),
+            'suppliers': len(self.suppliers),
+            'orders': len(self.orders),
+            'variants': len(self.variants)
+        }
+
+
+def build_catalog(
+    frames: Dict[str, pd.DataFrame],
+    variant_contexts: Optional[Dict] = None,
+    source_key: str = ''
+) -> ReferenceCatalog:
+    """
+    Build a catalog from DataFrames
+
+    Args:
+        frames: Table name (see CATALOG_TABLES) -> DataFrame; missing tables are empty
+        variant_contexts: Parsed variant_contexts.json ({'variants': [...]})
+        source_key: Content key of the source files
+
+    Returns:
+        ReferenceCatalog
+    """
+    tables = {
+        name: frames.get(name, pd.DataFrame(columns=empty_columns))
+        for name, (_, _, empty_columns) in CATALOG_TABLES.items()
+    }
+
+    def entity(name: str) -> EntityTable:
+        return EntityTable.from_frame(tables[name], CATALOG_TABLES[name][1])
+
+    variants = (variant_contexts or {}).get('variants', [])
+    return ReferenceCatalog(
+        users=entity('users'),
+        items=entity('items'),
+        suppliers=entity('suppliers'),
+        orders=entity('orders'),
+        order_kpis=entity('order_kpis'),
+        order_users=_group_rows(tables['order_users'], 'order_id'),
+        order_items=_group_rows(tables['order_items'], 'order_id'),
+        order_suppliers=_group_rows(tables['order_suppliers'], 'order_id'),
+        variant_samples=entity('variant_samples'),
+        variants=MappingProxyType({variant['variant_id']: MappingProxyType(variant) for variant in variants}),
+        source_key=source_key,
+        loaded_at=time.time()
+    )
+
+
+def load_catalog(data_dir: Path = DATA_DIR, source_key: str = '') -> ReferenceCatalog:
+    """
+    Read the catalog files (missing files give empty tables)
+
+    Args:
+        data_dir: Path to data directory
+        source_key: Content key of the files being read
+
+    Returns:
+        ReferenceCatalog
+    """
+    start = time.perf_counter()
+    frames = {}
+    for name, (file, _, _) in CATALOG_TABLES.items():
+        path = data_dir / file
+        if path.exists():
+            frames[name] = pd.read_csv(path)
+        else:
+            logger.warning(f"⚠️ {file} not found - '{name}' is empty in the reference catalog")
+
+    variant_contexts = None
+    contexts_path = data_dir / VARIANT_CONTEXTS_FILE
+    if contexts_path.exists():
+        with open(contexts_path, 'r') as f:
+            variant_contexts = json.load(f)
+
+    catalog = build_catalog(frames, variant_contexts, source_key)
+    logger.info(
+        f"✓ Loaded reference catalog: {len(catalog.users)} users, {len(catalog.items)} items, "
+        f"{len(catalog.suppliers)} suppliers, {len(catalog.orders)} orders "
+        f"({(time.perf_counter() - start) * 1000:.0f}ms)"
+    )
+    return catalog
+
+
+# data_dir -> (file key tracker, catalog)
+_catalogs: Dict[Path, Tuple[FileSetKey, ReferenceCatalog]] = {}
+_catalog_lock = threading.Lock()
+
+
+def get_reference_catalog(data_dir: Path = DATA_DIR) -> ReferenceCatalog:
+    """
+    Get the shared catalog of a data directory, loading it on first use and reloading it
+    when its files' content changed
+
+    Args:
+        data_dir: Path to data directory
+
+    Returns:
+        ReferenceCatalog (immutable; hold on to it for the duration of a request)
+    """
+    data_dir = Path(data_dir).resolve()
+    with _catalog_lock:
+        tracker, catalog = _catalogs.get(data_dir, (None, None))
+        if tracker is None:
+            tracker = FileSetKey(data_dir, CATALOG_FILES, CATALOG_CHECK_INTERVAL_S)
+        source_key = tracker.key()
+        if catalog is None or catalog.source_key != source_key:
+            if catalog is not None:
+                logger.info("🔄 Reference data changed - reloading catalog")
+            catalog = load_catalog(data_dir, source_key)
+            _catalogs[data_dir] = (tracker, catalog)
+        return catalog
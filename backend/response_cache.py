@@ -0,0 +1,185 @@
+"""
+Conditional Response Cache for Read-Only Data Endpoints
+Memoizes the serialized JSON of endpoints that only read the dataset (variants, flow
+metrics, data summary, sample orders), keyed by the fingerprint of the files each one is
+derived from. Responses carry a strong ETag (hash of the body) and Cache-Control, and a
+request whose If-None-Match matches is answered with 304 and no body.
+
+The key is revalidated from file metadata at most once per KPI_RESPONSE_CACHE_CHECK_S, and
+content is only rehashed when a file's size, mtime or inode changed (see
+dataset_fingerprint.FileSetKey), so a repeat call costs a dict lookup.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from compression import CONTENT_ENCODINGS, encoding_etag
+from dataset_fingerprint import FileSetKey
+from serialization import dumps
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds between metadata checks of an entry's source files
+CHECK_INTERVAL_S = float(os.getenv('KPI_RESPONSE_CACHE_CHECK_S', '1.0'))
+
+# Browser cache lifetime; 0 makes clients revalidate every poll (answered with 304)
+MAX_AGE_S = int(os.getenv('KPI_RESPONSE_MAX_AGE_S', '0'))
+
+
+def cache_control(max_age_s: int = MAX_AGE_S) -> str:
+    """Cache-Control header value for cached responses"""
+    if max_age_s <= 0:
+        return 'no-cache'
+    return f'public, max-age={max_age_s}'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against a strong ETag (weak comparison, RFC 9110 13.1.2)
+
+    The tags CompressionMiddleware gives the compressed representations ("<hash>-gzip",
+    "<hash>-br") match as well.
+
+    Args:
+        if_none_match: Header value ('*' or comma-separated entity tags), or None
+        etag: Quoted ETag of the current representation
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    current = {etag} | {encoding_etag(etag, encoding) for encoding in CONTENT_ENCODINGS}
+    return any(
+        tag.strip().removeprefix('W/') in current
+        for tag in if_none_match.split(',')
+    )
+
+
+@dataclass
+class CachedResponse:
+    """Serialized body of one endpoint and the source key it was built from"""
+    source_key: str
+    body: bytes
+    etag: str
+    built_ms: float
+
+
+class ResponseCache:
+    """
+    Per-endpoint memo of JSON response bodies with ETag / 304 handling
+
+    Each entry depends on a list of data files and is rebuilt when their content key changes.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        check_interval_s: float = CHECK_INTERVAL_S,
+        max_age_s: int = MAX_AGE_S
+    ):
+        """
+        Args:
+            data_dir: Path to data directory
+            check_interval_s: Seconds between metadata checks of an entry's files
+            max_age_s: Browser cache lifetime in Cache-Control (0: always revalidate)
+        """
+        self.data_dir = data_dir
+        self.check_interval_s = check_interval_s
+        self.cache_control = cache_control(max_age_s)
+
+        self._entries: Dict[str, CachedResponse] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._source_keys: Dict[Tuple[str, ...], FileSetKey] = {}
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    async def respond(
+        self,
+        request: Request,
+        name: str,
+        files: List[str],
+        build_fn: Callable[[], Awaitable]
+    ) -> Response:
+        """
+        Serve an endpoint from the cache, rebuilding it when its source files changed
+
+        Args:
+            request: Incoming request (for If-None-Match)
+            name: Cache entry name (one per endpoint)
+            files: Data files the response is derived from
+            build_fn: Coroutine function returning the JSON-serializable payload
+
+        Returns:
+            200 with the cached body, or 304 if the client's ETag is current
+        """
+        file_set = tuple(sorted(files))
+        if file_set not in self._source_keys:
+            self._source_keys[file_set] = FileSetKey(self.data_dir, list(file_set), self.check_interval_s)
+        tracker = self._source_keys[file_set]
+        source_key = tracker.current()
+        if source_key is None:
+            # First request or a changed file: hashing reads files, keep it off the event loop
+            source_key = await asyncio.get_running_loop().run_in_executor(None, tracker.compute)
+        entry = self._entries.get(name)
+        if entry is None or entry.source_key != source_key:
+            # One rebuild per entry; concurrent misses wait for it
+            lock = self._locks.setdefault(name, asyncio.Lock())
+            async with lock:
+                entry = self._entries.get(name)
+                if entry is None or entry.source_key != source_key:
+                    start = time.perf_counter()
+                    payload = await build_fn()
+                    body = dumps(jsonable_encoder(payload))
+                    entry = CachedResponse(
+                        source_key=source_key,
+                        body=body,
+                        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+                        built_ms=round((time.perf_counter() - start) * 1000, 2)
+                    )
+                    self._entries[name] = entry
+                    self.misses += 1
+                    logger.info(f"✓ Cached {name} ({len(body)} bytes, built in {entry.built_ms}ms)")
+                else:
+                    self.hits += 1
+        else:
+            self.hits += 1
+
+        headers = {'ETag': entry.etag, 'Cache-Control': self.cache_control}
+        if etag_matches(request.headers.get('if-none-match'), entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type='application/json', headers=headers)
+
+    def clear(self):
+        """Drop all cached bodies (they are rebuilt on the next request)"""
+        self._entries.clear()
+        self._source_keys.clear()
+
+    def get_stats(self) -> Dict:
+        """Hit / miss / 304 counts and the cached entries"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'entries': {
+                name: {'bytes': len(entry.body), 'etag': entry.etag, 'built_ms': entry.built_ms}
+                for name, entry in self._entries.items()
+            }
+        }
@@ -7,9 +7,11 @@ import numpy as np
 import pandas as pd
 import random
 import logging
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
 from pathlib import Path
 
+from reference_catalog import ReferenceCatalog, build_catalog, get_reference_catalog
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -36,41 +38,48 @@ class ScenarioGenerator:
             data_dir: Path to data directory
         """
         self.data_dir = data_dir
-        self.users_df: pd.DataFrame = None
-        self.items_df: pd.DataFrame = None
-        self.suppliers_df: pd.DataFrame = None
+        self._default_catalog: Optional[ReferenceCatalog] = None
         self._load_data()
     
     def _load_data(self):
-        """Load user, item, and supplier data"""
+        """Load user, item, and supplier data (shared reference catalog)"""
         try:
-            self.users_df = pd.read_csv(self.data_dir / 'users.csv')
-            self.items_df = pd.read_csv(self.data_dir / 'items.csv')
-            self.suppliers_df = pd.read_csv(self.data_dir / 'suppliers.csv')
+            catalog = get_reference_catalog(self.data_dir)
+            if not (len(catalog.users) and len(catalog.items) and len(catalog.suppliers)):
+                raise ValueError("users, items or suppliers table is empty")
             
-            logger.info(f"✓ Loaded {len(self.users_df)} users")
-            logger.info(f"✓ Loaded {len(self.items_df)} items")
-            logger.info(f"✓ Loaded {len(self.suppliers_df)} suppliers")
+            logger.info(f"✓ Loaded {len(catalog.users)} users")
+            logger.info(f"✓ Loaded {len(catalog.items)} items")
+            logger.info(f"✓ Loaded {len(catalog.suppliers)} suppliers")
         except Exception as e:
             logger.error(f"Failed to load entity data: {e}")
             # Create minimal defaults
-            self.users_df = pd.DataFrame({
-                'user_id': range(1, 8),
-                'name': [f'User {i}' for i in range(1, 8)],
-                'role': ['Admin', 'Sales', 'Finance', 'Warehouse', 'Shipping', 'Quality', 'Support']
-            })
-            self.items_df = pd.DataFrame({
-                'item_id': range(1, 25),
-                'name': [f'Item {i}' for i in range(1, 25)],
-                'category': ['Electronics'] * 6 + ['Office Supplies'] * 6 + ['Furniture'] * 6 + ['Others'] * 6,
-                'unit_price': [random.uniform(10, 500) for _ in range(24)]
-            })
-            self.suppliers_df = pd.DataFrame({
-                'supplier_id': range(1, 17),
-                'name': [f'Supplier {i}' for i in range(1, 17)]
+            self._default_catalog = build_catalog({
+                'users': pd.DataFrame({
+                    'user_id': [f'U{i:03d}' for i in range(1, 8)],
+                    'name': [f'User {i}' for i in range(1, 8)],
+                    'role': ['Admin', 'Sales', 'Finance', 'Warehouse', 'Shipping', 'Quality', 'Support']
+                }),
+                'items': pd.DataFrame({
+                    'item_id': [f'I{i:03d}' for i in range(1, 25)],
+                    'name': [f'Item {i}' for i in range(1, 25)],
+                    'category': ['Electronics'] * 6 + ['Office Supplies'] * 6 + ['Furniture'] * 6 + ['Others'] * 6,
+                    'unit_price': [random.uniform(10, 500) for _ in range(24)]
+                }),
+                'suppliers': pd.DataFrame({
+                    'supplier_id': [f'S{i:03d}' for i in range(1, 17)],
+                    'name': [f'Supplier {i}' for i in range(1, 17)]
+                })
             })
             logger.warning("Using default entity data")
     
+    @property
+    def catalog(self) -> ReferenceCatalog:
+        """Current reference catalog (reloaded by the shared catalog when the data changes)"""
+        if self._default_catalog is not None:
+            return self._default_catalog
+        return get_reference_catalog(self.data_dir)
+    
     def generate_scenario_entities(
         self,
         activities: List[str],
@@ -129,10 +138,11 @@ class ScenarioGenerator:
         selected_item_ids = [f'I{num:03d}' for num in item_nums]
         items_data = []
         order_value = 0.0
+        items_table = self.catalog.items
         
         for item_id in selected_item_ids:
             # Get item info
-            item_row = self.items_df[self.items_df['item_id'] == item_id].iloc[0]
+            item_row = items_table.rows[item_id]
             
             # Deterministic quantity (3-5, seeded by item_id)
             quantity = 3 + (hash(item_id) % 3)  # Always 3, 4, or 5
@@ -184,12 +194,13 @@ class ScenarioGenerator:
         Returns:
             Dict with detailed entity information
         """
+        catalog = self.catalog
+        
         # Get user details
         users_info = []
         for user_id in user_ids:
-            user_row = self.users_df[self.users_df['user_id'] == user_id]
-            if not user_row.empty:
-                user = user_row.iloc[0]
+            user = catalog.users.get(user_id)
+            if user is not None:
                 users_info.append({
                     'id': user_id,  # Keep as formatted string like 'U001'
                     'name': user['name'],
@@ -202,9 +213,8 @@ class ScenarioGenerator:
         # Get supplier details
         suppliers_info = []
         for supplier_id in supplier_ids:
-            supplier_row = self.suppliers_df[self.suppliers_df['supplier_id'] == supplier_id]
-            if not supplier_row.empty:
-                supplier = supplier_row.iloc[0]
+            supplier = catalog.suppliers.get(supplier_id)
+            if supplier is not None:
                 suppliers_info.append({
                     'id': supplier_id,  # Keep as formatted string like 'S001'
                     'name': supplier['name'],
@@ -274,26 +284,26 @@ class ScenarioGenerator:
         """Get user names by formatted IDs (e.g., 'U001')"""
         names = []
         for user_id in user_ids:
-            user_row = self.users_df[self.users_df['user_id'] == user_id]
-            if not user_row.empty:
-                names.append(user_row.iloc[0]['name'])
+            user = self.catalog.users.get(user_id)
+            if user is not None:
+                names.append(user['name'])
         return names
     
     def get_item_names(self, item_ids: List[str]) -> List[str]:
         """Get item names by formatted IDs (e.g., 'I001')"""
         names = []
         for item_id in item_ids:
-            item_row = self.items_df[self.items_df['item_id'] == item_id]
-            if not item_row.empty:
-                names.append(item_row.iloc[0]['name'])
+            item = self.catalog.items.get(item_id)
+            if item is not None:
+                names.append(item['name'])
         return names
     
     def get_supplier_names(self, supplier_ids: List[str]) -> List[str]:
         """Get supplier names by formatted IDs (e.g., 'S001')"""
         names = []
         for supplier_id in supplier_ids:
-            supplier_row = self.suppliers_df[self.suppliers_df['supplier_id'] == supplier_id]
-            if not supplier_row.empty:
-                names.append(supplier_row.iloc[0]['name'])
+            supplier = self.catalog.suppliers.get(supplier_id)
+            if supplier is not None:
+                names.append(supplier['name'])
         return names
 
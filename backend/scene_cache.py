@@ -0,0 +1,173 @@
+"""
+Content-Addressed Scene Cache for /api/sample
+Generated 3D scenes are stored under exports/scenes/ with a name derived from the case id,
+the content key of the data files the scene is built from and the scene builder version.
+A repeat request for the same case serves the existing file instead of recomputing
+positions, keyframes and item paths; a changed dataset or builder version gives a new name,
+so a browser never gets a stale scene under an old URL.
+
+Scene files, their precompressed siblings and their metadata are written atomically (temp
+file + rename), and concurrent requests for the same scene build it once.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from dataset_fingerprint import FileSetKey
+from reference_catalog import CATALOG_FILES
+from usd_builder import SCENE_BUILDER_VERSION, write_scene_file
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCENE_CACHE_ENABLED = os.getenv('KPI_SCENE_CACHE', '1') != '0'
+
+# Event log plus the reference tables a scene reads
+SCENE_SOURCE_FILES = ['o2c_data_orders_only.xml'] + CATALOG_FILES
+
+SCENE_DIR_NAME = 'scenes'
+SCENE_KEY_LENGTH = 16
+
+# Seconds between metadata checks of the source files
+CHECK_INTERVAL_S = float(os.getenv('KPI_SCENE_CACHE_CHECK_S', '1.0'))
+
+
+def scene_key(case_id: str, source_key: str, builder_version: int = SCENE_BUILDER_VERSION) -> str:
+    """Content address of a scene: hash of case id, data key and builder version"""
+    digest = hashlib.sha256(f'{case_id}\0{source_key}\0{builder_version}'.encode())
+    return digest.hexdigest()[:SCENE_KEY_LENGTH]
+
+
+class SceneCache:
+    """
+    Scene files keyed by (case_id, data fingerprint, builder version)
+
+    Entries are indexed in memory and found on disk after a restart via a metadata file
+    written after the scene itself.
+    """
+
+    def __init__(
+        self,
+        export_dir: Path,
+        data_dir: Path,
+        enabled: bool = SCENE_CACHE_ENABLED,
+        check_interval_s: float = CHECK_INTERVAL_S
+    ):
+        """
+        Args:
+            export_dir: Exports directory (served at /exports)
+            data_dir: Path to data directory
+            enabled: Serve existing scenes (False: always rebuild, env: KPI_SCENE_CACHE)
+            check_interval_s: Seconds between metadata checks of the source files
+        """
+        self.scene_dir = export_dir / SCENE_DIR_NAME
+        self.enabled = enabled
+        self._source_key = FileSetKey(data_dir, SCENE_SOURCE_FILES, check_interval_s)
+        self._source_lock = threading.Lock()
+
+        self._index: Dict[str, Tuple[Path, Dict[str, Any]]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.build_ms_total = 0.0
+
+    def source_key(self) -> str:
+        """Content key of the scene source files"""
+        with self._source_lock:
+            return self._source_key.key()
+
+    def _paths(self, case_id: str, key: str) -> Tuple[Path, Path]:
+        scene_path = self.scene_dir / f'{case_id}_{key}.json'
+        return scene_path, scene_path.with_name(f'{scene_path.stem}.meta.json')
+
+    def _load(self, case_id: str, key: str):
+        """Index entry from disk, or None if the scene is not complete on disk"""
+        scene_path, meta_path = self._paths(case_id, key)
+        if not (scene_path.exists() and meta_path.exists()):
+            return None
+        try:
+            with open(meta_path, 'r') as f:
+                return scene_path, json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Unreadable scene metadata {meta_path.name}: {e}")
+            return None
+
+    def _prune(self, case_id: str, key: str):
+        """Remove scenes (and their siblings) of the same case built from older data or builder versions"""
+        pattern = f'{case_id}_' + '?' * SCENE_KEY_LENGTH + '.*'
+        for path in self.scene_dir.glob(pattern):
+            if not path.name.startswith(f'{case_id}_{key}'):
+                path.unlink(missing_ok=True)
+
+    def get_or_build(
+        self,
+        case_id: str,
+        build_fn: Callable[[], Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> Tuple[Path, Dict[str, Any]]:
+        """
+        Path and metadata of a case's scene, building and writing it on a miss
+
+        Args:
+            case_id: Order ID
+            build_fn: Returns (scene_data, metadata) for the case
+
+        Returns:
+            Tuple of (scene file path, metadata)
+        """
+        key = scene_key(case_id, self.source_key())
+        if self.enabled:
+            entry = self._index.get(key)
+            if entry is not None and entry[0].exists():
+                self.hits += 1
+                return entry
+
+        with self._locks_lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if self.enabled:
+                entry = self._index.get(key)
+                if entry is not None and entry[0].exists():
+                    self.hits += 1
+                    return entry
+                entry = self._load(case_id, key)
+                if entry is not None:
+                    self._index[key] = entry
+                    self.disk_hits += 1
+                    return entry
+
+            start = time.perf_counter()
+            scene_data, metadata = build_fn()
+            scene_path, meta_path = self._paths(case_id, key)
+            write_scene_file(scene_data, scene_path)
+            write_scene_file(metadata, meta_path, precompress=False)  # Written last: marks the scene complete
+            self._prune(case_id, key)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            self._index[key] = (scene_path, metadata)
+            self.misses += 1
+            self.build_ms_total += build_ms
+            logger.info(f"✓ Built scene {scene_path.name} in {build_ms:.0f}ms")
+            return scene_path, metadata
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit / miss counts and the average build time"""
+        return {
+            'enabled': self.enabled,
+            'builder_version': SCENE_BUILDER_VERSION,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'avg_build_ms': round(self.build_ms_total / self.misses, 1) if self.misses else None,
+            'cached_scenes': len(self._index)
+        }
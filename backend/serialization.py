@@ -0,0 +1,76 @@
+"""
+Fast JSON Serialization
+Serializes API responses and scene files with orjson when it is installed (native NumPy
+arrays and scalars, datetimes, compact output), falling back to the standard library json
+module with NumpyEncoder. Both produce compact UTF-8 JSON, so cached bodies, ETags and
+scene files do not depend on which one is used beyond whitespace-free formatting.
+
+Select with KPI_JSON_BACKEND=auto|orjson|json (default: auto).
+"""
+
+import json
+import logging
+import os
+from typing import Any, Callable, Tuple
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JSON_BACKEND = os.getenv('KPI_JSON_BACKEND', 'auto')
+
+
+class NumpyEncoder(json.JSONEncoder):
+    """Custom JSON encoder for numpy types"""
+    def default(self, obj):
+        if isinstance(obj, (np.integer, np.int64)):
+            return int(obj)
+        elif isinstance(obj, (np.floating, np.float64)):
+            return float(obj)
+        elif isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return super(NumpyEncoder, self).default(obj)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, cls=NumpyEncoder).encode('utf-8')
+
+
+def resolve_backend(backend: str = JSON_BACKEND) -> Tuple[str, Callable[[Any], bytes]]:
+    """
+    Resolve a serializer name to (name, dumps function)
+
+    Args:
+        backend: 'auto' (orjson if installed), 'orjson' or 'json'
+
+    Returns:
+        Tuple of (backend name, function returning UTF-8 JSON bytes)
+    """
+    if backend not in ('auto', 'orjson', 'json'):
+        raise ValueError(f"Unknown JSON backend: {backend} (expected auto, orjson or json)")
+    if backend in ('auto', 'orjson'):
+        try:
+            import orjson
+            options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+            def _orjson_dumps(obj: Any) -> bytes:
+                return orjson.dumps(obj, default=NumpyEncoder().default, option=options)
+
+            return 'orjson', _orjson_dumps
+        except ImportError:
+            if backend == 'orjson':
+                logger.warning("⚠️ orjson not installed - falling back to json")
+    return 'json', _json_dumps
+
+
+BACKEND_NAME, dumps = resolve_backend()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast serializer"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -2,7 +2,6 @@ import networkx as nx
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, List, Optional
-import random
 
 class SimulationEngine:
     """
@@ -159,7 +158,7 @@ class SimulationEngine:
         
         # Adjust confidence based on complexity
         complexity_penalty = min(0.15, graph_metrics["node_count"] * 0.015)
-        confidence = confidence_base - complexity_penalty + random.uniform(-0.03, 0.03)
+        confidence = confidence_base - complexity_penalty
         confidence = max(0.35, min(0.92, confidence))  # Clamp between 0.35 and 0.92
         
         return {
@@ -0,0 +1,262 @@
+"""
+Per-Stage Latency Metrics
+Lightweight timing spans around the stages of request handling (entity generation, edge
+durations, feature extraction, scaling, prediction, baseline detection, summary; data loader
+queries, scene building, LLM calls, stage pool queueing), aggregated into fixed-bucket
+histograms labelled with the endpoint and stage, plus a request-latency histogram per
+endpoint. Exposed in the Prometheus text format at /metrics.
+
+The endpoint label is the route template (e.g. /api/session/info/{session_id}), taken from
+the request the span runs in - also inside the stage worker pools, which copy the request
+context. A span costs about a microsecond (two perf_counter calls, a dict lookup and a
+bisect under a lock), so the metrics stay on in production. KPI_STAGE_METRICS=0 turns the
+spans into no-ops.
+"""
+
+import bisect
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv('KPI_STAGE_METRICS', '1') != '0'
+
+# Upper bounds (seconds) of the histogram buckets, from sub-millisecond lookups to LLM calls
+LATENCY_BUCKETS_S = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+# Endpoint label outside of a request (startup, background tasks) and for unrouted requests
+NO_REQUEST_ENDPOINT = 'background'
+UNMATCHED_ENDPOINT = 'unmatched'
+
+# ASGI scope of the request being handled (its 'route' is set once routing matched)
+_request_scope: contextvars.ContextVar[Optional[Scope]] = contextvars.ContextVar('request_scope', default=None)
+
+
+def endpoint_label(scope: Scope) -> str:
+    """Route template of a request; mounted apps (e.g. /exports) as '<mount path>/*'"""
+    route = scope.get('route')
+    if route is not None:
+        return route.path
+    if 'endpoint' in scope:
+        return f"{scope.get('root_path', '')}/*"
+    return UNMATCHED_ENDPOINT
+
+
+def current_endpoint() -> str:
+    """Route template of the current request, or 'background'"""
+    scope = _request_scope.get()
+    if scope is None:
+        return NO_REQUEST_ENDPOINT
+    return endpoint_label(scope)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_S):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """Counts of observations <= each bucket bound, then the total (+Inf)"""
+        result, running = [], 0
+        for count in self.counts:
+            running += count
+            result.append(running)
+        return result
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels: str) -> str:
+    return ','.join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+
+
+class _Span:
+    """Times a `with` block into the registry"""
+    __slots__ = ('registry', 'stage', 'endpoint', 'start')
+
+    def __init__(self, registry: 'StageMetrics', stage: str, endpoint: Optional[str]):
+        self.registry = registry
+        self.stage = stage
+        self.endpoint = endpoint
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.stage, time.perf_counter() - self.start, self.endpoint)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class StageMetrics:
+    """Registry of stage and request latency histograms"""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, buckets: Tuple[float, ...] = LATENCY_BUCKETS_S):
+        """
+        Args:
+            enabled: Record spans (False: spans and observations are no-ops)
+            buckets: Histogram bucket upper bounds in seconds
+        """
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stages: Dict[Tuple[str, str], Histogram] = {}  # (endpoint, stage)
+        self._requests: Dict[Tuple[str, str], Histogram] = {}  # (endpoint, method)
+        self._responses: Dict[Tuple[str, str, int], int] = {}  # (endpoint, method, status)
+
+    def observe(self, stage: str, seconds: float, endpoint: Optional[str] = None):
+        """Record one stage duration (endpoint: the current request's route by default)"""
+        if not self.enabled:
+            return
+        key = (endpoint or current_endpoint(), stage)
+        with self._lock:
+            histogram = self._stages.get(key)
+            if histogram is None:
+                histogram = self._stages[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def span(self, stage: str, endpoint: Optional[str] = None):
+        """
+        Context manager timing a block as one observation of `stage`
+
+        Example:
+            with metrics.span('features'):
+                feature_vector = extract_features_from_scenario(...)
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, stage, endpoint)
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator timing every call of a function as `stage`"""
+        def decorator(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float):
+        """Record one request's latency and status"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._requests.get((endpoint, method))
+            if histogram is None:
+                histogram = self._requests[(endpoint, method)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            key = (endpoint, method, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def _render_histograms(self, name: str, help_text: str, histograms: Dict[Tuple, Histogram], label_names: Tuple[str, ...]) -> List[str]:
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        bounds = [repr(bound) for bound in self.buckets] + ['+Inf']
+        for key in sorted(histograms):
+            histogram = histograms[key]
+            labels = _labels(**dict(zip(label_names, key)))
+            for bound, count in zip(bounds, histogram.cumulative()):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return lines
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            lines = self._render_histograms(
+                'kpi_stage_duration_seconds',
+                'Duration of request handling stages.',
+                self._stages,
+                ('endpoint', 'stage')
+            )
+            lines += self._render_histograms(
+                'kpi_request_duration_seconds',
+                'End-to-end request latency.',
+                self._requests,
+                ('endpoint', 'method')
+            )
+            lines += ['# HELP kpi_requests_total Requests by endpoint, method and status.', '# TYPE kpi_requests_total counter']
+            for (endpoint, method, status), count in sorted(self._responses.items()):
+                lines.append(f'kpi_requests_total{{{_labels(endpoint=endpoint, method=method, status=status)}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Drop all recorded observations"""
+        with self._lock:
+            self._stages.clear()
+            self._requests.clear()
+            self._responses.clear()
+
+
+# Process-wide registry shared by main, the data loader, the scene builder and the LLM service
+metrics = StageMetrics()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording each request's latency and status under its route template,
+    and making the request visible to the spans it runs
+    """
+
+    def __init__(self, app: ASGIApp, registry: StageMetrics = metrics, exclude: Tuple[str, ...] = ('/metrics',)):
+        self.app = app
+        self.registry = registry
+        self.exclude = exclude
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or not self.registry.enabled or scope['path'] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_scope.set(scope)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_scope.reset(token)
+            self.registry.observe_request(endpoint_label(scope), scope['method'], status, time.perf_counter() - start)
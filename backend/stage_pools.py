@@ -0,0 +1,149 @@
+"""
+Per-Stage Worker Pools for API Handlers
+Runs the blocking stages of request handling (pandas queries, feature building and batched
+scoring, 3D scene export, Groq calls) in bounded thread pools, one per stage, so a slow
+stage only queues behind itself and the event loop keeps serving every other request.
+
+Pool sizes are set per stage with KPI_POOL_<STAGE>_WORKERS (e.g. KPI_POOL_LLM_WORKERS=16).
+KPI_STAGE_POOLS=0 runs every stage inline on the event loop, as before the pools existed
+(used as the baseline by benchmark_concurrency.py).
+
+Threads rather than processes: the stages read the in-memory data loader, session store
+and model bundle, which a process pool would have to pickle on every call. NumPy, pandas,
+TensorFlow and socket reads release the GIL for the expensive parts; forward passes can
+additionally be moved to worker processes with KPI_INFERENCE_WORKERS (see inference_pool.py).
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from stage_metrics import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default workers per stage
+DEFAULT_STAGE_WORKERS = {
+    'data': 4,       # pandas queries over the event log, CSV reads
+    'compute': max(2, os.cpu_count() or 1),  # feature building and batched scoring
+    'scene': 2,      # 3D scene generation and JSON export
+    'llm': 8,        # Groq HTTP calls (network-bound, mostly waiting)
+    'admin': 1       # model loads
+}
+
+STAGE_POOLS_ENABLED = os.getenv('KPI_STAGE_POOLS', '1') == '1'
+
+
+def stage_workers(stage: str) -> int:
+    """Configured pool size for a stage (KPI_POOL_<STAGE>_WORKERS, else the default)"""
+    return max(1, int(os.getenv(f'KPI_POOL_{stage.upper()}_WORKERS', str(DEFAULT_STAGE_WORKERS[stage]))))
+
+
+class StagePools:
+    """
+    One bounded ThreadPoolExecutor per handler stage
+
+    Calls beyond a pool's size wait in that pool's queue. Per-stage counts of running,
+    queued and completed calls are kept for the stats endpoint.
+    """
+
+    def __init__(self, sizes: Optional[Dict[str, int]] = None, enabled: bool = STAGE_POOLS_ENABLED):
+        """
+        Args:
+            sizes: Workers per stage (default: stage_workers for every stage)
+            enabled: False runs every call inline on the calling thread
+        """
+        self.sizes = sizes or {stage: stage_workers(stage) for stage in DEFAULT_STAGE_WORKERS}
+        self.enabled = enabled
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+        self._stats = {stage: {'submitted': 0, 'running': 0, 'completed': 0, 'failed': 0} for stage in self.sizes}
+
+        if enabled:
+            logger.info("✓ Stage pools: " + ', '.join(f"{stage}={size}" for stage, size in self.sizes.items()))
+        else:
+            logger.info("⚠️ Stage pools disabled (KPI_STAGE_POOLS=0) - handler stages run on the event loop")
+
+    def executor(self, stage: str) -> ThreadPoolExecutor:
+        """Executor of a stage (created on first use)"""
+        with self._lock:
+            if stage not in self._executors:
+                self._executors[stage] = ThreadPoolExecutor(
+                    max_workers=self.sizes[stage],
+                    thread_name_prefix=f'stage-{stage}'
+                )
+            return self._executors[stage]
+
+    def _tracked(self, stage: str, submitted_at: float, fn: Callable, *args, **kwargs):
+        metrics.observe(f'queue.{stage}', time.perf_counter() - submitted_at)
+        stats = self._stats[stage]
+        with self._lock:
+            stats['running'] += 1
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                stats['failed'] += 1
+            raise
+        finally:
+            with self._lock:
+                stats['running'] -= 1
+                stats['completed'] += 1
+        return result
+
+    async def run(self, stage: str, fn: Callable, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) in the stage's pool and await its result
+
+        Args:
+            stage: Pool name (see DEFAULT_STAGE_WORKERS)
+            fn: Blocking callable
+
+        Returns:
+            fn's return value (its exception is re-raised)
+        """
+        if stage not in self.sizes:
+            raise ValueError(f"Unknown stage '{stage}'. Use one of: {', '.join(self.sizes)}")
+        executor = self.executor(stage) if self.enabled else None
+        with self._lock:
+            self._stats[stage]['submitted'] += 1
+        if executor is None:
+            return self._tracked(stage, time.perf_counter(), fn, *args, **kwargs)
+        # Copy the request context into the worker, so its timing spans keep the endpoint label
+        call = functools.partial(
+            contextvars.copy_context().run, self._tracked, stage, time.perf_counter(), fn, *args, **kwargs
+        )
+        return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+    def get_stats(self) -> Dict:
+        """Per-stage pool size and call counts (queued = submitted but not yet started)"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'stages': {
+                    stage: {
+                        'workers': self.sizes[stage],
+                        'running': stats['running'],
+                        'queued': stats['submitted'] - stats['completed'] - stats['running'],
+                        'completed': stats['completed'],
+                        'failed': stats['failed']
+                    }
+                    for stage, stats in self._stats.items()
+                }
+            }
+
+    def shutdown(self):
+        """Stop all pools (queued calls are cancelled)"""
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
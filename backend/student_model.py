@@ -0,0 +1,528 @@
+"""
+Distilled Student Models for KPI Prediction
+Trains small students (a linear map, or one narrow hidden layer) to reproduce the KPI
+model's outputs, for interactive what-ifs that need predictions in microseconds. The
+teacher is queried over the real training scenarios plus synthetic perturbations of
+them and random process structures, the students are fitted to the teacher outputs,
+and an accuracy-versus-latency report compares every student with the teacher.
+Students are served with NumPy.
+
+Usage:
+    python student_model.py                          # distill linear, mlp16 and mlp32 + report
+    python student_model.py --architecture mlp32 --synthetic 50000
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from feature_extraction import (
+    ALL_EVENTS,
+    DURATION_SLICE,
+    USERS_SLICE,
+    ITEMS_SLICE,
+    SUPPLIERS_SLICE,
+    extract_features_from_scenario,
+    scale_feature_matrix
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Hidden layer widths per student architecture (no hidden layer: linear map)
+STUDENT_ARCHITECTURES = {
+    'linear': (),
+    'mlp16': (16,),
+    'mlp32': (32,)
+}
+
+# Student served for `predictor: "student"` requests
+DEFAULT_STUDENT = os.getenv('KPI_STUDENT_ARCHITECTURE', 'mlp32')
+
+STUDENT_REPORT_FILE = 'student_report.json'
+
+# Synthetic scenarios queried from the teacher on top of the real ones
+NUM_SYNTHETIC_SAMPLES = 20000
+
+# Spread of the log-normal factor applied to each observed edge duration
+DURATION_LOG_STD = 0.5
+
+# Chance that a synthetic scenario takes its users / items / suppliers from another order
+ENTITY_SWAP_PROBABILITY = 0.5
+
+# Share of the synthetic scenarios that are random process structures (the rest perturb
+# real orders). The event log has very few distinct structures, but what-if requests
+# add, remove and reorder activities freely.
+STRUCTURAL_FRACTION = 0.5
+
+# Flow the random structures are drawn from, in process order: the modeled events plus
+# the activities that only change the outcome features
+STRUCTURE_FLOW = [
+    'Receive Customer Order', 'Validate Customer Order', 'Perform Credit Check', 'Approve Order',
+    'Reject Order', 'Schedule Order Fulfillment', 'Generate Pick List', 'Pack Items',
+    'Generate Shipping Label', 'Ship Order', 'Process Return Request', 'Generate Invoice',
+    'Apply Discount', 'Receive Payment', 'Close Order', 'Cancel Order'
+]
+OPTIONAL_ACTIVITIES = ['Reject Order', 'Process Return Request', 'Apply Discount', 'Cancel Order']
+KEEP_PROBABILITY = 0.85
+OPTIONAL_PROBABILITY = 0.15
+
+KPI_NAMES = ['on_time_delivery', 'days_sales_outstanding', 'order_accuracy', 'invoice_accuracy', 'avg_cost_delivery']
+
+
+def student_model_path(models_dir: Path, architecture: str) -> Path:
+    """
+    Get the path of a distilled student's weights
+
+    Args:
+        models_dir: Bundle directory
+        architecture: One of STUDENT_ARCHITECTURES
+
+    Returns:
+        Path to the .npz file
+    """
+    return models_dir / f'kpi_student_{architecture}.npz'
+
+
+class StudentModel:
+    """
+    Small dense network evaluated with NumPy: ReLU hidden layers and a linear 5-unit head
+
+    Inputs are clipped to the range the student was distilled on. A student only agrees
+    with the teacher where it was fitted, and a feature far outside that range (e.g. a
+    duration slider moved well past anything observed) would otherwise be extrapolated
+    linearly.
+
+    Attributes:
+        scalers: Feature scalers of the teacher the student was distilled from (set by
+                 load_student; requests for the student are scaled with these)
+    """
+
+    def __init__(
+        self,
+        kernels: List[np.ndarray],
+        biases: List[np.ndarray],
+        input_min: np.ndarray,
+        input_max: np.ndarray,
+        architecture: str = 'custom'
+    ):
+        """
+        Args:
+            kernels: Layer kernels, the first one (417, H), the last one (H, 5)
+            biases: Layer biases
+            input_min: Smallest value of each scaled input during distillation
+            input_max: Largest value of each scaled input during distillation
+            architecture: Architecture name
+        """
+        self.kernels = [np.ascontiguousarray(k, dtype=np.float32) for k in kernels]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.input_min = np.asarray(input_min, dtype=np.float32)
+        self.input_max = np.asarray(input_max, dtype=np.float32)
+        self.architecture = architecture
+        self.scalers: Optional[Dict] = None
+
+    @property
+    def num_parameters(self) -> int:
+        return int(sum(k.size + b.size for k, b in zip(self.kernels, self.biases)))
+
+    def predict_batch(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Predict normalized KPIs
+
+        Args:
+            feature_matrix: Scaled feature matrix of shape (N, 417) or (417,)
+
+        Returns:
+            Array of shape (N, 5)
+        """
+        # Clip to the distillation range in place on a float32 copy (cheaper than np.clip)
+        h = np.array(feature_matrix, dtype=np.float32, ndmin=2)
+        np.minimum(h, self.input_max, out=h)
+        np.maximum(h, self.input_min, out=h)
+        for kernel, bias in zip(self.kernels[:-1], self.biases[:-1]):
+            h = np.maximum(h @ kernel + bias, 0.0)
+        return h @ self.kernels[-1] + self.biases[-1]
+
+    def save(self, path: Path):
+        arrays = {f'kernel_{i}': k for i, k in enumerate(self.kernels)}
+        arrays.update({f'bias_{i}': b for i, b in enumerate(self.biases)})
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                architecture=np.array(self.architecture),
+                input_min=self.input_min,
+                input_max=self.input_max,
+                **arrays
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> 'StudentModel':
+        with np.load(path, allow_pickle=False) as stored:
+            num_layers = sum(1 for name in stored.files if name.startswith('kernel_'))
+            return cls(
+                [stored[f'kernel_{i}'] for i in range(num_layers)],
+                [stored[f'bias_{i}'] for i in range(num_layers)],
+                stored['input_min'],
+                stored['input_max'],
+                architecture=str(stored['architecture'])
+            )
+
+
+def load_student(models_dir: Path, architecture: str = DEFAULT_STUDENT) -> Optional[StudentModel]:
+    """
+    Load a bundle's distilled student together with the scalers it expects
+
+    Args:
+        models_dir: Bundle directory
+        architecture: Student architecture
+
+    Returns:
+        StudentModel, or None if the bundle has no student of that architecture
+    """
+    from ml_model import load_scalers
+
+    path = student_model_path(models_dir, architecture)
+    if not path.exists():
+        return None
+    student = StudentModel.load(path)
+    student.scalers = load_scalers(models_dir)
+    return student
+
+
+def perturb_scenarios(X_raw: np.ndarray, num_samples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Synthetic scenarios around the real ones, in raw feature space
+
+    Each sample starts from a random real order. Its observed edge durations are scaled
+    by log-normal factors, and with ENTITY_SWAP_PROBABILITY each of its user, item and
+    supplier blocks is taken from another random order, so the teacher is also queried
+    on entity combinations that never occurred together.
+
+    Args:
+        X_raw: Raw feature matrix of real orders (N, 417)
+        num_samples: Synthetic scenarios to generate
+        rng: Random generator
+
+    Returns:
+        Raw feature matrix of shape (num_samples, 417)
+    """
+    synthetic = X_raw[rng.integers(len(X_raw), size=num_samples)].copy()
+
+    durations = synthetic[:, DURATION_SLICE]
+    factors = rng.lognormal(0.0, DURATION_LOG_STD, size=durations.shape)
+    synthetic[:, DURATION_SLICE] = np.where(durations > 0, durations * factors, durations)
+
+    for block in (USERS_SLICE, ITEMS_SLICE, SUPPLIERS_SLICE):
+        swap = rng.random(num_samples) < ENTITY_SWAP_PROBABILITY
+        donors = rng.integers(len(X_raw), size=int(swap.sum()))
+        synthetic[swap, block] = X_raw[donors, block]
+    return synthetic
+
+
+def typical_activity_hours(X_raw: np.ndarray) -> Dict[str, float]:
+    """Mean observed duration in hours of the edges leaving each event"""
+    durations = X_raw[:, DURATION_SLICE].reshape(len(X_raw), len(ALL_EVENTS), len(ALL_EVENTS))
+    hours = {}
+    for i, event in enumerate(ALL_EVENTS):
+        observed = durations[:, i, :][durations[:, i, :] > 0]
+        if len(observed):
+            hours[event] = float(observed.mean()) / 60
+    return hours
+
+
+def structural_scenarios(X_raw: np.ndarray, num_samples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Synthetic scenarios with random process structures, in raw feature space
+
+    Each sample keeps every activity of STRUCTURE_FLOW with KEEP_PROBABILITY (optional
+    activities with OPTIONAL_PROBABILITY), links them in flow order with log-normally
+    scaled typical durations, and takes its users, items and suppliers from a random
+    real order.
+
+    Args:
+        X_raw: Raw feature matrix of real orders (N, 417)
+        num_samples: Synthetic scenarios to generate
+        rng: Random generator
+
+    Returns:
+        Raw feature matrix of shape (num_samples, 417)
+    """
+    activity_hours = typical_activity_hours(X_raw)
+    mean_hours = float(np.mean(list(activity_hours.values()))) if activity_hours else 1.0
+    donors = rng.integers(len(X_raw), size=num_samples)
+
+    synthetic = np.empty((num_samples, X_raw.shape[1]))
+    for n in range(num_samples):
+        keep = rng.random(len(STRUCTURE_FLOW))
+        activities = [STRUCTURE_FLOW[0]] + [
+            name for name, draw in zip(STRUCTURE_FLOW[1:], keep[1:])
+            if draw < (OPTIONAL_PROBABILITY if name in OPTIONAL_ACTIVITIES else KEEP_PROBABILITY)
+        ]
+        edges = [
+            {'from': before, 'to': after,
+             'duration_hours': activity_hours.get(before, mean_hours) * rng.lognormal(0.0, DURATION_LOG_STD)}
+            for before, after in zip(activities, activities[1:])
+        ]
+        synthetic[n] = extract_features_from_scenario(activities, edges, [], [], [])
+
+    for block in (USERS_SLICE, ITEMS_SLICE, SUPPLIERS_SLICE):
+        synthetic[:, block] = X_raw[donors, block]
+    return synthetic
+
+
+def fit_student(
+    X: np.ndarray,
+    teacher_outputs: np.ndarray,
+    architecture: str,
+    seed: int = 42,
+    epochs: int = 200
+) -> StudentModel:
+    """
+    Fit a student to teacher outputs
+
+    Inputs are rescaled to [0, 1] over X for fitting, and the rescaling is folded into
+    the first kernel, so serving cost is unchanged. (The scaled features span very
+    different ranges and some are nearly constant in the event log, which rules out
+    fitting on them directly or on z-scores.) The linear student is solved in closed
+    form (ridge least squares); hidden-layer students are trained with Adam on the
+    squared error, with early stopping on 10% of the rows.
+
+    Args:
+        X: Scaled feature matrix (N, 417)
+        teacher_outputs: Teacher predictions (N, 5), normalized
+        architecture: One of STUDENT_ARCHITECTURES
+        seed: Training seed
+        epochs: Maximum epochs (hidden-layer students)
+
+    Returns:
+        Fitted StudentModel
+    """
+    input_min, input_max = X.min(axis=0), X.max(axis=0)
+    span = input_max - input_min
+    span[span == 0] = 1.0
+    X_unit = (X - input_min) / span
+
+    hidden_units = STUDENT_ARCHITECTURES[architecture]
+    if not hidden_units:
+        # Ridge on [X, 1]; the bias column is not penalized
+        design = np.hstack([X_unit, np.ones((len(X), 1))])
+        penalty = 1e-3 * np.eye(design.shape[1])
+        penalty[-1, -1] = 0.0
+        solution = np.linalg.solve(design.T @ design + penalty, design.T @ teacher_outputs)
+        kernels, biases = [solution[:-1]], [solution[-1]]
+    else:
+        from tensorflow import keras
+
+        keras.utils.set_random_seed(seed)
+        inputs = keras.Input(shape=(X.shape[1],))
+        h = inputs
+        for units in hidden_units:
+            h = keras.layers.Dense(units, activation='relu')(h)
+        outputs = keras.layers.Dense(teacher_outputs.shape[1])(h)
+        model = keras.Model(inputs, outputs)
+        model.compile(optimizer=keras.optimizers.Adam(learning_rate=3e-3), loss='mse')
+        model.fit(
+            X_unit.astype(np.float32),
+            teacher_outputs.astype(np.float32),
+            validation_split=0.1,
+            epochs=epochs,
+            batch_size=256,
+            callbacks=[
+                keras.callbacks.EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True),
+                keras.callbacks.ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=4, min_lr=1e-5)
+            ],
+            verbose=0
+        )
+        dense_layers = [layer for layer in model.layers if isinstance(layer, keras.layers.Dense)]
+        kernels = [layer.get_weights()[0] for layer in dense_layers]
+        biases = [layer.get_weights()[1] for layer in dense_layers]
+
+    # ((x - min) / span) @ W + b == x @ (W / span) + (b - (min / span) @ W)
+    biases[0] = biases[0] - (input_min / span) @ kernels[0]
+    kernels[0] = kernels[0] / span[:, None]
+    return StudentModel(kernels, biases, input_min, input_max, architecture)
+
+
+def _measure_latency_us(predict_fn: Callable, feature_matrix: np.ndarray, batch_size: int, repeats: int = 2000) -> Dict[str, float]:
+    """Measure p50/p99 latency (µs) of predict_fn at a given batch size"""
+    batch = np.ascontiguousarray(feature_matrix[:batch_size], dtype=np.float32)
+    predict_fn(batch)  # Warm-up
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_fn(batch)
+        timings.append((time.perf_counter() - start) * 1e6)
+
+    return {
+        'p50_us': round(float(np.percentile(timings, 50)), 1),
+        'p99_us': round(float(np.percentile(timings, 99)), 1)
+    }
+
+
+def _kpi_errors(predictions: np.ndarray, reference: np.ndarray) -> Dict[str, float]:
+    """Mean absolute error per KPI in denormalized KPI units"""
+    from ml_model import KPI_MULTIPLIERS
+
+    mae = (np.abs(predictions - reference) * np.asarray(KPI_MULTIPLIERS, dtype=np.float64)).mean(axis=0)
+    return {name: round(float(mae[i]), 4) for i, name in enumerate(KPI_NAMES)}
+
+
+def distill_students(
+    models_dir: Path,
+    architectures: List[str] = list(STUDENT_ARCHITECTURES),
+    num_synthetic: int = NUM_SYNTHETIC_SAMPLES,
+    seed: int = 42,
+    batch_sizes: List[int] = (1, 64)
+) -> Dict:
+    """
+    Distill students from a bundle's KPI model and report accuracy versus latency
+
+    The students never see the orders of the training test split (70/15/15, seed 42)
+    or scenarios derived from them; those orders measure each student's error against
+    the teacher and against the actual KPIs. Error against the teacher is also measured
+    on held-out perturbed and random-structure scenarios.
+
+    Args:
+        models_dir: Bundle directory with the trained model and scalers
+        architectures: Students to distill (saved as kpi_student_<architecture>.npz)
+        num_synthetic: Synthetic scenarios queried from the teacher
+        seed: Seed for the perturbations and training
+        batch_sizes: Batch sizes to measure latency at
+
+    Returns:
+        Report dictionary (also written to <models_dir>/student_report.json)
+    """
+    from sklearn.model_selection import train_test_split
+    from ensemble_model import StackedEnsemble
+    from ml_model import load_model_and_scalers, build_serving_function
+    from train_model import load_or_prepare_dataset
+
+    start = time.perf_counter()
+    model, scalers = load_model_and_scalers(models_dir)
+    teacher_fn = build_serving_function(model)
+    teacher_numpy = StackedEnsemble.from_members([model])
+
+    X_raw, y = load_or_prepare_dataset()
+    rows = np.arange(len(X_raw))
+    train_rows, rest_rows = train_test_split(rows, test_size=0.3, random_state=42)
+    _, test_rows = train_test_split(rest_rows, test_size=0.5, random_state=42)
+
+    rng = np.random.default_rng(seed)
+
+    def synthetic_scenarios(source_rows: np.ndarray, num_samples: int) -> np.ndarray:
+        num_structural = int(num_samples * STRUCTURAL_FRACTION)
+        return np.vstack([
+            perturb_scenarios(X_raw[source_rows], num_samples - num_structural, rng),
+            structural_scenarios(X_raw[source_rows], num_structural, rng)
+        ])
+
+    synthetic_raw = synthetic_scenarios(train_rows, num_synthetic)
+    num_held_out = max(num_synthetic // 20, 500)
+    held_out_perturbed = perturb_scenarios(X_raw[test_rows], num_held_out, rng)
+    held_out_structural = structural_scenarios(X_raw[test_rows], num_held_out, rng)
+
+    def scaled(raw: np.ndarray) -> np.ndarray:
+        return scale_feature_matrix(raw, scalers).astype(np.float32)
+
+    X_fit = np.vstack([scaled(X_raw[train_rows]), scaled(synthetic_raw)])
+    X_test = scaled(X_raw[test_rows])
+    X_perturbed, X_structural = scaled(held_out_perturbed), scaled(held_out_structural)
+    y_test = y[test_rows]
+
+    teacher_fit = teacher_fn(X_fit)
+    teacher_test = teacher_fn(X_test)
+    teacher_perturbed = teacher_fn(X_perturbed)
+    teacher_structural = teacher_fn(X_structural)
+    logger.info(f"✓ Queried the teacher on {len(train_rows)} real + {num_synthetic} synthetic scenarios")
+
+    report = {
+        'num_real_scenarios': int(len(train_rows)),
+        'num_synthetic_scenarios': int(num_synthetic),
+        'num_held_out_scenarios': int(2 * num_held_out),
+        'num_test_orders': int(len(test_rows)),
+        'teacher': {
+            'num_parameters': int(model.count_params()),
+            'test_mae_vs_actual': _kpi_errors(teacher_test, y_test),
+            'latency_keras': {str(bs): _measure_latency_us(teacher_fn, X_test, bs, repeats=500) for bs in batch_sizes},
+            'latency_numpy': {str(bs): _measure_latency_us(teacher_numpy.predict_batch, X_test, bs) for bs in batch_sizes}
+        },
+        'students': {}
+    }
+
+    for architecture in architectures:
+        fit_start = time.perf_counter()
+        student = fit_student(X_fit, teacher_fit, architecture, seed=seed)
+        fit_seconds = time.perf_counter() - fit_start
+        student.save(student_model_path(models_dir, architecture))
+
+        report['students'][architecture] = {
+            'num_parameters': student.num_parameters,
+            'fit_seconds': round(fit_seconds, 2),
+            'test_mae_vs_actual': _kpi_errors(student.predict_batch(X_test), y_test),
+            'test_mae_vs_teacher': _kpi_errors(student.predict_batch(X_test), teacher_test),
+            'perturbed_mae_vs_teacher': _kpi_errors(student.predict_batch(X_perturbed), teacher_perturbed),
+            'structural_mae_vs_teacher': _kpi_errors(student.predict_batch(X_structural), teacher_structural),
+            'latency': {str(bs): _measure_latency_us(student.predict_batch, X_test, bs) for bs in batch_sizes}
+        }
+        logger.info(f"✓ Distilled {architecture} ({student.num_parameters} parameters) in {fit_seconds:.1f}s")
+
+    report['seconds'] = round(time.perf_counter() - start, 1)
+    with open(models_dir / STUDENT_REPORT_FILE, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"✓ Saved student report to {models_dir / STUDENT_REPORT_FILE}")
+    return report
+
+
+def log_report(report: Dict):
+    """Log a compact accuracy-versus-latency table of a distillation report"""
+    def mean(errors: Dict[str, float]) -> float:
+        return float(np.mean(list(errors.values())))
+
+    logger.info("=" * 80)
+    logger.info(f"STUDENTS vs TEACHER ({report['num_test_orders']} test orders, "
+                f"{report['num_held_out_scenarios']} held-out scenarios, mean MAE in KPI units)")
+    logger.info("=" * 80)
+    logger.info(f"{'model':<14} {'params':>8} {'bs=1 p50':>10} {'bs=64 p50':>10} "
+                f"{'vs actual':>10} {'vs teacher':>11} {'perturbed':>10} {'structure':>10}")
+
+    teacher = report['teacher']
+    for name, latency in (('teacher keras', teacher['latency_keras']), ('teacher numpy', teacher['latency_numpy'])):
+        logger.info(
+            f"{name:<14} {teacher['num_parameters']:>8} {latency['1']['p50_us']:>8.1f}µs "
+            f"{latency.get('64', {}).get('p50_us', float('nan')):>8.1f}µs "
+            f"{mean(teacher['test_mae_vs_actual']):>10.3f} {'-':>11} {'-':>10} {'-':>10}"
+        )
+    for architecture, info in report['students'].items():
+        latency = info['latency']
+        logger.info(
+            f"{architecture:<14} {info['num_parameters']:>8} {latency['1']['p50_us']:>8.1f}µs "
+            f"{latency.get('64', {}).get('p50_us', float('nan')):>8.1f}µs "
+            f"{mean(info['test_mae_vs_actual']):>10.3f} {mean(info['test_mae_vs_teacher']):>11.3f} "
+            f"{mean(info['perturbed_mae_vs_teacher']):>10.3f} {mean(info['structural_mae_vs_teacher']):>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distill small student models from the KPI model")
+    parser.add_argument('--architecture', choices=list(STUDENT_ARCHITECTURES), action='append',
+                        help="Student architecture (repeatable, default: all)")
+    parser.add_argument('--synthetic', type=int, default=NUM_SYNTHETIC_SAMPLES,
+                        help="Synthetic scenarios to query the teacher on")
+    parser.add_argument('--models-dir', type=Path, default=Path(__file__).parent / 'trained_models',
+                        help="Bundle directory (default: the base model)")
+    args = parser.parse_args()
+
+    report = distill_students(
+        args.models_dir,
+        architectures=args.architecture or list(STUDENT_ARCHITECTURES),
+        num_synthetic=args.synthetic
+    )
+    log_report(report)
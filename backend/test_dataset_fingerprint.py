@@ -0,0 +1,144 @@
+"""
+Test script for the dataset manifest (runs without a server)
+Checks that the manifest rehashes exactly the files that may have changed, so a stale
+model is never served for changed data, and that legacy_hash reproduces the dataset hash
+written by models trained before the manifest existed.
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from dataset_fingerprint import DATASET_FILES, DatasetManifest
+
+HOUR_NS = 3600 * 1_000_000_000
+
+
+def reference_dataset_hash(data_dir: Path) -> str:
+    """The former ml_model.calculate_dataset_hash: SHA-256 over the concatenated files"""
+    digest = hashlib.sha256()
+    for filename in sorted(DATASET_FILES):
+        filepath = data_dir / filename
+        if filepath.exists():
+            with open(filepath, 'rb') as f:
+                for chunk in iter(lambda: f.read(4096), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_dataset(data_dir: Path, age_ns: int = 0):
+    """Small stand-in data files, with mtimes age_ns in the past"""
+    for i, name in enumerate(DATASET_FILES):
+        path = data_dir / name
+        path.write_bytes(f'{name}\n'.encode() + bytes(range(256)) * (i + 1))
+        if age_ns:
+            mtime_ns = time.time_ns() - age_ns
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def report(ok: bool, description: str) -> bool:
+    print(f"{'✅ PASS' if ok else '❌ FAIL'}: {description}")
+    return ok
+
+
+def check_racy_rewrite(data_dir: Path):
+    """A same-size rewrite keeping size, mtime and inode is caught inside the racy window"""
+    write_dataset(data_dir)
+    first = DatasetManifest(data_dir)
+    before = first.file_hashes()['users.csv']
+
+    path = data_dir / 'users.csv'
+    stat = path.stat()
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    with open(path, 'r+b') as f:  # In place: same inode
+        f.write(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))  # Same timestamp tick
+    same_metadata = (path.stat().st_size, path.stat().st_mtime_ns, path.stat().st_ino) == (
+        stat.st_size, stat.st_mtime_ns, stat.st_ino
+    )
+
+    second = DatasetManifest(data_dir)
+    after = second.file_hashes()['users.csv']
+    return [
+        report(same_metadata, "rewrite kept size, mtime_ns and inode"),
+        report('users.csv' in second.rehashed, "file modified within the racy window is rehashed"),
+        report(after != before, "rehashed content gives a new hash"),
+        report(second.fingerprint() != first.fingerprint(), "fingerprint changes")
+    ]
+
+
+def check_unchanged(data_dir: Path):
+    """Old files are not reread; a touched but unchanged file keeps its hash"""
+    write_dataset(data_dir, age_ns=HOUR_NS)
+    first = DatasetManifest(data_dir)
+    fingerprint = first.fingerprint()
+    before = first.file_hashes()['items.csv']
+
+    second = DatasetManifest(data_dir)
+    results = [
+        report(second.fingerprint() == fingerprint and not second.rehashed, "unchanged files are not rehashed")
+    ]
+
+    path = data_dir / 'items.csv'
+    os.utime(path, ns=(time.time_ns(), time.time_ns()))
+    third = DatasetManifest(data_dir)
+    after = third.file_hashes()['items.csv']
+    results += [
+        report(third.rehashed == ['items.csv'], "touched file is rehashed (and only that one)"),
+        report(after == before, "touched but unchanged file keeps its hash"),
+        report(third.fingerprint() == fingerprint, "fingerprint unchanged after touch")
+    ]
+    return results
+
+
+def check_legacy_hash(data_dir: Path, manifest_path: Path, description: str):
+    """legacy_hash equals the former calculate_dataset_hash, also when served from the manifest"""
+    expected = reference_dataset_hash(data_dir)
+    computed = DatasetManifest(data_dir, manifest_path=manifest_path).legacy_hash()
+    cached = DatasetManifest(data_dir, manifest_path=manifest_path)
+    return [
+        report(computed == expected, f"legacy_hash matches the old dataset hash ({description})"),
+        report(cached.matches(expected), f"a model stored with the old hash still matches ({description})")
+    ]
+
+
+def main():
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        print(f"\n{'='*80}")
+        print("TEST: Same-size rewrite within the racy window")
+        print(f"{'='*80}")
+        (tmp / 'racy').mkdir()
+        results += check_racy_rewrite(tmp / 'racy')
+
+        print(f"\n{'='*80}")
+        print("TEST: Unchanged and touched files")
+        print(f"{'='*80}")
+        (tmp / 'touched').mkdir()
+        results += check_unchanged(tmp / 'touched')
+
+        print(f"\n{'='*80}")
+        print("TEST: Legacy dataset hash")
+        print(f"{'='*80}")
+        (tmp / 'legacy').mkdir()
+        write_dataset(tmp / 'legacy', age_ns=HOUR_NS)
+        (tmp / 'legacy' / 'order_kpis.csv').unlink()  # Missing files are skipped, as before
+        results += check_legacy_hash(tmp / 'legacy', tmp / 'legacy' / 'manifest.json', "sample files")
+
+        data_dir = Path(__file__).parent.parent / 'data'
+        if data_dir.exists():
+            results += check_legacy_hash(data_dir, tmp / 'data_manifest.json', "data/")
+
+    passed = sum(results)
+    print(f"\n{passed}/{len(results)} checks passed")
+    if passed != len(results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Test script for the micro-batching queue (runs without a server)
+Checks that a failing predict function surfaces its error to the waiting requests, that
+the batcher keeps serving requests afterwards, and that batches run in (and are counted by)
+the compute stage pool it is given.
+"""
+import asyncio
+import functools
+import sys
+import threading
+import time
+
+import numpy as np
+
+from micro_batcher import MicroBatcher
+from stage_pools import StagePools
+
+
+def double(features):
+    return features * 2
+
+
+def failing(features):
+    raise RuntimeError("model unavailable")
+
+
+def slow(features):
+    time.sleep(0.2)
+    return features * 2
+
+
+def wrong_row_count(features):
+    return features[:1]
+
+
+def thread_name(features):
+    return np.full((len(features), 1), threading.current_thread().name, dtype=object)
+
+
+async def expect_error(batcher, vector, fn, message):
+    try:
+        await asyncio.wait_for(batcher.predict(vector, fn), timeout=5)
+    except asyncio.TimeoutError:
+        print(f"❌ FAIL: request hung instead of raising '{message}'")
+        return False
+    except Exception as e:
+        ok = message in str(e)
+        print(f"{'✅ PASS' if ok else '❌ FAIL'}: error surfaced to caller ({type(e).__name__}: {e})")
+        return ok
+    print(f"❌ FAIL: expected an error containing '{message}'")
+    return False
+
+
+async def expect_result(batcher, vector, description):
+    try:
+        result = await asyncio.wait_for(batcher.predict(vector), timeout=5)
+    except Exception as e:
+        print(f"❌ FAIL: {description} raised {type(e).__name__}: {e}")
+        return False
+    ok = np.allclose(result, np.asarray(vector) * 2)
+    print(f"{'✅ PASS' if ok else '❌ FAIL'}: {description} -> {result.tolist()}")
+    return ok
+
+
+async def gather_outcomes(requests):
+    """Results or exceptions of concurrent requests (None if they hang)"""
+    try:
+        return await asyncio.wait_for(asyncio.gather(*list(requests), return_exceptions=True), timeout=5)
+    except asyncio.TimeoutError:
+        print("❌ FAIL: requests hung")
+        return None
+
+
+async def run_checks():
+    batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=5)
+    results = []
+
+    print(f"\n{'='*80}")
+    print("TEST: Raising predict function")
+    print(f"{'='*80}")
+    results.append(await expect_error(batcher, [1.0, 2.0], failing, "model unavailable"))
+    results.append(await expect_result(batcher, [3.0, 4.0], "next request after the failure"))
+
+    print(f"\n{'='*80}")
+    print("TEST: Concurrent requests, one failing function")
+    print(f"{'='*80}")
+    outcomes = await gather_outcomes(
+        batcher.predict([float(i), 1.0], failing if i % 2 else None) for i in range(6)
+    )
+    ok = outcomes is not None and all(
+        isinstance(outcome, RuntimeError) if i % 2 else np.allclose(outcome, [2.0 * i, 2.0])
+        for i, outcome in enumerate(outcomes)
+    )
+    print(f"{'✅ PASS' if ok else '❌ FAIL'}: failing rows raise, other rows are served")
+    results.append(ok)
+
+    print(f"\n{'='*80}")
+    print("TEST: Malformed batch and predict output")
+    print(f"{'='*80}")
+    mixed = [batcher.predict([1.0, 2.0]), batcher.predict([1.0, 2.0, 3.0])]
+    outcomes = await gather_outcomes(mixed)
+    ok = outcomes is not None and any(isinstance(outcome, Exception) for outcome in outcomes)
+    print(f"{'✅ PASS' if ok else '❌ FAIL'}: mismatched feature lengths raise instead of stalling the runner")
+    results.append(ok)
+    results.append(await expect_result(batcher, [5.0, 6.0], "next request after the malformed batch"))
+
+    outcomes = await gather_outcomes(batcher.predict([1.0, 2.0], wrong_row_count) for _ in range(3))
+    ok = outcomes is not None and all(isinstance(outcome, ValueError) for outcome in outcomes)
+    print(f"{'✅ PASS' if ok else '❌ FAIL'}: wrong number of prediction rows raises")
+    results.append(ok)
+    results.append(await expect_result(batcher, [7.0, 8.0], "next request after the short output"))
+
+    print(f"\n{'='*80}")
+    print("TEST: Close with queued requests")
+    print(f"{'='*80}")
+    pending = [asyncio.ensure_future(batcher.predict([float(i), 1.0], slow)) for i in range(3)]
+    await asyncio.sleep(0.05)  # First request in flight, the others queued
+    await batcher.close()
+    outcomes = await gather_outcomes(pending)
+    ok = outcomes is not None and all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    print(f"{'✅ PASS' if ok else '❌ FAIL'}: in-flight and queued requests fail on close")
+    results.append(ok)
+    results.append(await expect_result(batcher, [2.0, 2.0], "request after close (runner restarts)"))
+    await batcher.close()
+
+    print(f"\n{'='*80}")
+    print("TEST: Batches run in the compute stage pool")
+    print(f"{'='*80}")
+    pools = StagePools(sizes={'compute': 2}, enabled=True)
+    pooled = MicroBatcher(double, max_batch_size=8, max_wait_ms=5, run_batch=functools.partial(pools.run, 'compute'))
+    outcomes = await gather_outcomes(pooled.predict([float(i), 1.0], thread_name) for i in range(6))
+    ok = outcomes is not None and all(str(outcome[0]).startswith('stage-compute') for outcome in outcomes)
+    print(f"{'✅ PASS' if ok else '❌ FAIL'}: forward passes run on the compute pool's threads")
+    results.append(ok)
+    results.append(await expect_error(pooled, [1.0, 2.0], failing, "model unavailable"))
+    results.append(await expect_result(pooled, [3.0, 4.0], "pooled request after the failure"))
+    compute = pools.get_stats()['stages']['compute']
+    ok = compute['completed'] == pooled.total_batches and compute['failed'] == 1
+    print(f"{'✅ PASS' if ok else '❌ FAIL'}: stage stats count every batch "
+          f"({compute['completed']} completed, {compute['failed']} failed, {pooled.total_batches} batches)")
+    results.append(ok)
+    await pooled.close()
+    pools.shutdown()
+
+    return results
+
+
+def main():
+    results = asyncio.run(run_checks())
+    passed = sum(results)
+    print(f"\n{passed}/{len(results)} checks passed")
+    if passed != len(results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,404 @@
+"""
+TFLite Model Variant for KPI Prediction
+Converts the Keras KPI model into a quantized TFLite flatbuffer for low-latency CPU serving,
+and reports accuracy / latency / memory of each variant against the full model.
+
+Usage:
+    python tflite_model.py                       # convert float16, dynamic and int8 + report
+    python tflite_model.py --quantization float16
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from feature_extraction import TOTAL_FEATURE_DIM
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Supported quantization modes
+#   float16: weights stored as float16, compute in float32
+#   dynamic: dynamic-range int8 weights, activations quantized on the fly
+#   int8:    int8 weights and activations, calibrated on the training feature matrix
+QUANTIZATION_MODES = ['float16', 'dynamic', 'int8']
+
+KPI_OUTPUT_NAMES = [
+    'on_time_delivery',
+    'days_sales_outstanding',
+    'order_accuracy',
+    'invoice_accuracy',
+    'avg_cost_delivery'
+]
+
+# Number of calibration rows fed to the int8 converter
+NUM_CALIBRATION_SAMPLES = 500
+
+
+def tflite_model_path(models_dir: Path, quantization: str) -> Path:
+    """
+    Get the path of the TFLite flatbuffer for a quantization mode
+
+    Args:
+        models_dir: Directory containing saved models
+        quantization: One of QUANTIZATION_MODES
+
+    Returns:
+        Path to the .tflite file
+    """
+    return models_dir / f'kpi_prediction_model_{quantization}.tflite'
+
+
+def convert_to_tflite(
+    model,
+    quantization: str = 'float16',
+    calibration_features: Optional[np.ndarray] = None
+) -> bytes:
+    """
+    Convert a Keras KPI model into a quantized TFLite flatbuffer
+
+    The model is exported through a serving signature with a dynamic batch dimension and
+    named outputs, so the flatbuffer can be served at any batch size and the outputs
+    can be mapped back to KPI names independent of tensor ordering.
+
+    Args:
+        model: Trained Keras model
+        quantization: One of QUANTIZATION_MODES
+        calibration_features: Scaled training feature matrix (required for 'int8')
+
+    Returns:
+        Serialized TFLite flatbuffer
+    """
+    import tempfile
+    import tensorflow as tf
+    from tensorflow import keras
+
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode: {quantization} (expected one of {QUANTIZATION_MODES})")
+
+    input_dim = model.input_shape[-1]
+
+    def serve(process_features):
+        outputs = model(process_features, training=False)
+        return {name: output for name, output in zip(KPI_OUTPUT_NAMES, outputs)}
+
+    # Export through a SavedModel so variables are frozen and the signature keeps named outputs
+    with tempfile.TemporaryDirectory(prefix='kpi_tflite_export_') as export_dir:
+        archive = keras.export.ExportArchive()
+        archive.track(model)
+        archive.add_endpoint(
+            name='serving_default',
+            fn=serve,
+            input_signature=[tf.TensorSpec([None, input_dim], tf.float32, name='process_features')]
+        )
+        archive.write_out(export_dir)
+
+        converter = tf.lite.TFLiteConverter.from_saved_model(export_dir)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+        if quantization == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+        elif quantization == 'int8':
+            if calibration_features is None or len(calibration_features) == 0:
+                raise ValueError("int8 quantization requires calibration_features")
+
+            rng = np.random.default_rng(42)
+            sample_size = min(NUM_CALIBRATION_SAMPLES, len(calibration_features))
+            sample_idx = rng.choice(len(calibration_features), size=sample_size, replace=False)
+            calibration_rows = calibration_features[sample_idx].astype(np.float32)
+
+            def representative_dataset():
+                for row in calibration_rows:
+                    yield [row.reshape(1, -1)]
+
+            converter.representative_dataset = representative_dataset
+
+        flatbuffer = converter.convert()
+
+    logger.info(f"✓ Converted model to TFLite ({quantization}): {len(flatbuffer) / 1024:.1f} KB")
+    return flatbuffer
+
+
+def save_tflite_model(flatbuffer: bytes, models_dir: Path, quantization: str) -> Path:
+    """
+    Save a TFLite flatbuffer next to the Keras model
+
+    Args:
+        flatbuffer: Serialized TFLite model
+        models_dir: Directory to save models
+        quantization: Quantization mode used for the conversion
+
+    Returns:
+        Path to the saved file
+    """
+    models_dir.mkdir(exist_ok=True)
+    path = tflite_model_path(models_dir, quantization)
+    with open(path, 'wb') as f:
+        f.write(flatbuffer)
+    logger.info(f"✓ Saved TFLite model to {path}")
+    return path
+
+
+def _load_interpreter_class():
+    """Prefer a standalone runtime (LiteRT / tflite_runtime), fall back to full TensorFlow"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteKPIModel:
+    """
+    Serves a TFLite KPI flatbuffer on CPU
+    """
+    def __init__(self, model_path: Path, num_threads: Optional[int] = None):
+        """
+        Load a TFLite flatbuffer
+
+        Args:
+            model_path: Path to the .tflite file
+            num_threads: Number of CPU threads for the interpreter (default: runtime choice)
+        """
+        Interpreter = _load_interpreter_class()
+        self.model_path = Path(model_path)
+        self.interpreter = Interpreter(model_path=str(self.model_path), num_threads=num_threads)
+        self.runner = self.interpreter.get_signature_runner()
+        logger.info(f"✓ Loaded TFLite model from {self.model_path}")
+
+    def predict_batch(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Predict normalized KPIs for a batch of feature vectors
+
+        Args:
+            feature_matrix: Scaled feature matrix of shape (N, 417) or (417,)
+
+        Returns:
+            Array of shape (N, 5) with normalized KPI values
+        """
+        feature_matrix = np.asarray(feature_matrix, dtype=np.float32)
+        if feature_matrix.ndim == 1:
+            feature_matrix = feature_matrix.reshape(1, -1)
+
+        outputs = self.runner(process_features=feature_matrix)
+        return np.concatenate([outputs[name].reshape(-1, 1) for name in KPI_OUTPUT_NAMES], axis=1)
+
+
+def _measure_latency(predict_fn, feature_matrix: np.ndarray, batch_size: int, repeats: int = 200) -> Dict[str, float]:
+    """Measure p50/p99 latency (ms) of predict_fn at a given batch size"""
+    batch = feature_matrix[:batch_size]
+    predict_fn(batch)  # Warm-up
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_fn(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 4),
+        'p99_ms': round(float(np.percentile(timings, 99)), 4)
+    }
+
+
+def _current_rss_mb() -> float:
+    """Current resident set size of this process in MB (/proc on Linux, else peak RSS)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _probe_deployment_rss(kind: str, model_path: str) -> Dict[str, float]:
+    """
+    Load one deployment and run a single prediction (meant for a fresh interpreter)
+
+    Args:
+        kind: 'keras' (model_path: models directory) or 'tflite' (model_path: .tflite file)
+        model_path: Path of the model to load
+
+    Returns:
+        Dict with the RSS before loading and after the first prediction (MB)
+    """
+    baseline = _current_rss_mb()
+    batch = np.zeros((1, TOTAL_FEATURE_DIM), dtype=np.float32)
+    if kind == 'keras':
+        from ml_model import load_model_and_scalers
+        model, _ = load_model_and_scalers(Path(model_path))
+        model(batch, training=False)
+    else:
+        TFLiteKPIModel(Path(model_path)).predict_batch(batch)
+    return {'baseline_mb': baseline, 'rss_mb': _current_rss_mb()}
+
+
+def measure_deployment_rss(kind: str, model_path: Path) -> Dict[str, float]:
+    """
+    Memory of one deployment: current RSS of a fresh interpreter after loading the model and
+    running one prediction, and the growth over the same interpreter before loading it
+
+    A fresh process per deployment keeps runtimes and converters loaded by earlier variants
+    out of the measurement (the peak RSS of this process would not move for later variants).
+
+    Args:
+        kind: 'keras' or 'tflite'
+        model_path: Models directory (keras) or .tflite file
+
+    Returns:
+        Dict with 'rss_mb' and 'rss_growth_mb'
+    """
+    code = (
+        "import json; from tflite_model import _probe_deployment_rss; "
+        f"print(json.dumps(_probe_deployment_rss({kind!r}, {str(model_path)!r})))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        'rss_mb': round(probe['rss_mb'], 1),
+        'rss_growth_mb': round(probe['rss_mb'] - probe['baseline_mb'], 1)
+    }
+
+
+def evaluate_tflite_variants(
+    models_dir: Path,
+    feature_matrix: np.ndarray,
+    quantizations: List[str] = QUANTIZATION_MODES,
+    batch_sizes: List[int] = (1, 64)
+) -> Dict:
+    """
+    Convert the Keras model to each quantization mode and compare against the full model
+
+    Reports per-KPI mean/max absolute error (in denormalized KPI units), latency at each
+    batch size, flatbuffer size and the RSS of each deployment, measured in a fresh process
+    (see measure_deployment_rss).
+
+    Args:
+        models_dir: Directory containing the trained Keras model and scalers
+        feature_matrix: Scaled training feature matrix (used for calibration and evaluation)
+        quantizations: Quantization modes to evaluate
+        batch_sizes: Batch sizes to measure latency at
+
+    Returns:
+        Report dictionary (also written to trained_models/tflite_report.json)
+    """
+    from ml_model import load_model_and_scalers, KPI_MULTIPLIERS
+
+    model, _ = load_model_and_scalers(models_dir)
+
+    feature_matrix = feature_matrix.astype(np.float32)
+    multipliers = np.array(KPI_MULTIPLIERS, dtype=np.float64)
+
+    def keras_predict(batch):
+        outputs = model(batch, training=False)
+        return np.concatenate([np.asarray(o) for o in outputs], axis=1)
+
+    reference = keras_predict(feature_matrix)
+
+    keras_model_path = models_dir / 'kpi_prediction_model.keras'
+    report = {
+        'num_rows': int(len(feature_matrix)),
+        'keras': {
+            'model_size_kb': round(keras_model_path.stat().st_size / 1024, 1),
+            **measure_deployment_rss('keras', models_dir),
+            'latency': {str(bs): _measure_latency(keras_predict, feature_matrix, bs) for bs in batch_sizes}
+        },
+        'variants': {}
+    }
+
+    for quantization in quantizations:
+        flatbuffer = convert_to_tflite(model, quantization, calibration_features=feature_matrix)
+        path = save_tflite_model(flatbuffer, models_dir, quantization)
+
+        tflite_model = TFLiteKPIModel(path)
+
+        predictions = tflite_model.predict_batch(feature_matrix)
+        abs_error = np.abs(predictions - reference) * multipliers
+
+        report['variants'][quantization] = {
+            'model_size_kb': round(len(flatbuffer) / 1024, 1),
+            **measure_deployment_rss('tflite', path),
+            'latency': {str(bs): _measure_latency(tflite_model.predict_batch, feature_matrix, bs) for bs in batch_sizes},
+            'accuracy_delta': {
+                kpi: {
+                    'mean_abs_error': round(float(abs_error[:, i].mean()), 4),
+                    'max_abs_error': round(float(abs_error[:, i].max()), 4)
+                }
+                for i, kpi in enumerate(KPI_OUTPUT_NAMES)
+            }
+        }
+
+    with open(models_dir / 'tflite_report.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"✓ Saved TFLite report to {models_dir / 'tflite_report.json'}")
+
+    return report
+
+
+def log_report(report: Dict):
+    """Log a compact summary table of a TFLite evaluation report"""
+    logger.info("="*80)
+    logger.info(f"TFLITE VARIANTS vs KERAS ({report['num_rows']} rows)")
+    logger.info("="*80)
+
+    keras_info = report['keras']
+    latency_str = ', '.join(f"bs={bs}: {v['p50_ms']:.3f}ms" for bs, v in keras_info['latency'].items())
+    logger.info(f"keras    size={keras_info['model_size_kb']:>8.1f}KB  rss={keras_info['rss_mb']:>6.1f}MB (+{keras_info['rss_growth_mb']:.1f})  {latency_str}")
+
+    for quantization, info in report['variants'].items():
+        latency_str = ', '.join(f"bs={bs}: {v['p50_ms']:.3f}ms" for bs, v in info['latency'].items())
+        logger.info(f"{quantization:<8} size={info['model_size_kb']:>8.1f}KB  rss={info['rss_mb']:>6.1f}MB (+{info['rss_growth_mb']:.1f})  {latency_str}")
+        for kpi, delta in info['accuracy_delta'].items():
+            logger.info(f"    {kpi:<24} MAE Δ={delta['mean_abs_error']:.4f}  max Δ={delta['max_abs_error']:.4f}")
+
+
+def load_scaled_training_features(models_dir: Path) -> np.ndarray:
+    """
+    Build the scaled training feature matrix used for calibration and evaluation
+
+    Args:
+        models_dir: Directory containing the fitted scalers
+
+    Returns:
+        Scaled feature matrix of shape (N, 417)
+    """
+    from train_model import prepare_dataset
+    from ml_model import load_scalers
+    from feature_extraction import scale_feature_matrix
+
+    X, _ = prepare_dataset()
+    scalers = load_scalers(models_dir)
+    X_scaled = scale_feature_matrix(X, scalers)
+    assert X_scaled.shape[1] == TOTAL_FEATURE_DIM
+    return X_scaled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the KPI model to TFLite and report accuracy/latency")
+    parser.add_argument('--quantization', choices=QUANTIZATION_MODES, action='append',
+                        help="Quantization mode (repeatable, default: all)")
+    args = parser.parse_args()
+
+    models_dir = Path(__file__).parent / 'trained_models'
+    features = load_scaled_training_features(models_dir)
+    report = evaluate_tflite_variants(models_dir, features, quantizations=args.quantization or QUANTIZATION_MODES)
+    log_report(report)
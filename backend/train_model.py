@@ -110,7 +110,7 @@ def load_event_log():
                 all_events.append({
                     'order_id': order_id,
                     'event_name': event_name,
-                    'timestamp': pd.to_datetime(event_time),
+                    'timestamp': event_time,
                     'event_sequence': i
                 })
     
@@ -120,16 +120,13 @@ def load_event_log():
         logger.error("No events were extracted from XML. Check XML file format.")
         raise ValueError("Failed to parse events from XML file")
     
+    # Parse all timestamps in one call (per-event parsing dominated load time)
+    df_events['timestamp'] = pd.to_datetime(df_events['timestamp'])
     df_events = df_events.sort_values(['order_id', 'timestamp']).reset_index(drop=True)
     
-    # Calculate duration to next event
-    df_events['duration_minutes'] = 0.0
-    for order_id in df_events['order_id'].unique():
-        mask = df_events['order_id'] == order_id
-        order_events = df_events[mask].copy()
-        if len(order_events) > 1:
-            durations = (order_events['timestamp'].shift(-1) - order_events['timestamp']).dt.total_seconds() / 60
-            df_events.loc[mask, 'duration_minutes'] = durations.fillna(0).values
+    # Calculate duration to next event (0 for the last event of each order)
+    next_timestamp = df_events.groupby('order_id')['timestamp'].shift(-1)
+    df_events['duration_minutes'] = ((next_timestamp - df_events['timestamp']).dt.total_seconds() / 60).fillna(0.0)
     
     logger.info(f"✓ Loaded {len(df_events)} events for {df_events['order_id'].nunique()} orders")
     return df_events
@@ -303,6 +300,68 @@ def prepare_dataset():
     return X, y
 
 
+# Cached feature matrices live next to the data, keyed by the files they are built from
+FEATURE_CACHE_DIR = DATA_DIR / '.feature_cache'
+FEATURE_CACHE_VERSION = 1  # Bump when extract_features_for_order changes
+FEATURE_SOURCE_FILES = [
+    'o2c_data_orders_only.xml',
+    'order_kpis.csv',
+    'order_users.csv',
+    'order_items.csv',
+    'order_suppliers.csv'
+]
+
+
+def feature_cache_paths(cache_dir: Path = FEATURE_CACHE_DIR):
+    """
+    Paths of the cached (X, y) arrays for the current data files
+    
+    Returns:
+        Tuple of (X path, y path)
+    """
+    from dataset_fingerprint import DatasetManifest
+    key = DatasetManifest(DATA_DIR).cache_key(FEATURE_SOURCE_FILES).split(':', 1)[1][:16]
+    stem = f'features_v{FEATURE_CACHE_VERSION}_{key}'
+    return cache_dir / f'{stem}_X.npy', cache_dir / f'{stem}_y.npy'
+
+
+def load_or_prepare_dataset(cache_dir: Path = FEATURE_CACHE_DIR, mmap: bool = False):
+    """
+    Load the feature matrix from the cache, or build it from the feature store and cache it
+    
+    The cached arrays are reused until a source file changes (see dataset_fingerprint);
+    after a change the feature store re-extracts only the orders whose data changed.
+    
+    Args:
+        cache_dir: Cache directory
+        mmap: Memory-map the cached arrays (read-only) instead of reading them
+    
+    Returns:
+        Tuple of (X, y)
+    """
+    x_path, y_path = feature_cache_paths(cache_dir)
+    if x_path.exists() and y_path.exists():
+        logger.info(f"✓ Using cached feature matrix {x_path.name}")
+        mmap_mode = 'r' if mmap else None
+        return np.load(x_path, mmap_mode=mmap_mode), np.load(y_path, mmap_mode=mmap_mode)
+    
+    from feature_store import FeatureStore
+    store = FeatureStore(cache_dir)
+    store.refresh()
+    X, y = store.X, store.y
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for path, array in ((x_path, X), (y_path, y)):
+        tmp_path = path.with_name(f'.{path.name}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        tmp_path.replace(path)
+    logger.info(f"✓ Cached feature matrix as {x_path.name}")
+    
+    if mmap:
+        return np.load(x_path, mmap_mode='r'), np.load(y_path, mmap_mode='r')
+    return X, y
+
+
 def normalize_features(X_train, X_val, X_test):
     """Apply feature normalization with separate scalers"""
     logger.info("Applying feature normalization...")
@@ -430,25 +489,33 @@ def normalize_features(X_train, X_val, X_test):
     return X_train_scaled, X_val_scaled, X_test_scaled, scalers
 
 
-def build_model():
-    """Build the KPI prediction model"""
+def build_model(
+    hidden_units=(256, 128, 64),
+    dropout=(0.3, 0.2, 0.1),
+    learning_rate: float = 0.001
+):
+    """
+    Build the KPI prediction model
+    
+    Args:
+        hidden_units: Width of each shared hidden layer
+        dropout: Dropout rate after each hidden layer (a single rate applies to all)
+        learning_rate: Initial Adam learning rate
+    """
+    if isinstance(dropout, (int, float)):
+        dropout = [dropout] * len(hidden_units)
+    if len(dropout) != len(hidden_units):
+        raise ValueError(f"Need one dropout rate per hidden layer, got {len(dropout)} for {len(hidden_units)}")
+    
     inputs = keras.Input(shape=(417,), name='process_features')  # Updated from 409 to 417
     
     # Shared layers with regularization
-    x = keras.layers.Dense(256, kernel_regularizer=keras.regularizers.l2(0.0001))(inputs)
-    x = keras.layers.BatchNormalization()(x)
-    x = keras.layers.Activation('relu')(x)
-    x = keras.layers.Dropout(0.3)(x)
-    
-    x = keras.layers.Dense(128, kernel_regularizer=keras.regularizers.l2(0.0001))(x)
-    x = keras.layers.BatchNormalization()(x)
-    x = keras.layers.Activation('relu')(x)
-    x = keras.layers.Dropout(0.2)(x)
-    
-    x = keras.layers.Dense(64, kernel_regularizer=keras.regularizers.l2(0.0001))(x)
-    x = keras.layers.BatchNormalization()(x)
-    x = keras.layers.Activation('relu')(x)
-    x = keras.layers.Dropout(0.1)(x)
+    x = inputs
+    for units, rate in zip(hidden_units, dropout):
+        x = keras.layers.Dense(units, kernel_regularizer=keras.regularizers.l2(0.0001))(x)
+        x = keras.layers.BatchNormalization()(x)
+        x = keras.layers.Activation('relu')(x)
+        x = keras.layers.Dropout(rate)(x)
     
     # 5 output heads
     on_time_delivery = keras.layers.Dense(1, activation='linear', name='on_time_delivery')(x)
@@ -464,32 +531,22 @@ def build_model():
     )
     
     model.compile(
-        optimizer=keras.optimizers.Adam(learning_rate=0.001, clipnorm=1.0),
+        optimizer=keras.optimizers.Adam(learning_rate=learning_rate, clipnorm=1.0),
         loss=[keras.losses.Huber(delta=1.0) for _ in range(5)],
         metrics=[['mae'] for _ in range(5)]
     )
     
-    logger.info("✓ Model architecture built: 256 → 128 → 64 → 5 outputs")
+    logger.info(f"✓ Model architecture built: {' → '.join(str(u) for u in hidden_units)} → 5 outputs")
     return model
 
 
-def train_model():
-    """Main training pipeline"""
-    logger.info("="*80)
-    logger.info("🚀 STARTING MODEL TRAINING")
-    logger.info("="*80)
-    
-    start_time = datetime.now()
+def split_dataset(X, y):
+    """
+    Split into train/val/test (70/15/15, fixed seed)
     
-    # Check data files
-    if not check_data_files():
-        logger.error("❌ Cannot proceed without required data files")
-        return False
-    
-    # Prepare dataset
-    X, y = prepare_dataset()
-    
-    # Split data (70% train, 15% val, 15% test)
+    Returns:
+        Tuple of (X_train, X_val, X_test, y_train, y_val, y_test), unscaled
+    """
     logger.info("Splitting dataset...")
     X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.3, random_state=42)
     X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42)
@@ -497,36 +554,197 @@ def train_model():
     logger.info(f"✓ Train: {len(X_train)} samples")
     logger.info(f"✓ Validation: {len(X_val)} samples")
     logger.info(f"✓ Test: {len(X_test)} samples")
-    
-    # Normalize features
+    return X_train, X_val, X_test, y_train, y_val, y_test
+
+
+def split_and_normalize(X, y):
+    """
+    Split into train/val/test (70/15/15, fixed seed) and fit the feature scalers on train
+    
+    Returns:
+        Tuple of (X_train_scaled, X_val_scaled, X_test_scaled, y_train, y_val, y_test, scalers)
+    """
+    X_train, X_val, X_test, y_train, y_val, y_test = split_dataset(X, y)
     X_train_scaled, X_val_scaled, X_test_scaled, scalers = normalize_features(X_train, X_val, X_test)
-    
-    # Prepare targets (already normalized)
-    y_train_list = [y_train[:, i:i+1] for i in range(5)]
-    y_val_list = [y_val[:, i:i+1] for i in range(5)]
-    
-    # Build model
-    logger.info("="*80)
-    logger.info("BUILDING MODEL")
-    logger.info("="*80)
-    model = build_model()
-    
-    # Callbacks
-    callbacks = [
+    return X_train_scaled, X_val_scaled, X_test_scaled, y_train, y_val, y_test, scalers
+
+
+# Batch size and learning rate the model was tuned with; larger batches scale the rate
+BASE_BATCH_SIZE = 32
+BASE_LEARNING_RATE = 0.001
+# Default training batch size (see benchmark_training.py: same test MAE, ~5x faster epochs)
+TRAIN_BATCH_SIZE = 256
+SHUFFLE_BUFFER_SIZE = 10000
+
+
+def scaled_learning_rate(batch_size: int, base_learning_rate: float = BASE_LEARNING_RATE) -> float:
+    """
+    Learning rate for a batch size, by square-root scaling from BASE_BATCH_SIZE
+    
+    Larger batches take fewer, less noisy steps per epoch; for Adam, scaling the rate
+    with the square root of the batch-size ratio keeps convergence comparable.
+    """
+    return base_learning_rate * float(np.sqrt(batch_size / BASE_BATCH_SIZE))
+
+
+def make_dataset(
+    X,
+    y,
+    batch_size: int = BASE_BATCH_SIZE,
+    shuffle: bool = False,
+    seed: int = None,
+    sample_weight=None
+):
+    """
+    tf.data input pipeline for model.fit / evaluate
+    
+    Rows are converted to float32 and split into the 5 target heads once, cached in
+    memory after the first epoch, reshuffled every epoch, batched, and prefetched so
+    the next batch is ready while the current step runs.
+    
+    Args:
+        X: Scaled feature matrix (N, 417)
+        y: Normalized targets (N, 5)
+        batch_size: Rows per batch
+        shuffle: Reshuffle the rows every epoch (training data)
+        seed: Shuffle seed
+        sample_weight: Optional per-row loss weights (N,), e.g. from compact_dataset
+    
+    Returns:
+        tf.data.Dataset of (features, (5 target columns)[, weight]) batches
+    """
+    def split_targets(features, targets):
+        return tf.cast(features, tf.float32), tuple(tf.cast(targets[i:i+1], tf.float32) for i in range(5))
+    
+    if sample_weight is None:
+        dataset = tf.data.Dataset.from_tensor_slices((X, y)).map(split_targets, num_parallel_calls=tf.data.AUTOTUNE)
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices((X, y, sample_weight)).map(
+            lambda features, targets, weight: (*split_targets(features, targets), tf.cast(weight, tf.float32)),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
+    dataset = dataset.cache()
+    if shuffle:
+        dataset = dataset.shuffle(min(len(X), SHUFFLE_BUFFER_SIZE), seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def compact_dataset(X, y, tolerance: float = 0.0):
+    """
+    Collapse duplicate training rows into one weighted row
+    
+    Rows whose scaled features are identical (tolerance 0) or within `tolerance`
+    (Euclidean distance in scaled feature space) of a group's first row are merged:
+    the group keeps that row's features, the mean of the members' targets, and the
+    member count as its sample weight, so the weighted loss matches the uncompacted one
+    for exact duplicates.
+    
+    Args:
+        X: Scaled feature matrix (N, 417)
+        y: Normalized targets (N, 5)
+        tolerance: Merge radius in scaled feature space (0 = exact duplicates only)
+    
+    Returns:
+        Tuple of (X_compact, y_compact, sample_weight, group index per original row)
+    """
+    if tolerance <= 0:
+        _, first_rows, groups = np.unique(X, axis=0, return_index=True, return_inverse=True)
+        groups = groups.ravel()
+    else:
+        from sklearn.neighbors import NearestNeighbors
+        neighborhoods = NearestNeighbors(radius=tolerance).fit(X).radius_neighbors(X, return_distance=False)
+        groups = np.full(len(X), -1)
+        first_rows = []
+        # Greedy: each unassigned row starts a group with its unassigned neighbours
+        for row, neighbours in enumerate(neighborhoods):
+            if groups[row] >= 0:
+                continue
+            groups[neighbours[groups[neighbours] < 0]] = len(first_rows)
+            first_rows.append(row)
+        first_rows = np.asarray(first_rows)
+    
+    counts = np.bincount(groups, minlength=len(first_rows))
+    y_compact = np.zeros((len(first_rows), y.shape[1]))
+    np.add.at(y_compact, groups, y)
+    y_compact /= counts[:, None]
+    return np.asarray(X)[first_rows], y_compact, counts.astype(np.float32), groups
+
+
+def make_callbacks(verbose: int = 1):
+    """Early stopping on validation loss and learning-rate decay on plateaus"""
+    return [
         keras.callbacks.EarlyStopping(
             monitor='val_loss',
             patience=50,
             restore_best_weights=True,
-            verbose=1
+            verbose=verbose
         ),
         keras.callbacks.ReduceLROnPlateau(
             monitor='val_loss',
             factor=0.5,
             patience=15,
             min_lr=1e-6,
-            verbose=1
+            verbose=verbose
         )
     ]
+
+
+def save_scalers(scalers, output_dir: Path):
+    """Pickle fitted feature scalers as scaler_<name>.pkl"""
+    for name, scaler in scalers.items():
+        with open(output_dir / f'scaler_{name}.pkl', 'wb') as f:
+            pickle.dump(scaler, f)
+    logger.info(f"✓ Saved {len(scalers)} feature scalers")
+
+
+def train_model(batch_size: int = TRAIN_BATCH_SIZE, compact_tolerance: float = None):
+    """
+    Main training pipeline
+    
+    Args:
+        batch_size: Training batch size (the learning rate is scaled to match)
+        compact_tolerance: Collapse duplicate training rows within this distance into
+            weighted rows (see compact_dataset); None trains on every row
+    """
+    logger.info("="*80)
+    logger.info("🚀 STARTING MODEL TRAINING")
+    logger.info("="*80)
+    
+    start_time = datetime.now()
+    
+    # Check data files
+    if not check_data_files():
+        logger.error("❌ Cannot proceed without required data files")
+        return False
+    
+    # Prepare dataset (memory-mapped cached feature matrix if the data is unchanged)
+    X, y = load_or_prepare_dataset(mmap=True)
+    
+    # Split data (70% train, 15% val, 15% test) and normalize features
+    X_train_scaled, X_val_scaled, X_test_scaled, y_train, y_val, y_test, scalers = split_and_normalize(X, y)
+    
+    # Optionally merge duplicate training rows (validation and test rows stay as they are)
+    sample_weight = None
+    X_fit, y_fit = X_train_scaled, y_train
+    if compact_tolerance is not None:
+        X_fit, y_fit, sample_weight, _ = compact_dataset(X_train_scaled, y_train, compact_tolerance)
+        logger.info(f"✓ Compacted training set: {len(X_train_scaled)} → {len(X_fit)} rows "
+                    f"(ratio {len(X_train_scaled) / len(X_fit):.3f}, tolerance {compact_tolerance:g})")
+    
+    # Input pipelines (targets are already normalized)
+    train_dataset = make_dataset(X_fit, y_fit, batch_size, shuffle=True, seed=42, sample_weight=sample_weight)
+    val_dataset = make_dataset(X_val_scaled, y_val, 1024)
+    
+    # Build model
+    logger.info("="*80)
+    logger.info("BUILDING MODEL")
+    logger.info("="*80)
+    learning_rate = scaled_learning_rate(batch_size)
+    logger.info(f"Batch size {batch_size}, learning rate {learning_rate:.5f}")
+    model = build_model(learning_rate=learning_rate)
+    
+    # Callbacks
+    callbacks = make_callbacks()
     
     # Train
     logger.info("="*80)
@@ -536,12 +754,11 @@ def train_model():
     logger.info("This may take 5-10 minutes depending on your CPU...")
     
     history = model.fit(
-        X_train_scaled,
-        y_train_list,
-        validation_data=(X_val_scaled, y_val_list),
+        train_dataset,
+        validation_data=val_dataset,
         epochs=300,
-        batch_size=32,
         callbacks=callbacks,
+        shuffle=False,  # make_dataset shuffles
         verbose=1
     )
     
@@ -554,10 +771,14 @@ def train_model():
     model.save(MODELS_DIR / 'kpi_prediction_model.keras')
     logger.info(f"✓ Saved model to {MODELS_DIR / 'kpi_prediction_model.keras'}")
     
-    for name, scaler in scalers.items():
-        with open(MODELS_DIR / f'scaler_{name}.pkl', 'wb') as f:
-            pickle.dump(scaler, f)
-    logger.info(f"✓ Saved {len(scalers)} feature scalers")
+    save_scalers(scalers, MODELS_DIR)
+    
+    # Record the orders the model was trained on, so incremental retraining can find what changed
+    from feature_store import FeatureStore
+    from model_retraining import save_training_orders
+    store = FeatureStore()
+    store.refresh()
+    save_training_orders(MODELS_DIR, store.order_ids, store.signatures)
     
     # Save normalization config
     normalization_config = {
@@ -583,13 +804,12 @@ def train_model():
     logger.info("EVALUATING ON TEST SET")
     logger.info("="*80)
     
-    y_test_list = [y_test[:, i:i+1] for i in range(5)]
-    test_results = model.evaluate(X_test_scaled, y_test_list, verbose=0)
+    test_results = model.evaluate(make_dataset(X_test_scaled, y_test, 1024), verbose=0, return_dict=True)
     
-    logger.info(f"Test Loss: {test_results[0]:.6f}")
-    for i, kpi_name in enumerate(['on_time_delivery', 'days_sales_outstanding', 
-                                   'order_accuracy', 'invoice_accuracy', 'avg_cost_delivery']):
-        logger.info(f"  {kpi_name}_mae: {test_results[i*2+2]:.6f}")
+    logger.info(f"Test Loss: {test_results['loss']:.6f}")
+    for kpi_name in ['on_time_delivery', 'days_sales_outstanding', 
+                     'order_accuracy', 'invoice_accuracy', 'avg_cost_delivery']:
+        logger.info(f"  {kpi_name}_mae: {test_results[f'{kpi_name}_mae']:.6f}")
     
     # Training summary
     elapsed_time = datetime.now() - start_time
@@ -607,9 +827,225 @@ def train_model():
     return True
 
 
+def train_ensemble(
+    num_members: int = 5,
+    base_seed: int = 42,
+    epochs: int = 300,
+    batch_size: int = TRAIN_BATCH_SIZE,
+    output_dir: Path = MODELS_DIR / 'ensemble'
+):
+    """
+    Train a deep ensemble: M independently seeded copies of the KPI model
+    
+    All members share the data split and scalers; only weight initialization, dropout
+    masks and batch order differ (seed = base_seed + member index). Members are saved as
+    member_<i>.keras next to the scalers, for stacked serving with ensemble_model.py.
+    
+    Args:
+        num_members: Number of ensemble members (M)
+        base_seed: Seed of the first member
+        epochs: Maximum epochs per member (early stopping applies)
+        batch_size: Training batch size (the learning rate is scaled to match)
+        output_dir: Directory for the ensemble bundle
+    
+    Returns:
+        True if training succeeded
+    """
+    logger.info("="*80)
+    logger.info(f"🚀 STARTING ENSEMBLE TRAINING ({num_members} members)")
+    logger.info("="*80)
+    
+    start_time = datetime.now()
+    
+    if not check_data_files():
+        logger.error("❌ Cannot proceed without required data files")
+        return False
+    
+    X, y = load_or_prepare_dataset(mmap=True)
+    X_train_scaled, X_val_scaled, X_test_scaled, y_train, y_val, y_test, scalers = split_and_normalize(X, y)
+    val_dataset = make_dataset(X_val_scaled, y_val, 1024)
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    save_scalers(scalers, output_dir)
+    
+    test_predictions = []
+    member_summaries = []
+    for member in range(num_members):
+        seed = base_seed + member
+        logger.info("="*80)
+        logger.info(f"TRAINING MEMBER {member + 1}/{num_members} (seed={seed})")
+        logger.info("="*80)
+        
+        keras.utils.set_random_seed(seed)
+        model = build_model(learning_rate=scaled_learning_rate(batch_size))
+        history = model.fit(
+            make_dataset(X_train_scaled, y_train, batch_size, shuffle=True, seed=seed),
+            validation_data=val_dataset,
+            epochs=epochs,
+            callbacks=make_callbacks(verbose=0),
+            shuffle=False,  # make_dataset shuffles
+            verbose=0
+        )
+        model.save(output_dir / f'member_{member}.keras')
+        
+        member_test = np.concatenate(model.predict(X_test_scaled, verbose=0), axis=1)
+        test_predictions.append(member_test)
+        member_summaries.append({
+            'member': member,
+            'seed': seed,
+            'epochs_trained': len(history.history['loss']),
+            'best_val_loss': float(min(history.history['val_loss'])),
+            'test_mae': float(np.abs(member_test - y_test).mean())
+        })
+        logger.info(f"✓ Member {member}: {member_summaries[-1]['epochs_trained']} epochs, "
+                    f"val_loss={member_summaries[-1]['best_val_loss']:.6f}, "
+                    f"test MAE={member_summaries[-1]['test_mae']:.6f}")
+    
+    # Ensemble vs members on the test set (normalized units)
+    test_predictions = np.stack(test_predictions, axis=1)  # (N, M, 5)
+    ensemble_mean = test_predictions.mean(axis=1)
+    ensemble_mae = np.abs(ensemble_mean - y_test).mean(axis=0)
+    
+    kpi_names = ['on_time_delivery', 'days_sales_outstanding', 'order_accuracy', 'invoice_accuracy', 'avg_cost_delivery']
+    ensemble_config = {
+        'num_members': num_members,
+        'base_seed': base_seed,
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'members': member_summaries,
+        'ensemble_test_mae': {name: float(ensemble_mae[i]) for i, name in enumerate(kpi_names)},
+        'mean_member_test_mae': float(np.mean([m['test_mae'] for m in member_summaries]))
+    }
+    with open(output_dir / 'ensemble_config.json', 'w') as f:
+        json.dump(ensemble_config, f, indent=2)
+    
+    from ml_model import calculate_dataset_hash
+    with open(output_dir / 'dataset_hash.txt', 'w') as f:
+        f.write(calculate_dataset_hash(DATA_DIR))
+    
+    logger.info("="*80)
+    logger.info("✅ ENSEMBLE TRAINING COMPLETE!")
+    logger.info("="*80)
+    logger.info(f"Total time: {datetime.now() - start_time}")
+    logger.info(f"Mean member test MAE: {ensemble_config['mean_member_test_mae']:.6f}")
+    logger.info(f"Ensemble test MAE:    {float(ensemble_mae.mean()):.6f}")
+    for name, mae in ensemble_config['ensemble_test_mae'].items():
+        logger.info(f"  {name}_mae: {mae:.6f}")
+    logger.info(f"✓ Saved ensemble to {output_dir}")
+    
+    return True
+
+
+def train_gbdt(output_dir: Path = MODELS_DIR, compact_tolerance: float = None):
+    """
+    Train the gradient-boosted tree backend (one regressor per KPI) next to a bundle's model
+    
+    Uses the same split as train_model. If the bundle already has scalers the trees are
+    trained on features scaled with them, so the GBDT and the Keras model share one set of
+    scalers; otherwise the scalers are fitted and saved. The trees are compiled into
+    kpi_gbdt_model.npz (see gbdt_model.py) and their test MAE is written to gbdt_config.json.
+    
+    Args:
+        output_dir: Bundle directory
+        compact_tolerance: Collapse duplicate training rows into weighted rows first
+    
+    Returns:
+        True if training succeeded
+    """
+    from gbdt_model import GBDT_PARAMS, GBDT_CONFIG_FILE, fit_gbdt, compile_gbdt, gbdt_model_path
+    from feature_extraction import scale_feature_matrix
+    
+    logger.info("="*80)
+    logger.info("🚀 STARTING GBDT TRAINING")
+    logger.info("="*80)
+    
+    start_time = datetime.now()
+    
+    if not check_data_files():
+        logger.error("❌ Cannot proceed without required data files")
+        return False
+    
+    X, y = load_or_prepare_dataset(mmap=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if list(output_dir.glob('scaler_*.pkl')):
+        from ml_model import load_scalers
+        X_train, _, X_test, y_train, _, y_test = split_dataset(X, y)
+        scalers = load_scalers(output_dir)
+        X_train_scaled = scale_feature_matrix(X_train, scalers)
+        X_test_scaled = scale_feature_matrix(X_test, scalers)
+        logger.info(f"✓ Using the scalers of {output_dir}")
+    else:
+        X_train_scaled, _, X_test_scaled, y_train, _, y_test, scalers = split_and_normalize(X, y)
+        save_scalers(scalers, output_dir)
+    
+    sample_weight = None
+    if compact_tolerance is not None:
+        X_train_scaled, y_train, sample_weight, _ = compact_dataset(X_train_scaled, y_train, compact_tolerance)
+    
+    fit_start = datetime.now()
+    regressors = fit_gbdt(X_train_scaled, y_train, sample_weight=sample_weight)
+    training_seconds = (datetime.now() - fit_start).total_seconds()
+    gbdt = compile_gbdt(regressors)
+    
+    # The compiled trees must reproduce scikit-learn's own predictions
+    reference = np.stack([regressor.predict(X_test_scaled) for regressor in regressors], axis=1)
+    test_predictions = gbdt.predict_batch(X_test_scaled)
+    compile_error = float(np.abs(test_predictions - reference).max())
+    if compile_error > 1e-5:
+        logger.error(f"❌ Compiled trees differ from scikit-learn's predictions by {compile_error:.2e}")
+        return False
+    
+    gbdt.save(gbdt_model_path(output_dir))
+    
+    kpi_names = ['on_time_delivery', 'days_sales_outstanding', 'order_accuracy', 'invoice_accuracy', 'avg_cost_delivery']
+    test_mae = np.abs(test_predictions - y_test).mean(axis=0)
+    gbdt_config = {
+        'params': GBDT_PARAMS,
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'training_seconds': round(training_seconds, 2),
+        'iterations': {name: int(regressors[i].n_iter_) for i, name in enumerate(kpi_names)},
+        'num_trees': gbdt.num_trees,
+        'num_nodes': gbdt.num_nodes,
+        'depth': gbdt.depth,
+        'compact_tolerance': compact_tolerance,
+        'test_mae': {name: float(test_mae[i]) for i, name in enumerate(kpi_names)}
+    }
+    with open(output_dir / GBDT_CONFIG_FILE, 'w') as f:
+        json.dump(gbdt_config, f, indent=2)
+    
+    logger.info("="*80)
+    logger.info("✅ GBDT TRAINING COMPLETE!")
+    logger.info("="*80)
+    logger.info(f"Total time: {datetime.now() - start_time} (fit {training_seconds:.1f}s)")
+    logger.info(f"Trees: {gbdt.num_trees} (depth ≤ {gbdt.depth}), test MAE: {float(test_mae.mean()):.6f}")
+    for name, mae in gbdt_config['test_mae'].items():
+        logger.info(f"  {name}_mae: {mae:.6f}")
+    
+    return True
+
+
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train the KPI prediction model")
+    parser.add_argument('--ensemble', type=int, default=0, metavar='M',
+                        help="Train a deep ensemble of M seeded members instead of a single model")
+    parser.add_argument('--gbdt', action='store_true',
+                        help="Train the gradient-boosted tree backend next to the existing model instead")
+    parser.add_argument('--epochs', type=int, default=300, help="Maximum epochs per model (ensemble mode)")
+    parser.add_argument('--batch-size', type=int, default=TRAIN_BATCH_SIZE,
+                        help=f"Training batch size; the learning rate scales with it (tuned at {BASE_BATCH_SIZE})")
+    parser.add_argument('--compact-tolerance', type=float, default=None, metavar='TOL',
+                        help="Merge duplicate training rows within TOL (scaled feature space, 0 = exact) "
+                             "into weighted rows (single model or GBDT)")
+    args = parser.parse_args()
+    
     try:
-        success = train_model()
+        if args.gbdt:
+            success = train_gbdt(compact_tolerance=args.compact_tolerance)
+        elif args.ensemble:
+            success = train_ensemble(num_members=args.ensemble, epochs=args.epochs, batch_size=args.batch_size)
+        else:
+            success = train_model(batch_size=args.batch_size, compact_tolerance=args.compact_tolerance)
         if success:
             print("\n✅ Model training completed successfully!")
             print("You can now start the backend with: python main.py")
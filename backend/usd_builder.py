@@ -3,7 +3,7 @@ USD Builder for O2C Process Visualization
 Converts O2C event sequences into USD/GLTF 3D animations
 """
 
-import json
+import os
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -11,20 +11,16 @@ from typing import Dict, List, Any, Tuple
 from datetime import datetime
 import logging
 
-
-class NumpyEncoder(json.JSONEncoder):
-    """Custom JSON encoder for numpy types"""
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.int64)):
-            return int(obj)
-        elif isinstance(obj, (np.floating, np.float64)):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super(NumpyEncoder, self).default(obj)
+from compression import write_precompressed
+from reference_catalog import EntityTable, get_reference_catalog
+from serialization import dumps
+from stage_metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Bump when the scene format or layout logic changes; cached scenes of older versions are not reused
+SCENE_BUILDER_VERSION = 1
+
 def generate_dynamic_supplier_positions(supplier_ids: List[str]) -> Dict[str, Dict[str, Any]]:
     """
     Dynamically generate positions for suppliers based on how many there are.
@@ -48,15 +44,14 @@ def generate_dynamic_supplier_positions(supplier_ids: List[str]) -> Dict[str, Di
     x_spacing = x_range / max(top_count, bottom_count) if count > 0 else 8
     x_start = -32
     
-    # Load supplier data for labels and countries
-    data_dir = Path(__file__).parent.parent / 'data'
-    df_suppliers = pd.read_csv(data_dir / 'suppliers.csv')
+    # Supplier data for labels and countries
+    suppliers = get_reference_catalog().suppliers
     
     # Position top row
     for i, sid in enumerate(supplier_ids[:top_count]):
-        supplier_info = df_suppliers[df_suppliers['supplier_id'] == sid]
-        label = supplier_info['name'].iloc[0].split()[0] if len(supplier_info) > 0 else sid
-        country = supplier_info['country'].iloc[0] if len(supplier_info) > 0 else 'USA'
+        supplier_info = suppliers.get(sid)
+        label = supplier_info['name'].split()[0] if supplier_info is not None else sid
+        country = supplier_info['country'] if supplier_info is not None else 'USA'
         
         positions[sid] = {
             'x': x_start + i * x_spacing,
@@ -68,9 +63,9 @@ def generate_dynamic_supplier_positions(supplier_ids: List[str]) -> Dict[str, Di
     
     # Position bottom row
     for i, sid in enumerate(supplier_ids[top_count:]):
-        supplier_info = df_suppliers[df_suppliers['supplier_id'] == sid]
-        label = supplier_info['name'].iloc[0].split()[0] if len(supplier_info) > 0 else sid
-        country = supplier_info['country'].iloc[0] if len(supplier_info) > 0 else 'USA'
+        supplier_info = suppliers.get(sid)
+        label = supplier_info['name'].split()[0] if supplier_info is not None else sid
+        country = supplier_info['country'] if supplier_info is not None else 'USA'
         
         positions[sid] = {
             'x': x_start + i * x_spacing,
@@ -254,26 +249,14 @@ def get_item_supplier_mapping(case_id: str, data_dir: Path) -> Dict[str, str]:
     Returns:
         Dict mapping item_id to supplier_id
     """
-    order_suppliers_path = data_dir / 'order_suppliers.csv'
-    if not order_suppliers_path.exists():
-        return {}
-    
-    df_order_suppliers = pd.read_csv(order_suppliers_path)
-    order_suppliers = df_order_suppliers[df_order_suppliers['order_id'] == case_id]
-    
-    # Create item_id -> supplier_id mapping
-    item_supplier_map = {}
-    for _, row in order_suppliers.iterrows():
-        item_supplier_map[row['item_id']] = row['supplier_id']
-    
-    return item_supplier_map
+    return get_reference_catalog(data_dir).item_supplier_map(case_id)
 
 
 def generate_item_paths(
     items: List[Dict[str, Any]],
     item_supplier_map: Dict[str, str],
     keyframes: List[Dict[str, Any]],
-    items_df: pd.DataFrame,
+    item_table: EntityTable,
     activity_positions: Dict[str, Dict[str, Any]],
     supplier_positions: Dict[str, Dict[str, Any]]
 ) -> List[Dict[str, Any]]:
@@ -288,7 +271,7 @@ def generate_item_paths(
         items: List of item dictionaries
         item_supplier_map: Mapping of item_id to supplier_id
         keyframes: Order event keyframes
-        items_df: DataFrame with item information (for category lookup)
+        item_table: Item catalog table (for category lookup)
         activity_positions: Dynamic positions for activities
         supplier_positions: Dynamic positions for suppliers
         
@@ -391,8 +374,8 @@ def generate_item_paths(
         })
         
         # Get item category for color
-        item_row = items_df[items_df['item_id'] == item_id]
-        category = item_row['category'].iloc[0] if len(item_row) > 0 else 'Others'
+        item_row = item_table.get(item_id)
+        category = item_row['category'] if item_row is not None else 'Others'
         color = CATEGORY_COLORS.get(category, CATEGORY_COLORS['Others'])
         
         # Stagger departure slightly after trigger event (avoid visual overlap)
@@ -514,7 +497,28 @@ def assign_users_to_events(events: List[Dict[str, Any]], available_users: List[s
     return event_to_user
 
 
-def generate_gltf_for_case(
+@metrics.timed('scene.write')
+def write_scene_file(scene_data: Dict[str, Any], output_file: Path, precompress: bool = True):
+    """
+    Write a scene as compact JSON, atomically (temp file + rename), so a concurrent
+    reader never sees a half-written file, plus its precompressed .gz/.br siblings.
+    
+    Args:
+        scene_data: Scene dictionary (may contain numpy types)
+        output_file: Destination path
+        precompress: Also write the .gz/.br siblings served for /exports
+    """
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_file.with_name(f'.{output_file.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(scene_data))
+    os.replace(tmp_path, output_file)
+    if precompress:
+        write_precompressed(output_file)
+
+
+@metrics.timed('scene.build')
+def build_scene_data(
     case_id: str,
     events: List[Dict[str, Any]],
     order_info: Dict[str, Any],
@@ -522,13 +526,10 @@ def generate_gltf_for_case(
     items: List[Dict[str, Any]],
     suppliers: List[str],
     kpis: Dict[str, float],
-    export_dir: Path
-) -> Tuple[str, Dict[str, Any]]:
+    data_dir: Path
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
-    Generate a GLTF-compatible JSON file for a single O2C case.
-    
-    Since USD Python libraries (pxr) may not be installed, we'll create a
-    simplified JSON format that can be consumed by the Three.js frontend.
+    Build the GLTF-compatible scene of a single O2C case (positions, keyframes, item paths).
     
     Args:
         case_id: Order ID
@@ -538,15 +539,12 @@ def generate_gltf_for_case(
         items: List of item dictionaries
         suppliers: List of supplier IDs
         kpis: KPI values for this order
-        export_dir: Directory to save the export
+        data_dir: Path to data directory (reference catalog)
         
     Returns:
-        Tuple of (file_path, metadata)
+        Tuple of (scene_data, metadata)
     """
     try:
-        # Ensure export directory exists
-        export_dir.mkdir(parents=True, exist_ok=True)
-        
         # Get unique activities from this case
         unique_activities = []
         for event in events:
@@ -671,19 +669,12 @@ def generate_gltf_for_case(
         # Calculate total duration (after normalization)
         total_duration = keyframes[-1]['time'] if keyframes else 0
         
-        # Load items dataframe and get item-supplier mapping
-        data_dir = export_dir.parent.parent / 'data'
-        items_csv_path = data_dir / 'items.csv'
-        if items_csv_path.exists():
-            items_df = pd.read_csv(items_csv_path)
-        else:
-            # Create empty DataFrame with expected columns
-            items_df = pd.DataFrame(columns=['item_id', 'name', 'category', 'unit_price', 'weight_kg', 'stock_status'])
-        
+        # Item catalog and item-supplier mapping
         item_supplier_map = get_item_supplier_mapping(case_id, data_dir)
         
         # Generate item animation paths
-        item_paths = generate_item_paths(items, item_supplier_map, keyframes, items_df, activity_positions, supplier_positions)
+        item_table = get_reference_catalog(data_dir).items
+        item_paths = generate_item_paths(items, item_supplier_map, keyframes, item_table, activity_positions, supplier_positions)
         
         # Build complete scene data (convert numpy types to native Python types)
         scene_data = {
@@ -739,13 +730,6 @@ def generate_gltf_for_case(
             ],
         }
         
-        # Save to JSON file using custom encoder for numpy types
-        output_file = export_dir / f'{case_id}_scene.json'
-        with open(output_file, 'w') as f:
-            json.dump(scene_data, f, indent=2, cls=NumpyEncoder)
-        
-        logger.info(f"Generated scene file: {output_file}")
-        
         metadata = {
             'case_id': case_id,
             'duration': total_duration,
@@ -754,13 +738,55 @@ def generate_gltf_for_case(
             'end_time': max_time.isoformat() if max_time else None,
         }
         
-        return str(output_file), metadata
+        return scene_data, metadata
         
     except Exception as e:
         logger.error(f"Error generating GLTF for case {case_id}: {e}")
         raise
 
 
+def generate_gltf_for_case(
+    case_id: str,
+    events: List[Dict[str, Any]],
+    order_info: Dict[str, Any],
+    users: List[str],
+    items: List[Dict[str, Any]],
+    suppliers: List[str],
+    kpis: Dict[str, float],
+    export_dir: Path
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Generate a GLTF-compatible JSON file for a single O2C case.
+    
+    Since USD Python libraries (pxr) may not be installed, we'll create a
+    simplified JSON format that can be consumed by the Three.js frontend.
+    
+    Args:
+        case_id: Order ID
+        events: List of event dictionaries with 'event_name' and 'timestamp'
+        order_info: Order metadata (value, status, etc.)
+        users: List of user IDs involved
+        items: List of item dictionaries
+        suppliers: List of supplier IDs
+        kpis: KPI values for this order
+        export_dir: Directory to save the export
+        
+    Returns:
+        Tuple of (file_path, metadata)
+    """
+    scene_data, metadata = build_scene_data(
+        case_id, events, order_info, users, items, suppliers, kpis, export_dir.parent.parent / 'data'
+    )
+    
+    # Save to JSON file using custom encoder for numpy types
+    output_file = export_dir / f'{case_id}_scene.json'
+    write_scene_file(scene_data, output_file)
+    logger.info(f"Generated scene file: {output_file}")
+    
+    return str(output_file), metadata
+
+
+@metrics.timed('scene.case_data')
 def get_sample_case_data(
     data_loader,
     case_id: str = None,
@@ -780,22 +806,15 @@ def get_sample_case_data(
     import random
     import numpy as np
     
-    # Load enriched data
-    data_dir = Path(__file__).parent.parent / 'data'
-    
-    df_orders = pd.read_csv(data_dir / 'orders_enriched.csv')
-    df_order_users = pd.read_csv(data_dir / 'order_users.csv')
-    df_order_items = pd.read_csv(data_dir / 'order_items.csv')
-    df_order_suppliers = pd.read_csv(data_dir / 'order_suppliers.csv')
-    df_kpis = pd.read_csv(data_dir / 'order_kpis.csv')
-    df_items = pd.read_csv(data_dir / 'items.csv')
+    # Enriched order data (shared in-memory catalog)
+    catalog = get_reference_catalog()
     
     # Select case
     if case_id is None:
         # Use seed to consistently pick the same sample
         random.seed(seed)
         np.random.seed(seed)
-        case_id = df_orders['order_id'].iloc[seed % len(df_orders)]
+        case_id = catalog.orders.ids[seed % len(catalog.orders)]
     
     logger.info(f"Fetching data for case: {case_id}")
     
@@ -811,7 +830,7 @@ def get_sample_case_data(
         })
     
     # Get order info
-    order_row = df_orders[df_orders['order_id'] == case_id].iloc[0]
+    order_row = catalog.orders.rows[case_id]
     order_info = {
         'order_value': order_row['order_value'],
         'order_status': order_row['order_status'],
@@ -820,27 +839,24 @@ def get_sample_case_data(
     }
     
     # Get users
-    users_df = df_order_users[df_order_users['order_id'] == case_id]
-    users = users_df['user_id'].tolist()
+    users = catalog.order_user_ids(case_id)
     
     # Get items
-    items_df = df_order_items[df_order_items['order_id'] == case_id]
-    items_df = items_df.merge(df_items[['item_id', 'name', 'category']], on='item_id', how='left')
     items = []
-    for _, row in items_df.iterrows():
+    for row in catalog.order_items.get(case_id, ()):
+        item = catalog.items.get(row['item_id'])
         items.append({
             'item_id': row['item_id'],
-            'name': row['name'],
+            'name': item['name'] if item is not None else None,
             'quantity': row['quantity'],
             'line_total': row['line_total'],
         })
     
     # Get suppliers
-    suppliers_df = df_order_suppliers[df_order_suppliers['order_id'] == case_id]
-    suppliers = suppliers_df['supplier_id'].tolist()
+    suppliers = catalog.order_supplier_ids(case_id)
     
     # Get KPIs (denormalized)
-    kpi_row = df_kpis[df_kpis['order_id'] == case_id].iloc[0]
+    kpi_row = catalog.order_kpis.rows[case_id]
     kpis = {
         'on_time_delivery': kpi_row['on_time_delivery'],
         'days_sales_outstanding': kpi_row['days_sales_outstanding'],